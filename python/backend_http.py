@@ -0,0 +1,144 @@
+"""Shared JSON POST helper for backend /sync endpoints with optional compression.
+
+Voucher and master payloads repeat the same camelCase keys and ledger names
+thousands of times, so they shrink 10-20x under gzip/zstd. Compression is
+opt-in via SYNC_BODY_COMPRESSION=gzip|zstd (default: off) and negotiated per
+endpoint: the first compressed POST to an endpoint either succeeds (the
+endpoint is remembered as accepting that encoding) or is rejected with
+400/415/501, in which case it is resent as plain JSON and the endpoint stays
+plain for the rest of the process. zstd needs the optional `zstandard`
+package and silently falls back to gzip without it.
+
+Callers that pass `encode` (voucher batches) can also send a dictionary-encoded
+body (symbol_table.encode_records: a name table plus integer references) with
+X-Payload-Encoding: symbols. That is opt-in via SYNC_PAYLOAD_ENCODING=symbols
+and negotiated per endpoint the same way: a 400/415/501 on the first try sends
+the batch again as plain records and keeps the endpoint plain.
+
+`post_json` returns (response, raw_bytes, wire_bytes) and logs both sizes to
+the sync log so the savings are visible per batch. With retry=False the POST
+skips sync_logger's transparent retries, for callers (BatchUploader senders)
+that back off and resend themselves.
+"""
+
+import gzip
+import logging
+import os
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+import requests
+
+import serializer
+from sync_logger import get_sync_logger, no_request_retries
+
+try:
+    import zstandard as _zstd
+except ImportError:  # optional dependency
+    _zstd = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+if not logger.handlers:
+    logger.handlers.extend(get_sync_logger().handlers)
+    logger.propagate = False
+
+COMPRESSION = os.getenv('SYNC_BODY_COMPRESSION', 'off').strip().lower()
+PAYLOAD_ENCODING = os.getenv('SYNC_PAYLOAD_ENCODING', 'off').strip().lower()
+MIN_COMPRESS_BYTES = 1024  # not worth the CPU / header below this
+_REJECTED_STATUS = {400, 415, 501}
+
+# (scheme, host, port, path) → negotiated encoding, or None once rejected.
+_endpoint_encoding: dict = {}
+# (scheme, host, port, path) → whether symbol-encoded bodies are accepted.
+_endpoint_symbols: dict = {}
+
+
+def _preferred_encoding() -> str | None:
+    if COMPRESSION == 'zstd':
+        return 'zstd' if _zstd is not None else 'gzip'
+    if COMPRESSION == 'gzip':
+        return 'gzip'
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'zstd':
+        return _zstd.ZstdCompressor(level=3).compress(body)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _endpoint_key(url: str) -> tuple:
+    parts = urlsplit(url)
+    return parts.scheme, parts.hostname, parts.port, parts.path
+
+
+def post_json(url: str, payload, headers: dict, timeout: int = 30, label: str = None,
+              encode=None, retry: bool = True):
+    """POST `payload` (object or pre-encoded JSON bytes) with negotiated compression.
+
+    `encode(payload)` builds the dictionary-encoded form of the payload, sent
+    instead when SYNC_PAYLOAD_ENCODING=symbols and the endpoint takes it.
+    `retry=False` sends each request once, so 429/5xx reach the caller at once.
+    Raises the same `requests` exceptions as `requests.post`. Returns
+    (response, raw_bytes, wire_bytes).
+    """
+    with nullcontext() if retry else no_request_retries():
+        return _post_negotiated(url, payload, headers, timeout, label, encode)
+
+
+def _post_negotiated(url: str, payload, headers: dict, timeout: int, label: str, encode):
+    key = _endpoint_key(url)
+    if encode is not None and PAYLOAD_ENCODING == 'symbols' and _endpoint_symbols.get(key, True):
+        negotiated = key in _endpoint_encoding
+        response, raw_bytes, wire_bytes = _post(url, encode(payload),
+                                                dict(headers or {}, **{'X-Payload-Encoding': 'symbols'}),
+                                                timeout, label)
+        if response.status_code not in _REJECTED_STATUS or key in _endpoint_symbols:
+            if response.status_code in (200, 201):
+                _endpoint_symbols[key] = True
+            return response, raw_bytes, wire_bytes
+        logger.warning(f"⚠️ {key[3]} rejected X-Payload-Encoding symbols (HTTP {response.status_code}) "
+                       f"— sending plain records to this endpoint")
+        _endpoint_symbols[key] = False
+        if not negotiated and _endpoint_encoding.get(key, '') is None:
+            # The rejection may have been the symbols, not the compression: negotiate that again.
+            del _endpoint_encoding[key]
+    return _post(url, payload, headers, timeout, label)
+
+
+def _post(url: str, payload, headers: dict, timeout: int, label: str):
+    body = payload if isinstance(payload, (bytes, bytearray)) else serializer.dumps(payload)
+    raw_bytes = len(body)
+    key = _endpoint_key(url)
+    encoding = _endpoint_encoding.get(key, _preferred_encoding())
+    if raw_bytes < MIN_COMPRESS_BYTES:
+        encoding = None
+
+    send_headers = dict(headers or {})
+    send_headers['Content-Type'] = 'application/json'
+    if encoding:
+        wire = _compress(body, encoding)
+        send_headers['Content-Encoding'] = encoding
+        response = requests.post(url, data=wire, headers=send_headers, timeout=timeout)
+        if response.status_code in _REJECTED_STATUS and key not in _endpoint_encoding:
+            logger.warning(f"⚠️ {key[3]} rejected Content-Encoding {encoding} (HTTP {response.status_code}) "
+                           f"— falling back to plain JSON for this endpoint")
+            _endpoint_encoding[key] = None
+            send_headers.pop('Content-Encoding', None)
+            response = requests.post(url, data=body, headers=send_headers, timeout=timeout)
+            wire = body
+        elif response.status_code in (200, 201):
+            _endpoint_encoding[key] = encoding
+    else:
+        wire = body
+        response = requests.post(url, data=body, headers=send_headers, timeout=timeout)
+
+    wire_bytes = len(wire)
+    if wire_bytes != raw_bytes:
+        logger.info(f"🗜️ {label or key[3]}: {raw_bytes:,} → {wire_bytes:,} bytes "
+                    f"({send_headers.get('Content-Encoding', 'identity')}, "
+                    f"{100.0 * wire_bytes / raw_bytes:.1f}%)")
+    else:
+        logger.debug(f"📦 {label or key[3]}: {raw_bytes:,} bytes (uncompressed)")
+    return response, raw_bytes, wire_bytes
@@ -0,0 +1,180 @@
+"""Concurrent sliding-window batch uploader for backend /sync endpoints.
+
+Voucher and master sync used to POST one batch at a time with a fixed sleep
+(BATCH_DELAY) in between, so throughput was capped by round-trip latency to the
+backend rather than by what the backend could actually absorb. `BatchUploader`
+keeps up to N batches in flight on a thread pool and adapts the window AIMD
+style: it grows by one after a window's worth of healthy responses, halves on
+429/5xx/transport errors, and backs off by one when latency drifts well above
+the best latency seen so far.
+
+Senders post with sync_logger's transparent retries off, so a 429/5xx or
+transport error reaches `_adapt` on the first response instead of after the
+retry backoff. The uploader resends such batches itself (up to
+SYNC_UPLOAD_ATTEMPTS tries, backing off SYNC_UPLOAD_RETRY_DELAY seconds,
+doubling) once the window has shrunk.
+
+Every batch's outcome is tracked individually so callers can keep the
+"advance the AlterID watermark only if ALL batches succeeded" rule.
+
+`send(item)` must return a dict: {success, saved, status, bytes, error}.
+"""
+
+import heapq
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv('SYNC_UPLOAD_WINDOW', '4'))
+# Shrink the window when a batch's latency exceeds this multiple of the best
+# (smoothed) latency observed during the run.
+LATENCY_TOLERANCE = 2.0
+_THROTTLE_STATUS = {429, 500, 502, 503, 504}
+DEFAULT_MAX_ATTEMPTS = int(os.getenv('SYNC_UPLOAD_ATTEMPTS', '4'))
+RETRY_DELAY = float(os.getenv('SYNC_UPLOAD_RETRY_DELAY', '1.0'))
+
+
+def _throttled(result: dict) -> bool:
+    status = result.get('status')
+    return not result.get('success') and (status is None or status in _THROTTLE_STATUS)
+
+
+class BatchUploader:
+    """Upload batches with an adaptive number of concurrent requests."""
+
+    def __init__(self, send, max_in_flight: int = None, min_in_flight: int = 1,
+                 name: str = 'upload', max_attempts: int = None, retry_delay: float = None):
+        self.send = send
+        self.max_attempts = max(1, max_attempts or DEFAULT_MAX_ATTEMPTS)
+        self.retry_delay = RETRY_DELAY if retry_delay is None else retry_delay
+        self.max_in_flight = max(1, max_in_flight or DEFAULT_MAX_IN_FLIGHT)
+        self.min_in_flight = max(1, min(min_in_flight, self.max_in_flight))
+        self.name = name
+        self.window = max(self.min_in_flight, self.max_in_flight // 2)
+        self._ewma_latency = None
+        self._best_latency = None
+        self._healthy_streak = 0
+        self.throttled = 0
+        self.retried = 0
+
+    def _adapt(self, result: dict, latency: float):
+        status = result.get('status')
+        if _throttled(result):
+            # Congestion / backend distress: multiplicative decrease.
+            self.throttled += 1
+            self._healthy_streak = 0
+            new_window = max(self.min_in_flight, self.window // 2)
+            if new_window != self.window:
+                logger.warning(f"⚠️ [{self.name}] HTTP {status or 'error'} — shrinking upload window "
+                               f"{self.window} → {new_window}")
+            self.window = new_window
+            return
+        if not result.get('success'):
+            return  # 4xx payload/auth errors say nothing about capacity
+
+        self._ewma_latency = latency if self._ewma_latency is None else 0.7 * self._ewma_latency + 0.3 * latency
+        if self._best_latency is None or self._ewma_latency < self._best_latency:
+            self._best_latency = self._ewma_latency
+
+        if self._ewma_latency > self._best_latency * LATENCY_TOLERANCE:
+            self._healthy_streak = 0
+            self.window = max(self.min_in_flight, self.window - 1)
+            return
+
+        # Additive increase: one extra slot per window of healthy responses.
+        self._healthy_streak += 1
+        if self._healthy_streak >= self.window and self.window < self.max_in_flight:
+            self.window += 1
+            self._healthy_streak = 0
+
+    def upload(self, batches, on_result=None) -> dict:
+        """Send every item from `batches` (any iterable; consumed lazily).
+
+        `on_result(item, result)` is called on the caller's thread as each batch
+        completes (after its last attempt). Returns a report with per-batch
+        results in submission order.
+        """
+        started = time.perf_counter()
+        results = []
+        report = {'batches': 0, 'succeeded': 0, 'failed': 0, 'saved': 0, 'bytes': 0}
+        pending = {}
+        retries = []  # heap of (ready_at, index, attempt, item)
+        source = iter(batches)
+        exhausted = False
+        peak_window = self.window
+
+        def timed_send(item):
+            t0 = time.perf_counter()
+            try:
+                result = self.send(item)
+            except Exception as e:
+                result = {'success': False, 'saved': 0, 'status': None, 'bytes': 0, 'error': str(e)[:200]}
+            return result, time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                thread_name_prefix=f'{self.name}-upload') as pool:
+            while True:
+                now = time.monotonic()
+                while retries and retries[0][0] <= now and len(pending) < self.window:
+                    _, index, attempt, item = heapq.heappop(retries)
+                    pending[pool.submit(timed_send, item)] = (index, item, attempt)
+                while not exhausted and not retries and len(pending) < self.window:
+                    try:
+                        item = next(source)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    index = report['batches']
+                    report['batches'] += 1
+                    results.append(None)
+                    pending[pool.submit(timed_send, item)] = (index, item, 1)
+                if not pending and not retries:
+                    break
+
+                timeout = max(0.0, retries[0][0] - time.monotonic()) if retries else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, item, attempt = pending.pop(future)
+                    result, latency = future.result()
+                    result['latencyMs'] = int(latency * 1000)
+                    result['attempts'] = attempt
+                    self._adapt(result, latency)
+                    peak_window = max(peak_window, self.window)
+                    if _throttled(result) and attempt < self.max_attempts:
+                        delay = self.retry_delay * (2 ** (attempt - 1))
+                        logger.warning(f"⚠️ [{self.name}] batch {index + 1} failed "
+                                       f"({result.get('error') or result.get('status')}) — retry "
+                                       f"{attempt}/{self.max_attempts - 1} in {delay:g}s")
+                        heapq.heappush(retries, (time.monotonic() + delay, index, attempt + 1, item))
+                        self.retried += 1
+                        continue
+                    results[index] = result
+                    report['bytes'] += result.get('bytes', 0) or 0
+                    if result.get('success'):
+                        report['succeeded'] += 1
+                        report['saved'] += result.get('saved', 0) or 0
+                    else:
+                        report['failed'] += 1
+                    if on_result is not None:
+                        on_result(item, result)
+
+        elapsed = time.perf_counter() - started
+        report.update({
+            'allSucceeded': report['failed'] == 0,
+            'elapsedSeconds': round(elapsed, 3),
+            'batchesPerSec': round(report['batches'] / elapsed, 2) if elapsed > 0 else 0.0,
+            'bytesPerSec': round(report['bytes'] / elapsed, 1) if elapsed > 0 else 0.0,
+            'peakWindow': peak_window,
+            'finalWindow': self.window,
+            'throttled': self.throttled,
+            'retried': self.retried,
+            'results': results,
+        })
+        if report['batches']:
+            logger.info(f"📤 [{self.name}] {report['succeeded']}/{report['batches']} batch(es) ok, "
+                        f"{report['batchesPerSec']} batches/s, {report['bytesPerSec'] / 1024:.1f} KiB/s "
+                        f"(window peak {peak_window}, throttled {self.throttled}x, retried {self.retried}x)")
+        return report
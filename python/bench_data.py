@@ -0,0 +1,245 @@
+"""Synthetic Tally export data for the bench_*.py scripts and mock_tally.py.
+
+Generates voucher / master XML shaped like a real TallyPrime Collection export
+(UDF: namespaced tags, &#4; control entities, nested ALLLEDGERENTRIES /
+BILLALLOCATIONS / CATEGORYALLOCATIONS / ALLINVENTORYENTRIES / BATCHALLOCATIONS),
+plus the Bills Receivable/Payable and Balance Sheet / P&L / Trial Balance report
+exports, so benchmarks exercise the same parser paths as production without a
+live Tally instance. Output is deterministic for a given seed.
+"""
+
+import random
+from datetime import date, timedelta
+from xml.sax.saxutils import escape
+
+PARTIES = [f"Customer {i:03d} Pvt Ltd" for i in range(1, 121)] + [f"Supplier {i:03d} & Co" for i in range(1, 41)]
+ITEMS = [f"Item SKU-{i:04d}" for i in range(1, 301)]
+SALES_LEDGERS = ['Sales Account', 'Sales - Interstate', 'Sales - Exempt']
+TAX_LEDGERS = ['Output CGST 9%', 'Output SGST 9%', 'Output IGST 18%']
+GODOWNS = ['Main Location', 'Warehouse 2', 'Shop Floor']
+VOUCHER_TYPES = ['Sales', 'Purchase', 'Receipt', 'Payment', 'Journal']
+
+
+def _tally_date(d: date) -> str:
+    return d.strftime('%Y%m%d')
+
+
+def make_voucher(i: int, vdate: date, rng: random.Random, alter_id: int = None) -> str:
+    """One <VOUCHER> element as Tally exports it."""
+    vtype = rng.choice(VOUCHER_TYPES)
+    party = escape(rng.choice(PARTIES))
+    n_items = rng.randint(1, 4) if vtype in ('Sales', 'Purchase') else 0
+    lines = []
+    item_total = 0.0
+    inventory = []
+    for _ in range(n_items):
+        qty = rng.randint(1, 50)
+        rate = round(rng.uniform(10, 2500), 2)
+        amount = round(qty * rate, 2)
+        item_total += amount
+        sales = rng.choice(SALES_LEDGERS)
+        inventory.append(
+            f"<ALLINVENTORYENTRIES.LIST><STOCKITEMNAME>{escape(rng.choice(ITEMS))}</STOCKITEMNAME>"
+            f"<ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE><RATE>{rate:.2f}/Nos</RATE><AMOUNT>{amount:.2f}</AMOUNT>"
+            f"<ACTUALQTY> {qty} Nos</ACTUALQTY><BILLEDQTY> {qty} Nos</BILLEDQTY>"
+            f"<BATCHALLOCATIONS.LIST><GODOWNNAME>{rng.choice(GODOWNS)}</GODOWNNAME>"
+            f"<BATCHNAME>Primary Batch</BATCHNAME><AMOUNT>{amount:.2f}</AMOUNT>"
+            f"<ACTUALQTY> {qty} Nos</ACTUALQTY><BILLEDQTY> {qty} Nos</BILLEDQTY></BATCHALLOCATIONS.LIST>"
+            f"<ACCOUNTINGALLOCATIONS.LIST><LEDGERNAME>{sales}</LEDGERNAME><AMOUNT>{amount:.2f}</AMOUNT>"
+            f"</ACCOUNTINGALLOCATIONS.LIST></ALLINVENTORYENTRIES.LIST>")
+    total = round(item_total * 1.18, 2) if n_items else round(rng.uniform(100, 90000), 2)
+    lines.append(
+        f"<ALLLEDGERENTRIES.LIST><LEDGERNAME>{party}</LEDGERNAME><ISDEEMEDPOSITIVE>Yes</ISDEEMEDPOSITIVE>"
+        f"<ISPARTYLEDGER>Yes</ISPARTYLEDGER><AMOUNT>-{total:.2f}</AMOUNT>"
+        f"<BILLALLOCATIONS.LIST><NAME>INV-{i}</NAME><BILLTYPE>New Ref</BILLTYPE>"
+        f"<BILLCREDITPERIOD>30 Days</BILLCREDITPERIOD><AMOUNT>-{total:.2f}</AMOUNT></BILLALLOCATIONS.LIST>"
+        f"</ALLLEDGERENTRIES.LIST>")
+    if n_items:
+        tax = round(item_total * 0.09, 2)
+        for tax_ledger in TAX_LEDGERS[:2]:
+            lines.append(
+                f"<ALLLEDGERENTRIES.LIST><LEDGERNAME>{tax_ledger}</LEDGERNAME><ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>"
+                f"<AMOUNT>{tax:.2f}</AMOUNT></ALLLEDGERENTRIES.LIST>")
+    else:
+        lines.append(
+            f"<ALLLEDGERENTRIES.LIST><LEDGERNAME>Bank Account</LEDGERNAME><ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>"
+            f"<AMOUNT>{total:.2f}</AMOUNT><CATEGORYALLOCATIONS.LIST><CATEGORY>Primary Cost Category</CATEGORY>"
+            f"<ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE><AMOUNT>{total:.2f}</AMOUNT><COSTCENTREALLOCATIONS.LIST>"
+            f"<NAME>Head Office</NAME><AMOUNT>{total:.2f}</AMOUNT></COSTCENTREALLOCATIONS.LIST>"
+            f"</CATEGORYALLOCATIONS.LIST></ALLLEDGERENTRIES.LIST>")
+    alter_id = alter_id if alter_id is not None else i + 1000
+    return (
+        f'<VOUCHER REMOTEID="r-{i}" VCHKEY="k-{i}" VCHTYPE="{vtype}" ACTION="Create" OBJVIEW="Invoice Voucher View">'
+        f"<GUID>5f6c1a2e-0000-4000-8000-{i:012d}</GUID><MASTERID>{i}</MASTERID><ALTERID>{alter_id}</ALTERID>"
+        f"<VOUCHERKEY>{190000000000 + i}</VOUCHERKEY><DATE>{_tally_date(vdate)}</DATE>"
+        f"<EFFECTIVEDATE>{_tally_date(vdate)}</EFFECTIVEDATE><VOUCHERTYPENAME>{vtype}</VOUCHERTYPENAME>"
+        f"<VOUCHERNUMBER>{i}</VOUCHERNUMBER><PARTYLEDGERNAME>{party}</PARTYLEDGERNAME>"
+        f"<PARTYGSTIN>33AAAAA{i % 10000:04d}A1Z5</PARTYGSTIN><PLACEOFSUPPLY>Tamil Nadu</PLACEOFSUPPLY>"
+        f"<NARRATION>Being goods sold vide bill {i} &#4;</NARRATION><UDF:VCHNOTE.LIST><UDF:VCHNOTE>n</UDF:VCHNOTE>"
+        f"</UDF:VCHNOTE.LIST><ISINVOICE>{'Yes' if n_items else 'No'}</ISINVOICE><ISCANCELLED>No</ISCANCELLED>"
+        f"<ISOPTIONAL>No</ISOPTIONAL><PERSISTEDVIEW>Invoice Voucher View</PERSISTEDVIEW>"
+        + ''.join(lines) + ''.join(inventory) + "</VOUCHER>")
+
+
+def make_voucher_xml(n: int, start: date = date(2024, 4, 1), days: int = 365, seed: int = 42) -> str:
+    """A Collection export envelope with `n` vouchers spread over `days` days."""
+    rng = random.Random(seed)
+    parts = ['<ENVELOPE><HEADER><VERSION>1</VERSION><STATUS>1</STATUS></HEADER><BODY><DESC></DESC><DATA><COLLECTION>']
+    for i in range(1, n + 1):
+        vdate = start + timedelta(days=(i * days) // max(n, 1))
+        parts.append(make_voucher(i, vdate, rng))
+    parts.append('</COLLECTION></DATA></BODY></ENVELOPE>')
+    return ''.join(parts)
+
+
+# ─── Masters ─────────────────────────────────────────────────────────
+
+MASTER_TYPES = ['Group', 'Currency', 'Unit', 'StockGroup', 'StockCategory', 'CostCategory',
+                'CostCenter', 'Godown', 'VoucherType', 'TaxUnit', 'Ledger', 'StockItem']
+PRIMARY_GROUPS = ['Sundry Debtors', 'Sundry Creditors', 'Sales Accounts', 'Purchase Accounts',
+                  'Duties & Taxes', 'Bank Accounts', 'Indirect Expenses', 'Capital Account']
+
+
+def master_guid(entity: str, i: int) -> str:
+    return f"6a7b{MASTER_TYPES.index(entity):04x}-0000-4000-8000-{i:012d}"
+
+
+def master_name(entity: str, i: int) -> str:
+    if entity == 'Ledger':
+        fixed = PARTIES + SALES_LEDGERS + TAX_LEDGERS + ['Bank Account']
+        return fixed[i - 1] if i <= len(fixed) else f"Ledger {i:05d}"
+    if entity == 'StockItem':
+        return ITEMS[i - 1] if i <= len(ITEMS) else f"Item SKU-{i:05d}"
+    if entity == 'Godown':
+        return GODOWNS[i - 1] if i <= len(GODOWNS) else f"Godown {i}"
+    if entity == 'VoucherType':
+        return VOUCHER_TYPES[i - 1] if i <= len(VOUCHER_TYPES) else f"Voucher Type {i}"
+    if entity == 'Group':
+        return PRIMARY_GROUPS[i - 1] if i <= len(PRIMARY_GROUPS) else f"Group {i}"
+    return f"{entity} {i}"
+
+
+def make_master(entity: str, i: int, alter_id: int, tag: str = None) -> str:
+    """One master element (<LEDGER NAME=...>, <STOCKITEM NAME=...>, ...) as Tally exports it."""
+    tag = tag or entity.upper()
+    name = escape(master_name(entity, i))
+    parts = [f'<{tag} NAME="{name}" RESERVEDNAME="">',
+             f"<GUID>{master_guid(entity, i)}</GUID><MASTERID>{i}</MASTERID><ALTERID>{alter_id}</ALTERID>",
+             f"<NAME>{name}</NAME>"]
+    if entity in ('Group', 'StockGroup', 'StockCategory', 'CostCenter', 'Godown', 'VoucherType'):
+        parent = '&#4; Primary' if i <= 8 else escape(master_name(entity, 1 + i % 8))
+        parts.append(f"<PARENT>{parent}</PARENT>")
+    if entity == 'Group':
+        parts.append(f"<NATURE>{'Assets' if i % 2 else 'Liabilities'}</NATURE>"
+                     f"<ISREVENUE>{'Yes' if i % 3 == 0 else 'No'}</ISREVENUE>")
+    elif entity == 'Ledger':
+        group = PRIMARY_GROUPS[i % len(PRIMARY_GROUPS)]
+        opening = (i * 137.5) % 100000
+        parts.append(
+            f"<PARENT>{escape(group)}</PARENT><PRIMARYGROUP>{escape(group)}</PRIMARYGROUP>"
+            f"<ISREVENUE>No</ISREVENUE><ISBILLWISEON>{'Yes' if i <= len(PARTIES) else 'No'}</ISBILLWISEON>"
+            f"<ISCOSTCENTRESON>No</ISCOSTCENTRESON><OPENINGBALANCE>-{opening:.2f}</OPENINGBALANCE>"
+            f"<CLOSINGBALANCE>-{opening * 1.7:.2f}</CLOSINGBALANCE><LEDGERPHONE>044-2{i % 1000000:06d}</LEDGERPHONE>"
+            f"<LEDGERMOBILE>98400{i % 100000:05d}</LEDGERMOBILE><EMAIL>accounts{i}@example.in</EMAIL>"
+            f"<CURRENCYNAME>₹</CURRENCYNAME><INCOMETAXNUMBER>AAAPA{i % 10000:04d}A</INCOMETAXNUMBER>"
+            f"<LEDMAILINGDETAILS.LIST><APPLICABLEFROM>20240401</APPLICABLEFROM><MAILINGNAME>{name}</MAILINGNAME>"
+            f"<STATE>Tamil Nadu</STATE><COUNTRY>India</COUNTRY><PINCODE>600{i % 1000:03d}</PINCODE>"
+            f"<ADDRESS.LIST><ADDRESS>{i} Anna Salai</ADDRESS><ADDRESS>Chennai</ADDRESS></ADDRESS.LIST>"
+            f"</LEDMAILINGDETAILS.LIST><LEDGSTREGDETAILS.LIST><APPLICABLEFROM>20240401</APPLICABLEFROM>"
+            f"<GSTREGISTRATIONTYPE>Regular</GSTREGISTRATIONTYPE><PLACEOFSUPPLY>Tamil Nadu</PLACEOFSUPPLY>"
+            f"<GSTIN>33AAAAA{i % 10000:04d}A1Z5</GSTIN></LEDGSTREGDETAILS.LIST>")
+    elif entity == 'StockItem':
+        parts.append(
+            f"<PARENT>{escape(master_name('StockGroup', 1 + i % 8))}</PARENT><CATEGORY>StockCategory 1</CATEGORY>"
+            f"<BASEUNITS>Nos</BASEUNITS><OPENINGBALANCE> {i % 500} Nos</OPENINGBALANCE>"
+            f"<OPENINGVALUE>-{(i % 500) * 12.5:.2f}</OPENINGVALUE><OPENINGRATE>12.50/Nos</OPENINGRATE>"
+            f"<GSTTYPEOFSUPPLY>Goods</GSTTYPEOFSUPPLY><HSNCODE>8471{i % 10000:04d}</HSNCODE>"
+            f"<COSTINGMETHOD>Avg. Cost</COSTINGMETHOD><VALUATIONMETHOD>Avg. Price</VALUATIONMETHOD>"
+            f"<ISBATCHWISEON>No</ISBATCHWISEON>")
+    elif entity == 'Currency':
+        parts.append("<SYMBOL>₹</SYMBOL><FORMALNAME>INR</FORMALNAME><DECIMALPLACES>2</DECIMALPLACES>")
+    elif entity == 'Unit':
+        parts.append("<ORIGINALNAME>Numbers</ORIGINALNAME><ISSIMPLEUNIT>Yes</ISSIMPLEUNIT>"
+                     "<NUMBEROFDECIMALS>0</NUMBEROFDECIMALS>")
+    elif entity == 'CostCenter':
+        parts.append("<CATEGORY>Primary Cost Category</CATEGORY>")
+    elif entity == 'VoucherType':
+        parts.append("<NUMBERINGMETHOD>Automatic</NUMBERINGMETHOD><ISDEEMEDPOSITIVE>Yes</ISDEEMEDPOSITIVE>"
+                     "<ISACTIVE>Yes</ISACTIVE>")
+    parts.append(f"</{tag}>")
+    return ''.join(parts)
+
+
+def make_master_xml(entity: str, n: int, alter_base: int = 0) -> str:
+    """A Collection export envelope with `n` masters of one type."""
+    body = ''.join(make_master(entity, i, alter_base + i) for i in range(1, n + 1))
+    return ('<ENVELOPE><HEADER><VERSION>1</VERSION><STATUS>1</STATUS></HEADER><BODY><DESC></DESC>'
+            f'<DATA><COLLECTION>{body}</COLLECTION></DATA></BODY></ENVELOPE>')
+
+
+def make_company_xml(names) -> str:
+    body = ''.join(f'<COMPANY NAME="{escape(n)}"><NAME>{escape(n)}</NAME><GUID>c0ffee00-0000-4000-8000-{k:012d}</GUID>'
+                   f'<BOOKSFROM>20240401</BOOKSFROM><STARTINGFROM>20240401</STARTINGFROM>'
+                   f'<STATENAME>Tamil Nadu</STATENAME><COUNTRYNAME>India</COUNTRYNAME>'
+                   f'<ISAGGREGATE>No</ISAGGREGATE></COMPANY>'
+                   for k, n in enumerate(names, 1))
+    return ('<ENVELOPE><HEADER><VERSION>1</VERSION><STATUS>1</STATUS></HEADER><BODY><DESC></DESC>'
+            f'<DATA><COLLECTION>{body}</COLLECTION></DATA></BODY></ENVELOPE>')
+
+
+# ─── Reports ─────────────────────────────────────────────────────────
+
+def make_bills_xml(n: int, seed: int = 42, start: date = date(2024, 4, 1)) -> str:
+    """Bills Receivable / Bills Payable report export (flat BILLFIXED, BILLCL, ... siblings)."""
+    rng = random.Random(seed)
+    parts = ['<ENVELOPE>']
+    for i in range(1, n + 1):
+        bdate = start + timedelta(days=rng.randint(0, 364))
+        amount = round(rng.uniform(500, 250000), 2)
+        parts.append(
+            f"<BILLFIXED><BILLDATE>{bdate.strftime('%d-%b-%y')}</BILLDATE><BILLREF>INV-{i}</BILLREF>"
+            f"<BILLPARTY>{escape(rng.choice(PARTIES))}</BILLPARTY></BILLFIXED>"
+            f"<BILLCL>-{amount:.2f}</BILLCL><BILLDUE>{(bdate + timedelta(days=30)).strftime('%d-%b-%y')}</BILLDUE>"
+            f"<BILLOVERDUE>{rng.randint(0, 200)}</BILLOVERDUE>")
+    parts.append('</ENVELOPE>')
+    return ''.join(parts)
+
+
+def _dsp_accname(i: int, n_groups: int) -> str:
+    is_group = i <= n_groups
+    name = PRIMARY_GROUPS[(i - 1) % len(PRIMARY_GROUPS)] if is_group else master_name('Ledger', i - n_groups)
+    parent = '&#4; Primary' if is_group else PRIMARY_GROUPS[i % len(PRIMARY_GROUPS)]
+    guid = master_guid('Group', i) if is_group else master_guid('Ledger', i - n_groups)
+    return (f"<DSPACCNAME><DSPDISPNAME>{escape(name)}</DSPDISPNAME><GUID>{guid}</GUID>"
+            f"<ISGROUP>{'Yes' if is_group else 'No'}</ISGROUP><PARENTGRP>{escape(parent)}</PARENTGRP></DSPACCNAME>")
+
+
+def make_balance_sheet_xml(n: int) -> str:
+    parts = ['<ENVELOPE>']
+    for i in range(1, n + 1):
+        parts.append(f"<BSNAME>{_dsp_accname(i, 8)}</BSNAME>"
+                     f"<BSAMT><BSSUBAMT>{i * 1000.5:.2f}</BSSUBAMT><BSMAINAMT>{i * 2000.25:.2f}</BSMAINAMT></BSAMT>")
+    parts.append('</ENVELOPE>')
+    return ''.join(parts)
+
+
+def make_profit_loss_xml(n: int) -> str:
+    parts = ['<ENVELOPE>']
+    for i in range(1, n + 1):
+        if i <= 8:
+            parts.append(f"{_dsp_accname(i, 8)}<PLAMT><PLSUBAMT></PLSUBAMT><PLMAINAMT>{i * 5000.75:.2f}</PLMAINAMT></PLAMT>")
+        else:
+            parts.append(f"<BSNAME>{_dsp_accname(i, 8)}</BSNAME>"
+                         f"<BSAMT><BSSUBAMT>-{i * 310.4:.2f}</BSSUBAMT><BSMAINAMT></BSMAINAMT></BSAMT>")
+    parts.append('</ENVELOPE>')
+    return ''.join(parts)
+
+
+def make_trial_balance_xml(n: int) -> str:
+    parts = ['<ENVELOPE>']
+    for i in range(1, n + 1):
+        dr, cr = (f"-{i * 725.5:.2f}", '') if i % 2 else ('', f"{i * 725.5:.2f}")
+        parts.append(f"{_dsp_accname(i, 8)}<DSPACCINFO><DSPCLDRAMT><DSPCLDRAMTA>{dr}</DSPCLDRAMTA></DSPCLDRAMT>"
+                     f"<DSPCLCRAMT><DSPCLCRAMTA>{cr}</DSPCLCRAMTA></DSPCLCRAMT></DSPACCINFO>")
+    parts.append('</ENVELOPE>')
+    return ''.join(parts)
@@ -0,0 +1,307 @@
+"""End-to-end sync benchmark against mock_tally.py and mock_backend.py.
+
+Starts both mocks as subprocesses, then drives `sync_worker.py --mode ...`
+(and sync_financial_reports.py) through a first-time sync, a round of
+simulated Tally edits, the incremental paths and reconciliation — each stage
+a fresh worker process, as the Electron app runs them. Per stage it records
+wall time, CPU time, peak RSS of the worker, what Tally served and what the
+backend received, and records/s. With --daemon the same stages run as jobs
+sent to one long-lived `sync_worker.py` daemon instead (warm imports, caches
+and connection pools); per-stage CPU then needs psutil and peak RSS is the
+daemon's, reported once at the end.
+
+    python bench_e2e.py [--vouchers 20000] [--masters-scale 1] [--latency-ms 0]
+                        [--stages fetch-companies,masters-full,...] [--env SYNC_BODY_COMPRESSION=gzip]
+                        [--daemon] [--json results.json]
+
+Peak RSS comes from os.wait4 (POSIX) or, failing that, psutil sampling when
+psutil is installed.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+COMPANY = 'Bench Company'
+COMPANY_GUID = 'c0ffee00-0000-4000-8000-000000000001'
+BOOKS_FROM = date(2024, 4, 1)
+
+DEFAULT_STAGES = ('fetch-companies,fetch-license,masters-full,vouchers-full,bills,reports,sync-master,'
+                  'touch,masters-incremental,vouchers-incremental,reconcile,masters-deep')
+
+try:
+    import psutil
+except ImportError:  # optional dependency
+    psutil = None
+
+
+def _start_mock(script: str, extra: list):
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, script), '--port', '0'] + extra,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=HERE, text=True)
+    info = json.loads(proc.stdout.readline())
+    return proc, info
+
+
+def _http(url: str, method: str = 'GET') -> dict:
+    req = urllib.request.Request(url, data=b'' if method == 'POST' else None, method=method)
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read())
+
+
+def _last_json(text: str):
+    """The worker's result document: the last stdout line/block that parses as JSON."""
+    lines = text.splitlines()
+    for start in range(len(lines) - 1, -1, -1):
+        if lines[start].startswith('{'):
+            try:
+                return json.loads('\n'.join(lines[start:]))
+            except ValueError:
+                continue
+    return None
+
+
+def _poll_rss(proc) -> int:
+    peak = 0
+    try:
+        p = psutil.Process(proc.pid)
+        while proc.poll() is None:
+            peak = max(peak, p.memory_info().rss)
+            time.sleep(0.05)
+    except psutil.Error:
+        pass
+    proc.wait()
+    return peak
+
+
+def run_child(cmd: list, env: dict) -> dict:
+    """Run one worker process; returns {returncode, wall, cpu, peakRss, stdout}."""
+    with tempfile.TemporaryFile() as out:
+        t0 = time.perf_counter()
+        # stdin stays open: sync_financial_reports exits when its parent closes the pipe.
+        proc = subprocess.Popen(cmd, stdout=out, stderr=subprocess.DEVNULL, stdin=subprocess.PIPE,
+                                env=env, cwd=HERE)
+        cpu = peak = None
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            cpu = usage.ru_utime + usage.ru_stime
+            peak = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        elif psutil is not None:
+            peak = _poll_rss(proc)
+        else:
+            proc.wait()
+        wall = time.perf_counter() - t0
+        proc.stdin.close()
+        out.seek(0)
+        stdout = out.read().decode('utf-8', errors='replace')
+    return {'returncode': proc.returncode, 'wall': wall, 'cpu': cpu, 'peakRss': peak, 'stdout': stdout}
+
+
+def _job_from_argv(cmd: list):
+    """(mode, params) for the daemon's job channel from a stage's command line."""
+    script, argv = os.path.basename(cmd[1]), cmd[2:]
+    if script == 'sync_financial_reports.py':
+        name, cmp_id, user_id, from_date, to_date, _port, backend_url = argv[:7]
+        return 'sync-financial-reports', {'companyName': name, 'companyId': cmp_id, 'userId': user_id,
+                                          'fromDate': from_date, 'toDate': to_date, 'backendUrl': backend_url}
+    mode, params, i = None, {}, 0
+    while i < len(argv):
+        key = argv[i][2:]
+        has_value = i + 1 < len(argv) and not argv[i + 1].startswith('--')
+        value = argv[i + 1] if has_value else True
+        i += 2 if has_value else 1
+        if key == 'mode':
+            mode = value
+        elif key not in ('host', 'port'):  # the daemon's settings line carries these
+            params[key] = value
+    return mode, params
+
+
+class DaemonWorker:
+    """One `sync_worker.py` daemon fed stages as NDJSON jobs."""
+
+    def __init__(self, env: dict, tally_port: int):
+        self.proc = subprocess.Popen([sys.executable, os.path.join(HERE, 'sync_worker.py')], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, cwd=HERE, text=True)
+        self.jobs = 0
+        self._send({'tallyHost': '127.0.0.1', 'tallyPort': tally_port, 'syncInterval': 24 * 60})
+
+    def _send(self, message: dict):
+        self.proc.stdin.write(json.dumps(message) + '\n')
+        self.proc.stdin.flush()
+
+    def _cpu(self):
+        if psutil is None:
+            return None
+        try:
+            times = psutil.Process(self.proc.pid).cpu_times()
+            return times.user + times.system
+        except psutil.Error:
+            return None
+
+    def run(self, cmd: list) -> dict:
+        """Same shape as run_child, plus the job's result document."""
+        mode, params = _job_from_argv(cmd)
+        self.jobs += 1
+        job_id = f"job-{self.jobs}"
+        cpu0, t0 = self._cpu(), time.perf_counter()
+        self._send({'type': 'job', 'id': job_id, 'mode': mode, 'params': params})
+        result, returncode = None, 1
+        for line in self.proc.stdout:
+            message = json.loads(line)
+            if message.get('id') != job_id:
+                continue
+            if message['type'] == 'result':
+                result = message['result']
+            elif message['type'] in ('job_done', 'job_error'):
+                returncode = 0 if message['type'] == 'job_done' else 1
+                break
+        wall = time.perf_counter() - t0
+        cpu1 = self._cpu()
+        return {'returncode': returncode, 'wall': wall, 'cpu': cpu1 - cpu0 if cpu0 is not None else None,
+                'peakRss': None, 'stdout': '', 'result': result}
+
+    def close(self):
+        """Shut the daemon down; returns its peak RSS in bytes (None if unavailable)."""
+        self._send({'type': 'shutdown'})
+        self.proc.stdout.read()
+        if hasattr(os, 'wait4'):
+            _, _, usage = os.wait4(self.proc.pid, 0)
+            self.proc.returncode = 0
+            return usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        self.proc.wait()
+        return None
+
+
+def build_stages(args, tally_port: int, backend_url: str) -> dict:
+    worker = [sys.executable, os.path.join(HERE, 'sync_worker.py'), '--host', '127.0.0.1',
+              '--port', str(tally_port)]
+    common = ['--company-id', '1', '--user-id', '1', '--backend-url', backend_url,
+              '--company-name', COMPANY, '--batch-size', str(args.batch_size)]
+    books_to = BOOKS_FROM + timedelta(days=args.days)
+    window = ['--from-date', BOOKS_FROM.strftime('%d-%b-%Y'), '--to-date', books_to.strftime('%d-%b-%Y')]
+    reports = [sys.executable, os.path.join(HERE, 'sync_financial_reports.py'), COMPANY, '1', '1',
+               BOOKS_FROM.strftime('%Y%m%d'), books_to.strftime('%Y%m%d'), str(tally_port), backend_url]
+    return {
+        'fetch-companies': worker + ['--mode', 'fetch-companies'],
+        'fetch-license': worker + ['--mode', 'fetch-license'],
+        'sync-master': worker + ['--mode', 'sync-master'] + common,
+        'masters-full': worker + ['--mode', 'incremental-sync', '--entity-type', 'all'] + common,
+        'vouchers-full': worker + ['--mode', 'sync-vouchers', '--company-guid', COMPANY_GUID,
+                                   '--last-voucher-alter-id', '0'] + common + window,
+        'bills': worker + ['--mode', 'sync-bills-outstanding'] + common,
+        'reports': reports,
+        'touch': None,
+        'masters-incremental': worker + ['--mode', 'incremental-sync', '--entity-type', 'all'] + common,
+        'vouchers-incremental': worker + ['--mode', 'sync-vouchers', '--company-guid', COMPANY_GUID] + common,
+        'reconcile': worker + ['--mode', 'reconcile', '--entity-type', 'voucher',
+                               '--company-guid', COMPANY_GUID] + common + window,
+        'masters-deep': worker + ['--mode', 'incremental-sync', '--entity-type', 'all', '--deep'] + common,
+    }
+
+
+def _delta(after: dict, before: dict) -> dict:
+    return {k: after[k] - before[k] for k in ('requests', 'bytes', 'records')}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vouchers', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--masters-scale', type=float, default=1.0)
+    parser.add_argument('--bills', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='mock Tally delay per request')
+    parser.add_argument('--record-us', type=float, default=0.0, help='mock Tally delay per record served')
+    parser.add_argument('--backend-latency-ms', type=float, default=0.0)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--touch-vouchers', type=int, default=200)
+    parser.add_argument('--touch-masters', type=int, default=50)
+    parser.add_argument('--delete-vouchers', type=int, default=20)
+    parser.add_argument('--stages', default=DEFAULT_STAGES)
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the worker processes (repeatable)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='run the worker stages as jobs in one persistent daemon process')
+    parser.add_argument('--json', help='also write the per-stage results to this file')
+    args = parser.parse_args()
+
+    tally, tally_info = _start_mock('mock_tally.py', [
+        '--vouchers', str(args.vouchers), '--days', str(args.days), '--masters-scale', str(args.masters_scale),
+        '--bills', str(args.bills), '--latency-ms', str(args.latency_ms), '--record-us', str(args.record_us)])
+    backend, backend_info = _start_mock('mock_backend.py', ['--latency-ms', str(args.backend_latency_ms)])
+    tally_url = f"http://127.0.0.1:{tally_info['port']}"
+    backend_url = f"http://127.0.0.1:{backend_info['port']}"
+
+    workdir = tempfile.mkdtemp(prefix='bench_e2e_')
+    env = dict(os.environ, TALLY_AUTH_TOKEN='bench', TALLY_DEVICE_TOKEN='bench',
+               SYNC_SNAPSHOT_DB=os.path.join(workdir, 'snapshot.db'), PYTHONIOENCODING='utf-8')
+    env.update(kv.split('=', 1) for kv in args.env)
+
+    print(f"mock Tally: {tally_info['vouchers']:,} vouchers, {tally_info['masters']:,} masters "
+          f"(built in {tally_info['buildSeconds']}s); backend codec {backend_info['codec']}")
+    print(f"{'stage':<22}{'ok':>3}{'wall s':>9}{'cpu s':>8}{'peak MB':>9}{'tally req':>10}"
+          f"{'tally MB':>9}{'tally rec':>10}{'posted':>9}{'rec/s':>9}")
+
+    stages = build_stages(args, tally_info['port'], backend_url)
+    daemon = DaemonWorker(env, tally_info['port']) if args.daemon else None
+    results = []
+    try:
+        for name in [s.strip() for s in args.stages.split(',') if s.strip()]:
+            if name not in stages:
+                print(f"{name:<22} unknown stage (choices: {', '.join(stages)})")
+                continue
+            if stages[name] is None:
+                info = _http(f"{tally_url}/_mock/touch?vouchers={args.touch_vouchers}"
+                             f"&masters={args.touch_masters}&deleted={args.delete_vouchers}", 'POST')
+                print(f"{name:<22} edited {info['vouchers']} vouchers, {info['masters']} masters, "
+                      f"deleted {info['deleted']} vouchers in mock Tally")
+                results.append({'stage': name, **info})
+                continue
+
+            t_before, b_before = _http(f"{tally_url}/_mock/stats"), _http(f"{backend_url}/_mock/stats")
+            run = daemon.run(stages[name]) if daemon else run_child(stages[name], env)
+            t_after, b_after = _http(f"{tally_url}/_mock/stats"), _http(f"{backend_url}/_mock/stats")
+            served, posted = _delta(t_after, t_before), _delta(b_after, b_before)
+            result = run['result'] if daemon else _last_json(run['stdout'])
+            ok = run['returncode'] == 0 and result is not None and result.get('success') is not False
+            records = posted['records'] or served['records']
+            row = {
+                'stage': name, 'ok': ok, 'wallSeconds': round(run['wall'], 3),
+                'cpuSeconds': round(run['cpu'], 3) if run['cpu'] is not None else None,
+                'peakRssBytes': run['peakRss'], 'tally': served, 'backend': posted,
+                'recordsPerSecond': round(records / run['wall'], 1) if run['wall'] else None,
+            }
+            results.append(row)
+            cpu = f"{row['cpuSeconds']:.2f}" if row['cpuSeconds'] is not None else 'n/a'
+            rss = f"{run['peakRss'] / 1e6:.1f}" if run['peakRss'] else 'n/a'
+            print(f"{name:<22}{'y' if ok else 'N':>3}{run['wall']:>9.2f}{cpu:>8}{rss:>9}{served['requests']:>10}"
+                  f"{served['bytes'] / 1e6:>9.1f}{served['records']:>10,}{posted['records']:>9,}"
+                  f"{row['recordsPerSecond'] or 0:>9,.0f}")
+        if daemon:
+            peak = daemon.close()
+            daemon = None
+            print(f"daemon: {len(results)} stages in one process, peak RSS "
+                  f"{f'{peak / 1e6:.1f} MB' if peak else 'n/a'}")
+    finally:
+        if daemon:
+            daemon.proc.kill()
+        for proc in (tally, backend):
+            proc.terminate()
+            proc.wait()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'vouchers': args.vouchers, 'mastersScale': args.masters_scale,
+                       'latencyMs': args.latency_ms, 'env': args.env, 'daemon': args.daemon,
+                       'stages': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Microbenchmark: IncrementalSyncManager master parsing, records/s per entity.
+
+Builds a synthetic Collection export per master type with bench_data and
+times `_parse_element` over the already-parsed elements (the extraction cost
+alone) and `parse_xml_response` end to end (sanitize + ET parse + extraction).
+
+Real Tally masters carry many more children than bench_data writes (every
+default field of the object comes along), and a find() per field scans all
+of them; --extra-children N pads every element with N unrelated fields to
+show that effect.
+
+    python bench_master_parse.py [--ledgers 50000] [--extra-children 0] [--repeat 3]
+"""
+
+import argparse
+import time
+import xml.etree.ElementTree as ET
+
+from bench_data import make_master
+from incremental_sync import IncrementalSyncManager
+from xml_sanitizer import sanitize
+
+SMALL = ('Group', 'Currency', 'Unit', 'StockGroup', 'CostCenter', 'Godown', 'VoucherType', 'StockItem')
+
+
+def build_xml(entity: str, n: int, extra: int) -> str:
+    padding = ''.join(f'<TALLYFIELD{k:03d}>No</TALLYFIELD{k:03d}>' for k in range(extra))
+    tag = IncrementalSyncManager.TALLY_TYPES.get(entity, entity).upper()
+    body = []
+    for i in range(1, n + 1):
+        element = make_master(entity, i, i, tag)
+        body.append(element.replace(f'</{tag}>', f'{padding}</{tag}>') if padding else element)
+    return ('<ENVELOPE><HEADER><VERSION>1</VERSION><STATUS>1</STATUS></HEADER><BODY><DESC></DESC>'
+            f'<DATA><COLLECTION>{"".join(body)}</COLLECTION></DATA></BODY></ENVELOPE>')
+
+
+def bench(fn, repeat: int):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ledgers', type=int, default=50000)
+    parser.add_argument('--others', type=int, default=5000, help='records per other master type')
+    parser.add_argument('--extra-children', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    manager = IncrementalSyncManager('http://localhost:8080', 'bench', 'bench')
+    print(f"extra children per element: {args.extra_children}, best of {args.repeat}")
+    print(f"{'entity':12s} {'records':>8s} {'extract ms':>11s} {'records/s':>11s} {'end-to-end ms':>14s} {'records/s':>11s}")
+    for entity in ('Ledger',) + SMALL:
+        n = args.ledgers if entity == 'Ledger' else args.others
+        xml = build_xml(entity, n, args.extra_children)
+        tag = IncrementalSyncManager.TALLY_TYPES.get(entity, entity).upper()
+        elements = [e for e in ET.fromstring(sanitize(xml)).iter(tag) if e.get('NAME')]
+        extract, records = bench(lambda: [manager._parse_element(e, entity) for e in elements], args.repeat)
+        total, parsed = bench(lambda: manager.parse_xml_response(xml, entity), args.repeat)
+        assert len(records) == len(parsed) == n, (entity, len(records), len(parsed))
+        print(f"{entity:12s} {n:8,d} {extract * 1000:11.1f} {n / extract:11,.0f} "
+              f"{total * 1000:14.1f} {n / total:11,.0f}")
+
+
+if __name__ == '__main__':
+    main()
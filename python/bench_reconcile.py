@@ -0,0 +1,111 @@
+"""Benchmark: month-wise voucher reconcile classification, iterrows loop vs merge.
+
+Builds Tally identity / backend voucher DataFrames of the given sizes with
+~1% missing, ~1% stale and ~0.5% extra vouchers, then times the previous
+iterrows + dict + set classification against diff_voucher_frames() (one outer
+merge) plus conversion to the detail dicts, and checks both agree.
+
+    python bench_reconcile.py [--sizes 50000,200000,1000000]
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from reconciliation import diff_voucher_frames, voucher_frame_records
+
+
+def make_frames(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    months = ['Apr-2024', 'May-2024', 'Jun-2024', 'Jul-2024', 'Aug-2024', 'Sep-2024',
+              'Oct-2024', 'Nov-2024', 'Dec-2024', 'Jan-2025', 'Feb-2025', 'Mar-2025']
+    tally_rows, db_rows = [], []
+    for i in range(n):
+        guid = f"5f6c1a2e-0000-4000-8000-{i:012d}"
+        alter = 1000 + i
+        tally_rows.append({'guid': guid, 'masterID': str(i), 'alterID': alter,
+                           'name': f"Sales {i}", 'month': months[i % 12]})
+        r = rng.random()
+        if r < 0.01:
+            continue  # missing in DB
+        db_rows.append({'guid': guid, 'alterId': alter - 1 if r < 0.02 else alter,
+                        'voucherNumber': str(i), 'voucherDate': '2024-04-01'})
+    for i in range(n // 200):
+        db_rows.append({'guid': f"deleted-{i}", 'alterId': 5, 'voucherNumber': f"D{i}",
+                        'voucherDate': '2024-04-01'})
+    return pd.DataFrame(tally_rows), pd.DataFrame(db_rows)
+
+
+def legacy_classify(tally_df, db_df):
+    """The classification reconcile_vouchers did before the merge (kept for comparison)."""
+    db_guid_col = 'guid'
+    db_alter_col = 'alterId'
+    tally_guid_set = set(tally_df['guid'].tolist()) if not tally_df.empty else set()
+    db_guid_set = set(db_df[db_guid_col].dropna().tolist()) if not db_df.empty else set()
+    tally_alter_map, tally_name_map, tally_masterid_map, tally_month_map = {}, {}, {}, {}
+    for _, row in tally_df.iterrows():
+        g = row['guid']
+        tally_alter_map[g] = row.get('alterID', 0)
+        tally_name_map[g] = row.get('name', g)
+        tally_masterid_map[g] = row.get('masterID', '')
+        tally_month_map[g] = row.get('month', '')
+    db_alter_map, db_name_map = {}, {}
+    for _, row in db_df.iterrows():
+        g = row.get(db_guid_col, '')
+        if g:
+            db_alter_map[g] = row.get(db_alter_col, 0) or 0
+            db_name_map[g] = row.get('voucherNumber', row.get('voucher_number', g))
+    missing_in_db, needs_update, matched = [], [], []
+    for guid in tally_guid_set:
+        if guid in db_guid_set:
+            tally_alter = tally_alter_map.get(guid, 0)
+            db_alter = db_alter_map.get(guid, 0)
+            if tally_alter > db_alter:
+                needs_update.append({'guid': guid, 'masterID': tally_masterid_map.get(guid, ''),
+                                     'name': tally_name_map.get(guid, guid), 'month': tally_month_map.get(guid, ''),
+                                     'tallyAlterID': tally_alter, 'dbAlterID': db_alter})
+            else:
+                matched.append(guid)
+        else:
+            missing_in_db.append({'guid': guid, 'masterID': tally_masterid_map.get(guid, ''),
+                                  'name': tally_name_map.get(guid, guid), 'month': tally_month_map.get(guid, ''),
+                                  'alterID': tally_alter_map.get(guid, 0)})
+    extra_in_db = [{'guid': g, 'name': db_name_map.get(g, g)} for g in db_guid_set if g not in tally_guid_set]
+    return missing_in_db, needs_update, extra_in_db, matched
+
+
+def merge_classify(tally_df, db_df):
+    frames = diff_voucher_frames(tally_df, db_df)
+    return (voucher_frame_records(frames['missing'], 'missing'),
+            voucher_frame_records(frames['stale'], 'stale'),
+            voucher_frame_records(frames['extra'], 'extra'),
+            frames['matched']['guid'].tolist())
+
+
+def _key(records):
+    return sorted(tuple(sorted((k, str(v)) for k, v in r.items())) for r in records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='50000,200000,1000000')
+    args = parser.parse_args()
+
+    print(f"{'vouchers':>10} {'iterrows':>10} {'merge':>9} {'speedup':>8}  missing/stale/extra")
+    for n in (int(x) for x in args.sizes.split(',')):
+        tally_df, db_df = make_frames(n)
+        t0 = time.perf_counter()
+        old = legacy_classify(tally_df, db_df)
+        t_old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        new = merge_classify(tally_df, db_df)
+        t_new = time.perf_counter() - t0
+        agree = all(_key(a) == _key(b) for a, b in zip(old[:3], new[:3])) and sorted(old[3]) == sorted(new[3])
+        print(f"{n:>10,} {t_old:>9.2f}s {t_new:>8.2f}s {t_old / t_new:>7.1f}x  "
+              f"{len(new[0])}/{len(new[1])}/{len(new[2])}{'' if agree else '  MISMATCH'}")
+
+
+if __name__ == '__main__':
+    main()
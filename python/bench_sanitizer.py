@@ -0,0 +1,116 @@
+"""Microbenchmark: xml_sanitizer vs the per-module regex chains it replaced.
+
+Builds a synthetic voucher export with bench_data (UDF: namespaced tags and
+&#4; references, as Tally sends them) and times, on the same UTF-8 response
+body:
+
+* the old chains — decode, then one full-payload `re.sub` per rule with a
+  Python callback (VoucherSyncManager / sync_bills_outstanding style, and
+  TallyAPIClient's four-pass version);
+* `sanitize` on the decoded text and on the raw bytes;
+* `XmlSanitizer` fed 64 KiB chunks, as the streaming voucher parser does.
+
+Each variant is checked to produce the same document before it is timed, and
+reports the best wall time, MB/s and the peak memory it allocated
+(tracemalloc, measured in a separate untimed run).
+
+    python bench_sanitizer.py [--vouchers 20000] [--repeat 5]
+"""
+
+import argparse
+import re
+import time
+import tracemalloc
+
+from bench_data import make_voucher_xml
+from xml_sanitizer import XmlSanitizer, sanitize
+
+CHUNK = 64 * 1024
+
+
+def old_voucher_chain(body: bytes) -> str:
+    """sync_vouchers / sync_bills_outstanding / reconciliation before xml_sanitizer."""
+    xml_string = body.decode('utf-8')
+    xml_string = re.sub(r'<(/?)([a-zA-Z_]+):([a-zA-Z_]+)', r'<\1\2_\3', xml_string)
+    return re.sub(
+        r'&#([0-9]+);',
+        lambda m: '' if int(m.group(1)) < 32 and int(m.group(1)) not in [9, 10, 13] else m.group(0),
+        xml_string
+    )
+
+
+def old_tally_api_chain(body: bytes) -> str:
+    """TallyAPIClient.clean_xml before xml_sanitizer (no namespace handling)."""
+    def replace_invalid_entity(match):
+        num = int(match.group(1))
+        return match.group(0) if num in (9, 10, 13) or num >= 32 else ''
+
+    def replace_invalid_hex_entity(match):
+        num = int(match.group(1), 16)
+        return match.group(0) if num in (9, 10, 13) or num >= 32 else ''
+
+    xml_string = body.decode('utf-8')
+    xml_string = re.sub(r'&#(\d+);', replace_invalid_entity, xml_string)
+    xml_string = re.sub(r'&#x([0-9a-fA-F]+);', replace_invalid_hex_entity, xml_string)
+    xml_string = re.sub(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F-\x9F]', '', xml_string)
+    return ''.join(char for char in xml_string if ord(char) >= 0x20 or char in '\t\n\r')
+
+
+def new_text(body: bytes) -> str:
+    return sanitize(body.decode('utf-8'))
+
+
+def new_bytes(body: bytes) -> bytes:
+    return sanitize(body)
+
+
+def new_stream(body: bytes) -> bytes:
+    sanitizer = XmlSanitizer('utf-8')
+    out = [sanitizer.feed(body[i:i + CHUNK]) for i in range(0, len(body), CHUNK)]
+    out.append(sanitizer.close())
+    return b''.join(out)
+
+
+VARIANTS = (
+    ('old: decode + 2 regex', old_voucher_chain),
+    ('old: TallyAPIClient', old_tally_api_chain),
+    ('sanitize(str)', new_text),
+    ('sanitize(bytes)', new_bytes),
+    ('XmlSanitizer 64 KiB', new_stream),
+)
+
+
+def _as_text(doc) -> str:
+    return doc.decode('utf-8') if isinstance(doc, bytes) else doc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vouchers', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    body = make_voucher_xml(args.vouchers).encode('utf-8')
+    expected = old_voucher_chain(body)
+    mb = len(body) / 1e6
+    print(f"{args.vouchers:,} vouchers, {mb:.1f} MB response, best of {args.repeat}")
+
+    baseline = None
+    for label, fn in VARIANTS:
+        same = _as_text(fn(body)) == expected
+        tracemalloc.start()
+        fn(body)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        best = float('inf')
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            fn(body)
+            best = min(best, time.perf_counter() - t0)
+        baseline = baseline or best
+        print(f"  {label:22s} {best * 1000:8.1f} ms  {mb / best:7.1f} MB/s  peak {peak / 1e6:6.1f} MB  "
+              f"x{baseline / best:5.2f}{'' if same else '  (output differs: no UDF: renaming)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Microbenchmark: stdlib json vs orjson / msgspec on real voucher payloads.
+
+Parses a synthetic Tally export through VoucherSyncManager.parse_voucher_xml so
+the payloads are exactly what goes over the wire (backend batch bodies) and
+what sync_worker writes to stdout (the tallyRecords result document), then
+times `dumps` for every backend available in this environment.
+
+    python bench_serializer.py [--vouchers 5000] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import serializer
+from bench_data import make_voucher_xml
+from sync_vouchers import VoucherSyncManager
+
+BACKENDS = ('json', 'orjson', 'msgspec')
+
+
+def build_payloads(n_vouchers: int) -> dict:
+    xml = make_voucher_xml(n_vouchers)
+    manager = VoucherSyncManager('http://localhost:8080', 'bench', 'bench')
+    vouchers = manager.parse_voucher_xml(xml, fk={'cmpId': 1, 'userId': 1})
+    batch = VoucherSyncManager.BATCH_SIZE
+    result = {
+        'success': True,
+        'message': f'Synced {len(vouchers)} vouchers',
+        'count': len(vouchers),
+        'tallyRecords': [
+            {'guid': v.get('guid'), 'alterId': v.get('alterId'), 'voucherNumber': v.get('voucherNumber'),
+             'voucherType': v.get('voucherType'), 'voucherDate': v.get('voucherDate')}
+            for v in vouchers
+        ],
+    }
+    return {
+        f'batches[{batch}]': [vouchers[i:i + batch] for i in range(0, len(vouchers), batch)],
+        'stdout result': [result],
+    }
+
+
+def bench(dumps, docs, repeat: int):
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = sum(len(dumps(doc)) for doc in docs)
+        best = min(best, time.perf_counter() - t0)
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vouchers', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.vouchers)
+    codecs = {}
+    for name in BACKENDS:
+        resolved, dumps, _ = serializer.get_codec(name)
+        if resolved == name:
+            codecs[name] = dumps
+    missing = [name for name in BACKENDS if name not in codecs]
+
+    print(f"{args.vouchers:,} vouchers, best of {args.repeat}; default backend: {serializer.BACKEND}")
+    if missing:
+        print(f"not installed: {', '.join(missing)}")
+    for label, docs in payloads.items():
+        print(f"\n{label}")
+        baseline = None
+        for name, dumps in codecs.items():
+            elapsed, size = bench(dumps, docs, args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {name:8s} {elapsed * 1000:9.1f} ms  {size / elapsed / 1e6:8.1f} MB/s  "
+                  f"{size:,} bytes  x{baseline / elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    main()
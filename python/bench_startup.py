@@ -0,0 +1,132 @@
+"""Startup benchmark: what `sync_worker.py --mode X` imports before doing any work.
+
+Runs each mode once under `python -X importtime` against mock_tally.py and
+mock_backend.py and reports, per mode, the number of modules imported, the
+total import time, the heaviest top-level imports and the wall time of the
+whole run. `import` is the bare `import sync_worker` cost (daemon startup).
+
+    python bench_startup.py [--modes import,fetch-license,fetch-companies,...] [--top 5]
+                            [--repeat 3] [--json startup.json]
+
+Each mode also has a list of modules it must NOT import (STARTUP_BUDGET); a
+mode that pulls one in is reported as a regression and the script exits 1,
+so the check works the same on any machine regardless of absolute timings.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_e2e import COMPANY, COMPANY_GUID, HERE, _start_mock
+
+# Modules a mode has no business importing. One-shot modes only load their own stack.
+_HEAVY = ('pandas', 'numpy', 'sync_vouchers', 'reconciliation', 'incremental_sync', 'sync_master',
+          'fetch_master_data', 'sync_financial_reports', 'merkle_reconcile', 'snapshot_store')
+STARTUP_BUDGET = {
+    'import': _HEAVY + ('tally_api', 'tally_http'),
+    'fetch-license': _HEAVY,
+    'fetch-companies': _HEAVY,
+    'sync-financial-reports': tuple(m for m in _HEAVY if m != 'sync_financial_reports'),
+    'fetch-master-data': tuple(m for m in _HEAVY if m != 'fetch_master_data'),
+    'sync-master': tuple(m for m in _HEAVY if m != 'sync_master'),
+    'sync-vouchers': ('pandas', 'reconciliation', 'incremental_sync', 'sync_master', 'fetch_master_data'),
+    'incremental-sync': ('pandas', 'sync_vouchers', 'sync_master', 'fetch_master_data'),
+}
+DEFAULT_MODES = ('import,fetch-license,fetch-companies,sync-financial-reports,fetch-master-data,'
+                 'sync-master,incremental-sync,sync-vouchers,reconcile')
+
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_importtime(stderr: str):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def mode_command(mode: str, tally_port: int, backend_url: str) -> list:
+    if mode == 'import':
+        return [sys.executable, '-X', 'importtime', '-c', 'import sync_worker']
+    cmd = [sys.executable, '-X', 'importtime', os.path.join(HERE, 'sync_worker.py'), '--mode', mode,
+           '--host', '127.0.0.1', '--port', str(tally_port)]
+    if mode in ('fetch-license', 'fetch-companies'):
+        return cmd
+    cmd += ['--company-id', '1', '--user-id', '1', '--backend-url', backend_url, '--company-name', COMPANY]
+    if mode == 'sync-financial-reports':
+        return cmd + ['--from-date', '20240401', '--to-date', '20250331']
+    if mode == 'incremental-sync':
+        return cmd + ['--entity-type', 'Group']
+    if mode in ('sync-vouchers', 'reconcile'):
+        cmd += ['--company-guid', COMPANY_GUID]
+        return cmd + (['--entity-type', 'voucher', '--from-date', '01-Apr-2024', '--to-date', '30-Apr-2024']
+                      if mode == 'reconcile' else [])
+    return cmd
+
+
+def run_mode(cmd: list, env: dict) -> dict:
+    t0 = time.perf_counter()
+    # stdin stays open and unused; daemon-style EOF handling must not shorten the run.
+    proc = subprocess.run(cmd, input='', stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          env=env, cwd=HERE, text=True, errors='replace')
+    wall = time.perf_counter() - t0
+    rows = parse_importtime(proc.stderr)
+    top = sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])
+    return {
+        'returncode': proc.returncode, 'wallSeconds': wall, 'modules': {r[0] for r in rows},
+        'importMs': sum(r[1] for r in rows) / 1000.0,
+        'top': [(name, cumulative / 1000.0) for name, _, cumulative, _ in top],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', default=DEFAULT_MODES)
+    parser.add_argument('--top', type=int, default=5, help='heaviest top-level imports to list')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per mode; the fastest is reported')
+    parser.add_argument('--json', help='also write the per-mode report to this file')
+    args = parser.parse_args()
+
+    tally, tally_info = _start_mock('mock_tally.py', ['--vouchers', '500'])
+    backend, backend_info = _start_mock('mock_backend.py', [])
+    backend_url = f"http://127.0.0.1:{backend_info['port']}"
+    env = dict(os.environ, TALLY_AUTH_TOKEN='bench', TALLY_DEVICE_TOKEN='bench', PYTHONIOENCODING='utf-8',
+               SYNC_SNAPSHOT_DB=os.path.join(tempfile.mkdtemp(prefix='bench_startup_'), 'snapshot.db'))
+
+    print(f"{'mode':<24}{'modules':>8}{'import ms':>11}{'wall s':>8}  heaviest top-level imports")
+    report, regressions = [], 0
+    try:
+        for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+            cmd = mode_command(mode, tally_info['port'], backend_url)
+            run = min((run_mode(cmd, env) for _ in range(max(args.repeat, 1))), key=lambda r: r['importMs'])
+            forbidden = sorted(set(STARTUP_BUDGET.get(mode, ())) & run['modules'])
+            regressions += bool(forbidden)
+            top = ', '.join(f"{name} {ms:.0f}" for name, ms in run['top'][:args.top])
+            print(f"{mode:<24}{len(run['modules']):>8}{run['importMs']:>11.1f}{run['wallSeconds']:>8.2f}  {top}"
+                  f"{'  exit ' + str(run['returncode']) if run['returncode'] else ''}")
+            if forbidden:
+                print(f"{'':<24}REGRESSION: imports {', '.join(forbidden)}")
+            report.append({'mode': mode, 'modules': len(run['modules']), 'importMs': round(run['importMs'], 1),
+                           'wallSeconds': round(run['wallSeconds'], 3), 'returncode': run['returncode'],
+                           'top': run['top'][:args.top], 'forbiddenImports': forbidden})
+    finally:
+        for proc in (tally, backend):
+            proc.terminate()
+            proc.wait()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'modes': report}, f, indent=2)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
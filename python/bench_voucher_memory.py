@@ -0,0 +1,115 @@
+"""Microbenchmark: memory held by parsed vouchers — dicts, records, interned names.
+
+Parses a synthetic Tally export (bench_data) with
+VoucherSyncManager.parse_voucher_xml and keeps the result, as a pipelined
+first-time sync does with a year of vouchers:
+
+* dicts — the plain dict trees the parser used to build (`to_wire()` of the
+  records, without name interning);
+* records — voucher_records types, every name a fresh str;
+* records + symbols — the parser as it runs, repeated names and dates interned
+  through the manager's SymbolTable.
+
+Figures are live bytes traced by tracemalloc, field values included. Also
+reports the parse rate with and without interning and the time to serialize
+the vouchers through serializer (untraced runs).
+
+    python bench_voucher_memory.py [--vouchers 100000]
+"""
+
+import argparse
+import gc
+import logging
+import time
+import tracemalloc
+
+import serializer
+from bench_data import make_voucher_xml
+from symbol_table import SymbolTable
+from sync_vouchers import VoucherSyncManager
+
+
+class _NoSymbols(SymbolTable):
+    """A symbol table that interns nothing (every name stays a fresh str)."""
+
+    def intern(self, value):
+        return value
+
+
+def count_rows(vouchers) -> int:
+    rows = 0
+    for v in vouchers:
+        for le in v['ledgerEntries']:
+            rows += 1 + len(le['billAllocations']) + len(le['costCategoryAllocations'])
+            rows += sum(len(cc['costCentreAllocations']) for cc in le['costCategoryAllocations'])
+        for ie in v['inventoryEntries']:
+            rows += 1 + len(ie['batchAllocations'])
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vouchers', type=int, default=100000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    fk = {'cmpId': 1, 'userId': 1}
+    xml = make_voucher_xml(args.vouchers)
+
+    def parse(symbols):
+        manager = VoucherSyncManager('http://localhost:8080', 'bench', 'bench')
+        manager.symbols = symbols
+        return manager.parse_voucher_xml(xml, fk=fk)
+
+    def timed_parse(symbols):
+        t0 = time.perf_counter()
+        vouchers = parse(symbols)
+        return vouchers, time.perf_counter() - t0
+
+    table = SymbolTable()
+    vouchers, parse_interned_s = timed_parse(table)
+    n = len(vouchers)
+    rows = count_rows(vouchers)
+    t0 = time.perf_counter()
+    serializer.dumps(vouchers)
+    dump_records_s = time.perf_counter() - t0
+    del vouchers
+    vouchers, parse_plain_s = timed_parse(_NoSymbols())
+    wire = [v.to_wire() for v in vouchers]
+    t0 = time.perf_counter()
+    serializer.dumps(wire)
+    dump_dicts_s = time.perf_counter() - t0
+    del vouchers, wire
+    gc.collect()
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    vouchers = parse(_NoSymbols())
+    gc.collect()
+    records_bytes = tracemalloc.get_traced_memory()[0] - base
+    wire = [v.to_wire() for v in vouchers]
+    del vouchers
+    gc.collect()
+    dicts_bytes = tracemalloc.get_traced_memory()[0] - base
+    del wire
+    gc.collect()
+    base = tracemalloc.get_traced_memory()[0]
+    vouchers = parse(SymbolTable())
+    gc.collect()
+    interned_bytes = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del vouchers
+
+    print(f"{n:,} vouchers, {rows:,} nested rows, {len(xml) / 1e6:.1f} MB of XML, "
+          f"{len(table):,} distinct symbols (serializer: {serializer.BACKEND})")
+    print(f"parse: {n / parse_plain_s:,.0f} vouchers/s, {n / parse_interned_s:,.0f} vouchers/s interning")
+    print(f"{'representation':18s} {'MB held':>9s} {'bytes/voucher':>14s} {'vs dicts':>9s} {'dumps s':>8s}")
+    for label, nbytes, dump_s in (('dicts', dicts_bytes, dump_dicts_s),
+                                  ('records', records_bytes, None),
+                                  ('records + symbols', interned_bytes, dump_records_s)):
+        print(f"{label:18s} {nbytes / 1e6:9.1f} {nbytes / n:14,.0f} {100 * (nbytes / dicts_bytes - 1):+8.0f}% "
+              + (f"{dump_s:8.2f}" if dump_s is not None else f"{'':>8s}"))
+
+
+if __name__ == '__main__':
+    main()
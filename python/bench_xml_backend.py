@@ -0,0 +1,145 @@
+"""Microbenchmark: xml_backend parsers (ElementTree vs lxml) on Tally exports.
+
+Runs every Tally parser in the sync layer once per available backend on the
+same synthetic exports (bench_data) and checks that they produce identical
+output:
+
+* vouchers — VoucherSyncManager.parse_voucher_xml, the streaming
+  iter_voucher_xml (64 KiB chunks) and the identity parser;
+* masters — IncrementalSyncManager / ReconciliationManager.parse_xml_response,
+  SyncManager and MasterDataFetcher.parse_xml;
+* reconciliation — ReconciliationManager.parse_voucher_reconciliation_xml;
+* company identity, Bills Receivable/Payable and the Balance Sheet / P&L /
+  Trial Balance walkers, fetched from a mock_tally server (the report rows are
+  captured instead of posted).
+
+The in-memory parsers are then timed per backend and reported in MB/s of
+response body (best of --repeat).
+
+    python bench_xml_backend.py [--vouchers 20000] [--ledgers 20000] [--repeat 3]
+"""
+
+import argparse
+import logging
+import threading
+import time
+
+import xml_backend
+from bench_data import make_master_xml, make_voucher_xml
+from fetch_master_data import MasterDataFetcher
+from incremental_sync import IncrementalSyncManager
+from mock_tally import MockCompany, MockTallyServer
+from reconciliation import ReconciliationManager
+from sync_bills_outstanding import _query_tally_company, fetch_bills_from_tally
+from sync_financial_reports import FinancialReportSync
+from sync_master import SyncManager
+from sync_vouchers import VoucherSyncManager
+
+CHUNK = 64 * 1024
+COMPANY = 'Bench Company'
+
+
+def use_backend(name: str):
+    """Make every parser in the sync layer use `name` (they look it up per call)."""
+    xml_backend.BACKEND, xml_backend.fromstring, xml_backend.iterparse = xml_backend.get_backend(name)
+
+
+class _CapturedReports(FinancialReportSync):
+    """FinancialReportSync that keeps the parsed rows instead of posting them."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.captured = {}
+
+    def _post_to_backend(self, endpoint, data, report_name):
+        self.captured[report_name] = data
+        return True
+
+
+def in_memory_cases(args):
+    vouchers = make_voucher_xml(args.vouchers)
+    ledgers = make_master_xml('Ledger', args.ledgers)
+    stock_items = make_master_xml('StockItem', args.ledgers // 4)
+    manager = VoucherSyncManager('http://localhost:8080', 'bench', 'bench')
+    incremental = IncrementalSyncManager('http://localhost:8080', 'bench', 'bench')
+    reconcile = ReconciliationManager('http://localhost:8080', 'bench', 'bench')
+    sync_master = SyncManager(COMPANY)
+    fetcher = MasterDataFetcher(COMPANY)
+    body = vouchers.encode('utf-8')
+    return [
+        ('vouchers: parse_voucher_xml', vouchers, lambda: manager.parse_voucher_xml(vouchers)),
+        ('vouchers: iter_voucher_xml', body,
+         lambda: list(manager.iter_voucher_xml((body[i:i + CHUNK] for i in range(0, len(body), CHUNK)),
+                                               encoding='utf-8'))),
+        ('vouchers: identity', vouchers, lambda: manager._parse_voucher_identity_xml(vouchers)),
+        ('vouchers: reconciliation', vouchers, lambda: reconcile.parse_voucher_reconciliation_xml(vouchers)),
+        ('ledgers: incremental', ledgers, lambda: incremental.parse_xml_response(ledgers, 'Ledger')),
+        ('ledgers: reconciliation', ledgers, lambda: reconcile.parse_xml_response(ledgers, 'Ledger')),
+        ('ledgers: sync_master', ledgers, lambda: sync_master.parse_xml(ledgers, 'Ledger')),
+        ('stock items: fetch_master_data', stock_items, lambda: fetcher.parse_xml(stock_items, 'StockItem')),
+    ]
+
+
+def served_cases(tally_url: str, port: int):
+    def reports():
+        sync = _CapturedReports(COMPANY, 1, 1, port, 'http://localhost:8080')
+        sync.fetch_and_sync_balance_sheet()
+        sync.fetch_and_sync_profit_loss()
+        sync.fetch_and_sync_trial_balance()
+        return sync.captured
+
+    return [
+        ('company identity', lambda: _query_tally_company(tally_url, COMPANY)),
+        ('bills receivable', lambda: fetch_bills_from_tally(tally_url, COMPANY, 'Bills Receivable')),
+        ('bills payable', lambda: fetch_bills_from_tally(tally_url, COMPANY, 'Bills Payable')),
+        ('financial reports', reports),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vouchers', type=int, default=20000)
+    parser.add_argument('--ledgers', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    backends = ['etree'] + (['lxml'] if xml_backend.get_backend('lxml')[0] == 'lxml' else [])
+    print(f"backends: {', '.join(backends)} (default: {xml_backend.BACKEND}), best of {args.repeat}")
+
+    server = MockTallyServer(('127.0.0.1', 0), MockCompany(COMPANY, 10, bills=2000, report_rows=400))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        outputs = {}
+        for name in backends:
+            use_backend(name)
+            outputs[name] = {label: fn() for label, fn in served_cases(f'http://127.0.0.1:{port}', port)}
+    finally:
+        server.shutdown()
+    for label, result in outputs['etree'].items():
+        same = all(outputs[name][label] == result for name in backends)
+        print(f"  {label:32s} {'identical' if same else 'OUTPUT DIFFERS'}")
+
+    cases = in_memory_cases(args)
+    print(f"{'parser':32s} {'MB':>6s} " + " ".join(f"{name + ' MB/s':>11s}" for name in backends) + "  output")
+    for label, doc, fn in cases:
+        mb = len(doc.encode('utf-8') if isinstance(doc, str) else doc) / 1e6
+        rates, results = [], []
+        for name in backends:
+            use_backend(name)
+            results.append(fn())
+            best = float('inf')
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - t0)
+            rates.append(mb / best)
+        same = all(result == results[0] for result in results) and len(results[0]) > 0
+        print(f"{label:32s} {mb:6.1f} " + " ".join(f"{rate:11.1f}" for rate in rates)
+              + f"  {'identical' if same else 'DIFFERS'} ({len(results[0]):,} records)")
+    use_backend(None)
+
+
+if __name__ == '__main__':
+    main()
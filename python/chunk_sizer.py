@@ -0,0 +1,252 @@
+"""Adaptive date-range chunking for Tally voucher exports.
+
+Voucher sync and voucher reconciliation both split a date range into requests
+small enough for Tally to answer in reasonable time. They used to do it with
+two separate fixed heuristics (calendar months re-synced week by week after a
+slow month; a 30 → 15 → 7 → 1-day step-down that never grew back), relearning
+the company's volume on every run.
+
+`ChunkSizer` replaces both. Per company it keeps
+
+* how many vouchers Tally held on each day, learned from complete exports, and
+* per request kind ('vouchers' = full export, 'voucher-ids' = identity-only),
+  the seconds and bytes one record costs and the current records-per-request
+  budget.
+
+A window is then the longest run of days whose expected record count fits the
+budget. After each request the budget moves towards what would have hit
+SYNC_CHUNK_TARGET_SECONDS and SYNC_CHUNK_TARGET_MB, at most doubling or
+halving per step. Until a company has any history the windows are calendar
+months (the old behaviour), unless the caller seeds the day counts from a
+cheap Tally count query first (`needs_counts` / `seed`) — then a heavy range
+is split before anything is fetched, starting from SYNC_CHUNK_INITIAL_RECORDS
+records per request. A failed or slower-than-target request also halves
+the day span of the following windows, which grows back as requests come in
+under half the target.
+
+Everything is persisted in the snapshot store (see snapshot_store) when it is
+enabled, else kept in memory for the life of the process, so the next run
+starts at the learned size.
+"""
+
+import calendar
+import logging
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from snapshot_store import get_snapshot_store, normalize_date
+
+logger = logging.getLogger(__name__)
+
+TARGET_SECONDS = float(os.getenv('SYNC_CHUNK_TARGET_SECONDS', '15'))
+TARGET_BYTES = int(float(os.getenv('SYNC_CHUNK_TARGET_MB', '48')) * 1024 * 1024)
+MAX_DAYS = int(os.getenv('SYNC_CHUNK_MAX_DAYS', '92'))
+INITIAL_RECORDS = int(os.getenv('SYNC_CHUNK_INITIAL_RECORDS', '5000'))
+MIN_RECORDS = 50
+GROW = 2.0
+SHRINK = 0.5
+_EWMA = 0.5
+
+# Process-wide fallback when the snapshot store is disabled: (company, kind) → state.
+_memory: Dict = {}
+_memory_lock = threading.Lock()
+
+
+def _month_end(day: datetime) -> datetime:
+    return datetime(day.year, day.month, calendar.monthrange(day.year, day.month)[1])
+
+
+class ChunkSizer:
+    """Records-per-request controller for one company and request kind."""
+
+    def __init__(self, company_id: int, kind: str, entity: str = 'Voucher',
+                 target_seconds: float = None, target_bytes: int = None):
+        self.company_id = int(company_id or 0)
+        self.kind = kind
+        self.entity = entity
+        self.target_seconds = target_seconds or TARGET_SECONDS
+        self.target_bytes = target_bytes or TARGET_BYTES
+        self.store = get_snapshot_store()
+        if self.store is not None:
+            profile = self.store.chunk_profile(self.company_id, kind)
+            self.days = self.store.day_counts(self.company_id, entity)
+        else:
+            with _memory_lock:
+                profile = dict(_memory.get((self.company_id, kind), {}))
+                self.days = dict(_memory.get((self.company_id, entity), {}))
+        self.budget = profile.get('budget')
+        self.seconds_per_record = profile.get('secondsPerRecord')
+        self.bytes_per_record = profile.get('bytesPerRecord')
+        self.span_cap = None  # max days per window after a slow/failed request (None: no cap)
+        self._observed_days = {}
+        self._means = None
+        self._lock = threading.RLock()  # the pipelined sync feeds back from two threads
+
+    # ── Planning ──────────────────────────────────────────────────
+
+    def _mean_density(self):
+        """(overall vouchers/day, {'YYYY-MM': vouchers/day}) over the known days."""
+        if self._means is None:
+            per_month = {}
+            for day, n in self.days.items():
+                total, count = per_month.get(day[:7], (0, 0))
+                per_month[day[:7]] = (total + n, count + 1)
+            overall = (sum(self.days.values()) / len(self.days)) if self.days else None
+            self._means = (overall, {m: t / c for m, (t, c) in per_month.items()})
+        return self._means
+
+    def estimate(self, day: datetime) -> Optional[float]:
+        """Expected vouchers on `day`: observed, else that month's mean, else the company mean."""
+        key = day.strftime('%Y-%m-%d')
+        if key in self.days:
+            return self.days[key]
+        overall, per_month = self._mean_density()
+        return per_month.get(key[:7], overall)
+
+    def estimate_range(self, start: datetime, end: datetime) -> Optional[float]:
+        total, day = 0.0, start
+        while day <= end:
+            n = self.estimate(day)
+            if n is None:
+                return None
+            total += n
+            day += timedelta(days=1)
+        return total
+
+    def needs_counts(self, start: datetime, end: datetime) -> bool:
+        """True when some month of [start, end] has no known day counts yet."""
+        per_month = self._mean_density()[1]
+        day = start
+        while day <= end:
+            if day.strftime('%Y-%m') not in per_month:
+                return True
+            day = _month_end(day) + timedelta(days=1)
+        return False
+
+    def next_end(self, start: datetime, end: datetime) -> datetime:
+        """Last day of the next window starting at `start` (never past `end`)."""
+        if self.span_cap:
+            end = min(end, start + timedelta(days=self.span_cap - 1))
+        if self.budget is None or self._mean_density()[0] is None:
+            return end if self.span_cap else min(_month_end(start), end)
+        total, last, day = 0.0, start, start
+        while day <= end and (day - start).days < MAX_DAYS:
+            total += self.estimate(day)
+            if total > self.budget and day > start:
+                break
+            last = day
+            day += timedelta(days=1)
+        return last
+
+    def plan(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Split [start, end] into windows with the current knowledge (no feedback)."""
+        windows = []
+        while start <= end:
+            w_end = self.next_end(start, end)
+            windows.append((start, w_end))
+            start = w_end + timedelta(days=1)
+        return windows
+
+    # ── Feedback ──────────────────────────────────────────────────
+
+    def observe(self, start: datetime, end: datetime, records: int, seconds: float,
+                nbytes: int = 0, dates: Iterable[str] = None):
+        """Feed back one successful request over [start, end].
+
+        `dates` (one entry per record) marks the export as complete for the
+        window — an unfiltered export — and records the per-day counts; leave
+        it None for AlterID-filtered requests, whose record count says nothing
+        about the range.
+        """
+        with self._lock:
+            self._observe(start, end, records, seconds, nbytes, dates)
+
+    def seed(self, start: datetime, end: datetime, counts: Dict[str, int]):
+        """Record per-day voucher counts for [start, end] learned without a fetch.
+
+        `counts` maps 'YYYY-MM-DD' (or any date form snapshot_store understands)
+        to a count; days missing from it had no vouchers. Without a learned
+        budget the windows start at INITIAL_RECORDS.
+        """
+        with self._lock:
+            self._record_days(start, end, {normalize_date(d): n for d, n in counts.items()})
+            if self.budget is None:
+                self.budget = INITIAL_RECORDS
+
+    def _record_days(self, start, end, counts):
+        day = start
+        while day <= end:
+            key = day.strftime('%Y-%m-%d')
+            self.days[key] = self._observed_days[key] = int(counts.get(key, 0))
+            day += timedelta(days=1)
+        self._means = None
+
+    def _observe(self, start, end, records, seconds, nbytes, dates):
+        span = (end - start).days + 1
+        if dates is not None:
+            self._record_days(start, end, Counter(normalize_date(d) for d in dates))
+        if seconds > self.target_seconds:
+            self.span_cap = max(1, int(span * SHRINK))
+        elif self.span_cap and seconds < self.target_seconds * SHRINK:
+            self.span_cap = None if self.span_cap * GROW >= MAX_DAYS else int(self.span_cap * GROW)
+        if dates is None or records <= 0 or seconds <= 0:
+            return
+
+        spr, bpr = seconds / records, (nbytes / records if nbytes else None)
+        self.seconds_per_record = spr if self.seconds_per_record is None else \
+            _EWMA * spr + (1 - _EWMA) * self.seconds_per_record
+        if bpr:
+            self.bytes_per_record = bpr if self.bytes_per_record is None else \
+                _EWMA * bpr + (1 - _EWMA) * self.bytes_per_record
+        desired = self.target_seconds / self.seconds_per_record
+        if self.bytes_per_record:
+            desired = min(desired, self.target_bytes / self.bytes_per_record)
+        current = self.budget or records
+        self.budget = max(MIN_RECORDS, min(max(desired, current * SHRINK), current * GROW))
+
+    def failed(self, start: datetime, end: datetime):
+        """A request over [start, end] failed or timed out: halve the next window."""
+        span = (end - start).days + 1
+        with self._lock:
+            self.span_cap = max(1, int(span * SHRINK))
+            expected = self.estimate_range(start, end)
+            current = min(self.budget or expected or 0, expected or self.budget or 0)
+            if current:
+                self.budget = max(MIN_RECORDS, current * SHRINK)
+        logger.info(f"📉 {self.kind} chunk {start:%d-%b-%Y}..{end:%d-%b-%Y} failed; next window ≤ "
+                    f"{self.span_cap} day(s){f', {self.budget:.0f} records' if self.budget else ''}")
+
+    def save(self):
+        """Persist what this run learned."""
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        profile = {'budget': self.budget, 'secondsPerRecord': self.seconds_per_record,
+                   'bytesPerRecord': self.bytes_per_record}
+        if self.store is not None:
+            try:
+                if self._observed_days:
+                    self.store.record_day_counts(self.company_id, self.entity, self._observed_days)
+                self.store.save_chunk_profile(self.company_id, self.kind, profile)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not persist chunk sizing for company {self.company_id}: {e}")
+        else:
+            with _memory_lock:
+                _memory[(self.company_id, self.kind)] = profile
+                _memory.setdefault((self.company_id, self.entity), {}).update(self._observed_days)
+        self._observed_days = {}
+
+    def describe(self) -> Dict:
+        overall = self._mean_density()[0]
+        return {
+            'kind': self.kind,
+            'budgetRecords': round(self.budget) if self.budget else None,
+            'secondsPerRecord': self.seconds_per_record,
+            'bytesPerRecord': round(self.bytes_per_record) if self.bytes_per_record else None,
+            'knownDays': len(self.days),
+            'vouchersPerDay': round(overall, 2) if overall is not None else None,
+        }
@@ -10,19 +10,15 @@ import sys
 import json
 from datetime import datetime
 from typing import Dict, List, Optional
-import xml.etree.ElementTree as ET
-import re
 import os
 
 from sync_logger import get_sync_logger
+from tally_http import tally_post
+from master_bundle import bundle_supported, bundle_tdl, mark_unsupported, split_bundle
+from xml_sanitizer import sanitize
+import xml_backend
 
-import sys as _sys
-if getattr(_sys, 'frozen', False):
-    log_dir = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'Tallify', 'logs')
-else:
-    log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, 'sync_worker.log')
+from sync_logger import LOG_DIR as log_dir, SYNC_LOG_FILE as log_file
 
 # Use global logger instead of basicConfig
 logger = logging.getLogger(__name__)
@@ -98,7 +94,7 @@ class MasterDataFetcher:
     def fetch_from_tally(self, tdl: str) -> Optional[str]:
         """Fetch data from Tally"""
         try:
-            response = requests.post(
+            response = tally_post(
                 self.tally_url,
                 data=tdl,
                 headers={'Content-Type': 'application/xml'},
@@ -121,8 +117,8 @@ class MasterDataFetcher:
         """Parse XML response"""
         try:
             # Remove invalid XML characters
-            xml_string = re.sub(r'&#([0-9]+);', lambda m: '' if int(m.group(1)) < 32 and int(m.group(1)) not in [9, 10, 13] else m.group(0), xml_string)
-            root = ET.fromstring(xml_string)
+            xml_string = sanitize(xml_string)
+            root = xml_backend.fromstring(xml_string)
             records = []
             
             for elem in root.iter(master_type.upper()):
@@ -163,10 +159,35 @@ class MasterDataFetcher:
             logger.warning(f"Error parsing element: {e}")
             return None
     
+    def fetch_bundle(self) -> Optional[Dict]:
+        """Fetch every master type with one multi-collection request; None if Tally rejects it"""
+        tdl = bundle_tdl([(master_type, master_type, fields, None) for master_type, fields in self.MASTERS.items()],
+                         self.company_name, '01-Jan-1970', '01-Jan-1970')
+        xml_response = self.fetch_from_tally(tdl)
+        if not xml_response:
+            return None
+        grouped = split_bundle(xml_response, [master_type.upper() for master_type in self.MASTERS])
+        if grouped is None:
+            mark_unsupported(self.tally_host, self.tally_port)
+            return None
+        
+        all_data = {}
+        for master_type in self.MASTERS.keys():
+            records = [r for r in (self._parse_element(e) for e in grouped[master_type.upper()]) if r]
+            all_data[master_type] = records
+            logger.info(f"{master_type}: {len(records)} records")
+        return all_data
+    
     def fetch_all(self) -> Dict:
         """Fetch all master data"""
         logger.info(f"Fetching all master data for company: {self.company_name}")
         
+        if bundle_supported(self.tally_host, self.tally_port):
+            all_data = self.fetch_bundle()
+            if all_data is not None:
+                logger.info(f"Total records fetched: {sum(len(r) for r in all_data.values())} (one request)")
+                return all_data
+        
         all_data = {}
         total_records = 0
         
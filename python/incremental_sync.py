@@ -5,26 +5,27 @@ import sys
 import time
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional
-import xml.etree.ElementTree as ET
-import re
 import os
 
 from sync_logger import get_sync_logger
-from tally_http import post_xml_with_retry
+from tally_http import cached_company_check, post_xml_with_retry, tally_post
+from master_bundle import bundle_tdl, mark_unsupported, split_bundle
 from sync_config import endpoint_for
+from batch_uploader import BatchUploader
+from backend_http import post_json
+from snapshot_store import ALL_PERIODS, VERIFY_MAX_AGE_SECONDS, checksum_records, content_hash, get_snapshot_store
+from xml_sanitizer import response_xml, sanitize
+import xml_backend
+from master_fields import FieldExtractor
+from symbol_table import SymbolTable
 
 # Production logging configuration
 LOG_LEVEL = os.getenv('SYNC_LOG_LEVEL', 'INFO')
 VERBOSE_MODE = os.getenv('SYNC_VERBOSE', 'false').lower() == 'true'
 
-# Create logs directory - use APPDATA when running as bundled exe
-import sys as _sys
-if getattr(_sys, 'frozen', False):
-    LOG_DIR = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'Tallify', 'logs')
-else:
-    LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
-os.makedirs(LOG_DIR, exist_ok=True)
-INCREMENTAL_SYNC_LOG_FILE = os.path.join(LOG_DIR, 'sync_worker.log')
+# Logs directory (APPDATA when running as bundled exe) is owned by sync_logger
+# and created on first write.
+from sync_logger import SYNC_LOG_FILE as INCREMENTAL_SYNC_LOG_FILE
 
 # Use the global shared logger instead of creating duplicate handlers
 logger = logging.getLogger(__name__)
@@ -51,8 +52,186 @@ class IncrementalSyncManager:
     """Manages incremental sync based on AlterID with reconciliation"""
     
     BATCH_SIZE = 500
-    BATCH_DELAY = 0.1  # 100ms delay between batches
+    UPLOAD_WINDOW = int(os.getenv('SYNC_UPLOAD_WINDOW', '4'))  # max batches in flight
     
+    # Collection TYPE where Tally's name differs from the entity name.
+    TALLY_TYPES = {
+        'CostCenter': 'COSTCENTRE',
+        'CostCategory': 'COSTCATEGORY'
+    }
+
+    # FETCH list per master entity for the incremental / bundle TDL.
+    ENTITY_FIELDS = {
+        'Group': "GUID, MASTERID, ALTERID, Name, Alias, Parent, Nature, IsRevenue, RESERVEDNAME",
+        'Currency': "GUID, MASTERID, ALTERID, Name, Symbol, FormalName, DecimalPlaces, DecimalSymbol, ShowAmountInWords, SuffixSymbol, SpaceBetweenAmountAndSymbol",
+        'Unit': "GUID, MASTERID, ALTERID, Name, Alias, OriginalName, DecimalPlaces, NumberOfDecimals",
+        'StockGroup': "GUID, MASTERID, ALTERID, Name, Alias, Parent, BaseUnits, AdditionalUnits",
+        'StockCategory': "GUID, MASTERID, ALTERID, Name, Alias, Parent",
+        'CostCategory': "GUID, MASTERID, ALTERID, Name, Alias, AllocateRevenue, AllocateNonRevenue",
+        'CostCenter': "GUID, MASTERID, ALTERID, Name, Alias, Parent, Category",
+        'Godown': "GUID, MASTERID, ALTERID, Name, Alias, Parent, Address",
+        'VoucherType': "GUID, MASTERID, ALTERID, Name, Alias, Parent, NumberingMethod, IsDeemedPositive",
+        'TaxUnit': "GUID, MASTERID, ALTERID, Name, Alias, OriginalName",
+        'Ledger': "GUID, MASTERID, ALTERID, Name, OnlyAlias, Parent, PrimaryGroup, IsRevenue, LastParent, Description, Narration, IsBillWiseOn, IsCostCentresOn, OpeningBalance, ClosingBalance, LEDGERPHONE, LEDGERCOUNTRYISDCODE, LEDGERMOBILE, LEDGERCONTACT, WEBSITE, EMAIL, CURRENCYNAME, INCOMETAXNUMBER, LEDMAILINGDETAILS.*, VATAPPLICABLEDATE, VATDEALERTYPE, VATTINNUMBER, LEDGSTREGDETAILS.*",
+        'StockItem': "GUID, MASTERID, ALTERID, Name, Alias, Parent, Category, Description, MailingName, BaseUnits, AdditionalUnits, OpeningBalance, OpeningValue, OpeningRate, ReorderLevel, MinimumLevel, CostingMethod, ValuationMethod, GSTTypeOfSupply, HSNCode, GST, IsBatchWiseOn, IsCostCentresOn",
+    }
+
+    # Parsed record per master entity: (record key, source tag(s), kind) — see
+    # master_fields for the notation. Every record starts with RECORD_BASE.
+    RECORD_BASE = (
+        ('guid', 'GUID', None),
+        ('masterID', 'MASTERID', None),
+        ('alterID', 'ALTERID', 'int'),
+        ('name', ('@NAME', 'NAME'), None),
+    )
+    _GST = 'LEDGSTREGDETAILS.LIST/'
+    _MAIL = 'LEDMAILINGDETAILS.LIST/'
+    RECORD_FIELDS = {
+        'Ledger': (
+            ('alias', ('ONLYALIAS', 'ALIAS'), None),
+            ('parent', 'PARENT', None),
+            ('primaryGroup', 'PRIMARYGROUP', None),
+            ('lastParent', 'LASTPARENT', None),
+            ('isRevenue', 'ISREVENUE', 'yes'),
+            ('description', 'DESCRIPTION', None),
+            ('narration', 'NARRATION', None),
+            ('isBillWiseOn', 'ISBILLWISEON', 'yes'),
+            ('isCostCentresOn', 'ISCOSTCENTRESON', 'yes'),
+            ('openingBalance', 'OPENINGBALANCE', 'amount'),
+            ('closingBalance', 'CLOSINGBALANCE', 'amount'),
+            ('phone', 'LEDGERPHONE', None),
+            ('countryIsdCode', 'LEDGERCOUNTRYISDCODE', None),
+            ('mobile', 'LEDGERMOBILE', None),
+            ('contact', 'LEDGERCONTACT', None),
+            ('email', 'EMAIL', None),
+            ('website', 'WEBSITE', None),
+            ('currencyName', 'CURRENCYNAME', None),
+            ('incometaxNumber', 'INCOMETAXNUMBER', None),
+            ('vatTINNumber', 'VATTINNUMBER', None),
+            ('vatDealerType', 'VATDEALERTYPE', None),
+            ('gstApplicable', 'GSTAPPLICABLE', 'applicable'),
+            ('gstRegistrationType', _GST + 'GSTREGISTRATIONTYPE', 'str'),
+            ('gstGstin', _GST + 'GSTIN', 'str'),
+            ('gstPlaceOfSupply', _GST + 'PLACEOFSUPPLY', 'str'),
+            ('gstDetailsApplicableFrom', _GST + 'APPLICABLEFROM', 'str'),
+            ('gstIsCommonParty', _GST + 'ISCOMMONPARTY', 'yes'),
+            ('gstIsFreezone', _GST + 'ISFREEZONE', 'yes'),
+            ('gstIsTransporter', _GST + 'ISTRANSPORTER', 'yes'),
+            ('gstIsOtherTerritoryAssessee', _GST + 'ISOTHERTERRITORYASSESSEE', 'yes'),
+            ('gstConsiderPurchaseForExport', _GST + 'CONSIDERPURCHASEFOREXPORT', 'yes'),
+            ('gstRegistrationDate', _GST + 'GSTREGISTRATIONDATE', 'str'),
+            ('gstState', (_GST + 'STATENAME', _GST + 'PLACEOFSUPPLY'), 'str'),
+            ('gstTransporterId', _GST + 'TRANSPORTERID', 'str'),
+            ('mailingName', _MAIL + 'MAILINGNAME', 'str'),
+            ('address1', _MAIL + 'ADDRESS.LIST/ADDRESS[0]', 'str'),
+            ('address2', _MAIL + 'ADDRESS.LIST/ADDRESS[1]', 'str'),
+            ('address3', _MAIL + 'ADDRESS.LIST/ADDRESS[2]', 'str'),
+            ('address4', _MAIL + 'ADDRESS.LIST/ADDRESS[3]', 'str'),
+            ('mailingState', _MAIL + 'STATE', 'str'),
+            ('mailingCountry', _MAIL + 'COUNTRY', 'str'),
+            ('mailingPincode', _MAIL + 'PINCODE', 'str'),
+            ('mailingApplicableFrom', _MAIL + 'APPLICABLEFROM', 'str'),
+        ),
+        'VoucherType': (
+            ('alias', 'MAILINGNAME', None),
+            ('parent', 'PARENT', None),
+            ('isActive', 'ISACTIVE', 'yes'),
+            ('isDeemedPositive', 'ISDEEMEDPOSITIVE', 'yes'),
+            ('numberingMethod', ('NUMBERINGMETHOD', 'VOUCHERNUMBERSERIES.LIST/NUMBERINGMETHOD'), None),
+            ('reservedName', '@RESERVEDNAME', None),
+        ),
+        'Unit': (
+            ('originalName', 'ORIGINALNAME', None),
+            ('decimalPlaces', 'NUMBEROFDECIMALS', 'int'),
+            ('simpleUnit', 'ISSIMPLEUNIT', 'yes'),
+            ('reservedName', '@RESERVEDNAME', None),
+        ),
+        'Godown': (
+            ('parent', 'PARENT', None),
+            ('address', 'ADDRESS', None),
+            ('reservedName', '@RESERVEDNAME', None),
+        ),
+        'TaxUnit': (
+            ('originalName', 'ORIGINALNAME', None),
+            ('reservedName', '@RESERVEDNAME', None),
+        ),
+        'Currency': (
+            ('symbol', ('SYMBOL', 'EXPANDEDSYMBOL', 'ORIGINALSYMBOL'), None),
+            ('formalName', 'FORMALNAME', None),
+            ('decimalPlaces', 'DECIMALPLACES', 'int'),
+            ('decimalSeparator', ('DECIMALSYMBOL', 'DECIMALSEPARATOR'), None),
+            ('showAmountInWords', 'SHOWAMOUNTINWORDS', None),
+            ('suffixSymbol', 'SUFFIXSYMBOL', None),
+            ('spaceBetweenAmountAndSymbol', 'SPACEBETWEENAMOUNTANDSYMBOL', None),
+        ),
+        'StockGroup': (
+            ('parent', 'PARENT', None),
+            ('reservedName', '@RESERVEDNAME', None),
+        ),
+        'StockCategory': (
+            ('parent', 'PARENT', None),
+            ('reservedName', '@RESERVEDNAME', None),
+        ),
+        'CostCategory': (
+            ('reservedName', '@RESERVEDNAME', None),
+        ),
+        'CostCenter': (
+            ('parent', 'PARENT', None),
+            ('category', 'CATEGORY', None),
+        ),
+        'Group': (
+            ('alias', 'ALIAS', None),
+            ('parent', 'PARENT', None),
+            ('nature', 'NATURE', None),
+            ('isRevenue', 'ISREVENUE', 'yes'),
+            ('reservedName', 'RESERVEDNAME', None),
+        ),
+        'StockItem': (
+            ('parent', 'PARENT', None),
+            ('category', 'CATEGORY', None),
+            ('description', 'DESCRIPTION', None),
+            ('mailingName', 'MAILINGNAME', None),
+            ('baseUnits', 'BASEUNITS', None),
+            ('additionalUnits', 'ADDITIONALUNITS', None),
+            ('costingMethod', 'COSTINGMETHOD', None),
+            ('valuationMethod', 'VALUATIONMETHOD', None),
+            ('gstTypeOfSupply', 'GSTTYPEOFSUPPLY', None),
+            ('hsnCode', 'HSNCODE', None),
+            ('openingBalance', 'OPENINGBALANCE', 'amount'),
+            ('openingValue', 'OPENINGVALUE', 'amount'),
+            ('openingRate', 'OPENINGRATE', 'amount'),
+            ('batchWiseOn', 'ISBATCHWISEON', 'yes'),
+            ('costCentersOn', 'ISCOSTCENTRESON', 'yes'),
+            ('reservedName', '@RESERVEDNAME', None),
+        ),
+    }
+    # Record keys whose values repeat across masters; interned through the
+    # sync's SymbolTable while parsing (see symbol_table).
+    RECORD_SYMBOLS = (
+        'parent', 'primaryGroup', 'lastParent', 'nature', 'category', 'currencyName', 'vatDealerType',
+        'gstRegistrationType', 'gstPlaceOfSupply', 'gstState', 'gstDetailsApplicableFrom',
+        'mailingState', 'mailingCountry', 'mailingApplicableFrom', 'countryIsdCode',
+        'baseUnits', 'additionalUnits', 'costingMethod', 'valuationMethod', 'gstTypeOfSupply',
+        'hsnCode', 'numberingMethod', 'reservedName',
+    )
+    _extractors: Dict[str, FieldExtractor] = {}
+
+    # Entity type -> key in the backend's /master-mapping response.
+    MAPPING_KEYS = {
+        'Group': 'group',
+        'Currency': 'currency',
+        'Unit': 'units',
+        'StockGroup': 'stockgroup',
+        'StockCategory': 'stockcategory',
+        'CostCategory': 'costcategory',
+        'CostCenter': 'costcenter',
+        'Godown': 'godown',
+        'VoucherType': 'vouchertype',
+        'TaxUnit': 'taxunit',
+        'Ledger': 'ledger',
+        'StockItem': 'stockitem',
+    }
+
     def __init__(self, backend_url: str, auth_token: str, device_token: str, batch_size: int = None):
         if batch_size and batch_size > 0:
             self.BATCH_SIZE = batch_size
@@ -63,6 +242,7 @@ class IncrementalSyncManager:
             'Authorization': f'Bearer {auth_token}',
             'X-Device-Token': device_token
         }
+        self.symbols = SymbolTable()
     
     def verify_tally_company(self, tally_host: str, tally_port: int, expected_company_name: str) -> tuple:
         """Verify that the expected company is loaded/open in Tally Prime.
@@ -76,23 +256,30 @@ class IncrementalSyncManager:
             exact match is found — callers should use it for SVCURRENTCOMPANY so
             Tally targets precisely the right company (it won't switch on a
             casing/whitespace mismatch and would silently serve the active one).
+
+        A positive answer is reused for TALLY_COMPANY_VERIFY_TTL seconds (shared
+        with the voucher, bills and report syncs via tally_http).
         """
+        tally_url = f"http://{tally_host}:{tally_port}"
+        return cached_company_check(tally_url, expected_company_name,
+                                    lambda: self._query_tally_company(tally_url, expected_company_name))
+
+    def _query_tally_company(self, tally_url: str, expected_company_name: str) -> tuple:
+        """Ask Tally for the loaded companies and match `expected_company_name` exactly."""
         xml_req = """<ENVELOPE>
 <HEADER><VERSION>1</VERSION><TALLYREQUEST>Export</TALLYREQUEST><TYPE>Collection</TYPE><ID>Collection of Companies</ID></HEADER>
 <BODY><DESC><STATICVARIABLES><SVFROMDATE TYPE="Date">01-Jan-1970</SVFROMDATE><SVTODATE TYPE="Date">01-Jan-1970</SVTODATE><SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT></STATICVARIABLES>
 <TDL><TDLMESSAGE><COLLECTION NAME="Collection of Companies" ISMODIFY="No"><TYPE>Company</TYPE><FETCH>NAME</FETCH><FILTERS>GroupFilter</FILTERS></COLLECTION><SYSTEM TYPE="FORMULAE" NAME="GroupFilter">$isaggregate = "No"</SYSTEM></TDLMESSAGE></TDL></DESC></BODY></ENVELOPE>"""
 
-        tally_url = f"http://{tally_host}:{tally_port}"
         try:
-            resp = requests.post(tally_url, data=xml_req.encode('utf-8'),
-                                 headers={'Content-Type': 'application/xml'},
-                                 timeout=10)
+            resp = tally_post(tally_url, data=xml_req.encode('utf-8'),
+                              headers={'Content-Type': 'application/xml'},
+                              timeout=10)
             if resp.status_code != 200:
                 logger.warning(f"⚠️ Could not verify Tally companies (HTTP {resp.status_code})")
                 return False, None, []  # Fail-closed
 
-            text = re.sub(r'[^\x09\x0A\x0D\x20-\x7E\x80-\xFF\u0100-\uFFFF]', '', resp.text)
-            root = ET.fromstring(text)
+            root = xml_backend.fromstring(response_xml(resp))
             
             companies = []
             for elem in root.iter('COMPANY'):
@@ -180,22 +367,7 @@ class IncrementalSyncManager:
                 return 0
             
             # Map entity type to master key (e.g., "Group" -> "group")
-            entity_key_map = {
-                'Group': 'group',
-                'Currency': 'currency',
-                'Unit': 'units',
-                'StockGroup': 'stockgroup',
-                'StockCategory': 'stockcategory',
-                'CostCategory': 'costcategory',
-                'CostCenter': 'costcenter',
-                'Godown': 'godown',
-                'VoucherType': 'vouchertype',
-                'TaxUnit': 'taxunit',
-                'Ledger': 'ledger',
-                'StockItem': 'stockitem',
-            }
-            
-            entity_key = entity_key_map.get(entity_type, entity_type.lower() if entity_type else None)
+            entity_key = self.MAPPING_KEYS.get(entity_type, entity_type.lower() if entity_type else None)
             
             if entity_key and entity_key in masters:
                 last_id = masters[entity_key]
@@ -341,30 +513,9 @@ class IncrementalSyncManager:
                         when companies don't maintain opening balances.
         """
         
-        # Map entity type to Tally-specific names
-        tally_entity_names = {
-            'CostCenter': 'COSTCENTRE',
-            'CostCategory': 'COSTCATEGORY'
-        }
-        tally_entity = tally_entity_names.get(entity_type, entity_type)
-        
-        # Define fetch fields for each entity type
-        entity_fields = {
-            'Group': "GUID, MASTERID, ALTERID, Name, Alias, Parent, Nature, IsRevenue, RESERVEDNAME",
-            'Currency': "GUID, MASTERID, ALTERID, Name, Symbol, FormalName, DecimalPlaces, DecimalSymbol, ShowAmountInWords, SuffixSymbol, SpaceBetweenAmountAndSymbol",
-            'Unit': "GUID, MASTERID, ALTERID, Name, Alias, OriginalName, DecimalPlaces, NumberOfDecimals",
-            'StockGroup': "GUID, MASTERID, ALTERID, Name, Alias, Parent, BaseUnits, AdditionalUnits",
-            'StockCategory': "GUID, MASTERID, ALTERID, Name, Alias, Parent",
-            'CostCategory': "GUID, MASTERID, ALTERID, Name, Alias, AllocateRevenue, AllocateNonRevenue",
-            'CostCenter': "GUID, MASTERID, ALTERID, Name, Alias, Parent, Category",
-            'Godown': "GUID, MASTERID, ALTERID, Name, Alias, Parent, Address",
-            'VoucherType': "GUID, MASTERID, ALTERID, Name, Alias, Parent, NumberingMethod, IsDeemedPositive",
-            'TaxUnit': "GUID, MASTERID, ALTERID, Name, Alias, OriginalName",
-            'Ledger': "GUID, MASTERID, ALTERID, Name, OnlyAlias, Parent, PrimaryGroup, IsRevenue, LastParent, Description, Narration, IsBillWiseOn, IsCostCentresOn, OpeningBalance, ClosingBalance, LEDGERPHONE, LEDGERCOUNTRYISDCODE, LEDGERMOBILE, LEDGERCONTACT, WEBSITE, EMAIL, CURRENCYNAME, INCOMETAXNUMBER, LEDMAILINGDETAILS.*, VATAPPLICABLEDATE, VATDEALERTYPE, VATTINNUMBER, LEDGSTREGDETAILS.*",
-            'StockItem': "GUID, MASTERID, ALTERID, Name, Alias, Parent, Category, Description, MailingName, BaseUnits, AdditionalUnits, OpeningBalance, OpeningValue, OpeningRate, ReorderLevel, MinimumLevel, CostingMethod, ValuationMethod, GSTTypeOfSupply, HSNCode, GST, IsBatchWiseOn, IsCostCentresOn",
-        }
+        tally_entity = self.TALLY_TYPES.get(entity_type, entity_type)
         
-        fetch_fields = entity_fields.get(entity_type, "GUID, MASTERID, ALTERID, Name")
+        fetch_fields = self.ENTITY_FIELDS.get(entity_type, "GUID, MASTERID, ALTERID, Name")
         
         # Add company name to STATICVARIABLES if provided
         company_var = ""
@@ -378,18 +529,7 @@ class IncrementalSyncManager:
         #   since company inception. This ensures ClosingBalance is accurate even when 
         #   companies don't maintain opening balances (OB = 0 for all ledgers).
         # - Otherwise, fall back to current Indian financial year dates.
-        now = datetime.now()
-        if books_from:
-            fy_start = books_from
-            # Use today's date as SVTODATE for up-to-date ClosingBalance
-            fy_end = now.strftime('%d-%b-%Y')  # e.g. '14-Feb-2026'
-        else:
-            if now.month >= 4:
-                fy_start = f"01-Apr-{now.year}"
-                fy_end = f"31-Mar-{now.year + 1}"
-            else:
-                fy_start = f"01-Apr-{now.year - 1}"
-                fy_end = f"31-Mar-{now.year}"
+        fy_start, fy_end = self._balance_window(books_from)
 
         return f"""<ENVELOPE>
         <HEADER>
@@ -419,6 +559,48 @@ class IncrementalSyncManager:
     </BODY>
 </ENVELOPE>"""
     
+    @staticmethod
+    def _balance_window(books_from: str = None) -> Tuple[str, str]:
+        """(SVFROMDATE, SVTODATE) for master exports: BooksFrom..today, else the current FY."""
+        now = datetime.now()
+        if books_from:
+            # Use today's date as SVTODATE for up-to-date ClosingBalance
+            return books_from, now.strftime('%d-%b-%Y')  # e.g. '14-Feb-2026'
+        if now.month >= 4:
+            return f"01-Apr-{now.year}", f"31-Mar-{now.year + 1}"
+        return f"01-Apr-{now.year - 1}", f"31-Mar-{now.year}"
+
+    def generate_bundle_tdl(self, watermarks: Dict[str, int], company_name: str = None,
+                            books_from: str = None) -> str:
+        """One-request TDL for several entities, each filtered by its own AlterID watermark."""
+        fy_start, fy_end = self._balance_window(books_from)
+        collections = [(entity_type, self.TALLY_TYPES.get(entity_type, entity_type),
+                        self.ENTITY_FIELDS.get(entity_type, "GUID, MASTERID, ALTERID, Name"), last_alter_id)
+                       for entity_type, last_alter_id in watermarks.items()]
+        return bundle_tdl(collections, company_name, fy_start, fy_end)
+
+    def parse_bundle_response(self, xml_string: str, entity_types: List[str]) -> Optional[Dict[str, List[Dict]]]:
+        """Demultiplex a bundle export into {entity_type: parsed records}; None if unusable."""
+        tags = {self.TALLY_TYPES.get(e, e).upper(): e for e in entity_types}
+        grouped = split_bundle(xml_string, list(tags))
+        if grouped is None:
+            return None
+        parsed = {}
+        for tag, elements in grouped.items():
+            entity_type = tags[tag]
+            records = []
+            for elem in elements:
+                # Skip elements without NAME attribute (container elements)
+                if not elem.get('NAME'):
+                    continue
+                record = self._parse_element(elem, entity_type)
+                if record:
+                    records.append(record)
+            parsed[entity_type] = records
+        logger.info(f"✅ Parsed {sum(len(r) for r in parsed.values())} records for "
+                    f"{len(parsed)} entities from one multi-collection response")
+        return parsed
+
     def fetch_from_tally(self, tdl: str, tally_host: str, tally_port: int) -> Optional[str]:
         """Fetch data from Tally Prime (with shared retry/backoff transport)."""
         text = post_xml_with_retry(tally_host, tally_port, tdl, timeout=30)
@@ -430,17 +612,13 @@ class IncrementalSyncManager:
         """Parse XML response from Tally"""
         try:
             # Clean invalid XML characters
-            xml_string = re.sub(r'&#([0-9]+);', lambda m: '' if int(m.group(1)) < 32 and int(m.group(1)) not in [9, 10, 13] else m.group(0), xml_string)
+            xml_string = sanitize(xml_string)
             
-            root = ET.fromstring(xml_string)
+            root = xml_backend.fromstring(xml_string)
             records = []
             
             # Map entity type to Tally-specific XML element names
-            tally_xml_names = {
-                'CostCenter': 'COSTCENTRE',
-                'CostCategory': 'COSTCATEGORY'
-            }
-            tally_xml_name = tally_xml_names.get(entity_type, entity_type.upper())
+            tally_xml_name = self.TALLY_TYPES.get(entity_type, entity_type).upper()
             
             # Find all entity elements
             for elem in root.iter(tally_xml_name):
@@ -458,236 +636,28 @@ class IncrementalSyncManager:
             logger.error(f"❌ Error parsing XML: {e}")
             return []
     
+    @classmethod
+    def _extractor(cls, entity_type: str) -> FieldExtractor:
+        """FieldExtractor for an entity's RECORD_FIELDS, compiled on first use."""
+        extractor = cls._extractors.get(entity_type)
+        if extractor is None:
+            extractor = FieldExtractor(
+                cls.RECORD_BASE + cls.RECORD_FIELDS.get(entity_type, ()),
+                converters={
+                    'amount': cls._parse_tally_amount,
+                    'applicable': lambda v: (v or '').lower() in ('applicable', 'yes', 'true'),
+                },
+                symbols=cls.RECORD_SYMBOLS)
+            cls._extractors[entity_type] = extractor
+        return extractor
+
     def _parse_element(self, elem, entity_type: str) -> Optional[Dict]:
-        """Parse individual element"""
+        """Parse individual element (one pass over its children, see master_fields)"""
         try:
-            def get_text(tag_name):
-                child = elem.find(tag_name)
-                if child is not None and child.text:
-                    return child.text.strip()
-                return None
-            
-            # Get NAME - try attribute first, then child element
-            name = elem.get('NAME') or get_text('NAME')
-            
-            if not name:
+            record = self._extractor(entity_type).extract(elem, self.symbols.intern)
+            if not record['name']:
                 # Skip elements without name
                 return None
-            
-            alter_id = int(get_text('ALTERID') or 0)
-            
-            record = {
-                'guid': get_text('GUID'),
-                'masterID': get_text('MASTERID'),
-                'alterID': alter_id,
-                'name': name,
-            }
-            
-            if entity_type == 'Ledger':
-                # Extract GST registration details from LEDGSTREGDETAILS.LIST
-                gst_reg = elem.find('.//LEDGSTREGDETAILS.LIST')
-                gst_applicable_text = get_text('GSTAPPLICABLE') or ''
-                gst_applicable = gst_applicable_text.lower() in ('applicable', 'yes', 'true')
-                gst_registration_type = ''
-                gst_gstin = ''
-                gst_place_of_supply = ''
-                gst_details_applicable_from = ''
-                gst_is_common_party = False
-                gst_is_freezone = False
-                gst_is_transporter = False
-                gst_is_other_territory = False
-                gst_consider_purchase_export = False
-                gst_registration_date = ''
-                gst_state = ''
-                gst_transporter_id = ''
-
-                if gst_reg is not None:
-                    def gst_text(tag):
-                        child = gst_reg.find(tag)
-                        if child is not None and child.text:
-                            return child.text.strip()
-                        return ''
-                    gst_registration_type = gst_text('GSTREGISTRATIONTYPE')
-                    gst_gstin = gst_text('GSTIN')
-                    gst_place_of_supply = gst_text('PLACEOFSUPPLY')
-                    gst_details_applicable_from = gst_text('APPLICABLEFROM')
-                    gst_is_common_party = gst_text('ISCOMMONPARTY') == 'Yes'
-                    gst_is_freezone = gst_text('ISFREEZONE') == 'Yes'
-                    gst_is_transporter = gst_text('ISTRANSPORTER') == 'Yes'
-                    gst_is_other_territory = gst_text('ISOTHERTERRITORYASSESSEE') == 'Yes'
-                    gst_consider_purchase_export = gst_text('CONSIDERPURCHASEFOREXPORT') == 'Yes'
-                    gst_registration_date = gst_text('GSTREGISTRATIONDATE')
-                    gst_state = gst_text('STATENAME') or gst_place_of_supply
-                    gst_transporter_id = gst_text('TRANSPORTERID')
-
-                # Extract mailing details
-                mailing = elem.find('.//LEDMAILINGDETAILS.LIST')
-                mailing_name = ''
-                address1 = ''
-                address2 = ''
-                address3 = ''
-                address4 = ''
-                mailing_state = ''
-                mailing_country = ''
-                mailing_pincode = ''
-                mailing_applicable_from = ''
-                if mailing is not None:
-                    def mail_text(tag):
-                        child = mailing.find(tag)
-                        if child is not None and child.text:
-                            return child.text.strip()
-                        return ''
-                    mailing_name = mail_text('MAILINGNAME')
-                    mailing_applicable_from = mail_text('APPLICABLEFROM')
-                    mailing_state = mail_text('STATE')
-                    mailing_country = mail_text('COUNTRY')
-                    mailing_pincode = mail_text('PINCODE')
-                    # Address lines are in ADDRESS.LIST
-                    addr_list = mailing.find('ADDRESS.LIST')
-                    if addr_list is not None:
-                        addrs = [a.text.strip() for a in addr_list.findall('ADDRESS') if a.text]
-                        address1 = addrs[0] if len(addrs) > 0 else ''
-                        address2 = addrs[1] if len(addrs) > 1 else ''
-                        address3 = addrs[2] if len(addrs) > 2 else ''
-                        address4 = addrs[3] if len(addrs) > 3 else ''
-
-                record.update({
-                    'alias': get_text('ONLYALIAS') or get_text('ALIAS'),
-                    'parent': get_text('PARENT'),
-                    'primaryGroup': get_text('PRIMARYGROUP'),
-                    'lastParent': get_text('LASTPARENT'),
-                    'isRevenue': get_text('ISREVENUE') == 'Yes',
-                    'description': get_text('DESCRIPTION'),
-                    'narration': get_text('NARRATION'),
-                    'isBillWiseOn': get_text('ISBILLWISEON') == 'Yes',
-                    'isCostCentresOn': get_text('ISCOSTCENTRESON') == 'Yes',
-                    'openingBalance': self._parse_tally_amount(get_text('OPENINGBALANCE')),
-                    'closingBalance': self._parse_tally_amount(get_text('CLOSINGBALANCE')),
-                    'phone': get_text('LEDGERPHONE'),
-                    'countryIsdCode': get_text('LEDGERCOUNTRYISDCODE'),
-                    'mobile': get_text('LEDGERMOBILE'),
-                    'contact': get_text('LEDGERCONTACT'),
-                    'email': get_text('EMAIL'),
-                    'website': get_text('WEBSITE'),
-                    'currencyName': get_text('CURRENCYNAME'),
-                    'incometaxNumber': get_text('INCOMETAXNUMBER'),
-                    'vatTINNumber': get_text('VATTINNUMBER'),
-                    'vatDealerType': get_text('VATDEALERTYPE'),
-                    'gstApplicable': gst_applicable,
-                    'gstRegistrationType': gst_registration_type,
-                    'gstGstin': gst_gstin,
-                    'gstPlaceOfSupply': gst_place_of_supply,
-                    'gstDetailsApplicableFrom': gst_details_applicable_from,
-                    'gstIsCommonParty': gst_is_common_party,
-                    'gstIsFreezone': gst_is_freezone,
-                    'gstIsTransporter': gst_is_transporter,
-                    'gstIsOtherTerritoryAssessee': gst_is_other_territory,
-                    'gstConsiderPurchaseForExport': gst_consider_purchase_export,
-                    'gstRegistrationDate': gst_registration_date,
-                    'gstState': gst_state,
-                    'gstTransporterId': gst_transporter_id,
-                    # Mailing details
-                    'mailingName': mailing_name,
-                    'address1': address1,
-                    'address2': address2,
-                    'address3': address3,
-                    'address4': address4,
-                    'mailingState': mailing_state,
-                    'mailingCountry': mailing_country,
-                    'mailingPincode': mailing_pincode,
-                    'mailingApplicableFrom': mailing_applicable_from,
-                })
-            elif entity_type == 'VoucherType':
-                # Extract numbering method - try direct path first, then nested
-                numbering_method = get_text('NUMBERINGMETHOD')
-                if not numbering_method:
-                    vch_series = elem.find('.//VOUCHERNUMBERSERIES.LIST/NUMBERINGMETHOD')
-                    if vch_series is not None:
-                        numbering_method = vch_series.text
-                
-                record.update({
-                    'alias': get_text('MAILINGNAME'),
-                    'parent': get_text('PARENT'),
-                    'isActive': get_text('ISACTIVE') == 'Yes',
-                    'isDeemedPositive': get_text('ISDEEMEDPOSITIVE') == 'Yes',
-                    'numberingMethod': numbering_method,
-                    'reservedName': elem.get('RESERVEDNAME', ''),
-                })
-            elif entity_type == 'Unit':
-                record.update({
-                    'originalName': get_text('ORIGINALNAME'),
-                    'decimalPlaces': int(get_text('NUMBEROFDECIMALS') or 0),
-                    'simpleUnit': get_text('ISSIMPLEUNIT') == 'Yes',
-                    'reservedName': elem.get('RESERVEDNAME', ''),
-                })
-            elif entity_type == 'Godown':
-                record.update({
-                    'parent': get_text('PARENT'),
-                    'address': get_text('ADDRESS'),
-                    'reservedName': elem.get('RESERVEDNAME', ''),
-                })
-            elif entity_type == 'TaxUnit':
-                record.update({
-                    'originalName': get_text('ORIGINALNAME'),
-                    'reservedName': elem.get('RESERVEDNAME', ''),
-                })
-            elif entity_type == 'Currency':
-                record.update({
-                    'symbol': get_text('SYMBOL') or get_text('EXPANDEDSYMBOL') or get_text('ORIGINALSYMBOL'),
-                    'formalName': get_text('FORMALNAME'),
-                    'decimalPlaces': int(get_text('DECIMALPLACES') or 0),
-                    'decimalSeparator': get_text('DECIMALSYMBOL') or get_text('DECIMALSEPARATOR'),
-                    'showAmountInWords': get_text('SHOWAMOUNTINWORDS'),
-                    'suffixSymbol': get_text('SUFFIXSYMBOL'),
-                    'spaceBetweenAmountAndSymbol': get_text('SPACEBETWEENAMOUNTANDSYMBOL'),
-                })
-            elif entity_type == 'StockGroup':
-                record.update({
-                    'parent': get_text('PARENT'),
-                    'reservedName': elem.get('RESERVEDNAME', ''),
-                })
-            elif entity_type == 'StockCategory':
-                record.update({
-                    'parent': get_text('PARENT'),
-                    'reservedName': elem.get('RESERVEDNAME', ''),
-                })
-            elif entity_type == 'CostCategory':
-                record.update({
-                    'reservedName': elem.get('RESERVEDNAME', ''),
-                })
-            elif entity_type == 'CostCenter':
-                record.update({
-                    'parent': get_text('PARENT'),
-                    'category': get_text('CATEGORY'),
-                })
-            elif entity_type == 'Group':
-                record.update({
-                    'alias': get_text('ALIAS'),
-                    'parent': get_text('PARENT'),
-                    'nature': get_text('NATURE'),
-                    'isRevenue': get_text('ISREVENUE') == 'Yes',
-                    'reservedName': get_text('RESERVEDNAME'),
-                })
-            elif entity_type == 'StockItem':
-                record.update({
-                    'parent': get_text('PARENT'),
-                    'category': get_text('CATEGORY'),
-                    'description': get_text('DESCRIPTION'),
-                    'mailingName': get_text('MAILINGNAME'),
-                    'baseUnits': get_text('BASEUNITS'),
-                    'additionalUnits': get_text('ADDITIONALUNITS'),
-                    'costingMethod': get_text('COSTINGMETHOD'),
-                    'valuationMethod': get_text('VALUATIONMETHOD'),
-                    'gstTypeOfSupply': get_text('GSTTYPEOFSUPPLY'),
-                    'hsnCode': get_text('HSNCODE'),
-                    'openingBalance': self._parse_tally_amount(get_text('OPENINGBALANCE')),
-                    'openingValue': self._parse_tally_amount(get_text('OPENINGVALUE')),
-                    'openingRate': self._parse_tally_amount(get_text('OPENINGRATE')),
-                    'batchWiseOn': get_text('ISBATCHWISEON') == 'Yes',
-                    'costCentersOn': get_text('ISCOSTCENTRESON') == 'Yes',
-                    'reservedName': elem.get('RESERVEDNAME', ''),
-                })
-            
             return record
         except Exception as e:
             logger.warning(f"⚠️ Error parsing element: {e}")
@@ -958,7 +928,16 @@ class IncrementalSyncManager:
     
     def save_batch_to_database(self, records: List[Dict], company_id: int, endpoint: str) -> Tuple[bool, int]:
         """Save batch of records to database. Sets self._last_batch_error on failure."""
-        self._last_batch_error = None
+        result = self._post_batch(records, endpoint)
+        self._last_batch_error = result['error']
+        return result['success'], result['saved']
+
+    def _post_batch(self, records: List[Dict], endpoint: str, retry: bool = True) -> Dict:
+        """POST one batch to {endpoint}/sync; returns {success, saved, status, bytes, error}.
+
+        Stateless (no _last_batch_error) so BatchUploader can run several at once;
+        BatchUploader passes retry=False and does its own backoff.
+        """
         try:
             url = f"{self.backend_url}{endpoint}/sync"
             
@@ -969,7 +948,8 @@ class IncrementalSyncManager:
             sample_size = min(len(records), 2)
             logger.info(f"📤 Sending batch of {len(records)} records to {endpoint}. Sample: {json.dumps(records[:sample_size], indent=2)}")
             
-            response = requests.post(url, json=records, headers=self.headers, timeout=30)
+            response, _, wire_bytes = post_json(url, records, self.headers, timeout=30,
+                                                label=f"{endpoint}/sync", retry=retry)
             
             if response.status_code in [200, 201]:
                 result = response.json()
@@ -977,7 +957,8 @@ class IncrementalSyncManager:
                 count = result.get('totalProcessed', result.get('count', len(records)))
                 if VERBOSE_MODE:
                     logger.debug(f"Saved {count} records")
-                return True, count
+                return {'success': True, 'saved': count, 'status': response.status_code,
+                        'bytes': wire_bytes, 'error': None}
             else:
                 # Capture full error detail for upstream reporting
                 error_body = ''
@@ -986,24 +967,37 @@ class IncrementalSyncManager:
                 except Exception:
                     error_body = 'Could not read response body'
                 
-                self._last_batch_error = f"HTTP {response.status_code}: {error_body}"
                 logger.error(f"❌ Database error: HTTP {response.status_code}")
                 logger.error(f"   URL: {url}")
                 logger.error(f"   Response: {error_body}")
-                return False, 0
+                return {'success': False, 'saved': 0, 'status': response.status_code,
+                        'bytes': wire_bytes, 'error': f"HTTP {response.status_code}: {error_body}"}
         except requests.exceptions.Timeout:
-            self._last_batch_error = f"Request timeout (30s) posting to {endpoint}/sync"
             logger.error(f"❌ Timeout saving batch to {endpoint}")
-            return False, 0
+            return {'success': False, 'saved': 0, 'status': None, 'bytes': 0,
+                    'error': f"Request timeout (30s) posting to {endpoint}/sync"}
         except requests.exceptions.ConnectionError as e:
-            self._last_batch_error = f"Connection error: {str(e)[:200]}"
             logger.error(f"❌ Connection error saving batch: {e}")
-            return False, 0
+            return {'success': False, 'saved': 0, 'status': None, 'bytes': 0,
+                    'error': f"Connection error: {str(e)[:200]}"}
         except Exception as e:
-            self._last_batch_error = f"Exception: {str(e)[:200]}"
             logger.error(f"Error saving batch: {e}")
-            return False, 0
-    
+            return {'success': False, 'saved': 0, 'status': None, 'bytes': 0,
+                    'error': f"Exception: {str(e)[:200]}"}
+
+    def save_batches_to_database(self, records: List[Dict], company_id: int, endpoint: str) -> Dict:
+        """Split records into BATCH_SIZE batches and upload them concurrently.
+
+        Returns the BatchUploader report; `results` holds each batch's outcome in
+        order and `allSucceeded` tells callers whether the watermark may advance.
+        Keeps no state on the manager, so sync_scheduler can run several entities
+        through one manager at once.
+        """
+        batches = [records[i:i + self.BATCH_SIZE] for i in range(0, len(records), self.BATCH_SIZE)]
+        uploader = BatchUploader(lambda batch: self._post_batch(batch, endpoint, retry=False),
+                                 max_in_flight=self.UPLOAD_WINDOW, name=endpoint.strip('/') or 'sync')
+        return uploader.upload(batches)
+
     def reconcile_records(self, company_id: int, entity_type: str, endpoint: str) -> Dict:
         """Reconcile records between Tally and database"""
         try:
@@ -1114,28 +1108,21 @@ class IncrementalSyncManager:
         # Save in batches with delay
         if VERBOSE_MODE:
             logger.info(f"💾 Saving {len(prepared_records)} {entity_type} records...")
-        total_saved = 0
+        report = self.save_batches_to_database(prepared_records, company_id, endpoint)
+        total_saved = report['saved']
         
-        for i in range(0, len(prepared_records), self.BATCH_SIZE):
-            batch = prepared_records[i:i + self.BATCH_SIZE]
-            success, count = self.save_batch_to_database(batch, company_id, endpoint)
-            
-            if not success:
-                error_detail = getattr(self, '_last_batch_error', '') or 'Unknown error'
-                logger.error(f"❌ Failed to save batch {i // self.BATCH_SIZE + 1}: {error_detail}")
+        for batch_num, batch_result in enumerate(report['results'], 1):
+            if not batch_result['success']:
+                error_detail = batch_result['error'] or 'Unknown error'
+                logger.error(f"❌ Failed to save batch {batch_num}: {error_detail}")
                 return {'success': False, 'message': f'Failed to save batch: {error_detail}', 'count': total_saved}
-            
-            total_saved += count
-            
-            # Delay between batches
-            if i + self.BATCH_SIZE < len(prepared_records):
-                time.sleep(self.BATCH_DELAY)
         
         # Get max AlterID
         max_alter_id = max([r['alterID'] for r in records])
         
         # Save last AlterID
         self.save_last_alter_id(company_id, max_alter_id, entity_type)
+        self._snapshot_upsert(company_id, entity_type, records)
         
         # Run reconciliation on first sync
         if is_first_sync:
@@ -1180,6 +1167,48 @@ class IncrementalSyncManager:
             'tallyRecords': tally_records_cache
         }
 
+    # ─── Local Snapshot ──────────────────────────────────────────────
+
+    @staticmethod
+    def _snapshot_rows(records: List[Dict]) -> List[Dict]:
+        return [dict(r, contentHash=content_hash(r)) for r in records]
+
+    def _snapshot_upsert(self, company_id: int, entity_type: str, records: List[Dict]):
+        """Record records the backend just accepted in the local snapshot (best effort)."""
+        store = get_snapshot_store()
+        if store is None or not records:
+            return
+        try:
+            store.upsert(company_id, entity_type, self._snapshot_rows(records))
+        except Exception as e:
+            logger.debug(f"Snapshot upsert failed for {entity_type}: {e}")
+
+    def _snapshot_if_verified(self, company_id: int, entity_type: str) -> Optional[Dict[str, Dict]]:
+        """The stored snapshot when a deep reconcile verified it recently, else None."""
+        store = get_snapshot_store()
+        if store is None:
+            return None
+        try:
+            state = store.verified_periods(company_id, entity_type).get(ALL_PERIODS)
+            if state is None or time.time() - state[2] > VERIFY_MAX_AGE_SECONDS:
+                return None
+            return store.load(company_id, entity_type)
+        except Exception as e:
+            logger.debug(f"Snapshot read failed for {entity_type}: {e}")
+            return None
+
+    def _snapshot_replace_verified(self, company_id: int, entity_type: str, records: List[Dict]):
+        """After a clean deep reconcile the DB equals Tally: store it and mark it verified."""
+        store = get_snapshot_store()
+        if store is None:
+            return
+        try:
+            rows = self._snapshot_rows(records)
+            store.replace(company_id, entity_type, rows)
+            store.mark_verified(company_id, entity_type, checksum_records(rows) or {ALL_PERIODS: (0, '')})
+        except Exception as e:
+            logger.debug(f"Snapshot replace failed for {entity_type}: {e}")
+
     # ─── DB Fetch for Reconciliation ─────────────────────────────────
 
     def _fetch_db_records(self, company_id: int, entity_type: str) -> List[Dict]:
@@ -1254,6 +1283,12 @@ class IncrementalSyncManager:
             return {'success': False, 'message': f'Failed to fetch {entity_type} from Tally', 'count': 0}
 
         changed = self.parse_xml_response(xml_response, entity_type)
+        return self._apply_fast_changes(company_id, user_id, entity_type, changed, last_alter_id)
+
+    def _apply_fast_changes(self, company_id: int, user_id: int, entity_type: str,
+                            changed: List[Dict], last_alter_id: int) -> Dict:
+        """Upsert the records Tally reported as changed and advance the entity's watermark."""
+        endpoint = endpoint_for(entity_type)
         # Defensive: the filter is server-side, but re-check in case of TDL quirks.
         changed = [r for r in changed if r.get('alterID', 0) > last_alter_id]
         logger.info(f"   ⚡ {len(changed)} changed {entity_type} record(s) since AlterID {last_alter_id}")
@@ -1262,18 +1297,15 @@ class IncrementalSyncManager:
         new_max_alter = last_alter_id
         if changed:
             prepared = self.prepare_for_database(changed, company_id, user_id, entity_type)
-            for i in range(0, len(prepared), self.BATCH_SIZE):
-                batch = prepared[i:i + self.BATCH_SIZE]
-                success, count = self.save_batch_to_database(batch, company_id, endpoint)
-                if success:
-                    total_saved += count
-                else:
-                    error_detail = getattr(self, '_last_batch_error', '') or 'Unknown error'
-                    logger.error(f"❌ Batch failed during fast sync: {error_detail}")
-                if i + self.BATCH_SIZE < len(prepared):
-                    time.sleep(self.BATCH_DELAY)
+            report = self.save_batches_to_database(prepared, company_id, endpoint)
+            total_saved = report['saved']
+            for batch_result in report['results']:
+                if not batch_result['success']:
+                    logger.error(f"❌ Batch failed during fast sync: {batch_result['error'] or 'Unknown error'}")
             new_max_alter = max(r.get('alterID', 0) for r in changed)
             self.save_last_alter_id(company_id, new_max_alter, entity_type)
+            if report['allSucceeded']:
+                self._snapshot_upsert(company_id, entity_type, changed)
 
         return {
             'success': True,
@@ -1284,6 +1316,55 @@ class IncrementalSyncManager:
             'reconciliation': None,  # not performed in fast mode
         }
 
+    def sync_incremental_fast_all(self, company_id: int, user_id: int, tally_host: str, tally_port: int,
+                                  entity_types: List[str], company_name: str = None,
+                                  books_from: str = None) -> Optional[Dict[str, Dict]]:
+        """sync_incremental_fast for several entities with ONE Tally export.
+
+        Watermarks come from a single master-mapping call; every entity keeps its
+        own `$Alterid > lastAlterID` filter inside the bundle. Entities are then
+        upserted one by one, in the given (dependency) order.
+
+        Returns {entity_type: result}, or None when the bundle could not be used
+        (Tally rejected or garbled it) — the caller then syncs entity by entity.
+        """
+        logger.info(f"⚡ Fast incremental (one request): {len(entity_types)} entities for company "
+                    f"{company_id} ({company_name or 'N/A'})")
+
+        if company_name:
+            is_loaded, matched_company_name, loaded_companies = self.verify_tally_company(tally_host, tally_port, company_name)
+            if is_loaded and matched_company_name:
+                company_name = matched_company_name
+            if not is_loaded:
+                error_msg = (f"Company '{company_name}' is not loaded in Tally. "
+                             f"Loaded: {loaded_companies}. Aborting to prevent data mismatch.")
+                logger.error(error_msg)
+                return {e: {'success': False, 'message': error_msg, 'count': 0} for e in entity_types}
+
+        masters = self.get_master_mapping(company_id) or {}
+        watermarks = {e: int(masters.get(self.MAPPING_KEYS.get(e, e.lower()), 0) or 0) for e in entity_types}
+
+        tdl = self.generate_bundle_tdl(watermarks, company_name, books_from)
+        xml_response = self.fetch_from_tally(tdl, tally_host, tally_port)
+        if not xml_response:
+            message = 'Failed to fetch masters from Tally'
+            return {e: {'success': False, 'message': message, 'count': 0} for e in entity_types}
+
+        parsed = self.parse_bundle_response(xml_response, entity_types)
+        if parsed is None:
+            mark_unsupported(tally_host, tally_port)
+            return None
+
+        results = {}
+        for entity_type in entity_types:
+            try:
+                results[entity_type] = self._apply_fast_changes(
+                    company_id, user_id, entity_type, parsed.get(entity_type, []), watermarks[entity_type])
+            except Exception as e:
+                logger.error(f"❌ {entity_type} sync failed: {e}")
+                results[entity_type] = {'success': False, 'message': str(e), 'count': 0}
+        return results
+
     def sync_and_reconcile(self, company_id: int, user_id: int, tally_host: str, tally_port: int,
                            entity_type: str = 'Ledger', company_name: str = None,
                            books_from: str = None) -> Dict:
@@ -1342,30 +1423,36 @@ class IncrementalSyncManager:
         new_records = [r for r in all_records if r.get('alterID', 0) > last_alter_id]
         total_saved = 0
         new_max_alter = last_alter_id
+        all_saved = True
 
         if new_records:
             logger.info(f"   🔄 {len(new_records)} new/updated records (AlterID > {last_alter_id})")
             prepared = self.prepare_for_database(new_records, company_id, user_id, entity_type)
-            for i in range(0, len(prepared), self.BATCH_SIZE):
-                batch = prepared[i:i + self.BATCH_SIZE]
-                success, count = self.save_batch_to_database(batch, company_id, endpoint)
-                if success:
-                    total_saved += count
-                else:
-                    error_detail = getattr(self, '_last_batch_error', '') or 'Unknown error'
-                    logger.error(f"❌ Batch failed during sync: {error_detail}")
-                if i + self.BATCH_SIZE < len(prepared):
-                    time.sleep(self.BATCH_DELAY)
+            report = self.save_batches_to_database(prepared, company_id, endpoint)
+            total_saved = report['saved']
+            for batch_result in report['results']:
+                if not batch_result['success']:
+                    logger.error(f"❌ Batch failed during sync: {batch_result['error'] or 'Unknown error'}")
+            all_saved = report['allSucceeded']
             new_max_alter = max(r['alterID'] for r in new_records)
             self.save_last_alter_id(company_id, new_max_alter, entity_type)
+            if all_saved:
+                self._snapshot_upsert(company_id, entity_type, new_records)
             logger.info(f"   ✅ Synced {total_saved} new records | AlterID: {new_max_alter}")
         else:
             logger.info(f"   ✅ No new records (AlterID > {last_alter_id})")
 
-        # 5. Reconcile: compare ALL Tally records with DB
-        db_records = self._fetch_db_records(company_id, entity_type)
-        db_count = len(db_records)
-        logger.info(f"   📊 DB: {db_count} records")
+        # 5. Reconcile: compare ALL Tally records with DB — or with the local snapshot
+        #    when a recent deep cycle verified it (skips the full backend download).
+        snapshot = self._snapshot_if_verified(company_id, entity_type)
+        if snapshot is not None:
+            db_records = list(snapshot.values())
+            db_count = len(db_records)
+            logger.info(f"   📸 Snapshot: {db_count} records (verified — DB download skipped)")
+        else:
+            db_records = self._fetch_db_records(company_id, entity_type)
+            db_count = len(db_records)
+            logger.info(f"   📊 DB: {db_count} records")
 
         # Build lookups by masterID_guid
         tally_lookup = {}
@@ -1405,13 +1492,9 @@ class IncrementalSyncManager:
         if all_to_sync:
             logger.info(f"   🔧 Reconciliation: {len(missing_records)} missing, {len(stale_records)} stale → auto-syncing")
             prepared = self.prepare_for_database(all_to_sync, company_id, user_id, entity_type)
-            for i in range(0, len(prepared), self.BATCH_SIZE):
-                batch = prepared[i:i + self.BATCH_SIZE]
-                success, count = self.save_batch_to_database(batch, company_id, endpoint)
-                if success:
-                    recon_synced += count
-                if i + self.BATCH_SIZE < len(prepared):
-                    time.sleep(self.BATCH_DELAY)
+            recon_report = self.save_batches_to_database(prepared, company_id, endpoint)
+            recon_synced = recon_report['saved']
+            all_saved = all_saved and recon_report['allSucceeded']
             logger.info(f"   ✅ Auto-synced {recon_synced} reconciliation records")
         else:
             logger.info(f"   ✅ Reconciliation: all records in sync")
@@ -1431,6 +1514,11 @@ class IncrementalSyncManager:
             logger.info(f"   🗑️ {len(orphan_guids)} {entity_type}(s) deleted in Tally → soft-deleting in DB")
             recon_deleted = self.soft_delete_orphans(company_id, entity_type, orphan_guids)
 
+        # Every upsert landed → the DB now mirrors this Tally fetch; snapshot it so the
+        # next deep cycle can diff locally instead of downloading the DB list.
+        if all_saved:
+            self._snapshot_replace_verified(company_id, entity_type, all_records)
+
         # Write to structured logs
         try:
             sync_logger = get_sync_logger()
@@ -1470,7 +1558,8 @@ class IncrementalSyncManager:
                 'missing': len(missing_records),
                 'updated': len(stale_records),
                 'synced': recon_synced,
-                'deleted': recon_deleted
+                'deleted': recon_deleted,
+                'fromSnapshot': snapshot is not None
             }
         }
 
@@ -0,0 +1,115 @@
+"""One Tally export request for several master collections.
+
+Syncing the 12 master types as 12 `Collection of X` requests costs 12 round
+trips and 12 report compilations in Tally's single-threaded HTTP server, every
+fast-sync cycle. `bundle_tdl` declares every collection in one envelope — each
+keeps its own TYPE, FETCH list and optional `$Alterid > N` filter — and exports
+their union (a collection whose `<COLLECTION>` lists the members). Tally writes
+each object under its own type tag, so `split_bundle` parses the response once
+and hands back the elements per tag for the caller's existing per-entity
+`_parse_element` / `prepare_for_database` path.
+
+A Tally build that rejects the union answers with a LINEERROR; `split_bundle`
+then returns None, the endpoint is remembered as unsupported for the rest of
+the process and callers fall back to one request per entity. Set
+SYNC_MASTER_BUNDLE=false to always use per-entity requests.
+"""
+
+import logging
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from xml_sanitizer import sanitize
+import xml_backend
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_ENABLED = os.getenv('SYNC_MASTER_BUNDLE', 'true').lower() == 'true'
+BUNDLE_ID = 'Tallify Master Bundle'
+
+_unsupported = set()  # (host, port) that answered a bundle with an error
+
+
+def bundle_supported(tally_host: str, tally_port: int) -> bool:
+    return BUNDLE_ENABLED and (tally_host, int(tally_port)) not in _unsupported
+
+
+def mark_unsupported(tally_host: str, tally_port: int):
+    _unsupported.add((tally_host, int(tally_port)))
+    logger.warning(f"⚠️ Tally at {tally_host}:{tally_port} rejected the multi-collection export; "
+                   f"using one request per master type")
+
+
+def bundle_tdl(collections: Sequence[Tuple[str, str, str, Optional[int]]], company_name: str = None,
+               from_date: str = None, to_date: str = None) -> str:
+    """Export envelope for several master collections in one request.
+
+    collections: (key, tally_type, fetch_fields, min_alter_id) per member, in
+    export order. min_alter_id None exports the whole collection; N keeps only
+    objects with `$Alterid > N`. Without from_date/to_date Tally's current
+    period applies, as in a plain `Collection of X` request.
+    """
+    members, definitions, formulae = [], [], []
+    for key, tally_type, fetch_fields, min_alter_id in collections:
+        name = f"Tallify {key}"
+        members.append(name)
+        filters = ''
+        if min_alter_id is not None:
+            formula = f"Tallify{key}AlterFilter"
+            filters = f"<FILTERS>{formula}</FILTERS>"
+            formulae.append(f'<SYSTEM TYPE="FORMULAE" NAME="{formula}"> $Alterid > {int(min_alter_id)} </SYSTEM>')
+        definitions.append(f'<COLLECTION NAME="{name}" ISMODIFY="No"><TYPE>{tally_type}</TYPE>'
+                           f'<FETCH>{fetch_fields}</FETCH>{filters}</COLLECTION>')
+
+    company_var = ''
+    if company_name:
+        escaped_company = escape(company_name)
+        company_var = f"<SVCOMPANY>{escaped_company}</SVCOMPANY><SVCURRENTCOMPANY>{escaped_company}</SVCURRENTCOMPANY>"
+    period = ''
+    if from_date and to_date:
+        period = (f'<SVFROMDATE TYPE="Date">{from_date}</SVFROMDATE>'
+                  f'<SVTODATE TYPE="Date">{to_date}</SVTODATE>')
+    body = '\n'.join(definitions + formulae)
+    return f"""<ENVELOPE>
+    <HEADER><VERSION>1</VERSION><TALLYREQUEST>Export</TALLYREQUEST><TYPE>Collection</TYPE><ID>{BUNDLE_ID}</ID></HEADER>
+    <BODY>
+        <DESC>
+            <STATICVARIABLES>{period}
+                <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>{company_var}
+            </STATICVARIABLES>
+            <TDL>
+                <TDLMESSAGE>
+<COLLECTION NAME="{BUNDLE_ID}" ISMODIFY="No"><COLLECTION>{', '.join(members)}</COLLECTION></COLLECTION>
+{body}
+                </TDLMESSAGE>
+            </TDL>
+        </DESC>
+    </BODY>
+</ENVELOPE>"""
+
+
+def split_bundle(xml_string: str, tags: Sequence[str]) -> Optional[Dict[str, List[ET.Element]]]:
+    """Parse a bundle response once and group its elements by tag.
+
+    Returns {tag: [elements]} for every requested tag (empty lists included),
+    or None when the response is not usable (parse error or a Tally LINEERROR).
+    """
+    try:
+        root = xml_backend.fromstring(sanitize(xml_string))
+    except xml_backend.PARSE_ERRORS as e:
+        logger.error(f"❌ Could not parse multi-collection response: {e}")
+        return None
+
+    error = root.find('.//LINEERROR')
+    if error is not None:
+        logger.error(f"❌ Tally rejected the multi-collection export: {(error.text or '').strip()}")
+        return None
+
+    grouped = {tag: [] for tag in tags}
+    for elem in root.iter():
+        bucket = grouped.get(elem.tag)
+        if bucket is not None:
+            bucket.append(elem)
+    return grouped
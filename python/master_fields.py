@@ -0,0 +1,131 @@
+"""Table-driven field extraction for Tally master elements.
+
+IncrementalSyncManager._parse_element used to call `elem.find(tag)` once per
+field — each call scans the element's children from the start, and a tag the
+element does not carry costs a scan of all of them — and located the ledger
+GST / mailing lists with `.//` searches over the whole subtree (tags with a
+'.' always go through the pure-Python ElementPath). A ledger has ~45 fields.
+
+`FieldExtractor` is compiled once per entity type from a field table:
+
+    (record_key, source, kind)
+
+source
+    'TAG'           text of the first direct child <TAG>
+    'LIST/TAG'      text of <TAG> inside the first direct child <LIST>
+    'LIST/TAG[n]'   n-th non-empty <TAG> text inside <LIST> (address lines)
+    '@ATTR'         attribute of the element itself ('' when absent)
+    a tuple         fallbacks, `a or b or c` — the first non-empty value,
+                    else the last one
+kind
+    None            the stripped text, None when the child is missing/empty
+    'str'           the same with '' instead of None
+    'yes'           text == 'Yes'
+    'int'           int(text or 0)
+    any other name  a converter passed to the constructor (e.g. 'amount')
+
+`extract(elem)` walks the element's children once (and each referenced nested
+list once) and dispatches them by tag into a dict keyed by source, keeping
+the first child per tag — the one `find` would have returned — then fills the
+record in table order with dict lookups. The record keys listed as `symbols`
+(parent groups, units, states — values shared by many masters) are passed
+through `extract(elem, intern)`, e.g. a symbol_table.SymbolTable's intern.
+"""
+
+import re
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+_LINE = re.compile(r'^(.*)\[(\d+)\]$')
+
+# How a wanted child is collected: its text under its source path, or every
+# non-empty text (address lines) as '<path>[n]'. A nested list maps to a dict
+# {tag: (path, mode)} of its own.
+_TEXT = 'text'
+_LINES = 'lines'
+
+_KINDS = {
+    'str': lambda v: v or '',
+    'yes': lambda v: v == 'Yes',
+    'int': lambda v: int(v or 0),
+}
+
+
+class FieldExtractor:
+    """Extract a flat record from a master element according to a field table."""
+
+    def __init__(self, fields: Sequence[Tuple[str, object, Optional[str]]],
+                 converters: Dict[str, Callable] = None, symbols: Sequence[str] = ()):
+        kinds = dict(_KINDS, **(converters or {}))
+        self.tree = {}  # {tag: (path, _TEXT | _LINES | {tag: ...})}
+        self.attrs = []
+        self.fields = []
+        for key, source, kind in fields:
+            sources = source if isinstance(source, tuple) else (source,)
+            for item in sources:
+                self._compile_source(item)
+            self.fields.append((key, sources, kinds[kind] if kind else None))
+        keys = {key for key, _, _ in self.fields}
+        self.symbols = tuple(key for key in symbols if key in keys)
+
+    def _compile_source(self, source: str):
+        if source.startswith('@'):
+            if source[1:] not in self.attrs:
+                self.attrs.append(source[1:])
+            return
+        *parents, leaf = source.split('/')
+        node, path = self.tree, ''
+        for tag in parents:
+            path += tag
+            node = self._want(node, tag, path, {})
+            path += '/'
+        line = _LINE.match(leaf)
+        if line:
+            self._want(node, line.group(1), path + line.group(1), _LINES)
+        else:
+            self._want(node, leaf, path + leaf, _TEXT)
+
+    @staticmethod
+    def _want(node: Dict, tag: str, path: str, mode):
+        current = node.setdefault(tag, (path, mode))[1]
+        if type(current) is not type(mode) or (isinstance(mode, str) and current != mode):
+            raise ValueError(f"<{tag}> is read in two different ways")
+        return current
+
+    @classmethod
+    def _collect(cls, elem, tree: Dict, found: Dict):
+        """Fill `found` {source: text} from one pass over the children."""
+        for child in elem:
+            wanted = tree.get(child.tag)
+            if wanted is None:
+                continue
+            path, mode = wanted
+            if mode is _TEXT:
+                if path not in found:
+                    text = child.text
+                    found[path] = text.strip() if text else None
+            elif mode is _LINES:
+                if child.text:
+                    n = found.get(path, 0)
+                    found[f'{path}[{n}]'] = child.text.strip()
+                    found[path] = n + 1
+            elif path not in found:
+                found[path] = True
+                cls._collect(child, mode, found)
+
+    def extract(self, elem, intern: Callable = None) -> Dict:
+        found = {}
+        self._collect(elem, self.tree, found)
+        for attr in self.attrs:
+            found['@' + attr] = elem.get(attr, '')
+        get = found.get
+        record = {}
+        for key, sources, convert in self.fields:
+            for source in sources:
+                value = get(source)
+                if value:
+                    break
+            record[key] = convert(value) if convert else value
+        if intern is not None:
+            for key in self.symbols:
+                record[key] = intern(record[key])
+        return record
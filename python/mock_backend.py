@@ -0,0 +1,387 @@
+"""In-memory stand-in for the Tallify backend, for end-to-end benchmarks.
+
+Accepts every route the sync worker calls — the master and voucher `/sync`
+endpoints (gzip / zstd bodies included), the NDJSON voucher stream
+(`/vouchers/sync/stream`, see stream_uploader), bills-outstanding and report sync,
+master-mapping / last-alter-id watermarks, soft-delete-orphans, sync-status —
+and serves back what it stored: `/{collection}/company/{id}` lists and the
+voucher bucket/identity routes used by merkle_reconcile. Records are upserted
+by GUID per collection; the mock models a single company.
+
+    python mock_backend.py [--port 8080] [--latency-ms 0] [--reject-compression]
+                           [--reject-symbols] [--no-stream] [--stream-cut N]
+
+Dictionary-encoded bodies (X-Payload-Encoding: symbols, see symbol_table) are
+decoded before routing; --reject-symbols answers them with 415 instead.
+
+--no-stream answers 404 on the stream routes (the batch-POST fallback);
+--stream-cut N drops the connection after N lines of each stream's first
+request, after committing them (the resume path).
+
+The first stdout line is {"port": N} once the server is listening.
+GET /_mock/stats returns request, byte and record counters per route.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import serializer
+from merkle_reconcile import bucket_hashes, tally_identities
+from symbol_table import decode_records
+
+try:
+    import zstandard as _zstd
+except ImportError:  # optional dependency
+    _zstd = None
+
+logger = logging.getLogger(__name__)
+
+# Backend collection → master-mapping key (see IncrementalSyncManager.get_last_alter_id).
+MAPPING_KEYS = {
+    'groups': 'group', 'currencies': 'currency', 'units': 'units', 'stock-groups': 'stockgroup',
+    'stock-categories': 'stockcategory', 'cost-categories': 'costcategory', 'cost-centers': 'costcenter',
+    'godowns': 'godown', 'voucher-types': 'vouchertype', 'tax-units': 'taxunit', 'ledgers': 'ledger',
+    'stock-items': 'stockitem', 'vouchers': 'voucher',
+}
+_ENTITY_COLLECTIONS = {key: collection for collection, key in MAPPING_KEYS.items()}
+_ENTITY_COLLECTIONS['unit'] = 'units'
+_VOUCHER_HEADER_SKIP = ('ledgerEntries', 'inventoryEntries')
+
+_COMPANY_ROUTE = re.compile(r'^/([a-z-]+)/company/(\d+)(?:/([a-z-]+))?$')
+_STREAM_ROUTE = '/vouchers/sync/stream'
+_STREAM_COMMIT = 500  # lines upserted per store transaction
+
+
+def _alter_of(record: dict) -> int:
+    try:
+        return int(record.get('alterId') or record.get('alterID') or record.get('alter_id') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class BackendStore:
+    """GUID-keyed records per collection plus explicit AlterID watermarks."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.collections = {}
+        self.watermarks = {}
+        self.bills = {}
+        self.reports = {}
+
+    def upsert(self, collection: str, records: list) -> int:
+        with self.lock:
+            table = self.collections.setdefault(collection, {})
+            saved = 0
+            for rec in records:
+                if not isinstance(rec, dict):
+                    continue
+                guid = rec.get('guid') or rec.get('GUID')
+                if guid:
+                    table[guid] = dict(rec, isDeleted=False)
+                    saved += 1
+            return saved
+
+    def soft_delete(self, entity_type: str, guids: list) -> int:
+        collection = _ENTITY_COLLECTIONS.get(entity_type.lower(), entity_type.lower())
+        with self.lock:
+            table = self.collections.get(collection, {})
+            deleted = 0
+            for guid in guids:
+                rec = table.get(guid)
+                if rec is not None and not rec.get('isDeleted'):
+                    rec['isDeleted'] = True
+                    deleted += 1
+            return deleted
+
+    def records(self, collection: str, headers_only: bool = False) -> list:
+        with self.lock:
+            rows = list(self.collections.get(collection, {}).values())
+        if headers_only:
+            rows = [{k: v for k, v in r.items() if k not in _VOUCHER_HEADER_SKIP} for r in rows]
+        return rows
+
+    def master_mapping(self) -> dict:
+        with self.lock:
+            masters = {key: 0 for key in MAPPING_KEYS.values()}
+            for collection, table in self.collections.items():
+                key = MAPPING_KEYS.get(collection)
+                if key and table:
+                    masters[key] = max(_alter_of(r) for r in table.values())
+            for key, value in self.watermarks.items():
+                masters[key] = max(masters.get(key, 0), value)
+            return masters
+
+    def voucher_identities(self, from_date: str, to_date: str) -> list:
+        rows = [r for r in self.records('vouchers') if not r.get('isDeleted')]
+        return [i for i in tally_identities(rows) if from_date <= i[2] <= to_date]
+
+
+class MockBackendHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockBackend/1.0'
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+        encoding = (self.headers.get('Content-Encoding') or '').lower()
+        if encoding and (self.server.reject_compression or (encoding == 'zstd' and _zstd is None)):
+            return raw, None, 415
+        if encoding == 'gzip':
+            data = gzip.decompress(raw)
+        elif encoding == 'zstd':
+            data = _zstd.ZstdDecompressor().decompressobj().decompress(raw)
+        else:
+            data = raw
+        payload = serializer.loads(data) if data else None
+        if (self.headers.get('X-Payload-Encoding') or '').lower() == 'symbols':
+            if self.server.reject_symbols:
+                return raw, None, 415
+            payload = decode_records(payload or {})
+        return raw, payload, None
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def _handle(self, method: str):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip('/')
+        if path == '/_mock/stats':
+            return self._send(200, self.server.stats_snapshot())
+        if path.startswith(_STREAM_ROUTE) and not self.server.no_stream:
+            return self._handle_stream(method, path)
+        raw, payload, error = self._body() if method != 'GET' else (b'', None, None)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if error:
+            self.server.count(f"{method} {path}", len(raw), 0)
+            return self._send(error, {'success': False, 'message': 'Unsupported encoding'})
+        status, response, records = self._route(method, path, parse_qs(parts.query), payload)
+        self.server.count(f"{method} {path}", len(raw), records)
+        self._send(status, response)
+
+    def _iter_request_body(self):
+        """Raw body pieces, decoding chunked transfer encoding as it arrives."""
+        if 'chunked' not in (self.headers.get('Transfer-Encoding') or '').lower():
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                yield self.rfile.read(length)
+            return
+        while True:
+            size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                return
+            yield self.rfile.read(size)
+            self.rfile.readline()
+
+    def _handle_stream(self, method: str, path: str):
+        """NDJSON voucher stream: commit lines as they arrive, acknowledge by offset."""
+        server = self.server
+        if method == 'GET':
+            with server.stream_lock:
+                acked = server.streams.get(path[len(_STREAM_ROUTE):].strip('/'), 0)
+            server.count(f"GET {_STREAM_ROUTE}/{{id}}", 0, 0)
+            return self._send(200, {'acknowledged': acked})
+
+        stream_id = self.headers.get('X-Sync-Stream') or ''
+        offset = int(self.headers.get('X-Sync-Offset') or 0)
+        with server.stream_lock:
+            acked = server.streams.get(stream_id, 0)
+            first_request = stream_id not in server.streams
+            server.streams.setdefault(stream_id, 0)
+        if offset > acked:
+            for _ in self._iter_request_body():
+                pass
+            return self._send(409, {'acknowledged': acked, 'message': 'offset ahead of acknowledged'})
+        if server.latency:
+            time.sleep(server.latency)
+
+        received, saved, lines, rejected, pending = 0, 0, 0, [], []
+        position = offset
+        tail = b''
+
+        def commit():
+            nonlocal saved, pending
+            if pending:
+                saved += server.store.upsert('vouchers', pending)
+            with server.stream_lock:
+                server.streams[stream_id] = max(server.streams[stream_id], position)
+            pending = []
+
+        cut = server.stream_cut if first_request else 0
+        for piece in self._iter_request_body():
+            received += len(piece)
+            *complete, tail = (tail + piece).split(b'\n')
+            for line in complete:
+                if position >= acked:  # lines below `acked` are a resend of committed ones
+                    try:
+                        record = serializer.loads(line)
+                        if not (isinstance(record, dict) and record.get('guid')):
+                            raise ValueError('voucher without guid')
+                        pending.append(record)
+                    except Exception as e:
+                        rejected.append({'offset': position, 'error': str(e)[:200]})
+                    lines += 1
+                position += 1
+                if len(pending) >= _STREAM_COMMIT:
+                    commit()
+                if cut and lines >= cut:
+                    commit()
+                    server.count(f"POST {_STREAM_ROUTE}", received, lines)
+                    self.close_connection = True
+                    return
+        commit()
+        server.count(f"POST {_STREAM_ROUTE}", received, lines)
+        with server.stream_lock:
+            acked = server.streams[stream_id]
+        self._send(200, {'success': True, 'acknowledged': acked, 'savedCount': saved, 'rejected': rejected})
+
+    def _route(self, method: str, path: str, query: dict, payload):
+        store = self.server.store
+        if method == 'GET':
+            if path == '/companies':
+                return 200, {'data': [{'id': 1, 'name': 'Bench Company', 'status': 'imported'}]}, 0
+            if path.endswith('/master-mapping'):
+                return 200, {'masters': store.master_mapping()}, 0
+            match = _COMPANY_ROUTE.match(path)
+            if not match:
+                return 404, {'success': False, 'message': f'No route {path}'}, 0
+            collection, _, sub = match.groups()
+            q = {k: v[0] for k, v in query.items()}
+            if collection == 'vouchers' and sub == 'buckets':
+                ids = store.voucher_identities(q.get('from', ''), q.get('to', '9999'))
+                buckets = bucket_hashes(ids, q.get('level', 'month'))
+                return 200, [{'bucket': b, 'count': c, 'hash': h} for b, (c, h) in sorted(buckets.items())], 0
+            if collection == 'vouchers' and sub == 'identities':
+                ids = store.voucher_identities(q.get('from', ''), q.get('to', '9999'))
+                return 200, [{'guid': g, 'alterId': a, 'voucherDate': d} for g, a, d in ids], 0
+            if collection == 'vouchers' and sub == 'statistics':
+                return 200, {'totalVouchers': len(store.records('vouchers'))}, 0
+            if collection == 'bills-outstanding' and sub == 'summary':
+                return 200, {k: len(v) for k, v in store.bills.items()}, 0
+            if sub:
+                return 200, {'data': []}, 0
+            return 200, {'data': store.records(collection, headers_only=(collection == 'vouchers'))}, 0
+
+        body = payload if payload is not None else {}
+        if path == '/sync/soft-delete-orphans':
+            return 200, {'deleted': store.soft_delete(body.get('entityType', ''), body.get('guids') or [])}, 0
+        if path == '/sync/notify' or path.endswith('/sync-status') or path.endswith('/reports-stamp'):
+            return 200, {'success': True}, 0
+        if path.endswith('/last-alter-id'):
+            key = str(body.get('entityType', '')).lower()
+            key = MAPPING_KEYS.get(_ENTITY_COLLECTIONS.get(key, ''), key)
+            with store.lock:
+                store.watermarks[key] = max(store.watermarks.get(key, 0), int(body.get('lastAlterID') or 0))
+            return 200, {'success': True}, 0
+        if path.endswith('/reconcile'):
+            return 200, {'success': True, 'message': 'Reconciled'}, 0
+        if path == '/bills-outstanding/sync':
+            bills = body.get('bills') or []
+            store.bills[body.get('reportType', 'unknown')] = bills
+            return 200, {'success': True, 'count': len(bills)}, len(bills)
+        if path.startswith('/reports/') and path.endswith('/sync'):
+            rows = body if isinstance(body, list) else []
+            store.reports[path.split('/')[2]] = len(rows)
+            return 200, {'success': True, 'count': len(rows)}, len(rows)
+        if path.endswith('/sync') or path.startswith('/sync/'):
+            # /{collection}/sync (incremental / vouchers) or /sync/{collection} (sync_master).
+            segments = path.strip('/').split('/')
+            collection = segments[0] if segments[-1] == 'sync' else segments[-1]
+            if isinstance(body, dict):
+                body = next((v for v in body.values() if isinstance(v, list)), [])
+            saved = store.upsert(collection, body)
+            return 200, {'success': True, 'totalReceived': len(body), 'totalProcessed': saved,
+                         'savedCount': saved, 'message': f'Synced {saved} {collection}'}, len(body)
+        return 404, {'success': False, 'message': f'No route {path}'}, 0
+
+    def _send(self, status: int, obj):
+        body = serializer.dumps(obj)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockBackendServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.0, reject_compression: bool = False,
+                 no_stream: bool = False, stream_cut: int = 0, reject_symbols: bool = False):
+        super().__init__(address, MockBackendHandler)
+        self.store = BackendStore()
+        self.latency = latency
+        self.reject_compression = reject_compression
+        self.reject_symbols = reject_symbols
+        self.no_stream = no_stream
+        self.stream_cut = stream_cut
+        self.streams = {}  # stream id → acknowledged offset
+        self.stream_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'bytes': 0, 'records': 0, 'byRoute': {}}
+
+    def count(self, route: str, received: int, records: int):
+        route = re.sub(r'/\d+(?=/|$)', '/{id}', route)
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += received
+            self.stats['records'] += records
+            r = self.stats['byRoute'].setdefault(route, {'requests': 0, 'records': 0, 'bytes': 0})
+            r['requests'] += 1
+            r['records'] += records
+            r['bytes'] += received
+
+    def stats_snapshot(self) -> dict:
+        with self._stats_lock:
+            return json.loads(json.dumps(self.stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080, help='0 picks a free port')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='fixed delay per request')
+    parser.add_argument('--reject-compression', action='store_true',
+                        help='answer 415 to compressed bodies (exercises the plain-JSON fallback)')
+    parser.add_argument('--no-stream', action='store_true',
+                        help='no NDJSON stream route (exercises the batch-POST fallback)')
+    parser.add_argument('--stream-cut', type=int, default=0, metavar='N',
+                        help="drop each stream's first request after N lines (exercises resume)")
+    parser.add_argument('--reject-symbols', action='store_true',
+                        help='answer 415 to dictionary-encoded bodies (exercises the plain fallback)')
+    args = parser.parse_args()
+
+    server = MockBackendServer((args.host, args.port), args.latency_ms / 1000.0, args.reject_compression,
+                               args.no_stream, args.stream_cut, args.reject_symbols)
+    print(json.dumps({'port': server.server_address[1], 'codec': serializer.BACKEND}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    main()
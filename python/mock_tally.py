@@ -0,0 +1,388 @@
+"""Local stand-in for the TallyPrime XML/HTTP server, for end-to-end benchmarks.
+
+Answers the same TDL requests the sync worker sends to Tally — company list,
+license, master Collections (AlterID-filtered or full, singly or as one
+multi-collection union), voucher Collections (full 7-level exports,
+identity-only or per-day count / max-AlterID probes, filtered by
+SVFROMDATE/SVTODATE and AlterID), Bills Receivable/Payable and the Balance
+Sheet / Profit and Loss / Trial Balance reports — from a synthetic company
+built with bench_data.py.
+
+Like Tally it handles one request at a time (use --concurrent to lift that).
+--latency-ms adds a fixed delay per request and --record-us a per-record
+generation cost, to model a slow Tally at a given scale.
+
+    python mock_tally.py [--port 9000] [--vouchers 20000] [--masters-scale 1]
+                         [--latency-ms 0] [--record-us 0] [--company "Bench Company"]
+                         [--reject-union]
+
+The first stdout line is {"port": N} once the server is listening. Control
+routes for benchmark drivers:
+
+    GET  /_mock/stats                        → request/byte/record counters
+    POST /_mock/touch?vouchers=K&masters=K   → bump the AlterID of K vouchers / masters
+    POST /_mock/touch?deleted=K              → delete K vouchers (for reconciliation runs)
+"""
+
+import argparse
+import bisect
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from xml.sax.saxutils import escape
+
+import bench_data
+
+logger = logging.getLogger(__name__)
+
+MASTER_COUNTS = {
+    'Group': 40, 'Currency': 3, 'Unit': 12, 'StockGroup': 25, 'StockCategory': 10,
+    'CostCategory': 4, 'CostCenter': 30, 'Godown': 6, 'VoucherType': 30, 'TaxUnit': 2,
+    'Ledger': 2000, 'StockItem': 1500,
+}
+# Collection <TYPE> (upper-cased) → bench_data master type.
+_TYPE_ALIASES = dict({t.upper(): t for t in bench_data.MASTER_TYPES}, COSTCENTRE='CostCenter')
+
+_ID_RE = re.compile(r'<ID>(.*?)</ID>', re.S)
+_REPORT_RE = re.compile(r'<REPORTNAME>(.*?)</REPORTNAME>', re.S)
+_TYPE_RE = re.compile(r'<COLLECTION\b[^>]*>\s*<TYPE>(.*?)</TYPE>', re.S)
+_UNION_RE = re.compile(r'<COLLECTION\b[^>]*>\s*<COLLECTION>(.*?)</COLLECTION>', re.S)
+_FILTERS_RE = re.compile(r'<FILTERS>(.*?)</FILTERS>', re.S)
+_FETCH_RE = re.compile(r'<FETCH>(.*?)</FETCH>', re.S)
+_FROM_RE = re.compile(r'<SVFROMDATE[^>]*>(.*?)</SVFROMDATE>', re.S)
+_TO_RE = re.compile(r'<SVTODATE[^>]*>(.*?)</SVTODATE>', re.S)
+_ALTER_RE = re.compile(r'\$Alterid\s*>\s*(\d+)', re.I)
+_VTYPE_RE = re.compile(r'VCHTYPE="([^"]*)"')
+
+_HEAD = b'<ENVELOPE><HEADER><VERSION>1</VERSION><STATUS>1</STATUS></HEADER><BODY><DESC></DESC><DATA><COLLECTION>'
+_TAIL = b'</COLLECTION></DATA></BODY></ENVELOPE>'
+CHUNK_BYTES = 256 * 1024
+
+
+def parse_tally_date(text: str):
+    """YYYYMMDD int from the date formats the sync layer sends (01-Apr-2024, 20240401, 2024-04-01)."""
+    text = (text or '').strip()
+    for fmt in ('%d-%b-%Y', '%Y%m%d', '%Y-%m-%d', '%d-%m-%Y', '%d-%b-%y'):
+        try:
+            return int(datetime.strptime(text, fmt).strftime('%Y%m%d'))
+        except ValueError:
+            continue
+    return None
+
+
+class MockCompany:
+    """The synthetic company: vouchers and masters with company-wide AlterIDs."""
+
+    def __init__(self, name: str, n_vouchers: int, masters_scale: float = 1.0,
+                 start: date = date(2024, 4, 1), days: int = 365, bills: int = 2000,
+                 report_rows: int = 400, seed: int = 42):
+        self.name = name
+        self.start = start
+        self.days = days
+        self.bills = bills
+        self.report_rows = report_rows
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.next_alter = 1
+
+        self.masters = {}
+        for entity in bench_data.MASTER_TYPES:
+            count = max(1, int(MASTER_COUNTS[entity] * masters_scale))
+            self.masters[entity] = [self._bump() for _ in range(count)]
+
+        # Per voucher: [date_int, alter_id, full_bytes, identity_bytes], kept sorted by date.
+        self.vouchers = {}
+        for i in range(1, n_vouchers + 1):
+            vdate = start + timedelta(days=(i * days) // max(n_vouchers, 1))
+            self.vouchers[i] = self._render(i, vdate, self._bump())
+        self._reindex()
+
+    def _bump(self) -> int:
+        alter = self.next_alter
+        self.next_alter += 1
+        return alter
+
+    @staticmethod
+    def _render(i: int, vdate: date, alter_id: int) -> list:
+        full = bench_data.make_voucher(i, vdate, random.Random(i), alter_id=alter_id)
+        vtype = _VTYPE_RE.search(full).group(1)
+        identity = (f'<VOUCHER VCHTYPE="{vtype}"><GUID>5f6c1a2e-0000-4000-8000-{i:012d}</GUID>'
+                    f'<MASTERID>{i}</MASTERID><ALTERID>{alter_id}</ALTERID><VOUCHERNUMBER>{i}</VOUCHERNUMBER>'
+                    f'<VOUCHERTYPENAME>{vtype}</VOUCHERTYPENAME><DATE>{vdate.strftime("%Y%m%d")}</DATE></VOUCHER>')
+        return [int(vdate.strftime('%Y%m%d')), alter_id, full.encode('utf-8'), identity.encode('utf-8')]
+
+    def _reindex(self):
+        self.order = sorted(self.vouchers.items(), key=lambda kv: (kv[1][0], kv[0]))
+        self.dates = [v[0] for _, v in self.order]
+
+    def touch(self, vouchers: int = 0, masters: int = 0, deleted: int = 0) -> dict:
+        """Simulate edits in Tally: new AlterIDs for some records, deletion of others."""
+        with self.lock:
+            keys = list(self.vouchers)
+            for i in self.rng.sample(keys, min(vouchers, len(keys))):
+                vdate = datetime.strptime(str(self.vouchers[i][0]), '%Y%m%d').date()
+                self.vouchers[i] = self._render(i, vdate, self._bump())
+            for i in self.rng.sample(list(self.vouchers), min(deleted, len(self.vouchers))):
+                del self.vouchers[i]
+            for _ in range(masters):
+                entity = self.rng.choice(('Ledger', 'StockItem'))
+                self.masters[entity][self.rng.randrange(len(self.masters[entity]))] = self._bump()
+            self._reindex()
+        return {'vouchers': vouchers, 'masters': masters, 'deleted': deleted,
+                'voucherCount': len(self.vouchers), 'maxAlterId': self.next_alter - 1}
+
+    def select_vouchers(self, from_int, to_int, min_alter: int, identity: bool):
+        lo = bisect.bisect_left(self.dates, from_int) if from_int else 0
+        hi = bisect.bisect_right(self.dates, to_int) if to_int else len(self.dates)
+        col = 3 if identity else 2
+        return [v[col] for _, v in self.order[lo:hi] if v[1] > min_alter]
+
+    def count_vouchers(self, from_int, to_int):
+        """One <VOUCHER> summary row (VCHDAY, VCHCOUNT, VCHMAXALTER) per day with vouchers."""
+        lo = bisect.bisect_left(self.dates, from_int) if from_int else 0
+        hi = bisect.bisect_right(self.dates, to_int) if to_int else len(self.dates)
+        days = {}
+        for _, v in self.order[lo:hi]:
+            count, max_alter = days.get(v[0], (0, 0))
+            days[v[0]] = (count + 1, max(max_alter, v[1]))
+        return [f'<VOUCHER><VCHDAY>{day}</VCHDAY><VCHCOUNT>{n}</VCHCOUNT><VCHMAXALTER>{alter}</VCHMAXALTER></VOUCHER>'
+                .encode('utf-8') for day, (n, alter) in sorted(days.items())]
+
+    def select_masters(self, entity: str, tag: str, min_alter: int):
+        return [bench_data.make_master(entity, i, alter, tag=tag).encode('utf-8')
+                for i, alter in enumerate(self.masters[entity], 1) if alter > min_alter]
+
+
+class MockTallyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockTally/1.0'
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+    # ── control routes ──────────────────────────────────────────────
+
+    def do_GET(self):
+        if urlsplit(self.path).path == '/_mock/stats':
+            return self._send_json(self.server.stats_snapshot())
+        self._send_body(b'<RESPONSE>TallyPrime Server is Running</RESPONSE>')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length).decode('utf-8', errors='replace')
+        parts = urlsplit(self.path)
+        if parts.path == '/_mock/touch':
+            q = {k: int(v[0]) for k, v in parse_qs(parts.query).items()}
+            return self._send_json(self.server.company.touch(
+                q.get('vouchers', 0), q.get('masters', 0), q.get('deleted', 0)))
+
+        lock = self.server.request_lock
+        with lock:
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            kind, records = self._dispatch(body)
+            if self.server.record_cost and records:
+                time.sleep(self.server.record_cost * len(records))
+            sent = self._send_records(records) if isinstance(records, list) else self._send_body(records)
+        self.server.count(kind, len(records) if isinstance(records, list) else 0, sent)
+
+    # ── TDL dispatch ────────────────────────────────────────────────
+
+    def _dispatch(self, tdl: str):
+        company = self.server.company
+        report = _REPORT_RE.search(tdl)
+        if report:
+            name = report.group(1).strip()
+            n = company.bills if name in ('Bills Receivable', 'Bills Payable') else 0
+            seed = 1 if name == 'Bills Receivable' else 2
+            return 'bills', bench_data.make_bills_xml(n, seed=seed, start=company.start).encode('utf-8')
+
+        request_id = (_ID_RE.search(tdl).group(1).strip() if _ID_RE.search(tdl) else '')
+        if request_id == '$$LicenseInfo':
+            return 'license', self._license_xml()
+        if request_id in ('Collection of Companies', 'ListOpenCompanies', 'ActiveCompany'):
+            return 'companies', bench_data.make_company_xml([company.name]).encode('utf-8')
+        if request_id == 'My Balance Sheet':
+            return 'report', bench_data.make_balance_sheet_xml(company.report_rows).encode('utf-8')
+        if request_id == 'My Profit and Loss':
+            return 'report', bench_data.make_profit_loss_xml(company.report_rows).encode('utf-8')
+        if request_id == 'My Trial Balance':
+            return 'report', bench_data.make_trial_balance_xml(company.report_rows).encode('utf-8')
+
+        union = _UNION_RE.search(tdl)
+        if union:
+            if self.server.reject_union:
+                return 'error', b'<ENVELOPE><BODY><DATA><LINEERROR>Could not find Collection!</LINEERROR></DATA></BODY></ENVELOPE>'
+            return 'masters', self._union_masters(tdl, [m.strip() for m in union.group(1).split(',')])
+
+        ctype = _TYPE_RE.search(tdl)
+        ctype = ctype.group(1).strip() if ctype else ''
+        alter = _ALTER_RE.search(tdl)
+        min_alter = int(alter.group(1)) if alter else 0
+        if ctype.upper() == 'VOUCHER':
+            fetch = _FETCH_RE.search(tdl)
+            identity = 'ALLLEDGERENTRIES' not in (fetch.group(1).upper() if fetch else '')
+            from_m, to_m = _FROM_RE.search(tdl), _TO_RE.search(tdl)
+            if '<BY>' in tdl:
+                with company.lock:
+                    return 'voucher-counts', company.count_vouchers(
+                        parse_tally_date(from_m.group(1)) if from_m else None,
+                        parse_tally_date(to_m.group(1)) if to_m else None)
+            with company.lock:
+                return ('voucher-ids' if identity else 'vouchers'), company.select_vouchers(
+                    parse_tally_date(from_m.group(1)) if from_m else None,
+                    parse_tally_date(to_m.group(1)) if to_m else None, min_alter, identity)
+        entity = _TYPE_ALIASES.get(ctype.upper())
+        if entity:
+            with company.lock:
+                return 'masters', company.select_masters(entity, ctype.upper(), min_alter)
+        return 'unknown', []
+
+    def _union_masters(self, tdl: str, members: list) -> list:
+        """Concatenated master records of every member collection, each with its own AlterID filter."""
+        company = self.server.company
+        records = []
+        for member in members:
+            definition = re.search(rf'<COLLECTION NAME="{re.escape(member)}"[^>]*>(.*?)</COLLECTION>', tdl, re.S)
+            ctype = _TYPE_RE.search(definition.group(0)) if definition else None
+            entity = _TYPE_ALIASES.get(ctype.group(1).strip().upper()) if ctype else None
+            if not entity:
+                continue
+            min_alter = 0
+            formula = _FILTERS_RE.search(definition.group(1))
+            if formula:
+                system = re.search(rf'NAME="{re.escape(formula.group(1).strip())}">([^<]*)', tdl)
+                alter = _ALTER_RE.search(system.group(1)) if system else None
+                min_alter = int(alter.group(1)) if alter else 0
+            with company.lock:
+                records += company.select_masters(entity, ctype.group(1).strip().upper(), min_alter)
+        return records
+
+    def _license_xml(self) -> bytes:
+        company = self.server.company
+        ledgers = len(company.masters['Ledger'])
+        return (f'<ENVELOPE><HEADER><VERSION>1</VERSION><STATUS>1</STATUS></HEADER><BODY><DESC><CMPINFO>'
+                f'<COMPANY>1</COMPANY><LEDGER>{ledgers}</LEDGER><VOUCHER>{len(company.vouchers)}</VOUCHER>'
+                f'<PRODMAJORVER>6</PRODMAJORVER><PRODMINORVER>0</PRODMINORVER><PRODMAJORREL>0</PRODMAJORREL>'
+                f'</CMPINFO></DESC><DATA><RESULT>{escape("790000001")}</RESULT></DATA></BODY></ENVELOPE>'
+                ).encode('utf-8')
+
+    # ── responses ───────────────────────────────────────────────────
+
+    def _send_json(self, obj) -> int:
+        return self._send_body(json.dumps(obj).encode('utf-8'), 'application/json')
+
+    def _send_body(self, body: bytes, content_type: str = 'text/xml; charset=utf-8') -> int:
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def _send_records(self, records) -> int:
+        """Stream <ENVELOPE>…records…</ENVELOPE> with chunked transfer encoding."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        sent = 0
+        buf, size = [_HEAD], len(_HEAD)
+        for rec in records:
+            buf.append(rec)
+            size += len(rec)
+            if size >= CHUNK_BYTES:
+                sent += self._write_chunk(b''.join(buf))
+                buf, size = [], 0
+        buf.append(_TAIL)
+        sent += self._write_chunk(b''.join(buf))
+        self.wfile.write(b'0\r\n\r\n')
+        return sent
+
+    def _write_chunk(self, data: bytes) -> int:
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+        return len(data)
+
+
+class MockTallyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, company: MockCompany, latency: float = 0.0,
+                 record_cost: float = 0.0, concurrent: bool = False, reject_union: bool = False):
+        super().__init__(address, MockTallyHandler)
+        self.company = company
+        self.latency = latency
+        self.record_cost = record_cost
+        self.reject_union = reject_union
+        # Tally's HTTP server is single-threaded: one export at a time.
+        self.request_lock = _NullLock() if concurrent else threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'requests': 0, 'bytes': 0, 'records': 0, 'byKind': {}}
+
+    def count(self, kind: str, records: int, sent: int):
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats['bytes'] += sent
+            self.stats['records'] += records
+            k = self.stats['byKind'].setdefault(kind, {'requests': 0, 'records': 0, 'bytes': 0})
+            k['requests'] += 1
+            k['records'] += records
+            k['bytes'] += sent
+
+    def stats_snapshot(self) -> dict:
+        with self._stats_lock:
+            return json.loads(json.dumps(self.stats))
+
+
+class _NullLock:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000, help='0 picks a free port')
+    parser.add_argument('--company', default='Bench Company')
+    parser.add_argument('--vouchers', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=365, help='voucher date span from 01-Apr-2024')
+    parser.add_argument('--masters-scale', type=float, default=1.0,
+                        help='multiplier on the default master counts (2000 ledgers, 1500 items, ...)')
+    parser.add_argument('--bills', type=int, default=2000, help='rows per Bills Receivable/Payable report')
+    parser.add_argument('--report-rows', type=int, default=400, help='rows per BS / P&L / TB report')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='fixed delay per request')
+    parser.add_argument('--record-us', type=float, default=0.0, help='extra delay per record served')
+    parser.add_argument('--concurrent', action='store_true', help='serve requests in parallel')
+    parser.add_argument('--reject-union', action='store_true',
+                        help='answer multi-collection exports with a LINEERROR (exercises the per-type fallback)')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    company = MockCompany(args.company, args.vouchers, args.masters_scale, days=args.days,
+                          bills=args.bills, report_rows=args.report_rows)
+    server = MockTallyServer((args.host, args.port), company, args.latency_ms / 1000.0,
+                             args.record_us / 1e6, args.concurrent, args.reject_union)
+    print(json.dumps({'port': server.server_address[1], 'vouchers': len(company.vouchers),
+                      'masters': sum(len(v) for v in company.masters.values()),
+                      'buildSeconds': round(time.perf_counter() - t0, 2)}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    main()
@@ -2,27 +2,31 @@ import requests
 import sys
 import os
 import json
-import xml.etree.ElementTree as ET
-import re
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 
 from sync_logger import get_sync_logger
-from tally_http import post_xml_with_retry
+from tally_http import post_xml_with_retry, tally_post
+from merkle_reconcile import MONTH, BackendBucketSource, SnapshotBucketSource, merkle_diff
+from snapshot_store import (ALL_PERIODS, EMPTY_CHECKSUM, FULL_RECONCILE_SECONDS, checksum_records,
+                            get_snapshot_store, normalize_date)
+from xml_sanitizer import response_xml, sanitize
+import xml_backend
 
 # Logging configuration
 LOG_LEVEL = os.getenv('SYNC_LOG_LEVEL', 'INFO')
 VERBOSE_MODE = os.getenv('SYNC_VERBOSE', 'false').lower() == 'true'
+# Deep voucher reconcile asks the backend for month/day bucket checksums before
+# listing identities (falls back to the full list when the routes are missing).
+MERKLE_RECONCILE = os.getenv('SYNC_MERKLE_RECONCILE', 'true').lower() == 'true'
+# Months due only for re-verification are first checked with one count/max-AlterID
+# probe; those matching the snapshot are marked verified without an identity export.
+PROBE_RECONCILE = os.getenv('SYNC_PROBE_RECONCILE', 'true').lower() == 'true'
 
-# Create logs directory - use APPDATA when running as bundled exe
-import sys as _sys
-if getattr(_sys, 'frozen', False):
-    LOG_DIR = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'Tallify', 'logs')
-else:
-    LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
-os.makedirs(LOG_DIR, exist_ok=True)
-RECONCILIATION_LOG_FILE = os.path.join(LOG_DIR, 'sync_worker.log')
+# Logs directory (APPDATA when running as bundled exe) is owned by sync_logger
+# and created on first write.
+from sync_logger import SYNC_LOG_FILE as RECONCILIATION_LOG_FILE, ensure_log_dir
 
 # Use the global shared logger instead of creating duplicate handlers
 logger = logging.getLogger(__name__)
@@ -44,6 +48,74 @@ if not logger.handlers:
     logger.handlers.extend(global_logger.handlers)
 
 
+def _first_column(df, candidates):
+    for col in candidates:
+        if col in df.columns:
+            return col
+    return None
+
+
+def diff_voucher_frames(tally_df, db_df) -> Dict:
+    """Classify vouchers with one outer merge on GUID.
+
+    `tally_df` holds reconciliation identity rows (guid, masterID, alterID, name,
+    month); `db_df` holds backend voucher rows, whose GUID / AlterID / number
+    columns may use any of the backend's spellings. Returns DataFrames keyed
+    'missing' (Tally only), 'stale' (Tally AlterID newer), 'extra' (DB only) and
+    'matched'. Missing or unparseable DB AlterIDs count as 0.
+    """
+    import pandas as pd
+
+    tally = tally_df.reindex(columns=['guid', 'masterID', 'alterID', 'name', 'month'])
+    tally = tally[tally['guid'].notna() & (tally['guid'] != '')].drop_duplicates('guid', keep='last')
+
+    guid_col = _first_column(db_df, ['guid', 'GUID'])
+    if guid_col is None:
+        db = pd.DataFrame({'guid': pd.Series(dtype=object), 'dbAlterID': pd.Series(dtype='int64'),
+                           'dbName': pd.Series(dtype=object)})
+    else:
+        alter_col = _first_column(db_df, ['alterId', 'alterID', 'alter_id', 'ALTERID'])
+        name_col = _first_column(db_df, ['voucherNumber', 'voucher_number'])
+        db = pd.DataFrame({
+            'guid': db_df[guid_col],
+            'dbAlterID': (pd.to_numeric(db_df[alter_col], errors='coerce').fillna(0).astype('int64')
+                          if alter_col else 0),
+            'dbName': db_df[name_col] if name_col else None,
+        })
+        db = db[db['guid'].notna() & (db['guid'] != '')].drop_duplicates('guid', keep='last')
+
+    merged = tally.merge(db, on='guid', how='outer', indicator=True, sort=False)
+    side = merged['_merge']
+    both = side == 'both'
+    stale = both & (pd.to_numeric(merged['alterID'], errors='coerce').fillna(0) > merged['dbAlterID'])
+    return {
+        'missing': merged[side == 'left_only'],
+        'stale': merged[stale],
+        'extra': merged[side == 'right_only'],
+        'matched': merged[both & ~stale],
+    }
+
+
+def voucher_frame_records(frame, kind: str) -> List[Dict]:
+    """Turn a diff_voucher_frames() frame into the detail dicts the report and re-sync use."""
+    if frame.empty:
+        return []
+    guid = frame['guid'].astype(str)
+    if kind == 'extra':
+        name = frame['dbName'].where(frame['dbName'].notna() & (frame['dbName'] != ''), guid)
+        return [{'guid': g, 'name': n} for g, n in zip(guid.tolist(), name.tolist())]
+    name = frame['name'].where(frame['name'].notna(), guid)
+    master_id = frame['masterID'].fillna('')
+    month = frame['month'].fillna('')
+    tally_alter = frame['alterID'].fillna(0).astype('int64')
+    columns = [guid.tolist(), master_id.tolist(), name.tolist(), month.tolist(), tally_alter.tolist()]
+    if kind == 'stale':
+        return [{'guid': g, 'masterID': m, 'name': n, 'month': mo, 'tallyAlterID': a, 'dbAlterID': d}
+                for g, m, n, mo, a, d in zip(*columns, frame['dbAlterID'].astype('int64').tolist())]
+    return [{'guid': g, 'masterID': m, 'name': n, 'month': mo, 'alterID': a}
+            for g, m, n, mo, a in zip(*columns)]
+
+
 class ReconciliationManager:
     """Manages reconciliation between Tally and Database"""
     
@@ -145,9 +217,9 @@ class ReconciliationManager:
         """Parse XML response from Tally"""
         try:
             # Clean invalid XML characters
-            xml_string = re.sub(r'&#([0-9]+);', lambda m: '' if int(m.group(1)) < 32 and int(m.group(1)) not in [9, 10, 13] else m.group(0), xml_string)
+            xml_string = sanitize(xml_string)
             
-            root = ET.fromstring(xml_string)
+            root = xml_backend.fromstring(xml_string)
             records = []
             
             # Map entity type to Tally-specific XML element names
@@ -595,9 +667,8 @@ class ReconciliationManager:
         """Parse voucher XML for reconciliation - extract only identity fields"""
         try:
             # Strip namespace prefixes like <UDF:FIELD> → <UDF_FIELD> (Tally UDF fields)
-            xml_string = re.sub(r'<(/?)([a-zA-Z_]+):([a-zA-Z_]+)', r'<\1\2_\3', xml_string)
-            xml_string = re.sub(r'&#([0-9]+);', lambda m: '' if int(m.group(1)) < 32 and int(m.group(1)) not in [9, 10, 13] else m.group(0), xml_string)
-            root = ET.fromstring(xml_string)
+            xml_string = sanitize(xml_string)
+            root = xml_backend.fromstring(xml_string)
             records = []
             
             for elem in root.iter('VOUCHER'):
@@ -625,10 +696,13 @@ class ReconciliationManager:
                     if not guid or alter_id == 0:
                         continue
                     
+                    voucher_date = normalize_date((elem.findtext('DATE') or '').strip())
                     records.append({
                         'guid': guid,
                         'masterID': master_id,
                         'alterID': alter_id,
+                        'date': voucher_date,
+                        'month': datetime.strptime(voucher_date, '%Y-%m-%d').strftime('%b-%Y') if voucher_date else '',
                         'name': f"{voucher_type} {voucher_number}" if voucher_number else guid,
                         'ledgerEntryCount': ledger_entry_count,
                         'inventoryEntryCount': inventory_entry_count
@@ -957,102 +1031,18 @@ class ReconciliationManager:
                 tally_count = len(tally_records)
                 logger.info(f"   📊 Cache: {tally_count} vouchers (from sync)")
             else:
+                # ── LOCAL SNAPSHOT path: re-fetch only months that changed ──
+                snapshot_result = self._reconcile_vouchers_from_snapshot(
+                    company_id, user_id, company_guid, tally_host, tally_port,
+                    company_name, start_dt, end_dt, from_date, to_date)
+                if snapshot_result is not None:
+                    return snapshot_result
+
                 # ── ADAPTIVE TALLY FETCH fallback ────────────────────────────
                 logger.info(f"   ⚡ Adaptive-fetch mode — fetching vouchers in dynamic date chunks")
-                
-                tally_records = []
-                current_start = start_dt
-                chunk_days = 30  # Start with 30-day chunks
-                success = True
-                
-                while current_start <= end_dt:
-                    current_end = current_start + timedelta(days=chunk_days - 1)
-                    if current_end > end_dt:
-                        current_end = end_dt
-                        
-                    tally_from = current_start.strftime("%d-%b-%Y")
-                    tally_to = current_end.strftime("%d-%b-%Y")
-                    
-                    logger.info(f"      📥 Fetching {tally_from} to {tally_to} ({chunk_days}-day chunk)...")
-                    
-                    company_var = ""
-                    if company_name:
-                        from xml.sax.saxutils import escape
-                        escaped_company = escape(company_name)
-                        company_var = f"\n                <SVCOMPANY>{escaped_company}</SVCOMPANY>\n                <SVCURRENTCOMPANY>{escaped_company}</SVCURRENTCOMPANY>"
-                    # Lightweight TDL — identity fields only, NO COMPUTE (sub-table counts kill performance)
-                    lightweight_tdl = f"""<ENVELOPE>
-    <HEADER>
-        <VERSION>1</VERSION>
-        <TALLYREQUEST>Export</TALLYREQUEST>
-        <TYPE>Collection</TYPE>
-        <ID>Collection of Vouchers</ID>
-    </HEADER>
-    <BODY>
-        <DESC>
-            <STATICVARIABLES>
-                <SVFROMDATE TYPE="Date">{tally_from}</SVFROMDATE>
-                <SVTODATE TYPE="Date">{tally_to}</SVTODATE>
-                <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>{company_var}
-            </STATICVARIABLES>
-            <TDL>
-                <TDLMESSAGE>
-                    <COLLECTION NAME="Collection of Vouchers" ISMODIFY="No">
-                        <TYPE>Voucher</TYPE>
-                        <FETCH>GUID, MASTERID, ALTERID, VOUCHERNUMBER, VOUCHERTYPENAME, DATE</FETCH>
-                    </COLLECTION>
-                </TDLMESSAGE>
-            </TDL>
-        </DESC>
-    </BODY>
-</ENVELOPE>"""
-
-                    fetch_start = _time.time()
-                    xml_response = self.fetch_from_tally(lightweight_tdl, tally_host, tally_port)
-                    fetch_duration = _time.time() - fetch_start
-
-                    if not xml_response:
-                        logger.warning(f"      ⚠️ Fetch failed or timed out for {tally_from} to {tally_to} (took {fetch_duration:.1f}s)")
-                        # If failed, shrink chunk size and retry
-                        if chunk_days > 1:
-                            if chunk_days >= 30: new_chunk = 15
-                            elif chunk_days >= 15: new_chunk = 7
-                            elif chunk_days >= 7: new_chunk = 1
-                            else: new_chunk = 1
-                            
-                            logger.info(f"      📉 Reducing chunk size from {chunk_days} to {new_chunk} days and retrying...")
-                            chunk_days = new_chunk
-                            continue
-                        else:
-                            error_msg = f"Adaptive-fetch: failed persistently on {tally_from} even at 1-day chunks."
-                            logger.error(f"   ❌ {error_msg}")
-                            success = False
-                            break
-                    
-                    # Parse current chunk and add to total 
-                    chunk_records = self.parse_voucher_reconciliation_xml(xml_response)
-                    tally_records.extend(chunk_records)
-                    
-                    logger.info(f"      ✅ Received {len(chunk_records)} identity records in {fetch_duration:.1f}s")
-                    
-                    # Adaptive check logic based on success time boundary
-                    if fetch_duration > 20 and chunk_days > 1:
-                        if chunk_days >= 30: new_chunk = 15
-                        elif chunk_days >= 15: new_chunk = 7
-                        elif chunk_days >= 7: new_chunk = 1
-                        else: new_chunk = 1
-                        
-                        logger.info(f"      ⚠️ Request took > 20s. Reducing next chunk from {chunk_days} to {new_chunk} days to avoid overload.")
-                        chunk_days = new_chunk
-                        
-                    # Advance date pointer for next loop iteration
-                    current_start = current_end + timedelta(days=1)
-                    
-                    # Quick connectivity check between chunks if we've seen failures
-                    if not success:
-                        break
-                
-                if not success:
+                tally_records, error_msg = self._fetch_voucher_identities(
+                    start_dt, end_dt, tally_host, tally_port, company_name, company_id)
+                if error_msg:
                     result = {'success': False, 'entityType': 'Voucher', 'error': error_msg,
                               'tallyCount': 0, 'dbCount': 0, 'missing': 0, 'updated': 0, 'synced': 0}
                     self.log_reconciliation(company_id, 'Voucher', result)
@@ -1061,55 +1051,71 @@ class ReconciliationManager:
                 tally_count = len(tally_records)
                 logger.info(f"   📊 Tally: {tally_count} vouchers (adaptive chunking)")
 
-            # Fetch DB vouchers
-            db_records = self.fetch_db_vouchers(company_id)
-            db_count = len(db_records) if db_records else 0
-            logger.info(f"   📊 DB: {db_count} vouchers")
-
-            # Build lookup maps
-            tally_guid_map = {}
-            for rec in tally_records:
-                g = rec.get('guid', '')
-                if g:
-                    tally_guid_map[g] = rec
-
-            db_guid_map = {}
-            if db_records:
-                for rec in db_records:
-                    g = rec.get('guid', rec.get('GUID', ''))
+            # Bucketed checksums first: only months/days whose (count, hash) differ are
+            # listed from the backend. Falls back to the full DB list when the backend
+            # has no bucket endpoints (or for a partial cache, which can't be bucketed).
+            merkle = None if tally_cache else self._merkle_voucher_diff(
+                company_id, tally_records, start_dt, end_dt,
+                BackendBucketSource(self.backend_url, self.headers, company_id))
+            if merkle is not None:
+                db_count = merkle['remoteCount']
+                missing_in_db = merkle['missing']
+                needs_update = merkle['stale']
+                db_guid_map = {g: {'guid': g, 'voucherDate': d} for g, d in merkle['extra']}
+                extra_in_db = [{'guid': g, 'name': g} for g in db_guid_map]
+                logger.info(f"   📊 DB: {db_count} vouchers (bucket checksums)")
+            else:
+                # Fetch DB vouchers
+                db_records = self.fetch_db_vouchers(company_id)
+                db_count = len(db_records) if db_records else 0
+                logger.info(f"   📊 DB: {db_count} vouchers")
+
+                # Build lookup maps
+                tally_guid_map = {}
+                for rec in tally_records:
+                    g = rec.get('guid', '')
                     if g:
-                        db_guid_map[g] = rec
-
-            # Find missing and stale
-            missing_in_db = []
-            needs_update = []
-            for guid, trec in tally_guid_map.items():
-                if guid not in db_guid_map:
-                    missing_in_db.append({
-                        'guid': guid,
-                        'masterID': trec.get('masterID', ''),
-                        'name': trec.get('name', guid),
-                        'alterID': trec.get('alterID', 0)
-                    })
-                else:
-                    db_alter = db_guid_map[guid].get('alterId', db_guid_map[guid].get('alterID', 0)) or 0
-                    if isinstance(db_alter, str):
-                        try:
-                            db_alter = int(db_alter)
-                        except (ValueError, TypeError):
-                            db_alter = 0
-                    tally_alter = trec.get('alterID', 0)
-                    if tally_alter > db_alter:
-                        needs_update.append({
+                        tally_guid_map[g] = rec
+
+                db_guid_map = {}
+                if db_records:
+                    for rec in db_records:
+                        g = rec.get('guid', rec.get('GUID', ''))
+                        if g:
+                            db_guid_map[g] = rec
+
+                # Find missing and stale
+                missing_in_db = []
+                needs_update = []
+                for guid, trec in tally_guid_map.items():
+                    if guid not in db_guid_map:
+                        missing_in_db.append({
                             'guid': guid,
                             'masterID': trec.get('masterID', ''),
                             'name': trec.get('name', guid),
-                            'tallyAlterID': tally_alter,
-                            'dbAlterID': db_alter
+                            'alterID': trec.get('alterID', 0),
+                            'month': trec.get('month', '')
                         })
-
-            extra_in_db = [{'guid': g, 'name': db_guid_map[g].get('voucherNumber', g)}
-                           for g in db_guid_map if g not in tally_guid_map]
+                    else:
+                        db_alter = db_guid_map[guid].get('alterId', db_guid_map[guid].get('alterID', 0)) or 0
+                        if isinstance(db_alter, str):
+                            try:
+                                db_alter = int(db_alter)
+                            except (ValueError, TypeError):
+                                db_alter = 0
+                        tally_alter = trec.get('alterID', 0)
+                        if tally_alter > db_alter:
+                            needs_update.append({
+                                'guid': guid,
+                                'masterID': trec.get('masterID', ''),
+                                'name': trec.get('name', guid),
+                                'tallyAlterID': tally_alter,
+                                'dbAlterID': db_alter,
+                                'month': trec.get('month', '')
+                            })
+
+                extra_in_db = [{'guid': g, 'name': db_guid_map[g].get('voucherNumber', g)}
+                               for g in db_guid_map if g not in tally_guid_map]
 
             total_to_sync = len(missing_in_db) + len(needs_update)
             logger.info(f"   📝 Missing: {len(missing_in_db)} | Stale: {len(needs_update)} | Extra: {len(extra_in_db)}")
@@ -1119,25 +1125,19 @@ class ReconciliationManager:
             # So an "extra" voucher is only truly deleted-in-Tally if its date falls
             # INSIDE the fetched window. Anything outside the window, or with an
             # unparseable/missing date, is NEVER deleted (fail-safe).
+            # A tally_cache is the incremental sync's changed vouchers, not the window's
+            # full identity set: nothing missing from it was deleted in Tally.
             deleted_count = 0
             try:
-                _start_d = start_dt.date()
-                _end_d = end_dt.date()
-                orphan_voucher_guids = []
-                skipped_out_of_range = 0
-                for e in extra_in_db:
-                    rec = db_guid_map.get(e['guid'], {})
-                    vdate_raw = rec.get('voucherDate') or rec.get('date')
-                    if not vdate_raw:
-                        continue  # no date → never delete
-                    try:
-                        vdate = datetime.strptime(str(vdate_raw)[:10], '%Y-%m-%d').date()
-                    except (ValueError, TypeError):
-                        continue  # unparseable → never delete
-                    if _start_d <= vdate <= _end_d:
-                        orphan_voucher_guids.append(str(e['guid']))
-                    else:
-                        skipped_out_of_range += 1
+                if tally_cache:
+                    if extra_in_db:
+                        logger.info(f"   🗑️ Deletion check skipped: {len(extra_in_db)} 'extra' voucher(s) "
+                                    f"measured against a partial (sync cache) Tally set")
+                    extra_in_db = []
+                orphan_voucher_guids, skipped_out_of_range = self._orphans_in_window(
+                    ((e['guid'], db_guid_map.get(e['guid'], {}).get('voucherDate')
+                      or db_guid_map.get(e['guid'], {}).get('date')) for e in extra_in_db),
+                    start_dt, end_dt)
                 if orphan_voucher_guids:
                     logger.info(f"   🗑️ {len(orphan_voucher_guids)} voucher(s) deleted in Tally (within window) → soft-deleting "
                                 f"({skipped_out_of_range} extra out-of-window kept)")
@@ -1155,6 +1155,11 @@ class ReconciliationManager:
                     from_date, to_date
                 )
 
+            # The full window was fetched and every gap repaired: seed the snapshot so the
+            # next deep cycle only re-fetches months that change.
+            if not tally_cache and synced_count >= total_to_sync:
+                self._snapshot_seed_vouchers(company_id, tally_records, start_dt, end_dt)
+
             reconcile_duration = _time.time() - reconcile_start
             logger.info(f"   ✅ Single-fetch reconciliation complete in {reconcile_duration:.1f}s")
             logger.info(f"      Synced: {synced_count} | Missing: {len(missing_in_db)} | Stale: {len(needs_update)}")
@@ -1171,6 +1176,8 @@ class ReconciliationManager:
                 'deleted': deleted_count,
                 'singleFetch': True
             }
+            if merkle is not None:
+                result['merkle'] = merkle['stats']
             self.log_reconciliation(company_id, 'Voucher', result)
 
             try:
@@ -1189,7 +1196,7 @@ class ReconciliationManager:
             return result
 
         # ── Setup dedicated voucher reconciliation log file ──────────────
-        recon_log_path = os.path.join(LOG_DIR, 'voucher_reconciliation.log')
+        recon_log_path = os.path.join(ensure_log_dir(), 'voucher_reconciliation.log')
         def write_recon_log(line: str):
             try:
                 with open(recon_log_path, 'a', encoding='utf-8') as f:
@@ -1317,93 +1324,11 @@ class ReconciliationManager:
             return result
 
         # ── Step 4: Reconcile using DataFrame merge ──────────────────────
-        # Normalize DB guid column
-        db_guid_col = 'guid'
-        if not db_df.empty:
-            # DB might use 'guid', 'GUID', etc.
-            for col_candidate in ['guid', 'GUID']:
-                if col_candidate in db_df.columns:
-                    db_guid_col = col_candidate
-                    break
-            # Normalize alterId column in DB
-            db_alter_col = None
-            for col_candidate in ['alterId', 'alterID', 'alter_id', 'ALTERID']:
-                if col_candidate in db_df.columns:
-                    db_alter_col = col_candidate
-                    break
-            if db_alter_col is None:
-                db_df['_db_alterID'] = 0
-                db_alter_col = '_db_alterID'
-        else:
-            db_alter_col = '_db_alterID'
-
-        # Build lookup structures from DataFrames
-        tally_guid_set = set(tally_df['guid'].tolist()) if not tally_df.empty else set()
-        db_guid_set = set(db_df[db_guid_col].dropna().tolist()) if not db_df.empty else set()
-
-        # Build per-guid alterID maps
-        tally_alter_map = {}
-        tally_name_map = {}
-        tally_masterid_map = {}
-        tally_month_map = {}
-        if not tally_df.empty:
-            for _, row in tally_df.iterrows():
-                g = row['guid']
-                tally_alter_map[g] = row.get('alterID', 0)
-                tally_name_map[g] = row.get('name', g)
-                tally_masterid_map[g] = row.get('masterID', '')
-                tally_month_map[g] = row.get('month', '')
-
-        db_alter_map = {}
-        db_name_map = {}
-        if not db_df.empty:
-            for _, row in db_df.iterrows():
-                g = row.get(db_guid_col, '')
-                if g:
-                    db_alter_map[g] = row.get(db_alter_col, 0) or 0
-                    db_name_map[g] = row.get('voucherNumber', row.get('voucher_number', g))
-
-        # Find missing, stale, extra
-        missing_in_db = []
-        needs_update = []
-        matched = []
-
-        for guid in tally_guid_set:
-            if guid in db_guid_set:
-                tally_alter = tally_alter_map.get(guid, 0)
-                db_alter = db_alter_map.get(guid, 0)
-                if isinstance(db_alter, str):
-                    try:
-                        db_alter = int(db_alter)
-                    except (ValueError, TypeError):
-                        db_alter = 0
-                if tally_alter > db_alter:
-                    needs_update.append({
-                        'guid': guid,
-                        'masterID': tally_masterid_map.get(guid, ''),
-                        'name': tally_name_map.get(guid, guid),
-                        'month': tally_month_map.get(guid, ''),
-                        'tallyAlterID': tally_alter,
-                        'dbAlterID': db_alter
-                    })
-                else:
-                    matched.append(guid)
-            else:
-                missing_in_db.append({
-                    'guid': guid,
-                    'masterID': tally_masterid_map.get(guid, ''),
-                    'name': tally_name_map.get(guid, guid),
-                    'month': tally_month_map.get(guid, ''),
-                    'alterID': tally_alter_map.get(guid, 0)
-                })
-
-        extra_in_db = []
-        for guid in db_guid_set:
-            if guid not in tally_guid_set:
-                extra_in_db.append({
-                    'guid': guid,
-                    'name': db_name_map.get(guid, guid)
-                })
+        frames = diff_voucher_frames(tally_df, db_df)
+        missing_in_db = voucher_frame_records(frames['missing'], 'missing')
+        needs_update = voucher_frame_records(frames['stale'], 'stale')
+        extra_in_db = voucher_frame_records(frames['extra'], 'extra')
+        matched = frames['matched']['guid'].tolist()
 
         total_to_sync = len(missing_in_db) + len(needs_update)
 
@@ -1507,16 +1432,9 @@ class ReconciliationManager:
         # Tally-side sub-table totals from parsed data
         tally_total_ledger_entries = 0
         tally_total_inventory_entries = 0
-        tally_per_voucher_counts = {}
         if not tally_df.empty and 'ledgerEntryCount' in tally_df.columns:
             tally_total_ledger_entries = int(tally_df['ledgerEntryCount'].sum())
             tally_total_inventory_entries = int(tally_df['inventoryEntryCount'].sum())
-            for _, row in tally_df.iterrows():
-                g = row['guid']
-                tally_per_voucher_counts[g] = {
-                    'ledgerEntries': int(row.get('ledgerEntryCount', 0)),
-                    'inventoryEntries': int(row.get('inventoryEntryCount', 0))
-                }
         
         logger.info(f"   📊 Tally sub-table totals: {tally_total_ledger_entries} ledger entries, {tally_total_inventory_entries} inventory entries")
         
@@ -1766,6 +1684,382 @@ class ReconciliationManager:
 
         return result
     
+    def _fetch_voucher_identities(self, start_dt: datetime, end_dt: datetime, tally_host: str,
+                                  tally_port: int, company_name: str = None,
+                                  company_id: int = None) -> Tuple[List[Dict], Optional[str]]:
+        """Fetch voucher identities for [start_dt, end_dt] in adaptively sized date chunks.
+
+        Window sizes come from chunk_sizer (the company's learned vouchers-per-day
+        and identity-export cost); a failed chunk is retried at half the size.
+        Returns (records, error); error is set when a chunk fails even at 1 day.
+        """
+        import time as _time
+        from chunk_sizer import ChunkSizer
+
+        sizer = ChunkSizer(company_id, 'voucher-ids')
+        tally_records = []
+        current_start = start_dt
+        success = True
+        
+        while current_start <= end_dt:
+            current_end = sizer.next_end(current_start, end_dt)
+            chunk_days = (current_end - current_start).days + 1
+                
+            tally_from = current_start.strftime("%d-%b-%Y")
+            tally_to = current_end.strftime("%d-%b-%Y")
+            
+            logger.info(f"      📥 Fetching {tally_from} to {tally_to} ({chunk_days}-day chunk)...")
+            
+            company_var = ""
+            if company_name:
+                from xml.sax.saxutils import escape
+                escaped_company = escape(company_name)
+                company_var = f"\n                <SVCOMPANY>{escaped_company}</SVCOMPANY>\n                <SVCURRENTCOMPANY>{escaped_company}</SVCURRENTCOMPANY>"
+            # Lightweight TDL — identity fields only, NO COMPUTE (sub-table counts kill performance)
+            lightweight_tdl = f"""<ENVELOPE>
+    <HEADER>
+        <VERSION>1</VERSION>
+        <TALLYREQUEST>Export</TALLYREQUEST>
+        <TYPE>Collection</TYPE>
+        <ID>Collection of Vouchers</ID>
+    </HEADER>
+    <BODY>
+        <DESC>
+            <STATICVARIABLES>
+                <SVFROMDATE TYPE="Date">{tally_from}</SVFROMDATE>
+                <SVTODATE TYPE="Date">{tally_to}</SVTODATE>
+                <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>{company_var}
+            </STATICVARIABLES>
+            <TDL>
+                <TDLMESSAGE>
+                    <COLLECTION NAME="Collection of Vouchers" ISMODIFY="No">
+                        <TYPE>Voucher</TYPE>
+                        <FETCH>GUID, MASTERID, ALTERID, VOUCHERNUMBER, VOUCHERTYPENAME, DATE</FETCH>
+                    </COLLECTION>
+                </TDLMESSAGE>
+            </TDL>
+        </DESC>
+    </BODY>
+</ENVELOPE>"""
+
+            fetch_start = _time.time()
+            xml_response = self.fetch_from_tally(lightweight_tdl, tally_host, tally_port)
+            fetch_duration = _time.time() - fetch_start
+
+            if not xml_response:
+                logger.warning(f"      ⚠️ Fetch failed or timed out for {tally_from} to {tally_to} (took {fetch_duration:.1f}s)")
+                # If failed, shrink chunk size and retry
+                if chunk_days > 1:
+                    sizer.failed(current_start, current_end)
+                    continue
+                else:
+                    error_msg = f"Adaptive-fetch: failed persistently on {tally_from} even at 1-day chunks."
+                    logger.error(f"   ❌ {error_msg}")
+                    success = False
+                    break
+            
+            # Parse current chunk and add to total 
+            chunk_records = self.parse_voucher_reconciliation_xml(xml_response)
+            tally_records.extend(chunk_records)
+            
+            logger.info(f"      ✅ Received {len(chunk_records)} identity records in {fetch_duration:.1f}s")
+            
+            # Size the next chunk from this one's cost (and remember it for the next run)
+            sizer.observe(current_start, current_end, len(chunk_records), fetch_duration,
+                          len(xml_response), dates=[r['date'] for r in chunk_records])
+                
+            # Advance date pointer for next loop iteration
+            current_start = current_end + timedelta(days=1)
+            
+            # Quick connectivity check between chunks if we've seen failures
+            if not success:
+                break
+
+        sizer.save()
+        return tally_records, (None if success else error_msg)
+
+    @staticmethod
+    def _month_windows(start_dt: datetime, end_dt: datetime) -> List[Tuple[str, datetime, datetime]]:
+        """('YYYY-MM', first day, last day) for every month in [start_dt, end_dt], clipped."""
+        import calendar
+        windows = []
+        cursor = datetime(start_dt.year, start_dt.month, 1)
+        while cursor <= end_dt:
+            last = datetime(cursor.year, cursor.month, calendar.monthrange(cursor.year, cursor.month)[1])
+            windows.append((cursor.strftime('%Y-%m'), max(cursor, start_dt), min(last, end_dt)))
+            cursor = last + timedelta(days=1)
+        return windows
+
+    @staticmethod
+    def _orphans_in_window(extras, start_dt: datetime, end_dt: datetime) -> Tuple[List[str], int]:
+        """GUIDs of (guid, voucher date) extras dated inside [start_dt, end_dt].
+
+        Only a voucher inside a window Tally was just asked for in full can have
+        been deleted there. Anything outside it, or with a missing/unparseable
+        date, is never deleted (fail-safe). Returns (guids, skipped out of window).
+        """
+        start_d, end_d = start_dt.date(), end_dt.date()
+        guids, skipped = [], 0
+        for guid, vdate_raw in extras:
+            if not vdate_raw:
+                continue  # no date → never delete
+            try:
+                vdate = datetime.strptime(str(vdate_raw)[:10], '%Y-%m-%d').date()
+            except (ValueError, TypeError):
+                continue  # unparseable → never delete
+            if start_d <= vdate <= end_d:
+                guids.append(str(guid))
+            else:
+                skipped += 1
+        return guids, skipped
+
+    def _confirm_snapshot_with_backend(self, store, company_id: int, from_date: str,
+                                       to_date: str) -> Optional[bool]:
+        """Compare the snapshot's month buckets with the backend's over [from_date, to_date].
+
+        True when every month's (count, hash) matches — the snapshot still stands
+        for the backend, and that is recorded as a full comparison; False on any
+        mismatch; None when the backend has no bucket routes or cannot answer.
+        One small request per cycle.
+        """
+        try:
+            remote = BackendBucketSource(self.backend_url, self.headers, company_id).buckets(
+                MONTH, from_date, to_date)
+        except Exception as e:
+            logger.debug(f"Backend bucket check unavailable: {e}")
+            return None
+        if remote is None:
+            return None
+        local = SnapshotBucketSource(store, company_id).buckets(MONTH, from_date, to_date)
+        drifted = sorted(m for m in set(local) | set(remote) if local.get(m) != remote.get(m))
+        if drifted:
+            logger.info(f"   📸 Backend differs from the snapshot in {len(drifted)} month(s) "
+                        f"({', '.join(drifted[:6])}{'…' if len(drifted) > 6 else ''}) — full reconcile")
+            return False
+        store.mark_verified(company_id, 'Voucher', {ALL_PERIODS: (store.count(company_id, 'Voucher'), '')})
+        return True
+
+    def _snapshot_mark_vouchers_verified(self, store, company_id: int, tally_records: List[Dict],
+                                         windows: List[Tuple[str, datetime, datetime]]):
+        """Make the snapshot equal the Tally identities for `windows` and mark those months verified."""
+        checksums = checksum_records(tally_records)
+        by_period = {}
+        for r in tally_records:
+            by_period.setdefault((r.get('date') or '')[:7], []).append(r)
+        for period, w_start, w_end in windows:
+            store.replace(company_id, 'Voucher', by_period.get(period, []),
+                          w_start.strftime('%Y-%m-%d'), w_end.strftime('%Y-%m-%d'))
+        store.mark_verified(company_id, 'Voucher',
+                            {period: checksums.get(period, (0, EMPTY_CHECKSUM)) for period, _, _ in windows})
+
+    def _merkle_voucher_diff(self, company_id: int, tally_records: List[Dict], start_dt: datetime,
+                             end_dt: datetime, source, required: bool = False) -> Optional[Dict]:
+        """merkle_diff over [start_dt, end_dt]; None when the source lacks the bucket
+        protocol or errors, so the caller can fall back to a full GUID diff."""
+        if not (MERKLE_RECONCILE or required):
+            return None
+        try:
+            return merkle_diff(tally_records, source, start_dt.strftime('%Y-%m-%d'), end_dt.strftime('%Y-%m-%d'))
+        except Exception as e:
+            logger.warning(f"   ⚠️ Bucket checksum reconcile via {source.name} failed ({e}) — using full diff")
+            return None
+
+    def _snapshot_seed_vouchers(self, company_id: int, tally_records: List[Dict],
+                                start_dt: datetime, end_dt: datetime):
+        """Record a full, repaired reconcile of [start_dt, end_dt] in the local snapshot."""
+        store = get_snapshot_store()
+        if store is None:
+            return
+        try:
+            self._snapshot_mark_vouchers_verified(store, company_id, tally_records,
+                                                  self._month_windows(start_dt, end_dt))
+            # ALL_PERIODS marks when the backend list itself was last compared.
+            store.mark_verified(company_id, 'Voucher', {ALL_PERIODS: (len(tally_records), '')})
+            logger.info(f"   📸 Snapshot seeded: {len(tally_records)} voucher identities")
+        except Exception as e:
+            logger.debug(f"Snapshot seed failed: {e}")
+
+    def _reconcile_vouchers_from_snapshot(self, company_id: int, user_id: int, company_guid: str,
+                                          tally_host: str, tally_port: int, company_name: str,
+                                          start_dt: datetime, end_dt: datetime,
+                                          from_date: str = None, to_date: str = None) -> Optional[Dict]:
+        """Reconcile against the local snapshot, re-fetching only months that changed.
+
+        Months whose snapshot checksum still equals the one recorded at their last clean
+        reconcile (and that were verified recently) are skipped outright; the rest are
+        fetched from Tally and diffed against the snapshot — no backend download. Returns
+        None when there is no verified snapshot yet, or the snapshot no longer matches
+        the backend's month buckets, so the caller does a full reconcile.
+        """
+        import time as _time
+
+        store = get_snapshot_store()
+        if store is None:
+            return None
+        windows = self._month_windows(start_dt, end_dt)
+        w_from, w_to = start_dt.strftime('%Y-%m-%d'), end_dt.strftime('%Y-%m-%d')
+        try:
+            # Fall back to a full (backend-list) reconcile when none was ever recorded, or
+            # the backend's month buckets no longer match the snapshot (drift on the
+            # backend side, which the snapshot cannot see). A backend without bucket
+            # routes gets one every SYNC_SNAPSHOT_FULL_DAYS instead.
+            full = store.verified_periods(company_id, 'Voucher').get(ALL_PERIODS)
+            if full is None:
+                return None
+            confirmed = self._confirm_snapshot_with_backend(store, company_id, w_from, w_to)
+            if confirmed is False:
+                return None
+            if confirmed is None and _time.time() - full[2] > FULL_RECONCILE_SECONDS:
+                return None
+            dirty = set(store.dirty_periods(company_id, 'Voucher', [p for p, _, _ in windows], w_from, w_to))
+            snapshot_counts = store.period_checksums(company_id, 'Voucher', w_from, w_to)
+        except Exception as e:
+            logger.debug(f"Snapshot unavailable for reconciliation: {e}")
+            return None
+
+        reconcile_start = _time.time()
+        dirty_windows = [w for w in windows if w[0] in dirty]
+        probed = self._probe_unchanged_months(store, company_id, tally_host, tally_port, company_name,
+                                              dirty_windows, snapshot_counts)
+        if probed:
+            dirty_windows = [w for w in dirty_windows if w[0] not in probed]
+            dirty -= probed
+        clean_count = sum(snapshot_counts.get(p, (0, ''))[0] for p, _, _ in windows if p not in dirty)
+        logger.info(f"   📸 Snapshot: {len(dirty_windows)}/{len(windows)} month(s) changed or due for "
+                    f"re-verification — fetching only those ({clean_count} vouchers unchanged)")
+
+        # Merge adjacent dirty months into one Tally range each.
+        ranges = []
+        for _, w_start, w_end in dirty_windows:
+            if ranges and ranges[-1][1] + timedelta(days=1) >= w_start:
+                ranges[-1][1] = w_end
+            else:
+                ranges.append([w_start, w_end])
+
+        # Per fetched range, bucket checksums against the snapshot narrow the GUID diff
+        # down to the days that actually differ.
+        source = SnapshotBucketSource(store, company_id)
+        tally_records, missing_in_db, needs_update, extra_guids = [], [], [], []
+        snapshot_count = 0
+        for r_start, r_end in ranges:
+            records, error_msg = self._fetch_voucher_identities(r_start, r_end, tally_host, tally_port, company_name,
+                                                                company_id)
+            if error_msg:
+                result = {'success': False, 'entityType': 'Voucher', 'error': error_msg,
+                          'tallyCount': 0, 'dbCount': 0, 'missing': 0, 'updated': 0, 'synced': 0}
+                self.log_reconciliation(company_id, 'Voucher', result)
+                return result
+            tally_records.extend(records)
+            diff = self._merkle_voucher_diff(company_id, records, r_start, r_end, source, required=True)
+            if diff is None:
+                return None
+            missing_in_db.extend(diff['missing'])
+            needs_update.extend(diff['stale'])
+            # Same guard as the backend path: only extras dated inside the range Tally
+            # was just asked for in full are deletions.
+            in_window, skipped = self._orphans_in_window(diff['extra'], r_start, r_end)
+            if skipped or len(in_window) < len(diff['extra']):
+                logger.warning(f"   ⚠️ {len(diff['extra']) - len(in_window)} snapshot extra(s) outside "
+                               f"{r_start:%d-%b-%Y}..{r_end:%d-%b-%Y} or undated — not deleting")
+            extra_guids.extend(in_window)
+            snapshot_count += diff['remoteCount']
+
+        total_to_sync = len(missing_in_db) + len(needs_update)
+        logger.info(f"   📝 Missing: {len(missing_in_db)} | Stale: {len(needs_update)} | Extra: {len(extra_guids)}")
+
+        deleted_count = 0
+        if extra_guids:
+            logger.info(f"   🗑️ {len(extra_guids)} voucher(s) deleted in Tally → soft-deleting")
+            deleted_count = self._soft_delete_orphans(company_id, 'voucher', extra_guids)
+
+        synced_count = 0
+        if total_to_sync > 0:
+            synced_count = self._trigger_voucher_resync(
+                company_id, user_id, company_guid, tally_host, tally_port, company_name,
+                missing_in_db, needs_update, from_date, to_date)
+
+        if synced_count >= total_to_sync and (not extra_guids or deleted_count > 0):
+            try:
+                self._snapshot_mark_vouchers_verified(store, company_id, tally_records, dirty_windows)
+            except Exception as e:
+                logger.debug(f"Snapshot verification update failed: {e}")
+
+        tally_count = clean_count + len(tally_records)
+        reconcile_duration = _time.time() - reconcile_start
+        logger.info(f"   ✅ Snapshot reconciliation complete in {reconcile_duration:.1f}s "
+                    f"({len(ranges)} Tally range(s), DB download skipped)")
+
+        result = {
+            'success': True,
+            'entityType': 'Voucher',
+            'tallyCount': tally_count,
+            'dbCount': clean_count + snapshot_count,
+            'missing': len(missing_in_db),
+            'updated': len(needs_update),
+            'extra': len(extra_guids),
+            'synced': synced_count,
+            'deleted': deleted_count,
+            'singleFetch': True,
+            'snapshot': {'months': len(windows), 'refetchedMonths': len(dirty_windows),
+                         'probedMonths': len(probed), 'tallyRanges': len(ranges)},
+        }
+        self.log_reconciliation(company_id, 'Voucher', result)
+        try:
+            get_sync_logger().log_reconciliation(
+                company_name=company_name or f'Company {company_id}',
+                entity_type='Voucher',
+                tally_count=tally_count, db_count=result['dbCount'],
+                missing=len(missing_in_db), updated=len(needs_update),
+                synced=synced_count,
+                unchanged=max(0, tally_count - total_to_sync),
+                status='success')
+        except Exception:
+            pass
+        return result
+
+    def _probe_unchanged_months(self, store, company_id: int, tally_host: str, tally_port: int,
+                                company_name: str, dirty_windows: List[Tuple[str, datetime, datetime]],
+                                snapshot_counts: Dict[str, Tuple[int, str]]) -> set:
+        """Months of `dirty_windows` whose Tally (count, max AlterID) equals the snapshot's.
+
+        AlterIDs are company-wide and only grow, so any voucher created, edited or
+        moved into a month raises its max AlterID and any deletion lowers its count:
+        a match means the month's identities are what the snapshot holds. Those
+        months are marked verified at their current checksum. One probe request
+        covers all of them; an empty set when probing is off or Tally can't answer.
+        """
+        if not (PROBE_RECONCILE and dirty_windows):
+            return set()
+        from sync_vouchers import VoucherSyncManager
+
+        p_start, p_end = dirty_windows[0][1], dirty_windows[-1][2]
+        vsm = VoucherSyncManager(self.backend_url,
+                                 self.headers.get('Authorization', '').replace('Bearer ', ''),
+                                 self.headers.get('X-Device-Token', ''))
+        probe = vsm.probe_vouchers(p_start.strftime('%d-%b-%Y'), p_end.strftime('%d-%b-%Y'),
+                                   tally_host, tally_port, company_name, 'month')
+        if probe is None:
+            return set()
+        try:
+            local = store.period_stats(company_id, 'Voucher', p_start.strftime('%Y-%m-%d'),
+                                       p_end.strftime('%Y-%m-%d'))
+        except Exception as e:
+            logger.debug(f"Snapshot period stats unavailable: {e}")
+            return set()
+        tally = {period: (count, max_alter) for period, count, max_alter in probe['buckets']}
+        unchanged = {period for period, _, _ in dirty_windows
+                     if tally.get(period, (0, 0)) == local.get(period, (0, 0))}
+        if unchanged:
+            try:
+                store.mark_verified(company_id, 'Voucher', {
+                    period: snapshot_counts.get(period, (0, EMPTY_CHECKSUM)) for period in unchanged})
+            except Exception as e:
+                logger.debug(f"Snapshot verification update failed: {e}")
+                return set()
+        logger.info(f"   📊 Probe: {len(unchanged)}/{len(dirty_windows)} month(s) unchanged in Tally "
+                    f"— skipping their identity export")
+        return unchanged
+
     def _trigger_voucher_resync(self, company_id: int, user_id: int, company_guid: str,
                                  tally_host: str, tally_port: int, company_name: str,
                                  missing_records: List[Dict], stale_records: List[Dict],
@@ -1852,7 +2146,7 @@ class ReconciliationManager:
                     logger.error(f"   ❌ [{month_label}] Failed to fetch vouchers from Tally")
                     continue
                 
-                chunk_vouchers = vsm.parse_voucher_xml(xml_response)
+                chunk_vouchers = vsm.parse_voucher_xml(xml_response, fk={'cmpId': company_id, 'userId': user_id})
                 if not chunk_vouchers:
                     continue
                 
@@ -1885,7 +2179,7 @@ class ReconciliationManager:
                             else:
                                 failed_guids.append({
                                     'guid': single_v.get('guid', ''),
-                                    'name': f"{single_v.get('voucher_type','')} {single_v.get('voucher_number','')}",
+                                    'name': f"{single_v.get('voucherType','')} {single_v.get('voucherNumber','')}",
                                     'month': month_label
                                 })
                 
@@ -1906,7 +2200,7 @@ class ReconciliationManager:
                 synced_vouchers = [v for v in vouchers_to_sync 
                                    if v.get('guid') not in {f['guid'] for f in failed_guids}]
                 if synced_vouchers:
-                    max_alter_id = max(v.get('alter_id', 0) for v in synced_vouchers)
+                    max_alter_id = max(v.get('alterId', 0) for v in synced_vouchers)
                     if max_alter_id > 0:
                         vsm.save_last_alter_id(company_id, max_alter_id)
             
@@ -1945,7 +2239,7 @@ class ReconciliationManager:
                         logger.warning(f"      ❌ {gf['month']} | {gf['name']} | {gf['guid']}")
                 
                 # Write to reconciliation log
-                recon_log_path = os.path.join(LOG_DIR, 'voucher_reconciliation.log')
+                recon_log_path = os.path.join(ensure_log_dir(), 'voucher_reconciliation.log')
                 try:
                     with open(recon_log_path, 'a', encoding='utf-8') as f:
                         f.write(f"\n── RE-SYNC VERIFICATION ───────────────────────────────────────\n")
@@ -1994,18 +2288,13 @@ class ReconciliationManager:
 </EXPORTDATA></BODY></ENVELOPE>"""
         try:
             url = f"http://{tally_host}:{tally_port}"
-            resp = requests.post(url, data=xml_req.encode('utf-8'),
-                                 headers={'Content-Type': 'application/xml'}, timeout=30)
+            resp = tally_post(url, data=xml_req.encode('utf-8'),
+                              headers={'Content-Type': 'application/xml'}, timeout=30)
             if resp.status_code != 200:
                 logger.error(f"❌ Tally returned {resp.status_code} for {report_name}")
                 return []
 
-            # Clean XML
-            text = re.sub(r'<(/?)([a-zA-Z_]+):([a-zA-Z_]+)', r'<\1\2_\3', resp.text)
-            text = re.sub(r'&#([0-9]+);',
-                          lambda m: '' if int(m.group(1)) < 32 and int(m.group(1)) not in [9, 10, 13] else m.group(0),
-                          text)
-            root = ET.fromstring(text)
+            root = xml_backend.fromstring(response_xml(resp))
             elements = list(root)
             bills = []
             i = 0
@@ -0,0 +1,85 @@
+"""Pluggable JSON serializer for backend request bodies and the stdout result channel.
+
+Voucher sync results carry a tallyRecords entry per voucher and batch payloads
+repeat deeply nested rows, so stdlib `json` encoding shows up in profiles. This
+module picks the fastest available encoder once at import:
+
+    orjson  → msgspec → stdlib json
+
+(override with SYNC_JSON_BACKEND=orjson|msgspec|json). Both fast backends
+produce UTF-8 bytes directly, which is what `requests` sends and what the
+Electron side reads from stdout, so no intermediate str is built.
+"""
+
+import json
+import os
+import sys
+
+try:
+    import orjson as _orjson
+except ImportError:  # optional dependency
+    _orjson = None
+
+try:
+    import msgspec as _msgspec
+except ImportError:  # optional dependency
+    _msgspec = None
+
+
+def _json_default(obj):
+    # Dataclass records (voucher_records) encode as objects, as orjson/msgspec do natively.
+    fields = getattr(type(obj), '__dataclass_fields__', None)
+    if fields is not None:
+        return {name: getattr(obj, name) for name in fields}
+    return str(obj)
+
+
+def _json_dumps(obj) -> bytes:
+    return json.dumps(obj, default=_json_default).encode('utf-8')
+
+
+def _json_loads(data):
+    return json.loads(data)
+
+
+def _select_backend(preferred: str = None) -> str:
+    preferred = (preferred or os.getenv('SYNC_JSON_BACKEND', '')).strip().lower()
+    available = [name for name, mod in (('orjson', _orjson), ('msgspec', _msgspec)) if mod is not None]
+    available.append('json')
+    if preferred in available:
+        return preferred
+    return available[0]
+
+
+def get_codec(backend: str = None):
+    """Return (name, dumps, loads) for a backend; unknown/unavailable → best available."""
+    name = _select_backend(backend)
+    if name == 'orjson':
+        option = _orjson.OPT_NON_STR_KEYS
+        return name, (lambda obj: _orjson.dumps(obj, default=str, option=option)), _orjson.loads
+    if name == 'msgspec':
+        encoder = _msgspec.json.Encoder(enc_hook=str)
+        decoder = _msgspec.json.Decoder()
+        return name, encoder.encode, decoder.decode
+    return name, _json_dumps, _json_loads
+
+
+BACKEND, dumps, loads = get_codec()
+
+
+def write_result(obj, stream=None):
+    """Write one JSON document + newline to stdout (the Electron result channel).
+
+    Writes bytes straight to the underlying buffer when there is one; any text
+    already printed is flushed first so ordering with print() is preserved.
+    """
+    stream = stream or sys.stdout
+    data = dumps(obj) + b'\n'
+    buffer = getattr(stream, 'buffer', None)
+    if buffer is not None:
+        stream.flush()
+        buffer.write(data)
+        buffer.flush()
+    else:
+        stream.write(data.decode('utf-8'))
+        stream.flush()
@@ -0,0 +1,395 @@
+"""Local SQLite snapshot of Tally identities for instant reconciliation.
+
+Deep reconcile cycles used to re-download the full Tally identity set and the
+full backend list on every run. This store keeps, per company and entity,
+
+    guid → (masterId, alterId, date, change hash)
+
+for everything that has been successfully pushed to the backend. The change
+hash is `content_hash` of the full record where the caller supplies one
+(masters, whose fields can change without an AlterID bump); vouchers are only
+ever compared by identity, so theirs is `identity_hash` of
+guid|masterId|alterId|date — it says nothing about the voucher's content. Fast syncs
+upsert into it after each saved batch; a deep reconcile that finishes cleanly
+replaces the reconciled window with the Tally set and records a per-month
+checksum as "verified". The next deep cycle compares current month checksums
+against the verified ones and only re-fetches months that differ (or whose
+verification is older than SYNC_SNAPSHOT_VERIFY_HOURS, default 24, which is
+what eventually catches deletions Tally never reports through AlterIDs). The
+snapshot only stands in for the backend while the two agree: each snapshot
+reconcile first compares per-month bucket hashes (merkle_reconcile) against the
+backend, and falls back to a full reconcile on any mismatch. A backend without
+the bucket routes gets a full comparison every SYNC_SNAPSHOT_FULL_DAYS
+(default 1) instead.
+
+The database lives next to the sync logs (SYNC_SNAPSHOT_DB overrides the path,
+SYNC_SNAPSHOT=off disables it) and is safe to share between worker processes
+(WAL + busy timeout). Deleting the file only costs one full deep reconcile.
+
+The same file keeps what chunk_sizer learns about a company between runs: the
+number of vouchers Tally held on each day (from complete, unfiltered exports)
+and the per-kind request profile (records per request, seconds and bytes per
+record).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sync_logger import LOG_DIR
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ENABLED = os.getenv('SYNC_SNAPSHOT', 'on').strip().lower() not in ('off', '0', 'false', 'no')
+SNAPSHOT_DB = os.getenv('SYNC_SNAPSHOT_DB') or os.path.join(LOG_DIR, 'tally_snapshot.db')
+VERIFY_MAX_AGE_SECONDS = float(os.getenv('SYNC_SNAPSHOT_VERIFY_HOURS', '24')) * 3600
+# How often a deep cycle still compares against the full backend list, when the
+# backend cannot answer the month bucket check.
+FULL_RECONCILE_SECONDS = float(os.getenv('SYNC_SNAPSHOT_FULL_DAYS', '1')) * 86400
+
+# Period key used for entities without a date (masters): the whole entity is one bucket.
+ALL_PERIODS = '*'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS identities (
+    company_id INTEGER NOT NULL,
+    entity     TEXT    NOT NULL,
+    guid       TEXT    NOT NULL,
+    master_id  TEXT    NOT NULL DEFAULT '',
+    alter_id   INTEGER NOT NULL DEFAULT 0,
+    vdate      TEXT    NOT NULL DEFAULT '',
+    hash       TEXT    NOT NULL DEFAULT '',
+    PRIMARY KEY (company_id, entity, guid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_identities_date ON identities (company_id, entity, vdate);
+CREATE TABLE IF NOT EXISTS verified_periods (
+    company_id  INTEGER NOT NULL,
+    entity      TEXT    NOT NULL,
+    period      TEXT    NOT NULL,
+    records     INTEGER NOT NULL,
+    checksum    TEXT    NOT NULL,
+    verified_at REAL    NOT NULL,
+    PRIMARY KEY (company_id, entity, period)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS day_counts (
+    company_id  INTEGER NOT NULL,
+    entity      TEXT    NOT NULL,
+    day         TEXT    NOT NULL,
+    records     INTEGER NOT NULL,
+    observed_at REAL    NOT NULL,
+    PRIMARY KEY (company_id, entity, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS chunk_profiles (
+    company_id         INTEGER NOT NULL,
+    kind               TEXT    NOT NULL,
+    budget             REAL,
+    seconds_per_record REAL,
+    bytes_per_record   REAL,
+    updated_at         REAL    NOT NULL,
+    PRIMARY KEY (company_id, kind)
+) WITHOUT ROWID;
+"""
+
+
+def normalize_date(value) -> str:
+    """'20240401' / '2024-04-01T..' / '01-Apr-2024' / date → '2024-04-01' ('' if unknown)."""
+    if not value:
+        return ''
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    s = str(value).strip()
+    if len(s) >= 10 and s[4] == '-' and s[7] == '-':
+        return s[:10]
+    if len(s) == 8 and s.isdigit():
+        return f"{s[:4]}-{s[4:6]}-{s[6:]}"
+    try:
+        return datetime.strptime(s, '%d-%b-%Y').strftime('%Y-%m-%d')
+    except ValueError:
+        return ''
+
+
+def identity_hash(guid: str, master_id: str, alter_id: int, vdate: str) -> str:
+    """Hash of a record's identity fields only — equal for two versions with the same AlterID."""
+    return hashlib.sha1(f"{guid}|{master_id}|{alter_id}|{vdate}".encode('utf-8')).hexdigest()[:16]
+
+
+def identity_of(rec: Dict) -> Optional[Tuple[str, str, int, str, str]]:
+    """(guid, masterId, alterId, date, change hash) from a Tally identity / parsed / backend record.
+
+    The change hash is the record's `contentHash` when it carries one (see
+    content_hash), else its identity_hash. Accepts both the reconciliation
+    spelling (masterID/alterID) and the camelCase wire format
+    (masterId/alterId/voucherDate).
+    """
+    guid = rec.get('guid') or rec.get('GUID')
+    if not guid:
+        return None
+    master_id = str(rec.get('masterID', rec.get('masterId', '')) or '')
+    try:
+        alter_id = int(rec.get('alterID', rec.get('alterId', 0)) or 0)
+    except (ValueError, TypeError):
+        alter_id = 0
+    vdate = normalize_date(rec.get('date') or rec.get('voucherDate'))
+    digest = rec.get('contentHash') or identity_hash(str(guid), master_id, alter_id, vdate)
+    return str(guid), master_id, alter_id, vdate, digest
+
+
+def content_hash(rec: Dict) -> str:
+    """Hash of a full parsed master record, so field edits show up even at equal AlterIDs."""
+    return hashlib.sha1(json.dumps(rec, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def _period_of(vdate: str, granularity: str) -> str:
+    if not vdate:
+        return ALL_PERIODS
+    return vdate[:7] if granularity == 'month' else vdate[:10]
+
+
+class SnapshotStore:
+    """Per-company identity snapshot backed by a single SQLite file."""
+
+    def __init__(self, path: str = None):
+        self.path = path or SNAPSHOT_DB
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ── Writes ────────────────────────────────────────────────────
+
+    def upsert(self, company_id: int, entity: str, records: Iterable[Dict]) -> int:
+        """Insert or update identities (called after each batch the backend accepted)."""
+        rows = [(company_id, entity) + ident for ident in map(identity_of, records) if ident]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO identities (company_id, entity, guid, master_id, alter_id, vdate, hash) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (company_id, entity, guid) DO UPDATE SET '
+                'master_id = excluded.master_id, alter_id = excluded.alter_id, '
+                'vdate = excluded.vdate, hash = excluded.hash', rows)
+        return len(rows)
+
+    def delete(self, company_id: int, entity: str, guids: Iterable[str]) -> int:
+        rows = [(company_id, entity, str(g)) for g in guids if g]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'DELETE FROM identities WHERE company_id = ? AND entity = ? AND guid = ?', rows)
+        return len(rows)
+
+    def replace(self, company_id: int, entity: str, records: Iterable[Dict],
+                from_date: str = None, to_date: str = None) -> int:
+        """Make the snapshot equal `records` — within [from_date, to_date] when given,
+        otherwise for the whole entity (masters)."""
+        rows = [(company_id, entity) + ident for ident in map(identity_of, records) if ident]
+        with self._lock, self._conn:
+            if from_date or to_date:
+                self._conn.execute(
+                    'DELETE FROM identities WHERE company_id = ? AND entity = ? AND vdate BETWEEN ? AND ?',
+                    (company_id, entity, normalize_date(from_date) or '0000-00-00',
+                     normalize_date(to_date) or '9999-12-31'))
+            else:
+                self._conn.execute('DELETE FROM identities WHERE company_id = ? AND entity = ?',
+                                   (company_id, entity))
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO identities (company_id, entity, guid, master_id, alter_id, vdate, hash) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def mark_verified(self, company_id: int, entity: str, checksums: Dict[str, Tuple[int, str]]):
+        """Record period checksums ({period: (records, checksum)}) as matching Tally now."""
+        now = time.time()
+        rows = [(company_id, entity, period, count, digest, now)
+                for period, (count, digest) in checksums.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO verified_periods '
+                '(company_id, entity, period, records, checksum, verified_at) VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def invalidate(self, company_id: int, entity: str = None):
+        """Forget verification state so the next deep cycle re-fetches everything."""
+        with self._lock, self._conn:
+            if entity:
+                self._conn.execute('DELETE FROM verified_periods WHERE company_id = ? AND entity = ?',
+                                   (company_id, entity))
+            else:
+                self._conn.execute('DELETE FROM verified_periods WHERE company_id = ?', (company_id,))
+
+    def record_day_counts(self, company_id: int, entity: str, counts: Dict[str, int]):
+        """Store observed records per day ({'YYYY-MM-DD': n}, zero days included)."""
+        now = time.time()
+        rows = [(company_id, entity, day, int(n), now) for day, n in counts.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO day_counts (company_id, entity, day, records, observed_at) '
+                'VALUES (?, ?, ?, ?, ?)', rows)
+
+    def save_chunk_profile(self, company_id: int, kind: str, profile: Dict):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO chunk_profiles '
+                '(company_id, kind, budget, seconds_per_record, bytes_per_record, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (company_id, kind, profile.get('budget'), profile.get('secondsPerRecord'),
+                 profile.get('bytesPerRecord'), time.time()))
+
+    # ── Reads ─────────────────────────────────────────────────────
+
+    def count(self, company_id: int, entity: str) -> int:
+        with self._lock:
+            row = self._conn.execute('SELECT COUNT(*) FROM identities WHERE company_id = ? AND entity = ?',
+                                     (company_id, entity)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, company_id: int, entity: str, from_date: str = None,
+             to_date: str = None) -> Dict[str, Dict]:
+        """guid → {guid, masterID, alterID, date, hash} (optionally date-scoped)."""
+        sql = ('SELECT guid, master_id, alter_id, vdate, hash FROM identities '
+               'WHERE company_id = ? AND entity = ?')
+        params = [company_id, entity]
+        if from_date or to_date:
+            sql += ' AND vdate BETWEEN ? AND ?'
+            params += [normalize_date(from_date) or '0000-00-00', normalize_date(to_date) or '9999-12-31']
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return {guid: {'guid': guid, 'masterID': master_id, 'alterID': alter_id, 'date': vdate, 'hash': digest}
+                for guid, master_id, alter_id, vdate, digest in rows}
+
+    def identity_tuples(self, company_id: int, entity: str, from_date: str = None,
+                        to_date: str = None) -> List[Tuple[str, int, str]]:
+        """(guid, alterId, date) rows, optionally date-scoped — the cheap form for bucket hashing."""
+        sql = 'SELECT guid, alter_id, vdate FROM identities WHERE company_id = ? AND entity = ?'
+        params = [company_id, entity]
+        if from_date or to_date:
+            sql += ' AND vdate BETWEEN ? AND ?'
+            params += [normalize_date(from_date) or '0000-00-00', normalize_date(to_date) or '9999-12-31']
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def period_checksums(self, company_id: int, entity: str, from_date: str = None,
+                         to_date: str = None, granularity: str = 'month') -> Dict[str, Tuple[int, str]]:
+        """{period: (records, checksum)} — 'YYYY-MM' (or 'YYYY-MM-DD' for granularity='day')."""
+        sql = 'SELECT vdate, hash FROM identities WHERE company_id = ? AND entity = ?'
+        params = [company_id, entity]
+        if from_date or to_date:
+            sql += ' AND vdate BETWEEN ? AND ?'
+            params += [normalize_date(from_date) or '0000-00-00', normalize_date(to_date) or '9999-12-31']
+        with self._lock:
+            rows = self._conn.execute(sql + ' ORDER BY vdate, guid', params).fetchall()
+        return checksum_periods(rows, granularity)
+
+    def period_stats(self, company_id: int, entity: str, from_date: str = None,
+                     to_date: str = None, granularity: str = 'month') -> Dict[str, Tuple[int, int]]:
+        """{period: (records, max alterId)} — the snapshot side of a Tally voucher probe."""
+        width = 7 if granularity == 'month' else 10
+        sql = (f'SELECT substr(vdate, 1, {width}) AS period, COUNT(*), MAX(alter_id) FROM identities '
+               'WHERE company_id = ? AND entity = ?')
+        params = [company_id, entity]
+        if from_date or to_date:
+            sql += ' AND vdate BETWEEN ? AND ?'
+            params += [normalize_date(from_date) or '0000-00-00', normalize_date(to_date) or '9999-12-31']
+        with self._lock:
+            rows = self._conn.execute(sql + ' GROUP BY period', params).fetchall()
+        return {period: (count, max_alter) for period, count, max_alter in rows}
+
+    def day_counts(self, company_id: int, entity: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT day, records FROM day_counts WHERE company_id = ? AND entity = ?',
+                                      (company_id, entity)).fetchall()
+        return dict(rows)
+
+    def chunk_profile(self, company_id: int, kind: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT budget, seconds_per_record, bytes_per_record FROM chunk_profiles '
+                'WHERE company_id = ? AND kind = ?', (company_id, kind)).fetchone()
+        if not row:
+            return {}
+        return {'budget': row[0], 'secondsPerRecord': row[1], 'bytesPerRecord': row[2]}
+
+    def verified_periods(self, company_id: int, entity: str) -> Dict[str, Tuple[int, str, float]]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT period, records, checksum, verified_at FROM verified_periods '
+                'WHERE company_id = ? AND entity = ?', (company_id, entity)).fetchall()
+        return {period: (count, digest, at) for period, count, digest, at in rows}
+
+    def dirty_periods(self, company_id: int, entity: str, periods: List[str],
+                      from_date: str = None, to_date: str = None,
+                      max_age: float = None) -> List[str]:
+        """Periods whose current checksum differs from the verified one, were never
+        verified, or were verified longer than `max_age` seconds ago."""
+        max_age = VERIFY_MAX_AGE_SECONDS if max_age is None else max_age
+        current = self.period_checksums(company_id, entity, from_date, to_date)
+        verified = self.verified_periods(company_id, entity)
+        now = time.time()
+        dirty = []
+        for period in periods:
+            state = verified.get(period)
+            if (state is None or now - state[2] > max_age
+                    or current.get(period, (0, EMPTY_CHECKSUM)) != (state[0], state[1])):
+                dirty.append(period)
+        return dirty
+
+
+def checksum_periods(rows: Iterable[Tuple[str, str]], granularity: str = 'month') -> Dict[str, Tuple[int, str]]:
+    """Fold (date, hash) rows (sorted by date, guid) into {period: (records, sha1)}."""
+    result = {}
+    current = None
+    hasher = None
+    count = 0
+    for vdate, digest in rows:
+        period = _period_of(vdate, granularity)
+        if period != current:
+            if current is not None:
+                result[current] = (count, hasher.hexdigest())
+            current, hasher, count = period, hashlib.sha1(), 0
+        hasher.update(digest.encode('ascii'))
+        count += 1
+    if current is not None:
+        result[current] = (count, hasher.hexdigest())
+    return result
+
+
+def checksum_records(records: Iterable[Dict], granularity: str = 'month') -> Dict[str, Tuple[int, str]]:
+    """Same checksums as SnapshotStore.period_checksums, computed from in-memory records."""
+    idents = sorted((ident[3], ident[0], ident[4]) for ident in map(identity_of, records) if ident)
+    return checksum_periods(((vdate, digest) for vdate, _, digest in idents), granularity)
+
+
+EMPTY_CHECKSUM = hashlib.sha1().hexdigest()
+
+_store = None
+_store_failed = False  # opening failed once: stay disabled for the rest of the process
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> Optional[SnapshotStore]:
+    """Process-wide store, or None when disabled / the file cannot be opened."""
+    global _store, _store_failed
+    if not SNAPSHOT_ENABLED or _store_failed:
+        return None
+    with _store_lock:
+        if _store is None and not _store_failed:
+            try:
+                _store = SnapshotStore()
+            except (sqlite3.Error, OSError) as e:
+                _store_failed = True
+                logger.warning(f"⚠️ Snapshot store unavailable ({SNAPSHOT_DB}): {e}")
+        return _store
@@ -0,0 +1,313 @@
+"""Streaming NDJSON upload of voucher batches to the backend.
+
+Fixed 50-voucher POSTs cost one request (headers, JSON array framing, backend
+transaction) per 50 vouchers — 2,000 round trips for a 100k-voucher first
+sync even with several in flight. `StreamUploader` writes the same batches as
+newline-delimited JSON into one long-lived chunked request per chunk range, so
+the backend ingests while the worker is still parsing:
+
+    POST {backend}/vouchers/sync/stream
+        X-Sync-Stream: <id>         one id per upload() call
+        X-Sync-Offset: <n>          stream offset of the body's first line
+        Content-Type: application/x-ndjson  (Transfer-Encoding: chunked)
+        body: one wire voucher per line
+
+    200 → {"acknowledged": A, "savedCount": S, "rejected": [{"offset": i, "error": "..."}]}
+
+A is the number of leading lines of the stream the backend has committed.
+Lines past A stay in a local buffer and are re-sent at the start of the next
+request (the resume); a rejected offset fails only the batch holding it.
+After a dropped connection `GET {backend}/vouchers/sync/stream/<id>` →
+{"acknowledged": A} says where to resume, and the same route is the capability
+check: a backend without it (404/405, or any answer but an acknowledged
+offset) keeps getting BatchUploader POSTs. Nothing sleeps: these requests
+skip sync_logger's retry backoff (no_request_retries), a resume is sent as
+soon as the offset is known, and the upload gives up after MAX_RESUMES
+attempts without progress. Giving up (or a fatal 4xx) closes the batch source instead
+of reading it to the end: the producer stops parsing, and the report says
+`cancelled` with allSucceeded false.
+
+The uploader keeps BatchUploader's interface: `upload(batches, on_result)`
+with per-batch results, so the "advance the AlterID watermark only if every
+batch saved" rule is unchanged. One request covers consecutive batches with
+the same `group` key (a month of the pipelined sync), at most
+SYNC_STREAM_MAX_RECORDS lines. SYNC_UPLOAD_MODE=batch forces POSTs,
+SYNC_UPLOAD_MODE=stream skips the capability check.
+"""
+
+import collections
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+
+import requests
+
+import serializer
+from sync_logger import no_request_retries
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_MODE = os.getenv('SYNC_UPLOAD_MODE', 'auto').strip().lower()
+MAX_RECORDS = int(os.getenv('SYNC_STREAM_MAX_RECORDS', '2000'))
+MAX_RESUMES = 3
+_FATAL_STATUS = {400, 401, 403, 404, 405, 413, 415}
+_TRANSIENT_STATUS = {429, 500, 502, 503, 504}
+
+_support = {}  # stream url → bool
+_support_lock = threading.Lock()
+
+
+def stream_supported(url: str, headers: dict) -> bool:
+    """Whether `url` accepts NDJSON streams (probed once per process).
+
+    Fails closed: only a 200 whose JSON object carries an integer
+    "acknowledged" counts as support. Any other answer means batch POSTs;
+    a transport error or 429/5xx is not remembered, so the next sync probes again.
+    """
+    if UPLOAD_MODE == 'batch':
+        return False
+    if UPLOAD_MODE == 'stream':
+        return True
+    with _support_lock:
+        if url in _support:
+            return _support[url]
+        try:
+            with no_request_retries():
+                response = requests.get(f"{url}/{uuid.uuid4().hex}", headers=headers, timeout=10)
+            status = response.status_code
+            payload = response.json() if status == 200 else None
+        except Exception as e:
+            logger.debug(f"Stream capability check failed for {url}: {e}")
+            return False
+        supported = isinstance(payload, dict) and type(payload.get('acknowledged')) is int
+        if status in _TRANSIENT_STATUS:
+            logger.debug(f"Stream capability check for {url} got HTTP {status} — batches for now")
+            return False
+        _support[url] = supported
+        if not supported:
+            logger.info(f"📤 {url} does not take NDJSON streams (HTTP {status}) — uploading in batches")
+        return supported
+
+
+def _close(source):
+    """Stop a batch source early (generators run their cleanup; others are dropped)."""
+    close = getattr(source, 'close', None)
+    if close is not None:
+        close()
+
+
+class _Entry:
+    """One batch inside the stream: its lines and where they start."""
+
+    __slots__ = ('index', 'item', 'first', 'lines', 'nbytes')
+
+    def __init__(self, index, item, first, lines):
+        self.index = index
+        self.item = item
+        self.first = first
+        self.lines = lines
+        self.nbytes = sum(len(line) for line in lines)
+
+
+class StreamUploader:
+    """Upload batches as NDJSON over one chunked request per group of batches."""
+
+    def __init__(self, url: str, headers: dict, records=None, group=None, prefetch: int = 0,
+                 max_records: int = None, name: str = 'upload'):
+        self.url = url
+        self.headers = dict(headers or {})
+        self.headers['Content-Type'] = 'application/x-ndjson'
+        self.records = records or (lambda item: item)
+        self.group = group
+        self.prefetch = prefetch
+        self.max_records = max_records or MAX_RECORDS
+        self.name = name
+
+    # ── source ────────────────────────────────────────────────────
+
+    def _prefetched(self, source):
+        """Pull `source` on a helper thread so producing batches overlaps sending them.
+
+        Closing the returned generator stops the helper and closes `source` on it.
+        """
+        q = queue.Queue(maxsize=self.prefetch)
+        done = object()
+        stop = threading.Event()
+
+        def pump():
+            try:
+                for item in source:
+                    if stop.is_set():
+                        break
+                    q.put(item)
+            except Exception as e:
+                logger.error(f"❌ [{self.name}] batch source failed: {e}")
+            finally:
+                _close(source)
+                q.put(done)
+
+        threading.Thread(target=pump, name=f'{self.name}-prefetch', daemon=True).start()
+        item = None
+        try:
+            while (item := q.get()) is not done:
+                yield item
+        finally:
+            if item is not done:
+                stop.set()
+                while q.get() is not done:  # unblock the helper; it stops at the next item
+                    pass
+
+    # ── upload ────────────────────────────────────────────────────
+
+    def upload(self, batches, on_result=None) -> dict:
+        """Send every item from `batches`; same report shape as BatchUploader.upload."""
+        started = time.perf_counter()
+        source = iter(batches)
+        if self.prefetch:
+            source = self._prefetched(source)
+        stream_id = uuid.uuid4().hex
+        pending = collections.deque()
+        rejected = {}
+        results = []
+        report = {'batches': 0, 'succeeded': 0, 'failed': 0, 'saved': 0, 'bytes': 0,
+                  'requests': 0, 'resumes': 0, 'cancelled': False}
+        state = {'acked': 0, 'next': 0, 'carry': None, 'exhausted': False}
+
+        def take():
+            if state['carry'] is not None:
+                item, state['carry'] = state['carry'], None
+                return item
+            if state['exhausted']:
+                return None
+            try:
+                return next(source)
+            except StopIteration:
+                state['exhausted'] = True
+                return None
+
+        def resolve(status, error=None):
+            """Report every batch the backend has acknowledged (or, with `error`, all pending)."""
+            while pending and (error or pending[0].first + len(pending[0].lines) <= state['acked']):
+                entry = pending.popleft()
+                bad = [rejected.pop(o) for o in range(entry.first, entry.first + len(entry.lines))
+                       if o in rejected]
+                if error:
+                    result = {'success': False, 'saved': 0, 'status': status, 'bytes': entry.nbytes,
+                              'error': error}
+                else:
+                    result = {'success': not bad, 'saved': len(entry.lines) - len(bad), 'status': status,
+                              'bytes': entry.nbytes,
+                              'error': f"{len(bad)} record(s) rejected: {bad[0]}" if bad else None}
+                results[entry.index] = result
+                report['bytes'] += entry.nbytes
+                if result['success']:
+                    report['succeeded'] += 1
+                else:
+                    report['failed'] += 1
+                report['saved'] += result['saved']
+                if on_result is not None:
+                    on_result(entry.item, result)
+
+        def body(offset):
+            sent = 0
+            key = self.group(pending[0].item) if (self.group and pending) else None
+            for entry in pending:  # resume: whatever the backend has not committed yet
+                lines = entry.lines[max(0, offset - entry.first):]
+                if lines:
+                    sent += len(lines)
+                    yield b''.join(lines)
+            while sent < self.max_records:
+                item = take()
+                if item is None:
+                    return
+                if self.group is not None:
+                    item_key = self.group(item)
+                    if (pending or sent) and item_key != key:
+                        state['carry'] = item
+                        return
+                    key = item_key
+                lines = [serializer.dumps(r) + b'\n' for r in self.records(item)]
+                entry = _Entry(report['batches'], item, state['next'], lines)
+                report['batches'] += 1
+                results.append(None)
+                state['next'] += len(lines)
+                pending.append(entry)
+                if lines:
+                    sent += len(lines)
+                    yield b''.join(lines)
+
+        attempts = 0
+        while True:
+            if not pending:
+                item = take()
+                if item is None:
+                    break
+                state['carry'] = item
+            offset = state['acked']
+            headers = dict(self.headers, **{'X-Sync-Stream': stream_id, 'X-Sync-Offset': str(offset)})
+            status, error = None, None
+            report['requests'] += 1
+            try:
+                with no_request_retries():
+                    response = requests.post(self.url, data=body(offset), headers=headers, timeout=(10, 300))
+                status = response.status_code
+                payload = response.json() if response.content else {}
+                if status in (200, 201, 409) and 'acknowledged' in payload:
+                    state['acked'] = max(state['acked'], int(payload['acknowledged']))
+                    for rej in payload.get('rejected') or []:
+                        rejected[int(rej.get('offset', -1))] = rej.get('error') or 'rejected'
+                else:
+                    error = f"HTTP {status}: {response.text[:200]}"
+            except Exception as e:
+                error = str(e)[:200]
+                try:  # the connection dropped mid-stream: ask how far the backend got
+                    with no_request_retries():
+                        status_resp = requests.get(f"{self.url}/{stream_id}", headers=self.headers, timeout=10)
+                    if status_resp.status_code == 200:
+                        state['acked'] = max(state['acked'], int(status_resp.json().get('acknowledged', 0)))
+                except Exception:
+                    pass
+
+            resolve(status)
+            if not pending:
+                attempts = 0
+                continue
+            attempts = 0 if state['acked'] > offset else attempts + 1
+            report['resumes'] += 1
+            fatal = status in _FATAL_STATUS
+            logger.warning(f"⚠️ [{self.name}] stream stopped at offset {state['acked']:,} "
+                           f"({error or 'partially acknowledged'}) — "
+                           f"{'giving up' if fatal or attempts > MAX_RESUMES else 'resuming'}")
+            if fatal or attempts > MAX_RESUMES:
+                if state['carry'] is not None:  # taken for the next request, never sent
+                    item, state['carry'] = state['carry'], None
+                    results.append(None)
+                    pending.append(_Entry(report['batches'], item, state['next'], []))
+                    report['batches'] += 1
+                resolve(status, error or 'stream not acknowledged')
+                # Stop the producer rather than parse the rest of the export just to fail it.
+                report['cancelled'] = not state['exhausted']
+                _close(source)
+                break
+
+        elapsed = time.perf_counter() - started
+        report.update({
+            'allSucceeded': report['failed'] == 0 and not report['cancelled'],
+            'elapsedSeconds': round(elapsed, 3),
+            'batchesPerSec': round(report['batches'] / elapsed, 2) if elapsed > 0 else 0.0,
+            'bytesPerSec': round(report['bytes'] / elapsed, 1) if elapsed > 0 else 0.0,
+            'peakWindow': 1,
+            'finalWindow': 1,
+            'throttled': 0,
+            'retried': 0,
+            'results': results,
+        })
+        if report['batches']:
+            logger.info(f"📤 [{self.name}] {report['succeeded']}/{report['batches']} batch(es) ok over "
+                        f"{report['requests']} stream request(s), {report['bytesPerSec'] / 1024:.1f} KiB/s "
+                        f"(resumed {report['resumes']}x"
+                        f"{', rest of the source cancelled' if report['cancelled'] else ''})")
+        return report
@@ -0,0 +1,83 @@
+"""Per-sync string table and dictionary-encoded upload payloads.
+
+Ledger, stock item, godown, unit and voucher type names repeat across tens of
+thousands of parsed rows, and every one of them is a fresh `str` built from an
+element's `.text.strip()`. A `SymbolTable` lives as long as one sync (one
+VoucherSyncManager / IncrementalSyncManager) and hands back a single shared
+object per distinct value, so a year of parsed vouchers holds each name once.
+Unlike `sys.intern` the table — and the names in it — go away with the sync.
+
+The same repetition is what `encode_records` removes from an upload body:
+
+    {"symbols": ["Sales", "Cash", ...],
+     "symbolFields": ["ledgerName", ...],
+     "records": [{..., "ledgerName": 0, ...}, ...]}
+
+Every listed field (at any nesting depth) holding a string is replaced by its
+index in the batch's own `symbols` list, so each body decodes on its own —
+batches go out concurrently and are retried independently. `decode_records`
+restores the records. backend_http sends this form only when
+SYNC_PAYLOAD_ENCODING=symbols and the endpoint accepts it.
+"""
+
+from typing import Dict, Iterable, List
+
+
+class SymbolTable:
+    """One shared str object per distinct value, for the lifetime of a sync."""
+
+    __slots__ = ('_symbols',)
+
+    def __init__(self):
+        self._symbols = {}
+
+    def intern(self, value):
+        """Return the table's copy of `value` (added on first sight); falsy values pass through."""
+        if not value:
+            return value
+        return self._symbols.setdefault(value, value)
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+
+def encode_records(records: Iterable, fields: Iterable[str]) -> Dict:
+    """Dictionary-encode a batch of records (dicts or voucher_records types)."""
+    fields = frozenset(fields)
+    symbols: List[str] = []
+    index: Dict[str, int] = {}
+
+    def encode(record) -> Dict:
+        out = {}
+        for key, value in record.items():
+            if type(value) is list:
+                value = [encode(row) for row in value]
+            elif type(value) is str and key in fields:
+                ref = index.get(value)
+                if ref is None:
+                    ref = index[value] = len(symbols)
+                    symbols.append(value)
+                value = ref
+            out[key] = value
+        return out
+
+    encoded = [encode(record) for record in records]
+    return {'symbols': symbols, 'symbolFields': sorted(fields), 'records': encoded}
+
+
+def decode_records(payload: Dict) -> List[Dict]:
+    """Inverse of encode_records: the records with every reference resolved."""
+    symbols = payload.get('symbols') or []
+    fields = frozenset(payload.get('symbolFields') or ())
+
+    def decode(record: Dict) -> Dict:
+        for key, value in record.items():
+            if type(value) is list:
+                for row in value:
+                    if type(row) is dict:
+                        decode(row)
+            elif key in fields and type(value) is int:
+                record[key] = symbols[value]
+        return record
+
+    return [decode(record) for record in payload.get('records') or []]
@@ -14,12 +14,14 @@ import requests
 import json
 import logging
 import sys
-import re
 import os
-import xml.etree.ElementTree as ET
 from datetime import datetime
 
 from sync_logger import get_sync_logger
+from tally_http import cached_company_check, tally_post
+from backend_http import post_json
+from xml_sanitizer import response_xml
+import xml_backend
 
 # Setup logging
 LOG_LEVEL = os.getenv('SYNC_LOG_LEVEL', 'INFO')
@@ -46,22 +48,30 @@ def verify_tally_company(tally_url: str, expected_company_name: str) -> tuple:
     Returns: (is_loaded: bool, matched_name: str|None, active_companies: list[str])
         matched_name is Tally's EXACT company name on an exact match; callers
         should use it for SVCURRENTCOMPANY so Tally targets the right company.
+
+    A positive answer is reused for TALLY_COMPANY_VERIFY_TTL seconds (shared with
+    the master and voucher syncs via tally_http).
     """
+    return cached_company_check(tally_url, expected_company_name,
+                                lambda: _query_tally_company(tally_url, expected_company_name))
+
+
+def _query_tally_company(tally_url: str, expected_company_name: str) -> tuple:
+    """Ask Tally for the loaded companies and match `expected_company_name` exactly."""
     xml_req = """<ENVELOPE>
 <HEADER><VERSION>1</VERSION><TALLYREQUEST>Export</TALLYREQUEST><TYPE>Collection</TYPE><ID>Collection of Companies</ID></HEADER>
 <BODY><DESC><STATICVARIABLES><SVFROMDATE TYPE="Date">01-Jan-1970</SVFROMDATE><SVTODATE TYPE="Date">01-Jan-1970</SVTODATE><SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT></STATICVARIABLES>
 <TDL><TDLMESSAGE><COLLECTION NAME="Collection of Companies" ISMODIFY="No"><TYPE>Company</TYPE><FETCH>NAME</FETCH><FILTERS>GroupFilter</FILTERS></COLLECTION><SYSTEM TYPE="FORMULAE" NAME="GroupFilter">$isaggregate = "No"</SYSTEM></TDLMESSAGE></TDL></DESC></BODY></ENVELOPE>"""
 
     try:
-        resp = requests.post(tally_url, data=xml_req.encode('utf-8'),
-                             headers={'Content-Type': 'application/xml'},
-                             timeout=10)
+        resp = tally_post(tally_url, data=xml_req.encode('utf-8'),
+                          headers={'Content-Type': 'application/xml'},
+                          timeout=10)
         if resp.status_code != 200:
             logger.warning(f"⚠️ Could not verify Tally companies (HTTP {resp.status_code})")
             return False, None, []
 
-        text = clean_xml(resp.text)
-        root = ET.fromstring(text)
+        root = xml_backend.fromstring(response_xml(resp))
         
         companies = []
         for elem in root.iter('COMPANY'):
@@ -117,18 +127,6 @@ def parse_tally_date(date_str):
     return None
 
 
-def clean_xml(xml_string):
-    """Remove invalid XML characters and strip namespace prefixes (e.g. UDF:)"""
-    # Strip namespace prefixes like <UDF:FIELD> → <UDF_FIELD>
-    xml_string = re.sub(r'<(/?)([a-zA-Z_]+):([a-zA-Z_]+)', r'<\1\2_\3', xml_string)
-    # Remove invalid XML character entities that are non-printable
-    return re.sub(
-        r'&#([0-9]+);',
-        lambda m: '' if int(m.group(1)) < 32 and int(m.group(1)) not in [9, 10, 13] else m.group(0),
-        xml_string
-    )
-
-
 def fetch_bills_from_tally(tally_url, company_name, report_name):
     """Fetch bill-wise outstanding using Tally's built-in report export.
     
@@ -151,15 +149,14 @@ def fetch_bills_from_tally(tally_url, company_name, report_name):
 </EXPORTDATA></BODY></ENVELOPE>"""
 
     try:
-        resp = requests.post(tally_url, data=xml_req.encode('utf-8'),
-                             headers={'Content-Type': 'application/xml'},
-                             timeout=30)
+        resp = tally_post(tally_url, data=xml_req.encode('utf-8'),
+                          headers={'Content-Type': 'application/xml'},
+                          timeout=30)
         if resp.status_code != 200:
             logger.error(f"Tally returned {resp.status_code} for {report_name}")
             return []
 
-        text = clean_xml(resp.text)
-        root = ET.fromstring(text)
+        root = xml_backend.fromstring(response_xml(resp))
         elements = list(root)
         bills = []
         i = 0
@@ -229,12 +226,8 @@ def push_to_backend(backend_url, headers, company_id, report_type, bills):
         'bills': bills
     }
     try:
-        resp = requests.post(
-            f"{backend_url}/bills-outstanding/sync",
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
+        resp, _, _ = post_json(f"{backend_url}/bills-outstanding/sync", payload,
+                               headers, timeout=30, label=f"bills-outstanding ({report_type})")
         if resp.status_code == 200:
             result = resp.json()
             return True, result.get('count', len(bills))
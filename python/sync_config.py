@@ -12,6 +12,16 @@ SYNC_ORDER = [
     'Ledger', 'StockItem',
 ]
 
+# Entity type -> entities that must be synced before it (the backend resolves
+# parents / units / categories by name). Anything not listed depends on nothing
+# and may run alongside other entities; see sync_scheduler.
+SYNC_DEPENDENCIES = {
+    'StockGroup': ('Unit',),
+    'CostCenter': ('CostCategory',),
+    'Ledger': ('Group', 'Currency'),
+    'StockItem': ('StockGroup', 'StockCategory', 'Unit'),
+}
+
 # Entity type -> backend REST collection endpoint.
 ENTITY_ENDPOINTS = {
     'Group': '/groups',
@@ -9,12 +9,15 @@ if sys.stderr.encoding and sys.stderr.encoding.lower() != 'utf-8':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
 import requests
-import xml.etree.ElementTree as ET
-import re
 import json
 import os
 import threading
 
+from tally_http import cached_company_check, tally_post
+from backend_http import post_json
+from xml_sanitizer import response_xml, sanitize
+import xml_backend
+
 TALLY_URL_TEMPLATE = "http://localhost:{}"
 BACKEND_URL_DEFAULT = "http:// 35.175.182.24:8080"
 
@@ -217,17 +220,14 @@ class FinancialReportSync:
         except Exception:
             return "Full"
 
-    def _clean_xml(self, xml_text):
-        # Sanitize invalid XML characters like &#4; that Tally sends
-        xml_text = re.sub(r'&#4;', '', xml_text)  # Remove &#4; specifically
-        xml_text = re.sub(r'&#x?[0-3][\da-fA-F];', '', xml_text)  # Remove other control chars
-        return xml_text
-
     def _post_to_backend(self, endpoint, data, report_name):
         sync_url = f"{self.backend_url}{endpoint}"
         print(f"Syncing {report_name} to backend at {sync_url}...")
         try:
-            response = requests.post(sync_url, json=data, headers=self.headers, timeout=30)
+            response, raw_bytes, wire_bytes = post_json(sync_url, data, self.headers, timeout=30,
+                                                        label=report_name)
+            if wire_bytes != raw_bytes:
+                print(f"Compressed {report_name} payload: {raw_bytes:,} -> {wire_bytes:,} bytes")
             if response.status_code in [200, 201]:
                 print(f"[SUCCESS] {report_name} successfully synced to database (Count: {len(data)})")
                 return True
@@ -260,17 +260,17 @@ class FinancialReportSync:
         tdl = TDL_BALANCE_SHEET.replace("{escaped_company}", escaped).replace("{from_date}", self.from_date).replace("{to_date}", self.to_date)
         
         try:
-            response = requests.post(self.tally_url, data=tdl.encode('utf-8'), timeout=60)
+            response = tally_post(self.tally_url, data=tdl.encode('utf-8'), timeout=60)
             if response.status_code != 200:
                 print(f"Failed to connect to Tally. Status Code: {response.status_code}")
                 return False
 
-            xml_text = self._clean_xml(response.text)
+            xml_text = sanitize(response.text)
             if "DSPACCNAME" not in xml_text:
                 print("Invalid response from Tally. It may not have exported properly.")
                 return False
 
-            root = ET.fromstring(xml_text)
+            root = xml_backend.fromstring(xml_text)
             parsed_data = []
             current_bsname = None
             
@@ -324,17 +324,17 @@ class FinancialReportSync:
         tdl = TDL_PROFIT_LOSS.replace("{escaped_company}", escaped).replace("{from_date}", self.from_date).replace("{to_date}", self.to_date)
         
         try:
-            response = requests.post(self.tally_url, data=tdl.encode('utf-8'), timeout=60)
+            response = tally_post(self.tally_url, data=tdl.encode('utf-8'), timeout=60)
             if response.status_code != 200:
                 print(f"Failed to connect to Tally. Status Code: {response.status_code}")
                 return False
 
-            xml_text = self._clean_xml(response.text)
+            xml_text = sanitize(response.text)
             if "DSPACCNAME" not in xml_text:
                 print("Invalid response from Tally. It may not have exported properly.")
                 return False
 
-            root = ET.fromstring(xml_text)
+            root = xml_backend.fromstring(xml_text)
             parsed_data = []
             elements = list(root)
             i = 0
@@ -437,17 +437,17 @@ class FinancialReportSync:
         tdl = TDL_TRIAL_BALANCE.replace("{escaped_company}", escaped).replace("{from_date}", self.from_date).replace("{to_date}", self.to_date)
         
         try:
-            response = requests.post(self.tally_url, data=tdl.encode('utf-8'), timeout=60)
+            response = tally_post(self.tally_url, data=tdl.encode('utf-8'), timeout=60)
             if response.status_code != 200:
                 print(f"Failed to connect to Tally. Status Code: {response.status_code}")
                 return False
 
-            xml_text = self._clean_xml(response.text)
+            xml_text = sanitize(response.text)
             if "DSPACCNAME" not in xml_text:
                 print("Invalid response from Tally. It may not have exported properly.")
                 return False
 
-            root = ET.fromstring(xml_text)
+            root = xml_backend.fromstring(xml_text)
             parsed_data = []
             elements = list(root)
             i = 0
@@ -550,19 +550,30 @@ class FinancialReportSync:
         financials under this company's ID. On an exact match we adopt Tally's
         exact name (casing/spacing) for the report requests.
 
+        A positive answer is reused for TALLY_COMPANY_VERIFY_TTL seconds (shared
+        with the master, voucher and bills syncs via tally_http).
+
         Returns: (is_loaded: bool, companies: list[str])
         """
+        is_loaded, matched, companies = cached_company_check(self.tally_url, self.company_name,
+                                                             self._query_tally_company)
+        if matched:
+            self.company_name = matched  # adopt Tally's exact name
+        return is_loaded, companies
+
+    def _query_tally_company(self):
+        """Returns (is_loaded, matched_name|None, companies); inconclusive checks proceed."""
         xml_req = """<ENVELOPE>
   <HEADER><VERSION>1</VERSION><TALLYREQUEST>Export</TALLYREQUEST><TYPE>Collection</TYPE><ID>Collection of Companies</ID></HEADER>
   <BODY><DESC><STATICVARIABLES><SVFROMDATE TYPE="Date">01-Jan-1970</SVFROMDATE><SVTODATE TYPE="Date">01-Jan-1970</SVTODATE><SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT></STATICVARIABLES>
   <TDL><TDLMESSAGE><COLLECTION NAME="Collection of Companies" ISMODIFY="No"><TYPE>Company</TYPE><FETCH>NAME</FETCH><FILTERS>GroupFilter</FILTERS></COLLECTION><SYSTEM TYPE="FORMULAE" NAME="GroupFilter">$isaggregate = "No"</SYSTEM></TDLMESSAGE></TDL></DESC></BODY></ENVELOPE>"""
         try:
-            resp = requests.post(self.tally_url, data=xml_req.encode('utf-8'),
-                                 headers={'Content-Type': 'application/xml'}, timeout=10)
+            resp = tally_post(self.tally_url, data=xml_req.encode('utf-8'),
+                              headers={'Content-Type': 'application/xml'}, timeout=10)
             if resp.status_code != 200:
                 print(f"[WARN] Could not verify Tally companies (HTTP {resp.status_code}); proceeding")
-                return True, []
-            root = ET.fromstring(self._clean_xml(resp.text))
+                return True, None, []
+            root = xml_backend.fromstring(response_xml(resp))
             companies = []
             for elem in root.iter('COMPANY'):
                 name = elem.findtext('NAME') or elem.get('NAME', '')
@@ -570,23 +581,22 @@ class FinancialReportSync:
                     companies.append(name.strip())
             if not companies:
                 print("[WARN] Could not parse Tally company list; proceeding")
-                return True, []
+                return True, None, []
             expected_lower = self.company_name.strip().lower()
             # STRICT exact match only — a partial match would let Tally serve the
             # active company's reports under the wrong company ID.
             for company in companies:
                 if company.strip().lower() == expected_lower:
-                    self.company_name = company  # adopt Tally's exact name
                     print(f"[OK] Company '{company}' is loaded in Tally")
-                    return True, companies
+                    return True, company, companies
             print(f"[ERROR] Company '{self.company_name}' is NOT loaded in Tally. Loaded: {companies}")
-            return False, companies
+            return False, None, companies
         except requests.exceptions.ConnectionError:
             print(f"[ERROR] Cannot connect to Tally at {self.tally_url}")
-            return False, []
+            return False, None, []
         except Exception as e:
             print(f"[WARN] Error verifying Tally company: {e}; proceeding")
-            return True, []
+            return True, None, []
 
     def sync_all(self, report_type=None):
         # Pre-flight: ensure the correct company is loaded in Tally, else we'd
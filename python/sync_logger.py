@@ -1,26 +1,42 @@
 """
 Talliffy Sync Logger - Global logger instance with Windows-safe file rotation.
 Also patches the `requests` library to support retries and structured error logging.
+
+Importing this module has no side effects: the log directory and file are created
+on the first log record, and the `requests` patch is installed by the first
+get_sync_logger() call (every sync module calls it before talking HTTP) or by
+the Tally transports when they open their first session.
 """
 import os
 import sys
 import logging
+import threading
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
-import requests
-from requests.exceptions import RequestException
 
 # Setup log directory
 if getattr(sys, "frozen", False):
     LOG_DIR = os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), "Tallify", "logs")
 else:
     LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
-os.makedirs(LOG_DIR, exist_ok=True)
 SYNC_LOG_FILE = os.path.join(LOG_DIR, "sync_worker.log")
 
+
+def ensure_log_dir():
+    """Create the log directory on demand; returns LOG_DIR."""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    return LOG_DIR
+
+
 class WindowsSafeRotatingFileHandler(RotatingFileHandler):
     """Windows-safe rotating file handler that handles file lock errors gracefully."""
+    def _open(self):
+        # Opened lazily (delay=True): create the directory only when something is logged.
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
     def doRollover(self):
         try:
             super().doRollover()
@@ -132,6 +148,16 @@ def _bind_structured_logging_methods(logger_instance):
 
 # Global singleton logger
 _global_logger = None
+_log_handler = None
+
+def sync_log_handler():
+    """The rotating sync_worker.log handler every sync logger shares (created once)."""
+    global _log_handler
+    if _log_handler is None:
+        _log_handler = WindowsSafeRotatingFileHandler(SYNC_LOG_FILE, maxBytes=10*1024*1024, backupCount=5,
+                                                      encoding="utf-8", delay=True)
+        _log_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    return _log_handler
 
 def get_sync_logger():
     """Get or create the global sync logger."""
@@ -140,11 +166,10 @@ def get_sync_logger():
         _global_logger = logging.getLogger("sync_logger_global")
         if not _global_logger.handlers:
             _global_logger.setLevel(logging.INFO)
-            handler = WindowsSafeRotatingFileHandler(SYNC_LOG_FILE, maxBytes=10*1024*1024, backupCount=5, encoding="utf-8")
-            handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-            _global_logger.addHandler(handler)
+            _global_logger.addHandler(sync_log_handler())
             _global_logger.propagate = False
             
+    install_request_retries()
     # Always apply defensive binding to ensure compatibility in case of pre-existing loggers
     _bind_structured_logging_methods(_global_logger)
     return _global_logger
@@ -157,14 +182,36 @@ class SyncLogger:
 
 # ─── Requests Monkey-Patching for Retries & Logging ─────────────────
 
-_original_request = requests.Session.request
+_original_request = None
+_retry_state = threading.local()
+
+
+@contextmanager
+def no_request_retries():
+    """Send requests made on this thread inside the block exactly once.
+
+    For callers that do their own retrying and need to see 429/5xx and
+    transport errors as they happen (BatchUploader shrinks its window on them).
+    """
+    previous = getattr(_retry_state, 'disabled', False)
+    _retry_state.disabled = True
+    try:
+        yield
+    finally:
+        _retry_state.disabled = previous
+
 
 def patched_request(self, method, url, **kwargs):
     """
     Patched requests.Session.request that intercepts all outgoing HTTP requests,
     implementing robust error logging and transparent retries with backoff.
     """
+    from requests.exceptions import RequestException
     logger = get_sync_logger()
+
+    if getattr(_retry_state, 'disabled', False):
+        logger.info(f"📤 HTTP {method} {url} (no retry)")
+        return _original_request(self, method, url, **kwargs)
     
     # 1. Determine if Tally request or Remote Backend request
     is_tally = "localhost" in url or "127.0.0.1" in url or "9000" in url
@@ -214,5 +261,11 @@ def patched_request(self, method, url, **kwargs):
             )
             time.sleep(delay)
 
-# Inject the patch
-requests.Session.request = patched_request
+def install_request_retries():
+    """Inject the patch (idempotent); imports requests on first call."""
+    global _original_request
+    if _original_request is not None:
+        return
+    import requests
+    _original_request = requests.Session.request
+    requests.Session.request = patched_request
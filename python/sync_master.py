@@ -10,23 +10,19 @@ import sys
 import json
 from datetime import datetime
 from typing import Dict, List, Optional
-import xml.etree.ElementTree as ET
-import re
 import os
 
 from sync_logger import get_sync_logger
+from tally_http import tally_post
+from master_bundle import bundle_supported, bundle_tdl, mark_unsupported, split_bundle
+from xml_sanitizer import sanitize
+import xml_backend
 
-# Setup logging - use APPDATA when running as bundled exe
-import sys as _sys
-if getattr(_sys, 'frozen', False):
-    _log_base = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'Tallify')
-else:
-    _log_base = os.path.dirname(os.path.abspath(__file__))
-log_dir = os.path.join(_log_base, 'logs')
-os.makedirs(log_dir, exist_ok=True)
+# Logs directory (APPDATA when running as bundled exe) is owned by sync_logger
+# and created on first write.
+from sync_logger import LOG_DIR as log_dir, SYNC_LOG_FILE as log_file, ensure_log_dir
 
-log_file = os.path.join(log_dir, 'sync_worker.log')
-reconcile_log_file = os.path.join(log_dir, 'sync_worker.log')
+reconcile_log_file = log_file
 
 # Use global logger instead of basicConfig
 logger = logging.getLogger(__name__)
@@ -111,7 +107,7 @@ class SyncManager:
             logger.info(f"Fetching {master_type} from Tally...")
             
             tdl = self.generate_tdl(master_type)
-            response = requests.post(
+            response = tally_post(
                 self.tally_url,
                 data=tdl,
                 headers={'Content-Type': 'application/xml'},
@@ -133,14 +129,43 @@ class SyncManager:
             logger.error(f"✗ Error fetching {master_type}: {e}")
             return None
     
+    def fetch_bundle_from_tally(self) -> Optional[Dict[str, List[Dict]]]:
+        """Fetch every master type with one multi-collection request; None if unavailable"""
+        try:
+            logger.info(f"Fetching {len(self.MASTERS)} master types from Tally in one request...")
+            tdl = bundle_tdl([(master_type, master_type, fields, None) for master_type, fields in self.MASTERS.items()],
+                             self.company_name)
+            response = tally_post(
+                self.tally_url,
+                data=tdl,
+                headers={'Content-Type': 'application/xml'},
+                timeout=30
+            )
+            if response.status_code != 200:
+                logger.error(f"✗ Tally error: HTTP {response.status_code}")
+                return None
+            grouped = split_bundle(response.text, [master_type.upper() for master_type in self.MASTERS])
+            if grouped is None:
+                mark_unsupported(self.tally_host, self.tally_port)
+                return None
+            fetched = {}
+            for master_type in self.MASTERS.keys():
+                fetched[master_type] = [r for r in (self._parse_element(e) for e in grouped[master_type.upper()]) if r]
+                logger.info(f"✓ Fetched {len(fetched[master_type])} {master_type} records from Tally")
+            return fetched
+        except requests.exceptions.ConnectionError:
+            logger.error(f"✗ Could not connect to Tally at {self.tally_url}")
+            return None
+        except Exception as e:
+            logger.error(f"✗ Error fetching masters: {e}")
+            return None
+    
     def parse_xml(self, xml_string: str, master_type: str) -> List[Dict]:
         """Parse XML response"""
         try:
-            xml_string = re.sub(r'&#([0-9]+);', 
-                lambda m: '' if int(m.group(1)) < 32 and int(m.group(1)) not in [9, 10, 13] else m.group(0), 
-                xml_string)
+            xml_string = sanitize(xml_string)
             
-            root = ET.fromstring(xml_string)
+            root = xml_backend.fromstring(xml_string)
             records = []
             
             for elem in root.iter(master_type.upper()):
@@ -405,6 +430,7 @@ class SyncManager:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
             # Ensure log file exists
+            ensure_log_dir()
             if not os.path.exists(reconcile_log_file):
                 logger.info(f"Creating reconciliation log file: {reconcile_log_file}")
                 with open(reconcile_log_file, 'w', encoding='utf-8') as f:
@@ -474,13 +500,14 @@ class SyncManager:
             logger.error(traceback.format_exc())
     
     def sync_master_type(self, cmp_id: int, user_id: int, master_type: str, 
-                        sync_type: str = "INITIAL") -> bool:
-        """Sync a single master type"""
+                        sync_type: str = "INITIAL", records: List[Dict] = None) -> bool:
+        """Sync a single master type (records: already fetched from Tally, else fetched here)"""
         logger.info(f"\n{'='*60}")
         logger.info(f"Starting {master_type} sync (Type: {sync_type})")
         logger.info(f"{'='*60}")
         
-        records = self.fetch_from_tally(master_type)
+        if records is None:
+            records = self.fetch_from_tally(master_type)
         
         if records is None:
             logger.error(f"✗ Failed to fetch {master_type}")
@@ -514,8 +541,12 @@ class SyncManager:
         results = {}
         total_records = 0
         
+        # One Tally request for all types when supported; per-type fetches otherwise.
+        fetched = self.fetch_bundle_from_tally() if bundle_supported(self.tally_host, self.tally_port) else None
+        
         for master_type in self.MASTERS.keys():
-            success = self.sync_master_type(cmp_id, user_id, master_type, sync_type)
+            success = self.sync_master_type(cmp_id, user_id, master_type, sync_type,
+                                            records=fetched[master_type] if fetched else None)
             results[master_type] = 'SUCCESS' if success else 'FAILED'
         
         logger.info(f"\n{'#'*60}")
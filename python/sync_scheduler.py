@@ -0,0 +1,118 @@
+"""Dependency-aware parallel scheduling of per-entity master syncs.
+
+`incremental-sync --entity-type all` used to walk SYNC_ORDER one entity at a
+time, so a `--deep` cycle cost the sum of every entity's fetch + upload +
+reconcile even though only a few entities depend on each other (Ledger on
+Group/Currency, StockItem on StockGroup/StockCategory/Unit, ...). `run_dag`
+starts every entity whose dependencies (sync_config.SYNC_DEPENDENCIES) have
+finished, up to SYNC_ENTITY_WORKERS at once, in SYNC_ORDER priority.
+
+Tally itself still serves one export at a time: tally_http gates concurrent
+requests per endpoint (TALLY_MAX_CONCURRENCY), so the overlap comes from one
+entity's parse / backend upload / reconcile running while another waits on
+Tally. Backend uploads are not gated.
+
+A dependency that fails does not stop its dependants — the sequential loop
+never did either; each entity reports its own outcome. SYNC_ENTITY_WORKERS=1
+restores the one-after-another behaviour.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from sync_config import SYNC_DEPENDENCIES
+
+logger = logging.getLogger(__name__)
+
+SYNC_ENTITY_WORKERS = int(os.getenv('SYNC_ENTITY_WORKERS', '4'))
+
+
+def _dependencies(entities: Sequence[str], dependencies: Dict[str, Sequence[str]]) -> Dict[str, set]:
+    """Dependencies restricted to the entities being synced; raises ValueError on a cycle."""
+    wanted = set(entities)
+    deps = {e: {d for d in dependencies.get(e, ()) if d in wanted and d != e} for e in entities}
+    done, remaining = set(), set(entities)
+    while remaining:
+        ready = {e for e in remaining if deps[e] <= done}
+        if not ready:
+            raise ValueError(f"Cyclic sync dependencies among {sorted(remaining)}")
+        done |= ready
+        remaining -= ready
+    return deps
+
+
+def critical_path(durations: Dict[str, float], deps: Dict[str, set],
+                  order: Sequence[str]) -> Tuple[List[str], float]:
+    """Longest dependency chain by measured duration: (entities, seconds)."""
+    finish, via = {}, {}
+    pending = list(order)
+    while pending:
+        for entity in list(pending):
+            if deps[entity] <= finish.keys():
+                parent = max(deps[entity], key=lambda d: finish[d], default=None)
+                finish[entity] = durations.get(entity, 0.0) + (finish[parent] if parent else 0.0)
+                via[entity] = parent
+                pending.remove(entity)
+    if not finish:
+        return [], 0.0
+    entity = max(order, key=lambda e: finish[e])
+    seconds = finish[entity]
+    path = []
+    while entity:
+        path.append(entity)
+        entity = via[entity]
+    return path[::-1], seconds
+
+
+def run_dag(entities: Sequence[str], run_one: Callable[[str], Dict],
+            dependencies: Dict[str, Sequence[str]] = None,
+            max_workers: int = None) -> Tuple[Dict[str, Dict], Dict]:
+    """Run `run_one(entity)` for every entity, dependencies first, independent ones in parallel.
+
+    Returns (results, schedule). results maps entity -> run_one's dict (an
+    exception becomes {'success': False, 'message': ..., 'count': 0}).
+    schedule reports wallSeconds, the summed per-entity seconds, each entity's
+    start/duration and the critical path through the dependency graph.
+    """
+    entities = list(entities)
+    deps = _dependencies(entities, SYNC_DEPENDENCIES if dependencies is None else dependencies)
+    workers = max(1, min(max_workers or SYNC_ENTITY_WORKERS, len(entities) or 1))
+    results, timings = {}, {}
+    t0 = time.perf_counter()
+
+    def timed(entity):
+        started = time.perf_counter()
+        try:
+            result = run_one(entity)
+        except Exception as e:
+            logger.error(f"❌ {entity} sync failed: {e}")
+            result = {'success': False, 'message': str(e), 'count': 0}
+        return result, started - t0, time.perf_counter() - started
+
+    pending = list(entities)  # priority = given order
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sync-entity') as pool:
+        while pending or running:
+            for entity in [e for e in pending if deps[e] <= results.keys()][:workers - len(running)]:
+                pending.remove(entity)
+                running[pool.submit(timed, entity)] = entity
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                entity = running.pop(future)
+                results[entity], started, seconds = future.result()
+                timings[entity] = {'start': round(started, 3), 'seconds': round(seconds, 3)}
+
+    wall = time.perf_counter() - t0
+    path, path_seconds = critical_path({e: t['seconds'] for e, t in timings.items()}, deps, entities)
+    schedule = {
+        'workers': workers,
+        'wallSeconds': round(wall, 3),
+        'sumSeconds': round(sum(t['seconds'] for t in timings.values()), 3),
+        'criticalPath': path,
+        'criticalPathSeconds': round(path_seconds, 3),
+        'entities': {e: timings[e] for e in entities},
+    }
+    return {e: results[e] for e in entities}, schedule
@@ -19,7 +19,16 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional
 from sync_logger import get_sync_logger
-import xml.etree.ElementTree as ET
+from tally_http import cached_company_check, tally_post
+from batch_uploader import BatchUploader
+from stream_uploader import StreamUploader, stream_supported
+from backend_http import post_json
+from snapshot_store import get_snapshot_store, normalize_date
+from xml_sanitizer import XmlSanitizer, response_xml, sanitize
+import xml_backend
+from symbol_table import SymbolTable, encode_records
+from voucher_records import (BatchAllocation, BillAllocation, CostCategoryAllocation,
+                             CostCentreAllocation, InventoryEntry, LedgerEntry, Voucher)
 
 # Production logging configuration
 LOG_LEVEL = os.getenv('SYNC_LOG_LEVEL', 'INFO')
@@ -41,6 +50,40 @@ if not logger.handlers:
     logger.handlers.extend(global_logger.handlers)
 
 
+class PipelineStage:
+    """Throughput counters for one stage of the pipelined voucher sync.
+
+    `busy_s` is time spent doing the stage's own work; `blocked_s` is time
+    spent waiting on a full downstream queue (i.e. backpressure).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.vouchers = 0
+        self.bytes = 0
+        self.busy_s = 0.0
+        self.blocked_s = 0.0
+
+    def put(self, q, item):
+        """Put onto a bounded queue, accounting the wait as backpressure."""
+        t0 = time.perf_counter()
+        q.put(item)
+        self.blocked_s += time.perf_counter() - t0
+
+    def to_dict(self) -> Dict:
+        busy = self.busy_s or 1e-9
+        return {
+            'items': self.items,
+            'vouchers': self.vouchers,
+            'bytes': self.bytes,
+            'busySeconds': round(self.busy_s, 3),
+            'blockedSeconds': round(self.blocked_s, 3),
+            'vouchersPerSec': round(self.vouchers / busy, 1),
+            'bytesPerSec': round(self.bytes / busy, 1),
+        }
+
+
 class VoucherSyncManager:
     """Production voucher sync from Tally to Backend with ALL fields.
     
@@ -54,7 +97,27 @@ class VoucherSyncManager:
     """
     
     BATCH_SIZE = 50   # Smaller batch for deeply nested voucher data
-    BATCH_DELAY = 0.3  # 300ms delay between batches
+    UPLOAD_WINDOW = int(os.getenv('SYNC_UPLOAD_WINDOW', '4'))  # max batches in flight
+    UPLOAD_PREFETCH = 4  # parsed batches kept ready ahead of an NDJSON upload stream
+
+    # Pipelined month sync: fetch / parse / upload run as separate stages joined by
+    # bounded queues so Tally exports month N+1 while month N is uploading.
+    PIPELINE_CHUNKS = os.getenv('SYNC_VOUCHER_PIPELINE', 'true').lower() == 'true'
+    PIPELINE_FETCH_QUEUE = 1    # opened month export (unread response) waiting for the parse stage
+    PIPELINE_UPLOAD_QUEUE = 8   # parsed batches waiting to be uploaded
+
+    # Names, types, units and dates that repeat across rows: interned through the
+    # sync's SymbolTable while parsing, dictionary-encoded in batch uploads when
+    # SYNC_PAYLOAD_ENCODING=symbols (see symbol_table).
+    SYMBOL_FIELDS = (
+        'voucherType', 'voucherDate', 'effectiveDate', 'voucherNumberSeries', 'persistedView',
+        'partyLedgerName', 'partyName', 'partyGstin', 'companyGstin', 'companyGstRegistrationType',
+        'companyGstState', 'gstRegistration', 'placeOfSupply', 'vchGstClass',
+        'ledgerName', 'ledgerGuid', 'gstClass', 'appropriateFor',
+        'billType', 'billDate', 'billDueDate', 'billCreditPeriod', 'categoryName', 'costCentreName',
+        'stockItemName', 'stockItemGuid', 'uom', 'alternateUom', 'rateUom', 'godownName',
+        'batchName', 'destinationGodown', 'batchUom', 'mfgDate', 'expiryDate',
+    )
     
     def __init__(self, backend_url: str, auth_token: str, device_token: str):
         self.backend_url = backend_url.rstrip('/')
@@ -63,6 +126,7 @@ class VoucherSyncManager:
             'Authorization': f'Bearer {auth_token}',
             'X-Device-Token': device_token
         }
+        self.symbols = SymbolTable()
     
     def verify_tally_company(self, tally_host: str, tally_port: int, expected_company_name: str) -> tuple:
         """Verify that the expected company is loaded/open in Tally Prime.
@@ -70,23 +134,30 @@ class VoucherSyncManager:
         Returns: (is_loaded: bool, matched_name: str|None, active_companies: list[str])
             matched_name is Tally's EXACT company name on an exact match; callers
             should use it for SVCURRENTCOMPANY so Tally targets the right company.
+
+        A positive answer is reused for TALLY_COMPANY_VERIFY_TTL seconds, so the
+        month/week chunks of one sync verify once.
         """
+        tally_url = f"http://{tally_host}:{tally_port}"
+        return cached_company_check(tally_url, expected_company_name,
+                                    lambda: self._query_tally_company(tally_url, expected_company_name))
+
+    def _query_tally_company(self, tally_url: str, expected_company_name: str) -> tuple:
+        """Ask Tally for the loaded companies and match `expected_company_name` exactly."""
         xml_req = """<ENVELOPE>
 <HEADER><VERSION>1</VERSION><TALLYREQUEST>Export</TALLYREQUEST><TYPE>Collection</TYPE><ID>Collection of Companies</ID></HEADER>
 <BODY><DESC><STATICVARIABLES><SVFROMDATE TYPE="Date">01-Jan-1970</SVFROMDATE><SVTODATE TYPE="Date">01-Jan-1970</SVTODATE><SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT></STATICVARIABLES>
 <TDL><TDLMESSAGE><COLLECTION NAME="Collection of Companies" ISMODIFY="No"><TYPE>Company</TYPE><FETCH>NAME</FETCH><FILTERS>GroupFilter</FILTERS></COLLECTION><SYSTEM TYPE="FORMULAE" NAME="GroupFilter">$isaggregate = "No"</SYSTEM></TDLMESSAGE></TDL></DESC></BODY></ENVELOPE>"""
 
-        tally_url = f"http://{tally_host}:{tally_port}"
         try:
-            resp = requests.post(tally_url, data=xml_req.encode('utf-8'),
-                                 headers={'Content-Type': 'application/xml'},
-                                 timeout=10)
+            resp = tally_post(tally_url, data=xml_req.encode('utf-8'),
+                              headers={'Content-Type': 'application/xml'},
+                              timeout=10)
             if resp.status_code != 200:
                 logger.warning(f"⚠️ Could not verify Tally companies (HTTP {resp.status_code})")
                 return False, None, []
 
-            text = self.clean_xml(resp.text)
-            root = ET.fromstring(text)
+            root = xml_backend.fromstring(response_xml(resp))
             
             companies = []
             for elem in root.iter('COMPANY'):
@@ -173,6 +244,14 @@ class VoucherSyncManager:
         if child is not None and child.text:
             return child.text.strip()
         return default
+
+    def get_symbol(self, elem, tag: str, default='') -> str:
+        """get_text, interned through the sync's symbol table (repeated names)"""
+        return self.symbols.intern(self.get_text(elem, tag, default))
+
+    def get_date(self, elem, tag: str) -> Optional[str]:
+        """Tally date child as an interned SQL date"""
+        return self.symbols.intern(self.parse_tally_date(self.get_text(elem, tag)))
     
     def get_bool(self, elem, tag: str) -> bool:
         """Convert Tally Yes/No to boolean"""
@@ -238,31 +317,32 @@ class VoucherSyncManager:
     
     # ─── Backend Format Conversion ────────────────────────────────
     
-    def _snake_to_camel(self, name: str) -> str:
-        """Convert snake_case to camelCase: 'voucher_number' → 'voucherNumber'"""
-        components = name.split('_')
-        return components[0] + ''.join(x.title() for x in components[1:])
-    
-    def _convert_keys_to_camel(self, data):
-        """Recursively convert all dict keys from snake_case to camelCase.
-        Also renames: all_ledger_entries → ledgerEntries, all_inventory_entries → inventoryEntries
-        """
-        RENAMES = {
-            'allLedgerEntries': 'ledgerEntries',
-            'allInventoryEntries': 'inventoryEntries',
-            'costCategoryAllocations': 'costCategoryAllocations',
-            'costCentreAllocations': 'costCentreAllocations',
-        }
-        if isinstance(data, dict):
-            result = {}
-            for k, v in data.items():
-                camel = self._snake_to_camel(k)
-                camel = RENAMES.get(camel, camel)
-                result[camel] = self._convert_keys_to_camel(v)
-            return result
-        elif isinstance(data, list):
-            return [self._convert_keys_to_camel(item) for item in data]
-        return data
+    @staticmethod
+    def _stamp_voucher_fks(v: Dict, company_id: int, user_id: int):
+        """Set cmpId/userId/voucherGuid on a parsed voucher and its child rows in place."""
+        voucher_guid = v.get('guid', '')
+        v['cmpId'] = company_id
+        v['userId'] = user_id
+        for le in v.get('ledgerEntries', []):
+            le['cmpId'] = company_id
+            le['userId'] = user_id
+            le['voucherGuid'] = voucher_guid
+            for ba in le.get('billAllocations', []):
+                ba['cmpId'] = company_id
+                ba['voucherGuid'] = voucher_guid
+            for cc in le.get('costCategoryAllocations', []):
+                cc['cmpId'] = company_id
+                cc['voucherGuid'] = voucher_guid
+                for cca in cc.get('costCentreAllocations', []):
+                    cca['cmpId'] = company_id
+                    cca['voucherGuid'] = voucher_guid
+        for ie in v.get('inventoryEntries', []):
+            ie['cmpId'] = company_id
+            ie['userId'] = user_id
+            ie['voucherGuid'] = voucher_guid
+            for bat in ie.get('batchAllocations', []):
+                bat['cmpId'] = company_id
+                bat['voucherGuid'] = voucher_guid
     
     def calculate_due_date(self, bill_date: Optional[str], credit_period: str) -> Optional[str]:
         """Calculate due date = bill_date + credit_period days"""
@@ -281,15 +361,8 @@ class VoucherSyncManager:
         return bill_date
     
     def clean_xml(self, xml_string: str) -> str:
-        """Remove invalid XML characters and strip namespace prefixes (e.g. UDF:)"""
-        # Strip namespace prefixes like <UDF:FIELD> → <UDF_FIELD>
-        xml_string = re.sub(r'<(/?)([a-zA-Z_]+):([a-zA-Z_]+)', r'<\1\2_\3', xml_string)
-        # Remove invalid XML character entities
-        return re.sub(
-            r'&#([0-9]+);',
-            lambda m: '' if int(m.group(1)) < 32 and int(m.group(1)) not in [9, 10, 13] else m.group(0),
-            xml_string
-        )
+        """Remove invalid XML characters and strip namespace prefixes (e.g. UDF:); see xml_sanitizer."""
+        return sanitize(xml_string)
     
     # ─── TDL Generation ─────────────────────────────────────────────
 
@@ -332,7 +405,7 @@ class VoucherSyncManager:
         """Parse lightweight voucher identity XML for reconciliation"""
         try:
             xml_string = self.clean_xml(xml_string)
-            root = ET.fromstring(xml_string)
+            root = xml_backend.fromstring(xml_string)
             records = []
             for elem in root.iter('VOUCHER'):
                 guid = (elem.findtext('GUID') or '').strip()
@@ -357,6 +430,95 @@ class VoucherSyncManager:
             logger.error(f"❌ Error parsing voucher identity XML: {e}")
             return []
 
+    def generate_voucher_probe_tdl(self, from_date: str, to_date: str,
+                                    company_name: str = None) -> str:
+        """Generate TDL that returns only per-day voucher counts and max AlterID (no voucher data).
+        Tally groups the vouchers by date itself, so the response is one tiny row per day."""
+        company_var = ""
+        if company_name:
+            from xml.sax.saxutils import escape
+            escaped_company = escape(company_name)
+            company_var = f"\n                <SVCOMPANY>{escaped_company}</SVCOMPANY>\n                <SVCURRENTCOMPANY>{escaped_company}</SVCURRENTCOMPANY>"
+        return f"""<ENVELOPE>
+    <HEADER>
+        <VERSION>1</VERSION>
+        <TALLYREQUEST>Export</TALLYREQUEST>
+        <TYPE>Collection</TYPE>
+        <ID>Tallify Voucher Days</ID>
+    </HEADER>
+    <BODY>
+        <DESC>
+            <STATICVARIABLES>
+                <SVFROMDATE TYPE="Date">{from_date}</SVFROMDATE>
+                <SVTODATE TYPE="Date">{to_date}</SVTODATE>
+                <SVEXPORTFORMAT>$$SysName:XML</SVEXPORTFORMAT>{company_var}
+            </STATICVARIABLES>
+            <TDL>
+                <TDLMESSAGE>
+                    <COLLECTION NAME="Tallify Voucher Days" ISMODIFY="No">
+                        <TYPE>Voucher</TYPE>
+                        <BY>VchDay : $Date</BY>
+                        <AGGRCOMPUTE>VchCount : Sum : 1</AGGRCOMPUTE>
+                        <AGGRCOMPUTE>VchMaxAlter : Max : $AlterId</AGGRCOMPUTE>
+                        <FETCH>VchDay, VchCount, VchMaxAlter</FETCH>
+                    </COLLECTION>
+                </TDLMESSAGE>
+            </TDL>
+        </DESC>
+    </BODY>
+</ENVELOPE>"""
+
+    def probe_vouchers(self, from_date: str, to_date: str, tally_host: str, tally_port: int,
+                       company_name: str = None, granularity: str = 'month') -> Optional[Dict]:
+        """Voucher histogram for a dd-Mon-yyyy range without exporting any voucher.
+
+        Returns {'from', 'to', 'granularity', 'total', 'maxAlterId', 'buckets'}
+        with buckets = [[period, count, maxAlterId], ...] in date order, period
+        'YYYY-MM-DD' (granularity='day') or 'YYYY-MM' ('month'); periods without
+        vouchers are absent. Tally always groups by day, months are rolled up here.
+        None means Tally could not answer the aggregate export (connection error
+        or a LINEERROR on older builds) — callers then go without it.
+        """
+        xml_string = self.fetch_from_tally(
+            self.generate_voucher_probe_tdl(from_date, to_date, company_name), tally_host, tally_port)
+        if xml_string is None:
+            return None
+        try:
+            root = xml_backend.fromstring(self.clean_xml(xml_string))
+        except xml_backend.PARSE_ERRORS as e:
+            logger.warning(f"⚠️ Could not parse voucher probe response: {e}")
+            return None
+        error = root.find('.//LINEERROR')
+        if error is not None:
+            logger.warning(f"⚠️ Tally rejected the voucher probe: {(error.text or '').strip()}")
+            return None
+
+        width = 7 if granularity == 'month' else 10
+        buckets = {}
+        for elem in root.iter():
+            day = normalize_date(elem.findtext('VCHDAY'))
+            if not day:
+                continue
+            try:
+                count = int(float((elem.findtext('VCHCOUNT') or '0').strip()))
+                max_alter = int(float((elem.findtext('VCHMAXALTER') or '0').strip()))
+            except ValueError:
+                continue
+            bucket = buckets.setdefault(day[:width], [day[:width], 0, 0])
+            bucket[1] += count
+            bucket[2] = max(bucket[2], max_alter)
+        histogram = {
+            'from': normalize_date(from_date),
+            'to': normalize_date(to_date),
+            'granularity': 'month' if width == 7 else 'day',
+            'total': sum(b[1] for b in buckets.values()),
+            'maxAlterId': max((b[2] for b in buckets.values()), default=0),
+            'buckets': [buckets[k] for k in sorted(buckets)],
+        }
+        logger.info(f"📊 {histogram['total']:,} vouchers in {len(buckets)} {histogram['granularity']}(s) "
+                    f"from {from_date} to {to_date} (max AlterID {histogram['maxAlterId']})")
+        return histogram
+
     def _fetch_db_vouchers(self, company_id: int) -> List[Dict]:
         """Fetch ALL voucher records from database for reconciliation comparison"""
         try:
@@ -531,7 +693,7 @@ class VoucherSyncManager:
         """Fetch voucher XML from Tally"""
         try:
             url = f"http://{tally_host}:{tally_port}"
-            response = requests.post(
+            response = tally_post(
                 url,
                 data=tdl,
                 headers={'Content-Type': 'application/xml'},
@@ -552,26 +714,139 @@ class VoucherSyncManager:
     
     # ─── XML Parsing ─────────────────────────────────────────────────
     
-    def parse_voucher_xml(self, xml_string: str) -> List[Dict]:
+    def parse_voucher_xml(self, xml_string: str, fk: Dict = None) -> List[Voucher]:
         """Parse full voucher XML with all nested collections"""
         try:
-            xml_string = self.clean_xml(xml_string)
-            root = ET.fromstring(xml_string)
-            vouchers = []
-            
-            for voucher_elem in root.iter('VOUCHER'):
-                v = self.parse_single_voucher(voucher_elem)
-                if v:
-                    vouchers.append(v)
-            
+            vouchers = list(self.iter_voucher_xml(xml_string, fk=fk))
             logger.info(f"✅ Parsed {len(vouchers)} vouchers")
             return vouchers
         except Exception as e:
             logger.error(f"❌ Error parsing voucher XML: {e}")
             return []
-    
-    def parse_single_voucher(self, elem) -> Optional[Dict]:
-        """Parse single voucher element with ALL nested data"""
+
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    def fetch_stream_from_tally(self, tdl: str, tally_host: str, tally_port: int):
+        """Open a streaming voucher export; returns the un-read Response or None.
+
+        The body is left on the socket so `iter_voucher_xml(response.iter_content(...))`
+        can parse it without ever materialising the whole XML string.
+        """
+        try:
+            url = f"http://{tally_host}:{tally_port}"
+            response = tally_post(
+                url,
+                data=tdl,
+                headers={'Content-Type': 'application/xml'},
+                timeout=30,
+                stream=True
+            )
+            if response.status_code == 200:
+                return response
+            logger.error(f"❌ Tally HTTP {response.status_code}")
+            response.close()
+            return None
+        except requests.exceptions.ConnectionError:
+            logger.error("❌ Could not connect to Tally Prime")
+            return None
+        except Exception as e:
+            logger.error(f"❌ Error fetching from Tally: {e}")
+            return None
+
+    def parse_voucher_stream(self, response, fk: Dict = None, stats: Dict = None) -> List[Voucher]:
+        """Parse a streaming Tally response (see fetch_stream_from_tally) into vouchers."""
+        stats = stats if stats is not None else {}
+        stats.setdefault('bytes', 0)
+        try:
+            chunks = response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)
+            vouchers = list(self.iter_voucher_xml(chunks, encoding=response.encoding, stats=stats, fk=fk))
+            logger.info(f"✅ Fetched voucher data from Tally ({stats['bytes']:,} bytes)")
+            logger.info(f"✅ Parsed {len(vouchers)} vouchers")
+            return vouchers
+        except Exception as e:
+            logger.error(f"❌ Error parsing voucher XML: {e}")
+            return []
+        finally:
+            response.close()
+
+    def _parsed_batches(self, response, fk: Dict, stats: Dict, total_stats: Dict,
+                        tally_records: List[Dict], parse_state: Dict):
+        """Yield BATCH_SIZE lists of vouchers parsed from a streaming Tally response.
+
+        Folds every voucher into `total_stats` / `tally_records` on the way and
+        adds the time spent inside the fetch + parse (not waiting on the upload)
+        to parse_state['seconds']. A parse error ends the stream early and is
+        left in parse_state['error'].
+        """
+        vouchers = self.iter_voucher_xml(response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE),
+                                         encoding=response.encoding, stats=stats, fk=fk)
+        batch = []
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    v = next(vouchers)
+                except StopIteration:
+                    break
+                finally:
+                    parse_state['seconds'] += time.perf_counter() - t0
+                self._accumulate_voucher_stats(v, total_stats, tally_records)
+                batch.append(v)
+                if len(batch) >= self.BATCH_SIZE:
+                    yield batch
+                    batch = []
+        except Exception as e:
+            logger.error(f"❌ Error parsing voucher XML: {e}")
+            parse_state['error'] = str(e)
+        finally:
+            response.close()
+        if batch:
+            yield batch
+
+    def iter_voucher_xml(self, source, encoding: str = None, stats: Dict = None, fk: Dict = None):
+        """Yield parsed vouchers (voucher_records.Voucher) one at a time from Tally voucher XML.
+
+        `source` is either the whole document (str/bytes) or an iterable of
+        str/bytes chunks such as `response.iter_content()`. Chunks are sanitised
+        and fed to xml_backend.iterparse; each <VOUCHER> element is cleared and
+        detached from its parent as soon as it has been parsed, so peak memory
+        is bounded by the largest single voucher rather than the payload.
+        """
+        chunks = self._iter_clean_xml_chunks(source, encoding, stats)
+        for elem in xml_backend.iterparse(chunks, 'VOUCHER'):
+            v = self.parse_single_voucher(elem, fk)
+            if v:
+                yield v
+
+    def _iter_clean_xml_chunks(self, source, encoding: str = None, stats: Dict = None):
+        """Sanitise a chunked source with xml_sanitizer.XmlSanitizer.
+
+        UTF-8 responses stay bytes end to end (the pull parser decodes them);
+        other encodings are decoded incrementally first.
+        """
+        if isinstance(source, (str, bytes)):
+            source = (source,)
+        sanitizer = XmlSanitizer(encoding)
+        for chunk in source:
+            if not chunk:
+                continue
+            if stats is not None:
+                stats['bytes'] = stats.get('bytes', 0) + len(chunk)
+            text = sanitizer.feed(chunk)
+            if text:
+                yield text
+        text = sanitizer.close()
+        if text:
+            yield text
+
+    def parse_single_voucher(self, elem, fk: Dict = None) -> Optional[Voucher]:
+        """Parse single voucher element with ALL nested data.
+
+        Emits the backend wire format directly as voucher_records types:
+        camelCase fields, nested lists named ledgerEntries / inventoryEntries,
+        and — when `fk` = {cmpId, userId} is given — the FK columns the backend
+        requires on every child row, stamped as each row is built.
+        """
         try:
             guid = self.get_text(elem, 'GUID')
             alter_id = int(self.get_text(elem, 'ALTERID', '0'))
@@ -579,26 +854,35 @@ class VoucherSyncManager:
                 return None
             
             voucher_number = self.get_text(elem, 'VOUCHERNUMBER')
-            voucher_date = self.parse_tally_date(self.get_text(elem, 'DATE'))
-            voucher_type = self.get_text(elem, 'VOUCHERTYPENAME')
+            voucher_date = self.get_date(elem, 'DATE')
+            voucher_type = self.get_symbol(elem, 'VOUCHERTYPENAME')
+
+            # Backend FK columns (child tables are NOT NULL on these): every nested
+            # row carries voucherGuid (+ cmpId); ledger/inventory rows also userId.
+            link_fk = {'voucherGuid': guid}
+            if fk:
+                link_fk['cmpId'] = fk['cmpId']
+            row_fk = dict(link_fk, userId=fk['userId']) if fk else link_fk
             
             # Parse all ledger entries
-            ledger_entries = self._parse_ledger_entries(elem, guid, voucher_number, voucher_date, voucher_type)
+            ledger_entries = self._parse_ledger_entries(elem, guid, voucher_number, voucher_date, voucher_type,
+                                                        row_fk, link_fk)
             
             # In Tally ALLLEDGERENTRIES: negative AMOUNT = Debit, positive = Credit.
-            total_debit = sum(le['debit_amount'] for le in ledger_entries)
-            total_credit = sum(le['credit_amount'] for le in ledger_entries)
+            total_debit = sum(le.debitAmount for le in ledger_entries)
+            total_credit = sum(le.creditAmount for le in ledger_entries)
             # Voucher net total. For item invoices the party ledger's balance IS the invoice total
             # (receivable/payable). Summing every debit double-counts contra lines that sit on the
             # items side (e.g. a refund/discount posted as a Debit), inflating the total — so for
             # invoices use the party amount. Receipts/Payments/Journals have no such contra and use
             # the debit side (= credit side). Falls back to total_debit when no party ledger.
             is_invoice = self.get_bool(elem, 'ISINVOICE')
-            party_total = sum(abs(le['amount']) for le in ledger_entries if le.get('is_party_ledger'))
+            party_total = sum(abs(le.amount) for le in ledger_entries if le.isPartyLedger)
             total_amount = party_total if (is_invoice and party_total) else total_debit
             
             # Parse all inventory entries
-            inventory_entries = self._parse_inventory_entries(elem, guid, voucher_number, voucher_date, voucher_type)
+            inventory_entries = self._parse_inventory_entries(elem, guid, voucher_number, voucher_date, voucher_type,
+                                                              row_fk, link_fk)
 
             # Mark income/sales ledgers that stock items post into, so the display layer can
             # distinguish them from tax/charge ledgers. Tally exposes this only inside each
@@ -607,81 +891,86 @@ class VoucherSyncManager:
             item_ledger_names = self._collect_inventory_accounting_ledgers(elem)
             if item_ledger_names:
                 for le in ledger_entries:
-                    if le.get('ledger_name') in item_ledger_names:
-                        le['ledger_from_item'] = True
+                    if le.ledgerName in item_ledger_names:
+                        le.ledgerFromItem = True
 
-            return {
+            voucher = Voucher(
                 # Tally Identity
-                'guid': guid,
-                'master_id': int(self.get_text(elem, 'MASTERID', '0')),
-                'alter_id': alter_id,
-                'voucher_key': int(self.get_text(elem, 'VOUCHERKEY', '0')),
-                'voucher_retain_key': int(self.get_text(elem, 'VOUCHERRETAINKEY', '0')),
-                'remote_id': self.get_text(elem, 'REMOTEID'),
-                'remote_alt_guid': self.get_text(elem, 'REMOTEALTGUID'),
+                guid=guid,
+                masterId=int(self.get_text(elem, 'MASTERID', '0')),
+                alterId=alter_id,
+                voucherKey=int(self.get_text(elem, 'VOUCHERKEY', '0')),
+                voucherRetainKey=int(self.get_text(elem, 'VOUCHERRETAINKEY', '0')),
+                remoteId=self.get_text(elem, 'REMOTEID'),
+                remoteAltGuid=self.get_text(elem, 'REMOTEALTGUID'),
                 
                 # Voucher Info
-                'voucher_number': voucher_number,
-                'voucher_type': voucher_type,
-                'voucher_date': voucher_date,
-                'effective_date': self.parse_tally_date(self.get_text(elem, 'EFFECTIVEDATE')),
-                'voucher_number_series': self.get_text(elem, 'VOUCHERNUMBERSERIES'),
-                'persisted_view': self.get_text(elem, 'PERSISTEDVIEW'),
+                voucherNumber=voucher_number,
+                voucherType=voucher_type,
+                voucherDate=voucher_date,
+                effectiveDate=self.get_date(elem, 'EFFECTIVEDATE'),
+                voucherNumberSeries=self.get_symbol(elem, 'VOUCHERNUMBERSERIES'),
+                persistedView=self.get_symbol(elem, 'PERSISTEDVIEW'),
                 
                 # Party Info
-                'party_ledger_name': self.get_text(elem, 'PARTYLEDGERNAME') or self.get_text(elem, 'PARTYNAME'),
-                'party_name': self.get_text(elem, 'PARTYNAME'),
-                'amount': total_amount,
-                'total_debit': total_debit,
-                'total_credit': total_credit,
+                partyLedgerName=self.get_symbol(elem, 'PARTYLEDGERNAME') or self.get_symbol(elem, 'PARTYNAME'),
+                partyName=self.get_symbol(elem, 'PARTYNAME'),
+                amount=total_amount,
+                totalDebit=total_debit,
+                totalCredit=total_credit,
                 
                 # Reference
-                'reference': self.get_text(elem, 'REFERENCE'),
-                'narration': self.get_text(elem, 'NARRATION'),
+                reference=self.get_text(elem, 'REFERENCE'),
+                narration=self.get_text(elem, 'NARRATION'),
                 
                 # GST
-                'party_gstin': self.get_text(elem, 'PARTYGSTIN'),
-                'company_gstin': self.get_text(elem, 'CMPGSTIN'),
-                'company_gst_registration_type': self.get_text(elem, 'CMPGSTREGISTRATIONTYPE'),
-                'company_gst_state': self.get_text(elem, 'CMPGSTSTATE'),
-                'gst_registration': self.get_text(elem, 'GSTREGISTRATION'),
-                'place_of_supply': self.get_text(elem, 'PLACEOFSUPPLY'),
-                'vch_gst_class': self.get_text(elem, 'VCHGSTCLASS'),
+                partyGstin=self.get_symbol(elem, 'PARTYGSTIN'),
+                companyGstin=self.get_symbol(elem, 'CMPGSTIN'),
+                companyGstRegistrationType=self.get_symbol(elem, 'CMPGSTREGISTRATIONTYPE'),
+                companyGstState=self.get_symbol(elem, 'CMPGSTSTATE'),
+                gstRegistration=self.get_symbol(elem, 'GSTREGISTRATION'),
+                placeOfSupply=self.get_symbol(elem, 'PLACEOFSUPPLY'),
+                vchGstClass=self.get_symbol(elem, 'VCHGSTCLASS'),
                 
                 # E-Invoice
-                'irn': self.get_text(elem, 'IRN'),
-                'irn_ack_no': self.get_text(elem, 'IRNACKNO'),
-                'irn_ack_date': self.parse_tally_date(self.get_text(elem, 'IRNACKDATE')),
-                'irn_qr_code': self.get_text(elem, 'IRNQRCODE'),
+                irn=self.get_text(elem, 'IRN'),
+                irnAckNo=self.get_text(elem, 'IRNACKNO'),
+                irnAckDate=self.parse_tally_date(self.get_text(elem, 'IRNACKDATE')),
+                irnQrCode=self.get_text(elem, 'IRNQRCODE'),
                 
                 # Status Flags
-                'is_optional': self.get_bool(elem, 'ISOPTIONAL'),
-                'is_deleted': self.get_bool(elem, 'ISDELETED'),
-                'is_cancelled': self.get_bool(elem, 'ISCANCELLED'),
-                'is_void': self.get_bool(elem, 'ISVOID'),
-                'is_on_hold': self.get_bool(elem, 'ISONHOLD'),
-                'is_invoice': self.get_bool(elem, 'ISINVOICE'),
-                'is_post_dated': self.get_bool(elem, 'ISPOSTDATED'),
-                'has_cash_flow': self.get_bool(elem, 'HASCASHFLOW'),
-                'has_discounts': self.get_bool(elem, 'HASDISCOUNTS'),
-                'is_deemed_positive': self.get_bool(elem, 'ISDEEMEDPOSITIVE'),
-                'is_reverse_charge_applicable': self.get_bool(elem, 'ISREVERSECHARGEAPPLICABLE'),
+                isOptional=self.get_bool(elem, 'ISOPTIONAL'),
+                isDeleted=self.get_bool(elem, 'ISDELETED'),
+                isCancelled=self.get_bool(elem, 'ISCANCELLED'),
+                isVoid=self.get_bool(elem, 'ISVOID'),
+                isOnHold=self.get_bool(elem, 'ISONHOLD'),
+                isInvoice=self.get_bool(elem, 'ISINVOICE'),
+                isPostDated=self.get_bool(elem, 'ISPOSTDATED'),
+                hasCashFlow=self.get_bool(elem, 'HASCASHFLOW'),
+                hasDiscounts=self.get_bool(elem, 'HASDISCOUNTS'),
+                isDeemedPositive=self.get_bool(elem, 'ISDEEMEDPOSITIVE'),
+                isReverseChargeApplicable=self.get_bool(elem, 'ISREVERSECHARGEAPPLICABLE'),
                 
                 # Nested Data
-                'all_ledger_entries': ledger_entries,
-                'all_inventory_entries': inventory_entries
-            }
+                ledgerEntries=ledger_entries,
+                inventoryEntries=inventory_entries
+            )
+            if fk:
+                voucher.cmpId = fk['cmpId']
+                voucher.userId = fk['userId']
+            return voucher
         except Exception as e:
             logger.warning(f"⚠️ Error parsing voucher: {e}")
             return None
     
-    def _parse_ledger_entries(self, voucher_elem, guid, vch_num, vch_date, vch_type) -> List[Dict]:
+    def _parse_ledger_entries(self, voucher_elem, guid, vch_num, vch_date, vch_type,
+                              row_fk: Dict = None, link_fk: Dict = None) -> List[LedgerEntry]:
         """Parse all ledger entries with nested bills and cost allocations"""
         entries = []
         
         for ledger_elem in voucher_elem.findall('.//ALLLEDGERENTRIES.LIST'):
             try:
-                ledger_name = self.get_text(ledger_elem, 'LEDGERNAME')
+                ledger_name = self.get_symbol(ledger_elem, 'LEDGERNAME')
                 if not ledger_name:
                     continue
                 
@@ -699,29 +988,30 @@ class VoucherSyncManager:
                 
                 # Parse nested bill allocations
                 bills = self._parse_bill_allocations(
-                    ledger_elem, guid, vch_num, vch_date, vch_type, ledger_name
+                    ledger_elem, guid, vch_num, vch_date, vch_type, ledger_name, link_fk
                 )
                 
                 # Parse nested cost category allocations (with cost centres inside)
                 cost_categories = self._parse_cost_category_allocations(
-                    ledger_elem, guid, vch_num, vch_date, vch_type
+                    ledger_elem, guid, vch_num, vch_date, vch_type, link_fk
                 )
                 
-                entries.append({
-                    'ledger_name': ledger_name,
-                    'ledger_guid': self.get_text(ledger_elem, 'LEDGERGUID'),
-                    'amount': amount,
-                    'debit_amount': debit_amount,
-                    'credit_amount': credit_amount,
-                    'dr_cr': dr_cr,
-                    'is_deemed_positive': is_deemed_positive,
-                    'is_party_ledger': self.get_bool(ledger_elem, 'ISPARTYLEDGER'),
-                    'ledger_from_item': self.get_bool(ledger_elem, 'LEDGERFROMITEM'),
-                    'gst_class': self.get_text(ledger_elem, 'GSTCLASS'),
-                    'appropriate_for': self.get_text(ledger_elem, 'APPROPRIATEFOR'),
-                    'bill_allocations': bills,
-                    'cost_category_allocations': cost_categories
-                })
+                entries.append(LedgerEntry(
+                    ledgerName=ledger_name,
+                    ledgerGuid=self.get_symbol(ledger_elem, 'LEDGERGUID'),
+                    amount=amount,
+                    debitAmount=debit_amount,
+                    creditAmount=credit_amount,
+                    drCr=dr_cr,
+                    isDeemedPositive=is_deemed_positive,
+                    isPartyLedger=self.get_bool(ledger_elem, 'ISPARTYLEDGER'),
+                    ledgerFromItem=self.get_bool(ledger_elem, 'LEDGERFROMITEM'),
+                    gstClass=self.get_symbol(ledger_elem, 'GSTCLASS'),
+                    appropriateFor=self.get_symbol(ledger_elem, 'APPROPRIATEFOR'),
+                    billAllocations=bills,
+                    costCategoryAllocations=cost_categories,
+                    **(row_fk or {})
+                ))
                 
             except Exception as e:
                 logger.warning(f"⚠️ Error parsing ledger entry: {e}")
@@ -729,35 +1019,38 @@ class VoucherSyncManager:
         
         return entries
     
-    def _parse_bill_allocations(self, ledger_elem, guid, vch_num, vch_date, vch_type, ledger_name) -> List[Dict]:
+    def _parse_bill_allocations(self, ledger_elem, guid, vch_num, vch_date, vch_type, ledger_name,
+                                link_fk: Dict = None) -> List[BillAllocation]:
         """Parse bill allocations with due date calculation"""
         bills = []
         
         for bill_elem in ledger_elem.findall('.//BILLALLOCATIONS.LIST'):
             try:
                 bill_date_str = self.get_text(bill_elem, 'BILLDATE')
-                bill_date = self.parse_tally_date(bill_date_str) if bill_date_str else vch_date
-                credit_period = self.get_text(bill_elem, 'BILLCREDITPERIOD', '0')
-                bill_due_date = self.calculate_due_date(bill_date, credit_period)
+                bill_date = self.symbols.intern(self.parse_tally_date(bill_date_str)) if bill_date_str else vch_date
+                credit_period = self.get_symbol(bill_elem, 'BILLCREDITPERIOD', '0')
+                bill_due_date = self.symbols.intern(self.calculate_due_date(bill_date, credit_period))
                 bill_amount = abs(self.get_amount(bill_elem, 'AMOUNT'))
                 
-                bills.append({
-                    'bill_type': self.get_text(bill_elem, 'BILLTYPE', 'Voucher'),
-                    'bill_name': self.get_text(bill_elem, 'NAME'),
-                    'bill_ref': self.get_text(bill_elem, 'BILLNUMBER'),
-                    'bill_date': bill_date,
-                    'bill_due_date': bill_due_date,
-                    'bill_credit_period': credit_period,
-                    'bill_amount': bill_amount,
-                    'tds_deductee_is_special_rate': self.get_bool(bill_elem, 'TDSDEDUCTEEISSPECIALRATE')
-                })
+                bills.append(BillAllocation(
+                    billType=self.get_symbol(bill_elem, 'BILLTYPE', 'Voucher'),
+                    billName=self.get_text(bill_elem, 'NAME'),
+                    billRef=self.get_text(bill_elem, 'BILLNUMBER'),
+                    billDate=bill_date,
+                    billDueDate=bill_due_date,
+                    billCreditPeriod=credit_period,
+                    billAmount=bill_amount,
+                    tdsDeducteeIsSpecialRate=self.get_bool(bill_elem, 'TDSDEDUCTEEISSPECIALRATE'),
+                    **(link_fk or {})
+                ))
             except Exception as e:
                 logger.warning(f"⚠️ Error parsing bill allocation: {e}")
                 continue
         
         return bills
     
-    def _parse_cost_category_allocations(self, ledger_elem, guid, vch_num, vch_date, vch_type) -> List[Dict]:
+    def _parse_cost_category_allocations(self, ledger_elem, guid, vch_num, vch_date, vch_type,
+                                         link_fk: Dict = None) -> List[CostCategoryAllocation]:
         """Parse cost category allocations with nested cost centres"""
         categories = []
         
@@ -767,20 +1060,22 @@ class VoucherSyncManager:
                 centres = []
                 for centre_elem in cat_elem.findall('.//COSTCENTREALLOCATIONS.LIST'):
                     try:
-                        centres.append({
-                            'cost_centre_name': self.get_text(centre_elem, 'COSTCENTRENAME'),
-                            'amount': abs(self.get_amount(centre_elem, 'AMOUNT'))
-                        })
+                        centres.append(CostCentreAllocation(
+                            costCentreName=self.get_symbol(centre_elem, 'COSTCENTRENAME'),
+                            amount=abs(self.get_amount(centre_elem, 'AMOUNT')),
+                            **(link_fk or {})
+                        ))
                     except Exception as e:
                         logger.warning(f"⚠️ Error parsing cost centre: {e}")
                         continue
                 
-                categories.append({
-                    'category_name': self.get_text(cat_elem, 'CATEGORY'),
-                    'amount': abs(self.get_amount(cat_elem, 'AMOUNT')),
-                    'is_deemed_positive': self.get_bool(cat_elem, 'ISDEEMEDPOSITIVE'),
-                    'cost_centre_allocations': centres
-                })
+                categories.append(CostCategoryAllocation(
+                    categoryName=self.get_symbol(cat_elem, 'CATEGORY'),
+                    amount=abs(self.get_amount(cat_elem, 'AMOUNT')),
+                    isDeemedPositive=self.get_bool(cat_elem, 'ISDEEMEDPOSITIVE'),
+                    costCentreAllocations=centres,
+                    **(link_fk or {})
+                ))
             except Exception as e:
                 logger.warning(f"⚠️ Error parsing cost category: {e}")
                 continue
@@ -803,13 +1098,14 @@ class VoucherSyncManager:
                     names.add(name)
         return names
 
-    def _parse_inventory_entries(self, voucher_elem, guid, vch_num, vch_date, vch_type) -> List[Dict]:
+    def _parse_inventory_entries(self, voucher_elem, guid, vch_num, vch_date, vch_type,
+                                 row_fk: Dict = None, link_fk: Dict = None) -> List[InventoryEntry]:
         """Parse all inventory entries with nested batch allocations"""
         entries = []
         
         for inv_elem in voucher_elem.findall('.//ALLINVENTORYENTRIES.LIST'):
             try:
-                stock_name = self.get_text(inv_elem, 'STOCKITEMNAME')
+                stock_name = self.get_symbol(inv_elem, 'STOCKITEMNAME')
                 if not stock_name:
                     continue
                 
@@ -821,7 +1117,7 @@ class VoucherSyncManager:
                 # amount, and stock movement abs()-es this, so a signed value is safe here.
                 stock_amount = self.get_amount(inv_elem, 'AMOUNT')
                 is_outward = actual_qty < 0
-                uom = self.get_text(inv_elem, 'UOM')
+                uom = self.get_symbol(inv_elem, 'UOM')
 
                 # Prefer Tally's own ISDEEMEDPOSITIVE; fall back to qty sign only when absent.
                 deemed_text = self.get_text(inv_elem, 'ISDEEMEDPOSITIVE', '')
@@ -829,7 +1125,7 @@ class VoucherSyncManager:
 
                 # Rate is exported as e.g. "800.00/VCH" — capture the unit the rate is quoted in.
                 rate_text = self.get_text(inv_elem, 'RATE', '')
-                rate_uom = rate_text.split('/')[-1].strip() if '/' in rate_text else uom
+                rate_uom = self.symbols.intern(rate_text.split('/')[-1].strip()) if '/' in rate_text else uom
                 # Tally often leaves the <UOM> tag empty and carries the unit only in the
                 # qty/rate strings. Fall back to the rate unit so the "per" / qty columns show.
                 if not uom:
@@ -847,26 +1143,27 @@ class VoucherSyncManager:
                 
                 # Parse nested batch allocations
                 batches = self._parse_batch_allocations(
-                    inv_elem, guid, vch_num, vch_date, vch_type, stock_name, actual_qty, uom
+                    inv_elem, guid, vch_num, vch_date, vch_type, stock_name, actual_qty, uom, link_fk
                 )
                 
-                entries.append({
-                    'stock_item_name': stock_name,
-                    'stock_item_guid': self.get_text(inv_elem, 'STOCKITEMGUID'),
-                    'billed_qty': abs(billed_qty),
-                    'actual_qty': abs(actual_qty),
-                    'rate': rate,
-                    'amount': stock_amount,
-                    'discount': self.get_amount(inv_elem, 'DISCOUNT'),
-                    'uom': uom,
-                    'alternate_uom': self.get_text(inv_elem, 'ALTERNATEUOM'),
-                    'rate_uom': rate_uom,
-                    'is_deemed_positive': is_deemed_positive,
-                    'is_outward': is_outward,
-                    'godown_name': self.get_text(inv_elem, 'GODOWNNAME'),
-                    'tracking_number': self.get_text(inv_elem, 'TRACKINGNUMBER'),
-                    'batch_allocations': batches
-                })
+                entries.append(InventoryEntry(
+                    stockItemName=stock_name,
+                    stockItemGuid=self.get_symbol(inv_elem, 'STOCKITEMGUID'),
+                    billedQty=abs(billed_qty),
+                    actualQty=abs(actual_qty),
+                    rate=rate,
+                    amount=stock_amount,
+                    discount=self.get_amount(inv_elem, 'DISCOUNT'),
+                    uom=uom,
+                    alternateUom=self.get_symbol(inv_elem, 'ALTERNATEUOM'),
+                    rateUom=rate_uom,
+                    isDeemedPositive=is_deemed_positive,
+                    isOutward=is_outward,
+                    godownName=self.get_symbol(inv_elem, 'GODOWNNAME'),
+                    trackingNumber=self.get_text(inv_elem, 'TRACKINGNUMBER'),
+                    batchAllocations=batches,
+                    **(row_fk or {})
+                ))
             except Exception as e:
                 logger.warning(f"⚠️ Error parsing inventory entry: {e}")
                 continue
@@ -874,7 +1171,7 @@ class VoucherSyncManager:
         return entries
     
     def _parse_batch_allocations(self, inv_elem, guid, vch_num, vch_date, vch_type,
-                                  stock_name, parent_qty, uom) -> List[Dict]:
+                                  stock_name, parent_qty, uom, link_fk: Dict = None) -> List[BatchAllocation]:
         """Parse batch allocations with derived quantities"""
         batches = []
         batch_elems = inv_elem.findall('.//BATCHALLOCATIONS.LIST')
@@ -892,19 +1189,20 @@ class VoucherSyncManager:
                 else:
                     batch_qty = abs(parent_qty)
                 
-                batches.append({
-                    'batch_name': self.get_text(batch_elem, 'BATCHNAME'),
-                    'godown_name': self.get_text(batch_elem, 'GODOWNNAME'),
-                    'destination_godown': self.get_text(batch_elem, 'DESTINATIONGODOWNNAME'),
-                    'batch_qty': batch_qty,
-                    'batch_rate': batch_rate,
-                    'batch_amount': batch_amount,
-                    'batch_uom': uom or 'Pcs',
-                    'mfg_date': self.parse_tally_date(self.get_text(batch_elem, 'MFGDATE')),
-                    'expiry_date': self.parse_tally_date(self.get_text(batch_elem, 'EXPIRYDATE')),
-                    'is_deemed_positive': parent_qty >= 0,
-                    'is_outward': parent_qty < 0
-                })
+                batches.append(BatchAllocation(
+                    batchName=self.get_symbol(batch_elem, 'BATCHNAME'),
+                    godownName=self.get_symbol(batch_elem, 'GODOWNNAME'),
+                    destinationGodown=self.get_symbol(batch_elem, 'DESTINATIONGODOWNNAME'),
+                    batchQty=batch_qty,
+                    batchRate=batch_rate,
+                    batchAmount=batch_amount,
+                    batchUom=uom or 'Pcs',
+                    mfgDate=self.get_date(batch_elem, 'MFGDATE'),
+                    expiryDate=self.get_date(batch_elem, 'EXPIRYDATE'),
+                    isDeemedPositive=parent_qty >= 0,
+                    isOutward=parent_qty < 0,
+                    **(link_fk or {})
+                ))
             except Exception as e:
                 logger.warning(f"⚠️ Error parsing batch allocation: {e}")
                 continue
@@ -920,51 +1218,28 @@ class VoucherSyncManager:
         Backend expects a flat JSON array of vouchers in camelCase format,
         each containing cmpId and userId.
         """
+        result = self.post_voucher_batch(vouchers, company_id, user_id, company_guid)
+        return result['success'], result['saved']
+
+    def post_voucher_batch(self, vouchers: List[Dict], company_id: int,
+                           user_id: int, company_guid: str, retry: bool = True) -> Dict:
+        """POST one voucher batch; returns {success, saved, status, bytes, error}.
+
+        This is the BatchUploader send function — status and byte counts let the
+        uploader adapt its in-flight window and report throughput. The uploader
+        passes retry=False so throttling reaches it unretried; it resends itself.
+        """
         try:
             if not vouchers:
-                return True, 0
+                return {'success': True, 'saved': 0, 'status': None, 'bytes': 0, 'error': None}
             
-            # Convert each voucher to camelCase and propagate cmpId/userId/voucherGuid
-            # to all nested entries (backend requires NOT NULL on child table FKs)
-            backend_vouchers = []
-            for v in vouchers:
-                camel_v = self._convert_keys_to_camel(v)
-                camel_v['cmpId'] = company_id
-                camel_v['userId'] = user_id
-                
-                # Get parent voucher's GUID for child FK references
-                voucher_guid = camel_v.get('guid', '')
-                
-                # Propagate cmpId/userId/voucherGuid to nested ledger entries
-                # (voucher_ledger_entries.voucher_guid NOT NULL)
-                for le in camel_v.get('ledgerEntries', []):
-                    le['cmpId'] = company_id
-                    le['userId'] = user_id
-                    le['voucherGuid'] = voucher_guid
-                    # Also propagate to bill allocations inside ledger entries
-                    for ba in le.get('billAllocations', []):
-                        ba['cmpId'] = company_id
-                        ba['voucherGuid'] = voucher_guid
-                    # And cost category/centre allocations
-                    for cc in le.get('costCategoryAllocations', []):
-                        cc['cmpId'] = company_id
-                        cc['voucherGuid'] = voucher_guid
-                        for cca in cc.get('costCentreAllocations', []):
-                            cca['cmpId'] = company_id
-                            cca['voucherGuid'] = voucher_guid
-                
-                # Propagate cmpId/userId/voucherGuid to nested inventory entries
-                # (voucher_inventory_entries.voucher_id / voucher_guid NOT NULL)
-                for ie in camel_v.get('inventoryEntries', []):
-                    ie['cmpId'] = company_id
-                    ie['userId'] = user_id
-                    ie['voucherGuid'] = voucher_guid
-                    # Also propagate to batch allocations inside inventory entries
-                    for bat in ie.get('batchAllocations', []):
-                        bat['cmpId'] = company_id
-                        bat['voucherGuid'] = voucher_guid
-                
-                backend_vouchers.append(camel_v)
+            # The parser already emits camelCase wire records; FK columns are stamped
+            # there too when it was given {cmpId, userId}. Only fill them in here for
+            # vouchers parsed without (or for a different) company context.
+            backend_vouchers = vouchers
+            for v in backend_vouchers:
+                if v.get('cmpId') != company_id or v.get('userId') != user_id:
+                    self._stamp_voucher_fks(v, company_id, user_id)
             
             url = f"{self.backend_url}/vouchers/sync"
             
@@ -975,34 +1250,83 @@ class VoucherSyncManager:
                               if k not in ('ledgerEntries', 'inventoryEntries')}
                     logger.info(f"📋 Sample voucher (header): {json.dumps(sample, default=str)[:500]}")
             
-            response = requests.post(
-                url,
-                json=backend_vouchers,
-                headers=self.headers,
-                timeout=300
-            )
+            response, _, wire_bytes = post_json(url, backend_vouchers, self.headers,
+                                                timeout=300, label='vouchers',
+                                                encode=lambda batch: encode_records(batch, self.SYMBOL_FIELDS),
+                                                retry=retry)
             
             if response.status_code in [200, 201]:
                 result = response.json()
                 saved_count = result.get('savedCount', result.get('totalProcessed', len(backend_vouchers)))
                 if VERBOSE_MODE:
                     logger.info(f"✅ Backend saved {saved_count} vouchers")
-                return True, saved_count
+                self._snapshot_upsert(company_id, backend_vouchers)
+                return {'success': True, 'saved': saved_count, 'status': response.status_code,
+                        'bytes': wire_bytes, 'error': None}
             else:
                 logger.error(f"❌ Backend error: HTTP {response.status_code}")
                 logger.error(f"Response: {response.text[:500]}")
-                return False, 0
+                return {'success': False, 'saved': 0, 'status': response.status_code,
+                        'bytes': wire_bytes, 'error': f"HTTP {response.status_code}: {response.text[:200]}"}
                 
         except Exception as e:
             logger.error(f"❌ Error sending to backend: {e}")
-            return False, 0
+            return {'success': False, 'saved': 0, 'status': None, 'bytes': 0, 'error': str(e)[:200]}
+
+    @staticmethod
+    def _snapshot_upsert(company_id: int, vouchers: List[Dict]):
+        """Mirror an accepted batch into the local identity snapshot (best effort)."""
+        store = get_snapshot_store()
+        if store is None:
+            return
+        try:
+            store.upsert(company_id, 'Voucher', vouchers)
+        except Exception as e:
+            logger.debug(f"Snapshot upsert failed: {e}")
+
+    def upload_voucher_batches(self, batches, company_id: int, user_id: int,
+                               company_guid: str, on_result=None, records=None, group=None,
+                               prefetch: int = 0) -> Dict:
+        """Upload voucher batches to the backend.
+
+        Streams them as NDJSON (stream_uploader) when the backend has the
+        /vouchers/sync/stream route, else POSTs them through the concurrent,
+        adaptive BatchUploader. `records(item)` gives an item's vouchers (default:
+        the item is the list); `group(item)` keys the batches that may share one
+        stream request; `prefetch` pulls that many batches ahead on a helper thread.
+        """
+        records = records or (lambda item: item)
+        stream_url = f"{self.backend_url}/vouchers/sync/stream"
+        if not stream_supported(stream_url, self.headers):
+            uploader = BatchUploader(
+                lambda item: self.post_voucher_batch(records(item), company_id, user_id, company_guid,
+                                                     retry=False),
+                max_in_flight=self.UPLOAD_WINDOW, name='vouchers')
+            return uploader.upload(batches, on_result=on_result)
+
+        def wire_records(item):
+            vouchers = records(item)
+            for v in vouchers:
+                if v.get('cmpId') != company_id or v.get('userId') != user_id:
+                    self._stamp_voucher_fks(v, company_id, user_id)
+            return vouchers
+
+        def acknowledged(item, result):
+            if result['success']:
+                self._snapshot_upsert(company_id, records(item))
+            if on_result is not None:
+                on_result(item, result)
+
+        uploader = StreamUploader(stream_url, self.headers, records=wire_records, group=group,
+                                  prefetch=prefetch, name='vouchers')
+        return uploader.upload(batches, on_result=acknowledged)
     
     # ─── Main Sync Orchestrator ──────────────────────────────────────
     
     def sync_vouchers(self, company_id: int, company_guid: str, user_id: int,
                       tally_host: str, tally_port: int, from_date: str = '01-Apr-2024',
                       to_date: str = '31-Mar-2025', last_alter_id: int = None,
-                      company_name: str = None) -> Dict:
+                      company_name: str = None, save_watermark: bool = True) -> Dict:
         """Execute incremental voucher sync pipeline:
         
         1. Get last AlterID (from backend or argument)
@@ -1011,6 +1335,10 @@ class VoucherSyncManager:
         4. Parse voucher XML (all 7 nested levels)
         5. Send to backend in batches
         6. Update AlterID on backend
+
+        With save_watermark=False step 6 is left to the caller (the chunked sync
+        saves once for the whole range); 'lastAlterID' is still the value it
+        would have saved.
         """
         
         logger.info(f"🚀 Starting voucher sync for company {company_id}")
@@ -1040,10 +1368,11 @@ class VoucherSyncManager:
         # Step 2: Generate TDL
         tdl = self.generate_voucher_tdl(last_alter_id, from_date, to_date, company_name)
         
-        # Step 3: Fetch from Tally
-        xml_response = self.fetch_from_tally(tdl, tally_host, tally_port)
+        # Step 3: Fetch from Tally (streamed — the XML body is parsed as it arrives)
+        fetch_start = time.perf_counter()
+        tally_response = self.fetch_stream_from_tally(tdl, tally_host, tally_port)
         
-        if not xml_response:
+        if tally_response is None:
             elapsed_ms = int((time.time() - sync_start_time) * 1000)
             try:
                 get_sync_logger().log_voucher_sync_single(
@@ -1059,75 +1388,79 @@ class VoucherSyncManager:
                 'count': 0
             }
         
-        # Step 4: Parse XML
-        vouchers = self.parse_voucher_xml(xml_response)
-        
-        if not vouchers:
+        # Step 4: Parse XML — batches are handed to the uploader as they are parsed, so the
+        # Tally export, the parse and the backend upload overlap.
+        stream_stats = {'bytes': 0}
+        total_stats = {'vouchers': 0, 'ledgerEntries': 0, 'billAllocations': 0,
+                       'inventoryEntries': 0, 'batchAllocations': 0}
+        tally_records_cache = []  # identity fields only, for reconciliation
+        parse_state = {'seconds': time.perf_counter() - fetch_start, 'error': None}
+        batches = self._parsed_batches(tally_response, {'cmpId': company_id, 'userId': user_id},
+                                       stream_stats, total_stats, tally_records_cache, parse_state)
+        first_batch = next(batches, None)
+
+        if first_batch is None:
+            fetch_ms = int(parse_state['seconds'] * 1000)
+            if parse_state['error']:
+                return {
+                    'success': False,
+                    'message': f"Error parsing voucher XML: {parse_state['error']}",
+                    'count': 0,
+                    'fetchMs': fetch_ms,
+                    'fetchBytes': stream_stats['bytes']
+                }
             logger.info(f"✅ No new vouchers to sync (AlterID > {last_alter_id})")
             return {
                 'success': True,
                 'message': 'No new vouchers',
                 'count': 0,
                 'lastAlterID': last_alter_id,
+                'fetchMs': fetch_ms,
+                'fetchBytes': stream_stats['bytes'],
                 'tallyRecords': []
             }
         
-        # Log stats
-        total_ledger = sum(len(v['all_ledger_entries']) for v in vouchers)
-        total_inventory = sum(len(v['all_inventory_entries']) for v in vouchers)
-        total_bills = sum(
-            len(b) for v in vouchers 
-            for le in v['all_ledger_entries'] 
-            for b in [le['bill_allocations']]
-        )
-        total_batch_alloc = sum(
-            len(b) for v in vouchers 
-            for ie in v['all_inventory_entries'] 
-            for b in [ie['batch_allocations']]
-        )
-        
-        logger.info(f"📊 Parsed: {len(vouchers)} vouchers, {total_ledger} ledger entries, "
-                     f"{total_bills} bills, {total_inventory} inventory entries, {total_batch_alloc} batches")
-        
-        # Step 5: Send to backend in batches
-        total_saved = 0
-        failed_batches = 0
-        batch_num = 0
-
-        for i in range(0, len(vouchers), self.BATCH_SIZE):
-            batch = vouchers[i:i + self.BATCH_SIZE]
-            batch_num += 1
-
-            if VERBOSE_MODE:
-                logger.info(f"📤 Batch {batch_num}: sending {len(batch)} vouchers...")
-
-            success, saved = self.save_vouchers_to_backend(batch, company_id, user_id, company_guid)
-
-            if success:
-                total_saved += saved
-            else:
-                failed_batches += 1
-                logger.error(f"❌ Batch {batch_num} failed")
+        # Step 5: Send to backend (one NDJSON stream, or several batches in flight at once)
+        def all_batches():
+            try:
+                yield first_batch
+                yield from batches
+            finally:
+                batches.close()  # an upload that gives up stops the parse and closes the export
 
-            # Delay between batches
-            if i + self.BATCH_SIZE < len(vouchers):
-                time.sleep(self.BATCH_DELAY)
+        upload_report = self.upload_voucher_batches(all_batches(), company_id,
+                                                    user_id, company_guid, prefetch=self.UPLOAD_PREFETCH)
+        fetch_ms = int(parse_state['seconds'] * 1000)
+        vouchers_parsed = total_stats['vouchers']
+        logger.info(f"✅ Fetched voucher data from Tally ({stream_stats['bytes']:,} bytes)")
+        logger.info(f"📊 Parsed: {vouchers_parsed} vouchers, {total_stats['ledgerEntries']} ledger entries, "
+                    f"{total_stats['billAllocations']} bills, {total_stats['inventoryEntries']} inventory entries, "
+                    f"{total_stats['batchAllocations']} batches")
+        total_saved = upload_report['saved']
+        failed_batches = upload_report['failed']
+        for batch_num, batch_result in enumerate(upload_report['results'], 1):
+            if not batch_result['success']:
+                logger.error(f"❌ Batch {batch_num} failed: {batch_result.get('error')}")
+        if parse_state['error']:
+            # A truncated export must not advance the watermark past vouchers never parsed.
+            failed_batches += 1
 
         all_ok = (failed_batches == 0)
-        max_alter_id = max(v['alter_id'] for v in vouchers)
+        max_alter_id = max(r['alterID'] for r in tally_records_cache)
 
         # Step 6: Advance the AlterID watermark ONLY if every batch saved. Advancing it after a
         # failure (e.g. an auth 401) would skip the unsaved vouchers permanently — they'd never be
         # re-fetched. On failure we keep the previous watermark so the next run retries them.
         if all_ok:
-            self.save_last_alter_id(company_id, max_alter_id)
+            if save_watermark:
+                self.save_last_alter_id(company_id, max_alter_id)
             effective_alter_id = max_alter_id
         else:
             effective_alter_id = last_alter_id
             logger.error(f"⚠️ {failed_batches} batch(es) failed — NOT advancing AlterID watermark "
                          f"(kept at {last_alter_id}); these vouchers will be retried next sync.")
 
-        logger.info(f"🎉 Voucher sync complete: {total_saved}/{len(vouchers)} vouchers saved"
+        logger.info(f"🎉 Voucher sync complete: {total_saved}/{vouchers_parsed} vouchers saved"
                     f"{'' if all_ok else f' ({failed_batches} batch(es) FAILED)'}")
 
         elapsed_ms = int((time.time() - sync_start_time) * 1000)
@@ -1142,68 +1475,48 @@ class VoucherSyncManager:
         except Exception:
             pass
         
-        # Build tallyRecords cache for reconciliation (identity fields only)
-        tally_records_cache = []
-        for v in vouchers:
-            tally_records_cache.append({
-                'guid': v['guid'],
-                'masterID': v.get('master_id', ''),
-                'alterID': v.get('alter_id', 0),
-                'name': f"{v.get('voucher_type', '')} {v.get('voucher_number', '')}".strip() or v['guid'],
-                'ledgerEntryCount': len(v.get('all_ledger_entries', [])),
-                'inventoryEntryCount': len(v.get('all_inventory_entries', []))
-            })
-        
         return {
             'success': all_ok,
             'message': (f'Successfully synced {total_saved} vouchers' if all_ok
-                        else f'Synced {total_saved}/{len(vouchers)} vouchers — {failed_batches} batch(es) '
+                        else f'Synced {total_saved}/{vouchers_parsed} vouchers — {failed_batches} batch(es) '
                              f'failed; AlterID watermark not advanced (will retry next sync)'),
             'count': total_saved,
             'lastAlterID': effective_alter_id,
             'elapsedMs': elapsed_ms,
+            'fetchMs': fetch_ms,
+            'fetchBytes': stream_stats['bytes'],
             'tallyRecords': tally_records_cache,
-            'stats': {
-                'vouchers': len(vouchers),
-                'ledgerEntries': total_ledger,
-                'billAllocations': total_bills,
-                'inventoryEntries': total_inventory,
-                'batchAllocations': total_batch_alloc
-            }
+            'upload': {k: upload_report[k] for k in ('batches', 'failed', 'bytes', 'batchesPerSec',
+                                                       'bytesPerSec', 'peakWindow', 'throttled')},
+            'stats': total_stats
         }
 
-    # ─── Monthly Chunked Sync (with Adaptive Weekly) ─────────────
+    # ─── Chunked Sync (adaptive chunk size, see chunk_sizer) ──────
 
-    def sync_vouchers_chunked(self, company_id: int, company_guid: str, user_id: int,
-                              tally_host: str, tally_port: int, from_date: str = '01-Apr-2024',
-                              to_date: str = '31-Mar-2025', last_alter_id: int = None,
-                              company_name: str = None) -> Dict:
-        """Sync vouchers in 1-month chunks to avoid Tally memory errors.
-        
-        Breaks the full date range into months and calls sync_vouchers() for each.
-        If a month takes >30 seconds, it is re-synced using weekly sub-chunks.
-        """
+    _MONTHS_MAP = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+                   'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+    _MONTHS_REV = ['', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+    @classmethod
+    def _parse_chunk_date(cls, d: str) -> datetime:
+        """Parse dd-Mon-yyyy to datetime"""
+        parts = d.split('-')
+        return datetime(int(parts[2]), cls._MONTHS_MAP[parts[1]], int(parts[0]))
+
+    @classmethod
+    def _format_chunk_date(cls, dt: datetime) -> str:
+        """Format datetime to dd-Mon-yyyy"""
+        return f"{dt.day:02d}-{cls._MONTHS_REV[dt.month]}-{dt.year}"
+
+    @classmethod
+    def _month_chunks(cls, from_date: str, to_date: str) -> List[Tuple[datetime, datetime]]:
+        """Split a dd-Mon-yyyy range into calendar-month (start, end) chunks."""
         import calendar
-        from datetime import timedelta
-        
-        months_map = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
-                      'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
-        months_rev = ['', 'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
-                      'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        
-        def parse_tally_date(d):
-            """Parse dd-Mon-yyyy to datetime"""
-            parts = d.split('-')
-            return datetime(int(parts[2]), months_map[parts[1]], int(parts[0]))
-        
-        def format_tally_date(dt):
-            """Format datetime to dd-Mon-yyyy"""
-            return f"{dt.day:02d}-{months_rev[dt.month]}-{dt.year}"
-        
-        start_dt = parse_tally_date(from_date)
-        end_dt = parse_tally_date(to_date)
-        
-        # Generate 1-month chunks
+
+        start_dt = cls._parse_chunk_date(from_date)
+        end_dt = cls._parse_chunk_date(to_date)
+
         chunks = []
         chunk_start = start_dt
         while chunk_start <= end_dt:
@@ -1218,18 +1531,64 @@ class VoucherSyncManager:
                 next_month = 1
                 next_year += 1
             chunk_start = datetime(next_year, next_month, 1)
+        return chunks
+
+    def sync_vouchers_chunked(self, company_id: int, company_guid: str, user_id: int,
+                              tally_host: str, tally_port: int, from_date: str = '01-Apr-2024',
+                              to_date: str = '31-Mar-2025', last_alter_id: int = None,
+                              company_name: str = None) -> Dict:
+        """Sync vouchers in date chunks sized by chunk_sizer to avoid Tally memory errors.
+        
+        Breaks the full date range into windows whose expected voucher count fits
+        the company's learned per-request budget and calls sync_vouchers() for
+        each. Where there is no volume history yet, one probe_vouchers()
+        query supplies it; calendar months only if Tally
+        cannot answer that. Every window is fetched once:
+        a slow window shrinks the following ones instead of being re-synced.
+        With PIPELINE_CHUNKS enabled the windows are planned up front and handed
+        to sync_vouchers_pipelined() instead, overlapping Tally export and upload.
+
+        The AlterID watermark is saved once, after the last window, to the max
+        AlterID seen — and only if every window synced. A failed window keeps
+        the previous watermark so its vouchers are fetched again next run.
+        """
+        from chunk_sizer import ChunkSizer
+
+        format_tally_date = self._format_chunk_date
+        start_dt = self._parse_chunk_date(from_date)
+        end_dt = self._parse_chunk_date(to_date)
+        sizer = ChunkSizer(company_id, 'vouchers')
+        if sizer.needs_counts(start_dt, end_dt):
+            # No volume history for part of the range: ask Tally for per-day counts so
+            # heavy months are split before they are fetched, not after.
+            probe = self.probe_vouchers(from_date, to_date, tally_host, tally_port, company_name, 'day')
+            if probe is not None:
+                sizer.seed(start_dt, end_dt, {day: count for day, count, _ in probe['buckets']})
+        chunks = sizer.plan(start_dt, end_dt)
+
+        if self.PIPELINE_CHUNKS and len(chunks) > 1:
+            return self.sync_vouchers_pipelined(
+                chunks, company_id=company_id, company_guid=company_guid, user_id=user_id,
+                tally_host=tally_host, tally_port=tally_port,
+                last_alter_id=last_alter_id, company_name=company_name,
+                from_date=from_date, to_date=to_date, sizer=sizer)
         
-        logger.info(f"📅 Monthly chunked sync: {len(chunks)} chunk(s) from {from_date} to {to_date}")
+        logger.info(f"📅 Chunked sync: ~{len(chunks)} chunk(s) from {from_date} to {to_date} "
+                    f"({sizer.describe()})")
         
         try:
             get_sync_logger().log_voucher_sync_start(
                 company_name=company_name or f'Company {company_id}',
                 from_date=from_date, to_date=to_date,
-                sync_type='First-Time (Monthly + Adaptive Weekly)',
+                sync_type='First-Time (Adaptive Chunks)',
                 chunk_count=len(chunks))
         except Exception:
             pass
         
+        # Resolved once: every window uses the same floor and none of them saves it.
+        if last_alter_id is None:
+            last_alter_id = self.get_last_alter_id(company_id)
+
         chunked_start_time = time.time()
         total_count = 0
         total_stats = {'vouchers': 0, 'ledgerEntries': 0, 'billAllocations': 0,
@@ -1238,11 +1597,17 @@ class VoucherSyncManager:
         last_alter = last_alter_id
         all_tally_records = []  # Accumulate tallyRecords across chunks
         
-        for i, (c_start, c_end) in enumerate(chunks):
+        i = 0
+        c_start = start_dt
+        while c_start <= end_dt:
+            c_end = sizer.next_end(c_start, end_dt)
+            total_chunks = i + len(sizer.plan(c_start, end_dt))
             c_from = format_tally_date(c_start)
             c_to = format_tally_date(c_end)
-            logger.info(f"📅 Month {i+1}/{len(chunks)}: {c_from} → {c_to}")
+            logger.info(f"📅 Chunk {i+1}/{total_chunks}: {c_from} → {c_to}")
             
+            # Same AlterID floor for every chunk: a later chunk can hold vouchers whose
+            # AlterID is below an earlier chunk's maximum.
             result = self.sync_vouchers(
                 company_id=company_id,
                 company_guid=company_guid,
@@ -1251,13 +1616,14 @@ class VoucherSyncManager:
                 tally_port=tally_port,
                 from_date=c_from,
                 to_date=c_to,
-                last_alter_id=last_alter,
-                company_name=company_name
+                last_alter_id=last_alter_id,
+                company_name=company_name,
+                save_watermark=False
             )
             
             if result.get('success'):
                 total_count += result.get('count', 0)
-                if result.get('lastAlterID'):
+                if result.get('lastAlterID') and result['lastAlterID'] > (last_alter or 0):
                     last_alter = result['lastAlterID']
                 stats = result.get('stats', {})
                 for k in total_stats:
@@ -1267,98 +1633,59 @@ class VoucherSyncManager:
                 if chunk_tally:
                     all_tally_records.extend(chunk_tally)
                 elapsed_ms = result.get('elapsedMs', 0)
-                logger.info(f"   ✅ Month {i+1}: {result.get('count', 0)} vouchers ({elapsed_ms}ms)")
+                logger.info(f"   ✅ Chunk {i+1}: {result.get('count', 0)} vouchers ({elapsed_ms}ms)")
+                # Only an unfiltered export says how many vouchers the window holds.
+                sizer.observe(c_start, c_end, len(chunk_tally), result.get('fetchMs', elapsed_ms) / 1000.0,
+                              result.get('fetchBytes', 0),
+                              dates=[r.get('date') for r in chunk_tally] if last_alter_id == 0 else None)
                 
                 try:
                     get_sync_logger().log_voucher_sync_chunk(
-                        chunk_num=i+1, total_chunks=len(chunks),
+                        chunk_num=i+1, total_chunks=total_chunks,
                         from_date=c_from, to_date=c_to,
                         count=result.get('count', 0), elapsed_ms=elapsed_ms,
-                        chunk_type='Month')
+                        chunk_type='Chunk')
                 except Exception:
                     pass
-                
-                # Adaptive weekly retry if month took >30s
-                if elapsed_ms > 30000:
-                    logger.info(f"   ⏱️ Month {i+1} took {elapsed_ms}ms (>30s), re-syncing weekly...")
-                    week_start = c_start
-                    week_num = 0
-                    while week_start <= c_end:
-                        week_num += 1
-                        week_end = week_start + timedelta(days=6)
-                        if week_end > c_end:
-                            week_end = c_end
-                        w_from = format_tally_date(week_start)
-                        w_to = format_tally_date(week_end)
-                        logger.info(f"      📅 Week {week_num}: {w_from} → {w_to}")
-                        
-                        w_result = self.sync_vouchers(
-                            company_id=company_id,
-                            company_guid=company_guid,
-                            user_id=user_id,
-                            tally_host=tally_host,
-                            tally_port=tally_port,
-                            from_date=w_from,
-                            to_date=w_to,
-                            last_alter_id=last_alter,
-                            company_name=company_name
-                        )
-                        if w_result.get('success'):
-                            total_count += w_result.get('count', 0)
-                            if w_result.get('lastAlterID'):
-                                last_alter = w_result['lastAlterID']
-                            w_stats = w_result.get('stats', {})
-                            for k in total_stats:
-                                total_stats[k] += w_stats.get(k, 0)
-                            logger.info(f"      ✅ Week {week_num}: {w_result.get('count', 0)} vouchers")
-                            try:
-                                get_sync_logger().log_voucher_sync_chunk(
-                                    chunk_num=week_num, total_chunks=0,
-                                    from_date=w_from, to_date=w_to,
-                                    count=w_result.get('count', 0),
-                                    elapsed_ms=w_result.get('elapsedMs', 0),
-                                    chunk_type=f'  Week (Month {i+1})')
-                            except Exception:
-                                pass
-                        else:
-                            logger.error(f"      ❌ Week {week_num} failed: {w_result.get('message')}")
-                            try:
-                                get_sync_logger().log_voucher_sync_chunk(
-                                    chunk_num=week_num, total_chunks=0,
-                                    from_date=w_from, to_date=w_to,
-                                    count=0, elapsed_ms=0,
-                                    chunk_type=f'  Week (Month {i+1})',
-                                    error=w_result.get('message', 'Unknown'))
-                            except Exception:
-                                pass
-                        
-                        week_start = week_end + timedelta(days=1)
             else:
-                chunk_errors.append(f"Month {i+1} ({c_from}-{c_to}): {result.get('message', 'Unknown error')}")
-                logger.error(f"   ❌ Month {i+1} failed: {result.get('message')}")
+                sizer.failed(c_start, c_end)
+                chunk_errors.append(f"Chunk {i+1} ({c_from}-{c_to}): {result.get('message', 'Unknown error')}")
+                logger.error(f"   ❌ Chunk {i+1} failed: {result.get('message')}")
                 try:
                     get_sync_logger().log_voucher_sync_chunk(
-                        chunk_num=i+1, total_chunks=len(chunks),
+                        chunk_num=i+1, total_chunks=total_chunks,
                         from_date=c_from, to_date=c_to,
                         count=0, elapsed_ms=0,
-                        chunk_type='Month',
+                        chunk_type='Chunk',
                         error=result.get('message', 'Unknown error'))
                 except Exception:
                     pass
+            i += 1
+            c_start = c_end + timedelta(days=1)
+        sizer.save()
+
+        # Advance the watermark only when every window landed.
+        if chunk_errors:
+            last_alter = last_alter_id
+            logger.error(f"⚠️ {len(chunk_errors)} chunk error(s) — NOT advancing AlterID watermark "
+                         f"(kept at {last_alter_id}); these vouchers will be retried next sync.")
+        elif last_alter and last_alter > (last_alter_id or 0):
+            self.save_last_alter_id(company_id, last_alter)
         
         chunked_elapsed = int((time.time() - chunked_start_time) * 1000)
         try:
             get_sync_logger().log_voucher_sync_complete(
                 company_name=company_name or f'Company {company_id}',
-                total_vouchers=total_count, total_chunks=len(chunks),
+                total_vouchers=total_count, total_chunks=i,
                 errors=len(chunk_errors), duration_ms=chunked_elapsed)
         except Exception:
             pass
         
         if chunk_errors:
             return {
-                'success': len(chunk_errors) < len(chunks),
-                'message': f'Synced {total_count} vouchers with {len(chunk_errors)} month error(s)',
+                'success': len(chunk_errors) < i,
+                'message': (f'Synced {total_count} vouchers with {len(chunk_errors)} chunk error(s); '
+                            f'AlterID watermark not advanced (will retry next sync)'),
                 'count': total_count,
                 'lastAlterID': last_alter,
                 'stats': total_stats,
@@ -1368,7 +1695,7 @@ class VoucherSyncManager:
         
         return {
             'success': True,
-            'message': f'Successfully synced {total_count} vouchers in {len(chunks)} month(s)',
+            'message': f'Successfully synced {total_count} vouchers in {i} chunk(s)',
             'count': total_count,
             'lastAlterID': last_alter,
             'stats': total_stats,
@@ -1376,6 +1703,322 @@ class VoucherSyncManager:
         }
 
 
+    def sync_vouchers_pipelined(self, chunks: List[Tuple[datetime, datetime]], company_id: int,
+                                company_guid: str, user_id: int, tally_host: str, tally_port: int,
+                                last_alter_id: int = None, company_name: str = None,
+                                from_date: str = None, to_date: str = None, sizer=None) -> Dict:
+        """Pipelined month sync: Tally fetch → XML parse → backend upload.
+
+        The three stages run on their own threads connected by bounded queues, so
+        Tally builds month N+1's export while month N's last batches upload and a
+        slow backend throttles the fetcher instead of piling XML up in memory.
+        The fetch stage only opens each month's export (fetch_stream_from_tally);
+        the parse stage reads the body off the socket as it parses, so no month
+        is ever held as one XML string. Tally answers one request at a time, so
+        the next export is opened only once the previous body has been read to
+        the end — an export opened earlier would wait on a slow upload and hit
+        the read timeout.
+
+        Every month is fetched with the SAME AlterID floor (they run concurrently,
+        so month N's max AlterID can't gate month N+1). The watermark is advanced
+        once, to the max AlterID seen, and only if every month fetched/parsed and
+        every batch uploaded successfully — otherwise it stays put for a retry.
+
+        `sizer` (a chunk_sizer.ChunkSizer that planned `chunks`) is fed each
+        month's fetch cost so the next run starts at the right chunk size.
+        """
+        import queue
+        import threading
+
+        if company_name:
+            is_loaded, matched_company_name, loaded_companies = self.verify_tally_company(tally_host, tally_port, company_name)
+            if is_loaded and matched_company_name:
+                company_name = matched_company_name
+            if not is_loaded:
+                error_msg = (f"Company '{company_name}' is not loaded in Tally. "
+                           f"Loaded: {loaded_companies}. Aborting to prevent data mismatch.")
+                logger.error(error_msg)
+                return {'success': False, 'message': error_msg, 'count': 0}
+
+        if last_alter_id is None:
+            last_alter_id = self.get_last_alter_id(company_id)
+
+        logger.info(f"📅 Pipelined monthly sync: {len(chunks)} chunk(s) from {from_date} to {to_date}, "
+                    f"AlterID > {last_alter_id}")
+        try:
+            get_sync_logger().log_voucher_sync_start(
+                company_name=company_name or f'Company {company_id}',
+                from_date=from_date, to_date=to_date,
+                sync_type='First-Time (Monthly, Pipelined)',
+                chunk_count=len(chunks))
+        except Exception:
+            pass
+
+        fk = {'cmpId': company_id, 'userId': user_id}
+        complete = sizer is not None and last_alter_id == 0  # unfiltered: counts are the window's volume
+        fetch_stage = PipelineStage('fetch')
+        parse_stage = PipelineStage('parse')
+        upload_stage = PipelineStage('upload')
+        fetch_q = queue.Queue(maxsize=self.PIPELINE_FETCH_QUEUE)
+        upload_q = queue.Queue(maxsize=self.PIPELINE_UPLOAD_QUEUE)
+
+        chunk_errors = []
+        errors_lock = threading.Lock()
+        cancelled = threading.Event()  # the uploader gave up: stop fetching and parsing
+        tally_idle = threading.Semaphore(1)  # released when the open export's body is fully read
+        total_stats = {'vouchers': 0, 'ledgerEntries': 0, 'billAllocations': 0,
+                       'inventoryEntries': 0, 'batchAllocations': 0}
+        all_tally_records = []
+        max_alter = {'value': last_alter_id or 0}
+        upload_result = {'saved': 0, 'failed_batches': 0}
+        pipeline_start = time.time()
+
+        def record_error(msg):
+            with errors_lock:
+                chunk_errors.append(msg)
+            logger.error(f"   ❌ {msg}")
+
+        def fetch_worker():
+            try:
+                for idx, (c_start, c_end) in enumerate(chunks):
+                    if cancelled.is_set():
+                        break
+                    c_from = self._format_chunk_date(c_start)
+                    c_to = self._format_chunk_date(c_end)
+                    t0 = time.perf_counter()
+                    tally_idle.acquire()
+                    fetch_stage.blocked_s += time.perf_counter() - t0
+                    if cancelled.is_set():
+                        tally_idle.release()
+                        break
+                    t0 = time.perf_counter()
+                    tdl = self.generate_voucher_tdl(last_alter_id, c_from, c_to, company_name)
+                    response = self.fetch_stream_from_tally(tdl, tally_host, tally_port)
+                    open_s = time.perf_counter() - t0
+                    fetch_stage.busy_s += open_s
+                    if response is None:
+                        tally_idle.release()
+                        record_error(f"Month {idx+1} ({c_from}-{c_to}): Failed to fetch vouchers from Tally")
+                        if sizer is not None:
+                            sizer.failed(c_start, c_end)
+                        continue
+                    fetch_stage.items += 1
+                    fetch_stage.put(fetch_q, (idx, c_from, c_to, response, open_s))
+            finally:
+                fetch_q.put(None)
+
+        def parse_worker():
+            try:
+                while True:
+                    item = fetch_q.get()
+                    if item is None:
+                        break
+                    idx, c_from, c_to, response, open_s = item
+                    if cancelled.is_set():
+                        response.close()
+                        tally_idle.release()
+                        continue
+                    t0 = time.perf_counter()
+                    busy_s = 0.0  # reading + parsing this month, not blocked on the upload queue
+                    batch = []
+                    count = 0
+                    dates = [] if complete else None
+                    stream_stats = {'bytes': 0}
+                    try:
+                        chunks_in = response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)
+                        for v in self.iter_voucher_xml(chunks_in, encoding=response.encoding,
+                                                       stats=stream_stats, fk=fk):
+                            if cancelled.is_set():
+                                break
+                            count += 1
+                            if dates is not None:
+                                dates.append(v.get('voucherDate'))
+                            self._accumulate_voucher_stats(v, total_stats, all_tally_records)
+                            if v['alterId'] > max_alter['value']:
+                                max_alter['value'] = v['alterId']
+                            batch.append(v)
+                            if len(batch) >= self.BATCH_SIZE:
+                                busy_s += time.perf_counter() - t0
+                                parse_stage.put(upload_q, ('batch', idx, batch))
+                                batch = []
+                                t0 = time.perf_counter()
+                    except Exception as e:
+                        record_error(f"Month {idx+1} ({c_from}-{c_to}): Error parsing voucher XML: {e}")
+                        dates = None
+                    finally:
+                        response.close()
+                        tally_idle.release()  # body read to the end (or abandoned): open the next month
+                    busy_s += time.perf_counter() - t0
+                    fetch_stage.bytes += stream_stats['bytes']
+                    # Same measure as sync_vouchers' fetchMs: export open + body read and parsed.
+                    fetch_ms = int((open_s + busy_s) * 1000)
+                    if sizer is not None:
+                        sizer.observe(chunks[idx][0], chunks[idx][1], count, fetch_ms / 1000.0,
+                                      stream_stats['bytes'], dates)
+                    if batch:
+                        parse_stage.put(upload_q, ('batch', idx, batch))
+                    parse_stage.busy_s += busy_s
+                    parse_stage.items += 1
+                    parse_stage.vouchers += count
+                    # Marker travels behind the month's batches: when the uploader sees it,
+                    # every batch of that month has been sent.
+                    parse_stage.put(upload_q, ('done', idx, (c_from, c_to, count, fetch_ms)))
+            finally:
+                upload_q.put(None)
+
+        def upload_worker():
+            month_saved = {}
+            month_failed = {}
+            month_outstanding = {}
+            month_done = {}
+
+            def finish_month(idx):
+                c_from, c_to, count, fetch_ms = month_done.pop(idx)
+                saved = month_saved.pop(idx, 0)
+                failed = month_failed.pop(idx, 0)
+                month_outstanding.pop(idx, None)
+                logger.info(f"   ✅ Month {idx+1}/{len(chunks)}: {saved}/{count} vouchers "
+                            f"(fetch {fetch_ms}ms)")
+                try:
+                    get_sync_logger().log_voucher_sync_chunk(
+                        chunk_num=idx+1, total_chunks=len(chunks),
+                        from_date=c_from, to_date=c_to,
+                        count=saved, elapsed_ms=fetch_ms,
+                        chunk_type='Month',
+                        error=f'{failed} batch(es) failed' if failed else None)
+                except Exception:
+                    pass
+
+            def batches_from_queue():
+                # Runs on this thread inside the uploader, which only pulls the next
+                # batch when it can send it — that is the backpressure.
+                item = None
+                try:
+                    while (item := upload_q.get()) is not None:
+                        kind, idx, payload = item
+                        if kind == 'done':
+                            month_done[idx] = payload
+                            if not month_outstanding.get(idx):
+                                finish_month(idx)
+                            continue
+                        month_outstanding[idx] = month_outstanding.get(idx, 0) + 1
+                        yield idx, payload
+                finally:
+                    if item is not None:
+                        # Closed by an uploader that gave up: stop the fetch and parse
+                        # stages, and discard what they already queued.
+                        cancelled.set()
+                        record_error("Upload stopped — remaining months were not synced")
+                        while upload_q.get() is not None:
+                            pass
+
+            def on_result(item, result):
+                idx, batch = item
+                upload_stage.items += 1
+                upload_stage.vouchers += len(batch)
+                upload_stage.bytes += result.get('bytes', 0)
+                if result['success']:
+                    month_saved[idx] = month_saved.get(idx, 0) + result['saved']
+                else:
+                    month_failed[idx] = month_failed.get(idx, 0) + 1
+                    logger.error(f"❌ Month {idx+1} batch failed: {result.get('error')}")
+                month_outstanding[idx] -= 1
+                if month_outstanding[idx] == 0 and idx in month_done:
+                    finish_month(idx)
+
+            t0 = time.perf_counter()
+            # One NDJSON stream request per month when the backend supports it.
+            report = self.upload_voucher_batches(batches_from_queue(), company_id, user_id, company_guid,
+                                                 on_result=on_result, records=lambda item: item[1],
+                                                 group=lambda item: item[0])
+            upload_stage.busy_s += time.perf_counter() - t0
+            upload_result['saved'] = report['saved']
+            upload_result['failed_batches'] = report['failed']
+            upload_result['report'] = report
+
+        threads = [threading.Thread(target=fn, name=f'voucher-{name}', daemon=True)
+                   for name, fn in (('fetch', fetch_worker), ('parse', parse_worker),
+                                    ('upload', upload_worker))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        if sizer is not None:
+            sizer.save()
+
+        total_count = upload_result['saved']
+        failed_batches = upload_result['failed_batches']
+        all_ok = not chunk_errors and failed_batches == 0
+        pipeline_ms = int((time.time() - pipeline_start) * 1000)
+
+        # Advance the watermark only when every month and every batch landed.
+        effective_alter_id = last_alter_id
+        if all_ok and max_alter['value'] > (last_alter_id or 0):
+            self.save_last_alter_id(company_id, max_alter['value'])
+            effective_alter_id = max_alter['value']
+        elif not all_ok:
+            logger.error(f"⚠️ {len(chunk_errors)} month error(s), {failed_batches} failed batch(es) — "
+                         f"NOT advancing AlterID watermark (kept at {last_alter_id})")
+
+        pipeline_stats = {s.name: s.to_dict() for s in (fetch_stage, parse_stage, upload_stage)}
+        logger.info(f"🎉 Pipelined sync complete: {total_count}/{total_stats['vouchers']} vouchers saved "
+                    f"in {pipeline_ms}ms")
+        for name, st in pipeline_stats.items():
+            logger.info(f"   ⚙️ {name}: {st['items']} item(s), busy {st['busySeconds']}s, "
+                        f"blocked {st['blockedSeconds']}s, {st['vouchersPerSec']} vouchers/s")
+
+        if failed_batches:
+            chunk_errors.append(f'{failed_batches} upload batch(es) failed')
+        try:
+            get_sync_logger().log_voucher_sync_complete(
+                company_name=company_name or f'Company {company_id}',
+                total_vouchers=total_count, total_chunks=len(chunks),
+                errors=len(chunk_errors), duration_ms=pipeline_ms)
+        except Exception:
+            pass
+
+        result = {
+            'success': all_ok or len(chunk_errors) < len(chunks),
+            'message': (f'Successfully synced {total_count} vouchers in {len(chunks)} month(s)' if all_ok
+                        else f'Synced {total_count} vouchers with {len(chunk_errors)} error(s); '
+                             f'AlterID watermark not advanced (will retry next sync)'),
+            'count': total_count,
+            'lastAlterID': effective_alter_id,
+            'elapsedMs': pipeline_ms,
+            'stats': total_stats,
+            'tallyRecords': all_tally_records,
+            'pipeline': pipeline_stats,
+        }
+        report = upload_result.get('report')
+        if report:
+            result['upload'] = {k: report[k] for k in ('batches', 'failed', 'bytes', 'batchesPerSec',
+                                                       'bytesPerSec', 'peakWindow', 'throttled')}
+        if chunk_errors:
+            result['chunkErrors'] = chunk_errors
+        return result
+
+    @staticmethod
+    def _accumulate_voucher_stats(v: Dict, total_stats: Dict, tally_records: List[Dict]):
+        """Fold one parsed voucher into the sync stats and tallyRecords cache."""
+        ledger_entries = v.get('ledgerEntries', [])
+        inventory_entries = v.get('inventoryEntries', [])
+        total_stats['vouchers'] += 1
+        total_stats['ledgerEntries'] += len(ledger_entries)
+        total_stats['billAllocations'] += sum(len(le['billAllocations']) for le in ledger_entries)
+        total_stats['inventoryEntries'] += len(inventory_entries)
+        total_stats['batchAllocations'] += sum(len(ie['batchAllocations']) for ie in inventory_entries)
+        tally_records.append({
+            'guid': v['guid'],
+            'masterID': v.get('masterId', ''),
+            'alterID': v.get('alterId', 0),
+            'name': f"{v.get('voucherType', '')} {v.get('voucherNumber', '')}".strip() or v['guid'],
+            'date': v.get('voucherDate'),
+            'ledgerEntryCount': len(ledger_entries),
+            'inventoryEntryCount': len(inventory_entries)
+        })
+
+
 def main():
     """Main entry point - called from Electron or CLI"""
     try:
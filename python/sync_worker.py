@@ -1,46 +1,82 @@
 #!/usr/bin/env python3
 
+import gc
 import json
+import queue
+import re
 import sys
 import time
 import threading
 import logging
-import subprocess
 from datetime import datetime
 import os
 
-# Setup logging - use %APPDATA%/Tallify for bundled exe (Program Files is read-only)
-if getattr(sys, 'frozen', False):
-    _base_dir = os.path.join(os.environ.get('APPDATA', os.path.expanduser('~')), 'Tallify')
-else:
-    _base_dir = os.path.dirname(os.path.abspath(__file__))
+# Logs go to sync_logger.LOG_DIR (%APPDATA%/Tallify/logs for the bundled exe,
+# Program Files is read-only); the directory is created on the first log record.
+# get_sync_logger() is left to the sync modules: it installs the `requests`
+# retry patch, which would import requests before any mode needs it.
+from sync_logger import sync_log_handler
 
-log_dir = os.path.join(_base_dir, 'logs')
-os.makedirs(log_dir, exist_ok=True)
-log_file = os.path.join(log_dir, 'sync_worker.log')
-
-from sync_logger import get_sync_logger
-
-# Use global logger
-logger = get_sync_logger()
-
-# Add console handler if not already present
-if not any(isinstance(h, logging.StreamHandler) for h in logger.handlers):
+logger = logging.getLogger('sync_worker')
+if not logger.handlers:
+    logger.setLevel(logging.INFO)
+    logger.addHandler(sync_log_handler())
     console_handler = logging.StreamHandler(sys.stderr)
     console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
     logger.addHandler(console_handler)
+    logger.propagate = False
 
 
 import argparse
-from tally_api import TallyAPIClient
-from incremental_sync import IncrementalSyncManager
-from reconciliation import ReconciliationManager
-from sync_master import SyncManager
-from fetch_master_data import MasterDataFetcher
-from sync_vouchers import VoucherSyncManager
+from serializer import write_result as _write_stdout
+
+# The sync modules (tally_api, incremental_sync, reconciliation, sync_master,
+# fetch_master_data, sync_vouchers, ...) are imported by the mode that needs them,
+# so e.g. --mode fetch-license doesn't pay for the voucher/reconcile stack at startup.
+
+# While the daemon is running a job, run_* results go to this callable (which tags
+# them with the job id) instead of straight to stdout.
+_result_sink = None
+
+
+def write_result(obj):
+    """Deliver a run_* result document: stdout, or the daemon's job channel."""
+    sink = _result_sink
+    if sink is not None:
+        sink(obj)
+    else:
+        _write_stdout(obj)
+
+
+# Structured progress lines from sync_logger ("📅 [VOUCHER SYNC CHUNK] ...").
+_PROGRESS_TAG = re.compile(r'\[([A-Z][A-Z ]+)\]')
+
+
+class _ProgressFilter(logging.Filter):
+    """Forwards structured progress / warning log records of the running job.
+
+    Installed as a filter on the shared sync log handlers, which every sync
+    module attaches to its own logger, so it sees records from all of them.
+    Never drops a record.
+    """
+
+    def __init__(self, emit):
+        super().__init__()
+        self.emit = emit
+
+    def filter(self, record):
+        try:
+            message = record.getMessage()
+            tag = _PROGRESS_TAG.search(message)
+            if tag or record.levelno >= logging.WARNING:
+                self.emit(record.levelname, tag.group(1) if tag else None, message[:500])
+        except Exception:
+            pass
+        return True
+
 
 class SyncWorker:
-    """Manages periodic sync operations"""
+    """Manages periodic sync operations and serves sync jobs over stdin/stdout (see serve_jobs)"""
     
     def __init__(self):
         self.running = False
@@ -49,6 +85,13 @@ class SyncWorker:
         self.tally_port = 9000
         self.sync_interval = 1  # minutes
         self.last_sync_time = None
+        # Job server state: stdout is the message channel, shared by the heartbeat
+        # thread and the job thread, so every write goes through _emit.
+        self._out = sys.stdout
+        self._out_lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.job_thread = None
+        self.current_job = None
         
     def read_settings_from_stdin(self):
         """Read settings from Electron main process via stdin"""
@@ -105,7 +148,7 @@ class SyncWorker:
                 'port': self.tally_port,
                 'data': data or {}
             }
-            print(json.dumps(message), flush=True)
+            self._emit(message)
         except (OSError, IOError) as e:
             # If stdout is broken/closed, we can't communicate with Electron.
             # Most likely Invalid Argument (22) or Broken Pipe (32).
@@ -195,11 +238,171 @@ class SyncWorker:
         })
         
         try:
+            self.serve_jobs(sys.stdin)
             while self.running:
                 time.sleep(1)
         except KeyboardInterrupt:
             logger.info("Keyboard interrupt received")
             self.stop()
+
+    # ─── Job server ──────────────────────────────────────────────────
+
+    def _emit(self, message):
+        """Write one NDJSON message to the parent (thread-safe)."""
+        with self._out_lock:
+            _write_stdout(message, stream=self._out)
+
+    def serve_jobs(self, stream):
+        """Read newline-delimited JSON requests from `stream` until EOF or shutdown.
+
+        Requests (one JSON object per line):
+            {"id": "j1", "mode": "sync-vouchers", "params": {"companyId": 7, ...}}
+            {"type": "ping"}  {"type": "settings", "tallyPort": 9000}  {"type": "shutdown"}
+
+        `params` uses the same names as Electron's runWorkerCommand (companyId,
+        fromDate, lastAlterID, ...) or the CLI flag names. Jobs run one at a time,
+        in order, on a job thread inside this process, so Tally/backend connection
+        pools and module caches stay warm between them. For each job the parent
+        receives job_started, progress (structured sync log lines and warnings),
+        result (whatever the CLI mode would have printed) and job_done messages,
+        all carrying the job id.
+
+        EOF only ends the request loop: a parent that closes stdin after sending
+        the settings line keeps the previous daemon behaviour.
+        """
+        # Anything a sync module print()s must not corrupt the message channel.
+        sys.stdout = sys.stderr
+        self.job_thread = threading.Thread(target=self._job_loop, name='sync-jobs', daemon=True)
+        self.job_thread.start()
+        for line in iter(stream.readline, ''):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError('request must be a JSON object')
+            except ValueError as e:
+                self._emit({'type': 'job_error', 'id': None, 'error': f'Invalid request: {e}'})
+                continue
+
+            kind = request.get('type', 'job')
+            if kind == 'ping':
+                self._emit({'type': 'pong', 'id': request.get('id'), 'running': self.current_job,
+                            'queued': self.jobs.qsize()})
+            elif kind == 'settings':
+                self.tally_host = request.get('tallyHost', self.tally_host)
+                self.tally_port = request.get('tallyPort', self.tally_port)
+                self.sync_interval = request.get('syncInterval', self.sync_interval)
+            elif kind == 'shutdown':
+                logger.info("Shutdown requested by parent")
+                self.jobs.put(None)
+                self.job_thread.join()
+                self.stop()
+                return
+            elif kind == 'job':
+                self.jobs.put(request)
+                self._emit({'type': 'job_queued', 'id': request.get('id'), 'mode': request.get('mode'),
+                            'queued': self.jobs.qsize()})
+            else:
+                self._emit({'type': 'job_error', 'id': request.get('id'), 'error': f'Unknown request type: {kind}'})
+        logger.info("Job channel closed (stdin EOF); daemon continues without accepting jobs")
+
+    def _job_loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            try:
+                self.run_job(job)
+            except OSError as e:
+                logger.error(f"Stdout pipe broken/closed ({e}), stopping worker...")
+                self.running = False
+                return
+
+    def job_args(self, mode, params):
+        """argparse Namespace for a job: the CLI defaults, overridden by `params`.
+
+        Values are set on the namespace directly (typed and checked against the
+        option's `type`/`choices`), never turned back into argv — a value such as
+        "-Cash" or -1 would otherwise be read as an option.
+        """
+        if mode not in MODE_RUNNERS:
+            raise ValueError(f"Unknown mode: {mode}")
+        parser = build_arg_parser()
+        args = parser.parse_args(['--mode', mode])
+        args.host, args.port = self.tally_host, self.tally_port
+        actions = {action.dest: action for action in parser._actions}
+        for key, value in (params or {}).items():
+            if value is None:
+                continue
+            dest = JOB_PARAMS.get(key, key).replace('-', '_')
+            action = actions.get(dest)
+            if action is None or dest in ('mode', 'help'):
+                raise ValueError(f"Unknown parameter for {mode}: {key}")
+            if action.nargs == 0:  # store_true flags
+                value = bool(value)
+            else:
+                try:
+                    value = action.type(value) if action.type else str(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Invalid value for {key}: {value!r}")
+                if action.choices is not None and value not in action.choices:
+                    raise ValueError(f"Invalid value for {key}: {value!r} (choose from {', '.join(action.choices)})")
+            setattr(args, dest, value)
+        return resolve_secrets(args)
+
+    def run_job(self, job):
+        """Run one job request in-process and report it on the message channel."""
+        global _result_sink
+        job_id, mode = job.get('id'), job.get('mode')
+        try:
+            args = self.job_args(mode, job.get('params') or job.get('args'))
+        except ValueError as e:
+            self._emit({'type': 'job_error', 'id': job_id, 'mode': mode, 'error': str(e)})
+            return
+
+        from tally_http import transport_stats
+        self.current_job = job_id
+        started = time.perf_counter()
+        stats_before = transport_stats()
+        self._emit({'type': 'job_started', 'id': job_id, 'mode': mode, 'timestamp': datetime.now().isoformat()})
+
+        results = []
+
+        def deliver(obj):
+            results.append(obj)
+            self._emit({'type': 'result', 'id': job_id, 'mode': mode, 'result': obj})
+
+        progress = _ProgressFilter(lambda level, stage, message: self._emit(
+            {'type': 'progress', 'id': job_id, 'level': level, 'stage': stage, 'message': message}))
+        # The sync log file handler is shared by every sync module's logger, so one
+        # filter on it sees each record exactly once.
+        log_handlers = [sync_log_handler()]
+        for handler in log_handlers:
+            handler.addFilter(progress)
+        _result_sink = deliver
+        error = None
+        try:
+            MODE_RUNNERS[mode](args)
+        except Exception as e:  # run_* report their own errors; this is the last resort
+            logger.error(f"Job {job_id} ({mode}) failed: {e}", exc_info=True)
+            error = str(e)
+        finally:
+            _result_sink = None
+            for handler in log_handlers:
+                handler.removeFilter(progress)
+            self.current_job = None
+
+        last = results[-1] if results else None
+        success = error is None and (last.get('success', True) if isinstance(last, dict) else last is not None)
+        stats_after = transport_stats()
+        self._emit({
+            'type': 'job_done', 'id': job_id, 'mode': mode, 'success': bool(success), 'error': error,
+            'elapsedMs': int((time.perf_counter() - started) * 1000),
+            'tallyRequests': stats_after['requests'] - stats_before['requests'],
+        })
+        gc.collect()
     
     def stop(self):
         """Stop the sync worker"""
@@ -216,43 +419,45 @@ class SyncWorker:
 
 def fetch_license(host, port):
     try:
+        from tally_api import TallyAPIClient
         client = TallyAPIClient(host=host, port=port, timeout=10)
         success, result = client.get_license_info()
-        print(json.dumps({
+        write_result({
             'success': success,
             'data': result if success else None,
             'error': None if success else str(result)
-        }))
+        })
     except OSError:
         pass # Parent closed pipe
     except Exception as e:
         try:
-            print(json.dumps({
+            write_result({
                 'success': False,
                 'data': None,
                 'error': str(e)
-            }))
+            })
         except OSError:
             pass
 
 def fetch_companies(host, port):
     try:
+        from tally_api import TallyAPIClient
         client = TallyAPIClient(host=host, port=port, timeout=10)
         success, result = client.get_companies()
-        print(json.dumps({
+        write_result({
             'success': success,
             'data': result if success else None,
             'error': None if success else str(result)
-        }))
+        })
     except OSError:
         pass # Parent closed pipe
     except Exception as e:
         try:
-            print(json.dumps({
+            write_result({
                 'success': False,
                 'data': None,
                 'error': str(e)
-            }))
+            })
         except OSError:
             pass
 
@@ -293,32 +498,46 @@ def run_incremental_sync(args):
     Fetches all records from Tally, upserts only those changed since lastAlterID,
     then reconciles DB against Tally to detect missing/stale/deleted records.
     When entity_type == 'all', every master entity is synced IN THIS SINGLE PROCESS
-    (in dependency order) instead of spawning one process per entity per cycle.
+    instead of spawning one process per entity per cycle; per-entity syncs run
+    through sync_scheduler, independent entities in parallel, dependencies first.
     """
     try:
         # Company name is mandatory — every entity fetch is scoped via SVCURRENTCOMPANY,
         # and an empty name would silently reconcile against the active Tally company.
         if not args.company_name or not str(args.company_name).strip():
-            print(json.dumps({'success': False, 'message': 'Company name is required', 'count': 0}))
+            write_result({'success': False, 'message': 'Company name is required', 'count': 0})
             return
 
+        from incremental_sync import IncrementalSyncManager
         manager = IncrementalSyncManager(args.backend_url, args.auth_token, args.device_token, batch_size=args.batch_size)
         force_deep = getattr(args, 'deep', False)
 
         if (args.entity_type or '').lower() == 'all':
-            results = {}
-            total_count = 0
-            any_failure = False
-            for entity_type in INCREMENTAL_SYNC_ORDER:
-                try:
-                    r = _sync_one_entity(manager, args, entity_type, force_deep)
-                except Exception as ent_err:
-                    logger.error(f"❌ {entity_type} sync failed: {ent_err}")
-                    r = {'success': False, 'message': str(ent_err), 'count': 0}
-                results[entity_type] = r
-                total_count += r.get('count', 0) or 0
-                if not r.get('success'):
-                    any_failure = True
+            bundled = None
+            schedule = None
+            if not force_deep:
+                from master_bundle import bundle_supported
+                if bundle_supported(args.host, args.port):
+                    # One Tally export for every master; None → Tally rejected it, go per entity.
+                    bundled = manager.sync_incremental_fast_all(
+                        company_id=int(args.company_id), user_id=args.user_id,
+                        tally_host=args.host, tally_port=args.port,
+                        entity_types=list(INCREMENTAL_SYNC_ORDER), company_name=args.company_name)
+            if bundled is not None:
+                results = bundled
+            else:
+                from sync_scheduler import run_dag
+                # One manager for every worker: its sync paths report through return
+                # values, not instance state (the symbol table interns with setdefault).
+                results, schedule = run_dag(
+                    INCREMENTAL_SYNC_ORDER, lambda entity_type: _sync_one_entity(manager, args, entity_type, force_deep))
+                logger.info(f"🗓️ Masters synced in {schedule['wallSeconds']:.2f}s with {schedule['workers']} worker(s) "
+                            f"(sequential {schedule['sumSeconds']:.2f}s); critical path "
+                            f"{' → '.join(schedule['criticalPath'])} = {schedule['criticalPathSeconds']:.2f}s")
+                logger.info("⏱️ " + ", ".join(
+                    f"{e} {t['seconds']:.2f}s" for e, t in sorted(schedule['entities'].items(), key=lambda i: -i[1]['seconds'])))
+            total_count = sum(r.get('count', 0) or 0 for r in results.values())
+            any_failure = not all(r.get('success') for r in results.values())
 
             # Overall status reflects per-entity outcome (partial when some failed).
             status = 'synced' if not any_failure else 'partial'
@@ -327,12 +546,13 @@ def run_incremental_sync(args):
             changed_entities = [e for e, r in results.items() if (r.get('count') or 0) > 0]
             if changed_entities:
                 manager.notify_data_changed(int(args.company_id), args.user_id, changed_entities)
-            print(json.dumps({
+            write_result({
                 'success': not any_failure,
                 'status': status,
                 'totalCount': total_count,
                 'results': results,
-            }))
+                'schedule': schedule,
+            })
             return
 
         # Single entity
@@ -344,10 +564,10 @@ def run_incremental_sync(args):
         )
         if result.get('success') and (result.get('count') or 0) > 0:
             manager.notify_data_changed(int(args.company_id), args.user_id, [args.entity_type])
-        print(json.dumps(result))
+        write_result(result)
     except Exception as e:
         logger.error(f"Incremental sync error: {e}")
-        print(json.dumps({'success': False, 'message': str(e), 'count': 0}))
+        write_result({'success': False, 'message': str(e), 'count': 0})
 
 def run_reconciliation(args):
     """Run reconciliation. Master entities are already reconciled inline during sync.
@@ -356,9 +576,12 @@ def run_reconciliation(args):
         # Company name is mandatory — voucher reconciliation fetches from Tally scoped
         # via SVCURRENTCOMPANY; an empty name would reconcile against the active company.
         if not args.company_name or not str(args.company_name).strip():
-            print(json.dumps({'success': False, 'message': 'Company name is required', 'count': 0}))
+            write_result({'success': False, 'message': 'Company name is required', 'count': 0})
             return
 
+        from incremental_sync import IncrementalSyncManager
+        from reconciliation import ReconciliationManager
+        from sync_vouchers import VoucherSyncManager
         manager = ReconciliationManager(args.backend_url, args.auth_token, args.device_token, batch_size=args.batch_size)
         sync_manager = IncrementalSyncManager(args.backend_url, args.auth_token, args.device_token, batch_size=args.batch_size)
 
@@ -440,15 +663,15 @@ def run_reconciliation(args):
 
             if args.entity_type.lower() == 'all':
                 # Wrap as combined result (masters already done, only voucher result here)
-                print(json.dumps({
+                write_result({
                     'success': voucher_result.get('success', False),
                     'totalMissing': voucher_result.get('missing', 0),
                     'totalUpdated': voucher_result.get('updated', 0),
                     'totalSynced': voucher_result.get('synced', 0),
                     'details': [voucher_result]
-                }))
+                })
             else:
-                print(json.dumps(voucher_result))
+                write_result(voucher_result)
         else:
             # Single master entity reconciliation (standalone, not called during normal sync)
             result = manager.reconcile_entity(
@@ -466,11 +689,11 @@ def run_reconciliation(args):
                 result.get('success', False)
             )
             
-            print(json.dumps(result))
+            write_result(result)
             
     except Exception as e:
         logger.error(f"Reconciliation error: {e}")
-        print(json.dumps({'success': False, 'error': str(e)}))
+        write_result({'success': False, 'error': str(e)})
 
 def run_bills_outstanding_sync(args):
     """Fetch bills outstanding from Tally's built-in reports and push to backend.
@@ -481,7 +704,7 @@ def run_bills_outstanding_sync(args):
     """
     try:
         import requests
-        import xml.etree.ElementTree as ET
+        import xml_backend
         
         tally_url = f"http://{args.host}:{args.port}"
         backend_url = args.backend_url.rstrip('/')
@@ -493,7 +716,7 @@ def run_bills_outstanding_sync(args):
         # company's Receivables/Payables. Abort rather than sync the wrong company.
         if not company_name:
             logger.error("run_bills_outstanding_sync: missing company_name — aborting to avoid syncing the wrong (active) company")
-            print(json.dumps({'success': False, 'error': 'company_name is required for company-scoped bills sync'}))
+            write_result({'success': False, 'error': 'company_name is required for company-scoped bills sync'})
             return
 
         headers = {
@@ -502,11 +725,6 @@ def run_bills_outstanding_sync(args):
             'X-Device-Token': args.device_token or ''
         }
         
-        def clean_xml(text):
-            """Remove invalid XML characters."""
-            import re
-            return re.sub(r'[^\x09\x0A\x0D\x20-\x7E\x80-\xFF\u0100-\uFFFF]', '', text)
-
         def fetch_bills_from_tally(report_name):
             """Fetch bill-wise outstanding using Tally's built-in report export."""
             from xml.sax.saxutils import escape
@@ -531,8 +749,8 @@ def run_bills_outstanding_sync(args):
                     logger.error(f"Tally fetch failed for {report_name}")
                     return []
 
-                text = clean_xml(raw)
-                root = ET.fromstring(text)
+                from xml_sanitizer import sanitize
+                root = xml_backend.fromstring(sanitize(raw))
                 elements = list(root)
                 bills = []
                 i = 0
@@ -602,12 +820,9 @@ def run_bills_outstanding_sync(args):
                 'bills': bills
             }
             try:
-                resp = requests.post(
-                    f"{backend_url}/bills-outstanding/sync",
-                    json=payload,
-                    headers=headers,
-                    timeout=30
-                )
+                from backend_http import post_json
+                resp, _, _ = post_json(f"{backend_url}/bills-outstanding/sync", payload,
+                                       headers, timeout=30, label=f"bills-outstanding ({report_type})")
                 if resp.status_code == 200:
                     result = resp.json()
                     return True, result.get('count', len(bills))
@@ -648,16 +863,16 @@ def run_bills_outstanding_sync(args):
                 }
         
         all_success = all(r['success'] for r in results.values())
-        print(json.dumps({
+        write_result({
             'success': all_success,
             'message': 'Bills outstanding synced from Tally' if all_success else 'Partial failure',
             'receivable': results.get('receivable', {}),
             'payable': results.get('payable', {}),
-        }))
+        })
         
     except Exception as e:
         logger.error(f"Bills outstanding sync error: {e}")
-        print(json.dumps({'success': False, 'message': str(e)}))
+        write_result({'success': False, 'message': str(e)})
 
 
 def run_sync_master(args):
@@ -673,15 +888,16 @@ def run_sync_master(args):
         device_token = args.device_token
 
         if not company_name:
-            print(json.dumps({'success': False, 'error': 'Company name is required'}))
+            write_result({'success': False, 'error': 'Company name is required'})
             return
 
+        from sync_master import SyncManager
         manager = SyncManager(company_name, tally_host, tally_port, backend_url, auth_token, device_token)
         result = manager.sync_all(cmp_id, user_id, "INITIAL")
-        print(json.dumps(result))
+        write_result(result)
     except Exception as e:
         logger.error(f"Sync master error: {e}", exc_info=True)
-        print(json.dumps({'success': False, 'error': str(e)}))
+        write_result({'success': False, 'error': str(e)})
 
 
 def run_fetch_master_data(args):
@@ -693,9 +909,10 @@ def run_fetch_master_data(args):
         is_first_sync = args.is_first_sync
 
         if not company_name:
-            print(json.dumps({'success': False, 'data': {}, 'message': 'Company name is required'}))
+            write_result({'success': False, 'data': {}, 'message': 'Company name is required'})
             return
 
+        from fetch_master_data import MasterDataFetcher
         fetcher = MasterDataFetcher(company_name, tally_host, tally_port)
         master_data = fetcher.fetch_all()
 
@@ -705,10 +922,10 @@ def run_fetch_master_data(args):
             'data': master_data,
             'message': 'Master data fetched successfully'
         }
-        print(json.dumps(result))
+        write_result(result)
     except Exception as e:
         logger.error(f"Fetch master data error: {e}", exc_info=True)
-        print(json.dumps({'success': False, 'data': {}, 'message': str(e)}))
+        write_result({'success': False, 'data': {}, 'message': str(e)})
 
 
 def run_sync_vouchers(args):
@@ -739,19 +956,20 @@ def run_sync_vouchers(args):
         user_id = args.user_id or 1
 
         if not company_guid:
-            print(json.dumps({'success': False, 'message': 'Company GUID required', 'count': 0}))
+            write_result({'success': False, 'message': 'Company GUID required', 'count': 0})
             return
 
         # Vouchers are exported scoped via SVCURRENTCOMPANY — without the name Tally
         # would return the active company's vouchers.
         if not company_name or not str(company_name).strip():
-            print(json.dumps({'success': False, 'message': 'Company name is required', 'count': 0}))
+            write_result({'success': False, 'message': 'Company name is required', 'count': 0})
             return
 
         if not backend_url:
-            print(json.dumps({'success': False, 'message': 'Backend URL required', 'count': 0}))
+            write_result({'success': False, 'message': 'Backend URL required', 'count': 0})
             return
 
+        from sync_vouchers import VoucherSyncManager
         sync_manager = VoucherSyncManager(backend_url, auth_token, device_token)
 
         # Explicit dates ⇒ first-time chunked sync; honor them verbatim.
@@ -793,18 +1011,76 @@ def run_sync_vouchers(args):
             last_alter_id=last_alter_id,
             company_name=company_name
         )
-        print(json.dumps(result))
+        write_result(result)
     except Exception as e:
         logger.error(f"Voucher sync error: {e}", exc_info=True)
-        print(json.dumps({'success': False, 'message': str(e), 'count': 0}))
+        write_result({'success': False, 'message': str(e), 'count': 0})
 
 
-if __name__ == '__main__':
+def run_probe_vouchers(args):
+    """Voucher count / max-AlterID histogram for a date range, without exporting vouchers.
+
+    Lets the renderer size progress bars before a first-time chunked sync.
+    """
+    try:
+        company_name = args.company_name
+        if not company_name or not str(company_name).strip():
+            write_result({'success': False, 'message': 'Company name is required'})
+            return
+        now = datetime.now()
+        start_year = now.year if now.month >= 4 else now.year - 1
+        from_date = (args.from_date or '').strip() or f"01-Apr-{start_year}"
+        to_date = (args.to_date or '').strip() or now.strftime('%d-%b-%Y')
+
+        from sync_vouchers import VoucherSyncManager
+        manager = VoucherSyncManager(args.backend_url or os.getenv('BACKEND_URL', ''),
+                                     args.auth_token or '', args.device_token or '')
+        histogram = manager.probe_vouchers(from_date, to_date, args.host, args.port, company_name,
+                                           args.granularity)
+        if histogram is None:
+            write_result({'success': False, 'message': 'Tally could not answer the voucher count query'})
+            return
+        write_result(dict(histogram, success=True))
+    except Exception as e:
+        logger.error(f"Voucher probe error: {e}", exc_info=True)
+        write_result({'success': False, 'message': str(e)})
+
+
+def run_financial_reports(args):
+    """Run financial report sync (sync_financial_reports.py logic). Dates are YYYYMMDD."""
+    import contextlib
+    from sync_financial_reports import FinancialReportSync
+    try:
+        if not args.company_name:
+            write_result({'success': False, 'message': 'Company name is required — refusing to sync the active Tally company'})
+            return
+        syncer = FinancialReportSync(
+            company_name=args.company_name,
+            cmp_id=args.company_id or 1,
+            user_id=args.user_id or 1,
+            tally_port=args.port,
+            backend_url=args.backend_url or os.getenv('BACKEND_URL', ''),
+            from_date=args.from_date,
+            to_date=args.to_date,
+            auth_token=args.auth_token,
+            device_token=args.device_token,
+            financial_year=args.financial_year,
+        )
+        # FinancialReportSync reports progress with print(); keep stdout for the result.
+        with contextlib.redirect_stdout(sys.stderr):
+            result = syncer.sync_all(args.report_type)
+        write_result(result)
+    except Exception as e:
+        logger.error(f"Financial reports sync error: {e}", exc_info=True)
+        write_result({'success': False, 'message': str(e), 'details': {}})
+
+
+def build_arg_parser():
     parser = argparse.ArgumentParser(description='Tallify Sync Worker')
     parser.add_argument('--mode', choices=[
         'daemon', 'fetch-license', 'fetch-companies', 'incremental-sync',
         'reconcile', 'sync-bills-outstanding', 'sync-master',
-        'fetch-master-data', 'sync-vouchers'
+        'fetch-master-data', 'sync-vouchers', 'sync-financial-reports', 'probe-vouchers'
     ], default='daemon', help='Operation mode')
     parser.add_argument('--host', type=str, default='localhost', help='Tally server host/IP')
     parser.add_argument('--port', type=int, default=9000, help='Tally port number')
@@ -830,9 +1106,15 @@ if __name__ == '__main__':
     parser.add_argument('--deep', action='store_true',
                         help='Deep sync: full fetch + reconcile + deletion propagation (slower, periodic safety net). '
                              'When omitted, a fast AlterID-filtered incremental sync is used.')
+    parser.add_argument('--report-type', choices=['balancesheet', 'profitloss', 'trailbalance'],
+                        help='Single report for sync-financial-reports (default: all three)')
+    parser.add_argument('--financial-year', help='Financial year label for sync-financial-reports')
+    parser.add_argument('--granularity', choices=['day', 'month'], default='month',
+                        help='Histogram bucket size for probe-vouchers')
+    return parser
 
-    args = parser.parse_args()
 
+def resolve_secrets(args):
     # SECURITY: prefer secrets from environment (passed by Electron via env, not argv,
     # so they don't leak into process listings / logs). Fall back to any --auth-token /
     # --device-token only for backward compatibility and dev positional invocation.
@@ -840,24 +1122,47 @@ if __name__ == '__main__':
         args.auth_token = os.environ.get('TALLY_AUTH_TOKEN', '')
     if not getattr(args, 'device_token', None):
         args.device_token = os.environ.get('TALLY_DEVICE_TOKEN', '')
+    return args
+
+
+# One-shot modes, shared by the CLI and the daemon's job channel.
+MODE_RUNNERS = {
+    'fetch-license': lambda args: fetch_license(args.host, args.port),
+    'fetch-companies': lambda args: fetch_companies(args.host, args.port),
+    'incremental-sync': run_incremental_sync,
+    'reconcile': run_reconciliation,
+    'sync-bills-outstanding': run_bills_outstanding_sync,
+    'sync-master': run_sync_master,
+    'fetch-master-data': run_fetch_master_data,
+    'sync-vouchers': run_sync_vouchers,
+    'sync-financial-reports': run_financial_reports,
+    'probe-vouchers': run_probe_vouchers,
+}
+
+# Job params as Electron's runWorkerCommand names them → argparse dest.
+JOB_PARAMS = {
+    'tallyHost': 'host', 'cmpId': 'company_id', 'tallyPort': 'port', 'companyId': 'company_id', 'userId': 'user_id',
+    'backendUrl': 'backend_url', 'entityType': 'entity_type', 'maxAlterID': 'max_alter_id',
+    'companyName': 'company_name', 'companyGuid': 'company_guid', 'fromDate': 'from_date',
+    'toDate': 'to_date', 'lastAlterID': 'last_voucher_alter_id', 'isFirstSync': 'is_first_sync',
+    'syncCacheFile': 'sync_cache_file', 'batchSize': 'batch_size', 'reportType': 'report_type',
+    'financialYear': 'financial_year', 'authToken': 'auth_token', 'deviceToken': 'device_token',
+    'granularity': 'granularity',
+}
 
-    if args.mode == 'fetch-license':
-        fetch_license(args.host, args.port)
-    elif args.mode == 'fetch-companies':
-        fetch_companies(args.host, args.port)
-    elif args.mode == 'incremental-sync':
-        run_incremental_sync(args)
-    elif args.mode == 'reconcile':
-        run_reconciliation(args)
-    elif args.mode == 'sync-bills-outstanding':
-        run_bills_outstanding_sync(args)
-    elif args.mode == 'sync-master':
-        run_sync_master(args)
-    elif args.mode == 'fetch-master-data':
-        run_fetch_master_data(args)
-    elif args.mode == 'sync-vouchers':
-        run_sync_vouchers(args)
-    else:
-        # Default daemon mode
+
+if __name__ == '__main__':
+    args = resolve_secrets(build_arg_parser().parse_args())
+
+    if args.mode == 'daemon':
         worker = SyncWorker()
         worker.start()
+    else:
+        MODE_RUNNERS[args.mode](args)
+        from tally_http import transport_stats
+        stats = transport_stats()
+        if stats['requests']:
+            checks = stats['companyChecks']
+            logger.info(f"🔌 Tally transport: {stats['requests']} requests, "
+                        f"{stats['newConnections']} new connections, {stats['reusedConnections']} reused; "
+                        f"company verified {checks['misses']}x, {checks['hits']} cached")
@@ -20,6 +20,22 @@ a = Analysis(
         (os.path.join(_src_dir, 'sync_bills_outstanding.py'), '.'),
         (os.path.join(_src_dir, 'sync_logger.py'), '.'),
         (os.path.join(_src_dir, 'sync_config.py'), '.'),
+        (os.path.join(_src_dir, 'sync_scheduler.py'), '.'),
+        (os.path.join(_src_dir, 'tally_http.py'), '.'),
+        (os.path.join(_src_dir, 'master_bundle.py'), '.'),
+        (os.path.join(_src_dir, 'batch_uploader.py'), '.'),
+        (os.path.join(_src_dir, 'backend_http.py'), '.'),
+        (os.path.join(_src_dir, 'serializer.py'), '.'),
+        (os.path.join(_src_dir, 'snapshot_store.py'), '.'),
+        (os.path.join(_src_dir, 'chunk_sizer.py'), '.'),
+        (os.path.join(_src_dir, 'stream_uploader.py'), '.'),
+        (os.path.join(_src_dir, 'xml_sanitizer.py'), '.'),
+        (os.path.join(_src_dir, 'master_fields.py'), '.'),
+        (os.path.join(_src_dir, 'xml_backend.py'), '.'),
+        (os.path.join(_src_dir, 'voucher_records.py'), '.'),
+        (os.path.join(_src_dir, 'symbol_table.py'), '.'),
+        (os.path.join(_src_dir, 'merkle_reconcile.py'), '.'),
+        (os.path.join(_src_dir, 'sync_financial_reports.py'), '.'),
     ],
     hiddenimports=[
         # HTTP / networking
@@ -60,6 +76,23 @@ a = Analysis(
         'sync_bills_outstanding',
         'sync_logger',
         'sync_config',
+        'sync_scheduler',
+        'tally_http',
+        'master_bundle',
+        'batch_uploader',
+        'backend_http',
+        'serializer',
+        'snapshot_store',
+        'chunk_sizer',
+        'stream_uploader',
+        'xml_sanitizer',
+        'master_fields',
+        'xml_backend',
+        'voucher_records',
+        'symbol_table',
+        'merkle_reconcile',
+        'sync_financial_reports',
+        'sqlite3',
     ],
     hookspath=[],
     hooksconfig={},
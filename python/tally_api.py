@@ -5,6 +5,10 @@ import logging
 from typing import Dict, Optional, Tuple, Any, List
 from datetime import datetime
 
+from sync_logger import install_request_retries
+from xml_sanitizer import sanitize
+import xml_backend
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -28,6 +32,7 @@ class TallyAPIClient:
         self.port = port
         self.timeout = timeout
         self.base_url = f"http://{host}:{port}"
+        install_request_retries()
         self.session = requests.Session()
         logger.info(f"TallyAPIClient initialized for {self.base_url}")
 
@@ -188,28 +193,8 @@ class TallyAPIClient:
 
     @staticmethod
     def clean_xml(xml_string: str) -> str:
-        """Remove invalid XML characters and entities."""
-        import re
-        # Remove invalid numeric character references (&#0; to &#31; except 9, 10, 13)
-        def replace_invalid_entity(match):
-            num = int(match.group(1))
-            if num in (9, 10, 13) or num >= 32:
-                return match.group(0)
-            return ''
-        
-        xml_string = re.sub(r'&#(\d+);', replace_invalid_entity, xml_string)
-        
-        def replace_invalid_hex_entity(match):
-            num = int(match.group(1), 16)
-            if num in (9, 10, 13) or num >= 32:
-                return match.group(0)
-            return ''
-        
-        xml_string = re.sub(r'&#x([0-9a-fA-F]+);', replace_invalid_hex_entity, xml_string)
-        xml_string = re.sub(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F-\x9F]', '', xml_string)
-        xml_string = ''.join(char for char in xml_string if ord(char) >= 0x20 or char in '\t\n\r')
-        
-        return xml_string
+        """Remove invalid XML characters and entities (see xml_sanitizer)."""
+        return sanitize(xml_string)
 
     def send_request(self, xml_data: str) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -603,7 +588,7 @@ class TallyAPIClient:
             Dictionary with parsed data
         """
         try:
-            root = ET.fromstring(xml_response)
+            root = xml_backend.fromstring(xml_response)
             
             # Extract data from BODY
             body = root.find(".//BODY")
@@ -616,7 +601,7 @@ class TallyAPIClient:
             logger.info(f"Parsed response: {str(data)[:100]}...")
             return data
             
-        except ET.ParseError as e:
+        except xml_backend.PARSE_ERRORS as e:
             logger.error(f"XML parse error: {e}")
             return {"error": "Invalid XML response", "raw": xml_response}
         except Exception as e:
@@ -8,13 +8,25 @@ transient Tally hiccup failed a whole entity for the cycle.
 
 This helper returns the raw response text (Tally XML) so existing ElementTree
 parsing in the sync modules keeps working unchanged.
+
+Requests share a keep-alive session per Tally (host, port) — see `tally_post`,
+`transport_stats()` and the TALLY_POOL_* settings.
 """
 
 import logging
+import os
 import random
+import re
+import threading
 import time
+import weakref
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from sync_logger import install_request_retries
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +36,263 @@ DEFAULT_MAX_RETRIES = 3
 DEFAULT_INITIAL_DELAY = 1.0   # seconds
 DEFAULT_BACKOFF_FACTOR = 2.0
 
+# Connection pool policy. Tally serves one request at a time, so a small pool is
+# plenty; sessions unused for longer than the idle window are closed so a
+# long-lived daemon doesn't hold sockets Tally has already dropped.
+DEFAULT_POOL_SIZE = int(os.getenv('TALLY_POOL_SIZE', '4'))
+DEFAULT_IDLE_SECONDS = float(os.getenv('TALLY_POOL_IDLE_SECONDS', '60'))
+# Requests in flight per endpoint; Tally answers one export at a time.
+MAX_CONCURRENCY = max(1, int(os.getenv('TALLY_MAX_CONCURRENCY', '1')))
+
+# How long a successful company verification is trusted. Failures are never cached.
+COMPANY_VERIFY_TTL = float(os.getenv('TALLY_COMPANY_VERIFY_TTL', '300'))
+_COMPANY_ERROR = re.compile(rb'<LINEERROR>[^<]*compan', re.IGNORECASE)
+
+
+class _PooledEndpoint:
+    """Keep-alive session for one Tally (host, port) plus usage counters.
+
+    Idle time counts from when a request finished (for stream=True, when the
+    response is closed); an endpoint with a request in flight is never evicted.
+    `gate` admits at most TALLY_MAX_CONCURRENCY requests at once, so parallel
+    callers (sync_scheduler) queue here rather than on Tally's single-threaded
+    server; for stream=True the slot is held until the headers arrive.
+    """
+
+    def __init__(self, host: str, port: int, pool_size: int):
+        self.host = host
+        self.port = port
+        install_request_retries()  # first Tally session: sync_logger's retry patch goes in now
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.requests = 0  # requests actually sent
+        self.in_use = 0    # requests in flight (a streamed response counts until closed)
+        self.last_used = time.monotonic()  # when the last request finished
+        self.gate = threading.BoundedSemaphore(MAX_CONCURRENCY)
+        self.waited = 0.0  # seconds callers spent queued on the gate
+
+    def connections_opened(self) -> int:
+        """Number of TCP connections urllib3 has opened for this endpoint."""
+        try:
+            pools = self.adapter.poolmanager.pools
+            return sum(int(getattr(pools.get(key), 'num_connections', 0)) for key in pools.keys())
+        except Exception:
+            return 0
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception:
+            pass
+
+
+_endpoints: dict = {}
+_lock = threading.Lock()
+# Counters carried over from endpoints that were evicted/closed.
+_retired = {'requests': 0, 'newConnections': 0, 'evicted': 0, 'waited': 0.0}
+# (host, port, company name lower) -> (expires_at, verification result)
+_company_checks: dict = {}
+_company_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+# Per-key locks so concurrent syncs of one company share a single verification.
+_company_locks: dict = {}
+
+
+def _evict_idle_locked(now: float, idle_seconds: float):
+    for key, endpoint in list(_endpoints.items()):
+        if endpoint.in_use == 0 and now - endpoint.last_used > idle_seconds:
+            _retire_locked(key, endpoint)
+            _retired['evicted'] += 1
+            logger.debug(f"🔌 Closed idle Tally session {key[0]}:{key[1]}")
+
+
+def _retire_locked(key, endpoint):
+    _retired['requests'] += endpoint.requests
+    _retired['newConnections'] += endpoint.connections_opened()
+    _retired['waited'] += endpoint.waited
+    endpoint.close()
+    _endpoints.pop(key, None)
+
+
+def get_session(host: str, port: int, pool_size: int = None,
+                idle_seconds: float = None) -> requests.Session:
+    """Return the shared keep-alive session for a Tally endpoint.
+
+    Requests sent on it directly are neither counted nor protected from idle
+    eviction; use tally_post for that.
+    """
+    return _get_endpoint(host, int(port), pool_size, idle_seconds).session
+
+
+def _get_endpoint(host: str, port: int, pool_size: int = None,
+                  idle_seconds: float = None, acquire: bool = False) -> _PooledEndpoint:
+    """The pooled endpoint for (host, port); with acquire=True it is marked in use
+    (see _release) before the lock is dropped, so it cannot be evicted meanwhile."""
+    key = (host, port)
+    now = time.monotonic()
+    with _lock:
+        _evict_idle_locked(now, idle_seconds if idle_seconds is not None else DEFAULT_IDLE_SECONDS)
+        endpoint = _endpoints.get(key)
+        if endpoint is None:
+            endpoint = _PooledEndpoint(host, port, pool_size or DEFAULT_POOL_SIZE)
+            _endpoints[key] = endpoint
+        if acquire:
+            endpoint.in_use += 1
+    return endpoint
+
+
+def _release(endpoint: _PooledEndpoint, sent: bool):
+    """A request on `endpoint` finished: its idle time starts now."""
+    with _lock:
+        endpoint.in_use -= 1
+        endpoint.last_used = time.monotonic()
+        if sent:
+            endpoint.requests += 1
+
+
+def _connect_failed(error: BaseException) -> bool:
+    """True when `error` means the request never left (no connection to Tally)."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def _release_on_close(response: requests.Response, endpoint: _PooledEndpoint):
+    """Keep a streamed response's endpoint in use until the response is closed
+    (or garbage-collected, if a caller forgets to close it)."""
+    released = threading.Lock()
+
+    def release():
+        if released.acquire(blocking=False):
+            _release(endpoint, sent=True)
+
+    finalizer = weakref.finalize(response, release)
+    close = response.close
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            finalizer()
+
+    response.close = close_and_release
+
+
+def tally_post(url: str, data, headers: dict = None, timeout: int = 30,
+               stream: bool = False) -> requests.Response:
+    """Drop-in replacement for `requests.post(tally_url, ...)` over the pooled session.
+
+    Raises the same `requests` exceptions as `requests.post`, so existing
+    ConnectionError / status-code handling at call sites is unchanged. With
+    stream=True the body is left on the socket for `iter_content`; the caller
+    must consume or close the response so the connection returns to the pool.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or 'localhost'
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    endpoint = _get_endpoint(host, port, acquire=True)
+    try:
+        queued = time.perf_counter()
+        with endpoint.gate:
+            endpoint.waited += time.perf_counter() - queued
+            response = endpoint.session.post(url, data=data, headers=headers, timeout=timeout, stream=stream)
+    except BaseException as e:
+        _release(endpoint, sent=not _connect_failed(e))
+        raise
+    if stream:
+        _release_on_close(response, endpoint)
+    else:
+        try:
+            body = response.content
+        finally:
+            _release(endpoint, sent=True)
+        # Tally's error envelopes are tiny; only those need scanning.
+        if len(body) < 4096 and b'LINEERROR' in body and _COMPANY_ERROR.search(body):
+            invalidate_company_checks(host, port)
+    return response
+
+
+def _company_key(tally_url: str, company_name: str) -> tuple:
+    parts = urlsplit(tally_url)
+    return (parts.hostname or 'localhost', parts.port or 80, (company_name or '').strip().lower())
+
+
+def cached_company_check(tally_url: str, company_name: str, verify):
+    """Return `verify()` for this Tally endpoint and company, reusing a recent success.
+
+    `verify` returns (is_loaded, matched_name, loaded_companies). Only an exact
+    match (loaded, with Tally's name) is cached, for COMPANY_VERIFY_TTL seconds;
+    a failed or inconclusive check is asked again next time. Concurrent
+    callers for the same key wait for the one verification in flight, so an
+    `--entity-type all` run or a chunked voucher sync asks Tally once. A Tally
+    LINEERROR mentioning the company drops the endpoint's cached answers.
+    """
+    key = _company_key(tally_url, company_name)
+    with _lock:
+        key_lock = _company_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        now = time.monotonic()
+        with _lock:
+            cached = _company_checks.get(key)
+            if cached is not None and cached[0] > now:
+                _company_stats['hits'] += 1
+                logger.debug(f"✅ Company '{company_name}' verified {COMPANY_VERIFY_TTL - (cached[0] - now):.0f}s ago (cached)")
+                return cached[1]
+            _company_stats['misses'] += 1
+        result = verify()
+        if result[0] and result[1] and COMPANY_VERIFY_TTL > 0:
+            with _lock:
+                _company_checks[key] = (time.monotonic() + COMPANY_VERIFY_TTL, result)
+        return result
+
+
+def invalidate_company_checks(host: str = None, port: int = None):
+    """Forget cached company verifications (all, or those for one Tally endpoint)."""
+    with _lock:
+        for key in [k for k in _company_checks if host is None or (k[0], k[1]) == (host, port)]:
+            del _company_checks[key]
+            _company_stats['invalidations'] += 1
+
+
+def transport_stats() -> dict:
+    """Aggregate pool counters: requests sent, new TCP connections, reuses."""
+    with _lock:
+        total_requests = _retired['requests']
+        new_connections = _retired['newConnections']
+        waited = _retired['waited']
+        per_endpoint = {}
+        for (host, port), endpoint in _endpoints.items():
+            opened = endpoint.connections_opened()
+            total_requests += endpoint.requests
+            new_connections += opened
+            waited += endpoint.waited
+            per_endpoint[f"{host}:{port}"] = {
+                'requests': endpoint.requests,
+                'newConnections': opened,
+                'reusedConnections': max(endpoint.requests - opened, 0),
+                'gateWaitSeconds': round(endpoint.waited, 3),
+            }
+        return {
+            'requests': total_requests,
+            'newConnections': new_connections,
+            'reusedConnections': max(total_requests - new_connections, 0),
+            'evictedSessions': _retired['evicted'],
+            'gateWaitSeconds': round(waited, 3),
+            'companyChecks': dict(_company_stats),
+            'endpoints': per_endpoint,
+        }
+
+
+def close_all():
+    """Close every pooled Tally session (e.g. on worker shutdown)."""
+    with _lock:
+        for key, endpoint in list(_endpoints.items()):
+            _retire_locked(key, endpoint)
+
 
 def post_xml_with_retry(host: str, port: int, xml: str, timeout: int = 30,
                         max_retries: int = DEFAULT_MAX_RETRIES,
@@ -43,8 +312,8 @@ def post_xml_with_retry(host: str, port: int, xml: str, timeout: int = 30,
                 logger.warning(f"Retrying Tally request in {delay:.2f}s (attempt {attempt}/{max_retries})")
                 time.sleep(delay)
 
-            response = requests.post(
-                url, data=data,
+            response = tally_post(
+                url, data,
                 headers={'Content-Type': content_type},
                 timeout=timeout,
             )
@@ -0,0 +1,128 @@
+"""ChunkSizer window planning and its shrink / grow feedback."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import chunk_sizer
+from chunk_sizer import INITIAL_RECORDS, ChunkSizer
+from snapshot_store import SnapshotStore
+
+COMPANY = 3
+APR_1, JUN_30 = datetime(2024, 4, 1), datetime(2024, 6, 30)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path / 'snapshot.db'))
+    monkeypatch.setattr(chunk_sizer, 'get_snapshot_store', lambda: store)
+    yield store
+    store.close()
+
+
+def make_sizer(**kwargs):
+    return ChunkSizer(COMPANY, 'vouchers', target_seconds=10, target_bytes=10 * 1024 * 1024, **kwargs)
+
+
+def daily(start, end, n):
+    days, day = {}, start
+    while day <= end:
+        days[day.strftime('%Y-%m-%d')] = n
+        day += timedelta(days=1)
+    return days
+
+
+def test_without_history_windows_are_calendar_months(store):
+    sizer = make_sizer()
+
+    assert sizer.plan(datetime(2024, 4, 15), datetime(2024, 6, 10)) == [
+        (datetime(2024, 4, 15), datetime(2024, 4, 30)),
+        (datetime(2024, 5, 1), datetime(2024, 5, 31)),
+        (datetime(2024, 6, 1), datetime(2024, 6, 10)),
+    ]
+    assert sizer.needs_counts(APR_1, JUN_30)
+
+
+def test_seeded_counts_split_a_heavy_range_by_the_initial_budget(store):
+    sizer = make_sizer()
+    per_day = INITIAL_RECORDS // 5
+    sizer.seed(APR_1, datetime(2024, 4, 30), daily(APR_1, datetime(2024, 4, 30), per_day))
+
+    windows = sizer.plan(APR_1, datetime(2024, 4, 30))
+
+    assert not sizer.needs_counts(APR_1, datetime(2024, 4, 30))
+    assert [(e - s).days + 1 for s, e in windows] == [5] * 6
+    assert windows[0] == (APR_1, datetime(2024, 4, 5))
+
+
+def test_quiet_days_are_merged_into_one_window(store):
+    sizer = make_sizer()
+    counts = daily(APR_1, JUN_30, 0)
+    counts['2024-05-15'] = INITIAL_RECORDS * 2  # one very busy day
+    sizer.seed(APR_1, JUN_30, counts)
+
+    windows = sizer.plan(APR_1, JUN_30)
+
+    # The busy day gets a window of its own; the empty days around it do not split.
+    assert windows == [(APR_1, datetime(2024, 5, 14)), (datetime(2024, 5, 15), datetime(2024, 5, 15)),
+                       (datetime(2024, 5, 16), JUN_30)]
+
+
+def test_slow_request_halves_span_and_budget_at_most(store):
+    sizer = make_sizer()
+    start, end = APR_1, datetime(2024, 4, 20)
+    sizer.seed(start, end, daily(start, end, 100))
+
+    # 2000 records in 40 s against a 10 s target: ideal is 500, but one step halves at most.
+    sizer.observe(start, end, 2000, 40.0, 2000 * 1024, ['2024-04-01'] * 2000)
+
+    assert sizer.span_cap == 10
+    assert sizer.budget == INITIAL_RECORDS * 0.5
+    assert sizer.next_end(datetime(2024, 5, 1), JUN_30) == datetime(2024, 5, 10)
+
+
+def test_fast_requests_double_budget_at_most_and_lift_the_span_cap(store):
+    sizer = make_sizer()
+    start, end = APR_1, datetime(2024, 4, 30)
+    sizer.seed(start, end, daily(start, end, 100))
+    sizer.span_cap = 8
+
+    sizer.observe(start, end, 3000, 1.0, 3000 * 100, [d for d in daily(start, end, 0) for _ in range(100)])
+
+    assert sizer.budget == INITIAL_RECORDS * 2
+    assert sizer.span_cap == 16
+    assert sizer.days['2024-04-30'] == 100
+
+
+def test_filtered_exports_do_not_move_the_budget(store):
+    sizer = make_sizer()
+    sizer.seed(APR_1, JUN_30, daily(APR_1, JUN_30, 100))
+
+    sizer.observe(APR_1, datetime(2024, 4, 30), 3, 1.0)  # AlterID-filtered: no dates
+
+    assert sizer.budget == INITIAL_RECORDS
+    assert sizer.seconds_per_record is None
+
+
+def test_failed_request_halves_the_next_window(store):
+    sizer = make_sizer()
+    sizer.seed(APR_1, JUN_30, daily(APR_1, JUN_30, 100))
+
+    sizer.failed(APR_1, datetime(2024, 4, 20))
+
+    assert sizer.span_cap == 10
+    assert sizer.budget == 1000
+    assert sizer.next_end(datetime(2024, 4, 21), JUN_30) == datetime(2024, 4, 30)
+
+
+def test_saved_profile_is_picked_up_by_the_next_run(store):
+    sizer = make_sizer()
+    sizer.seed(APR_1, datetime(2024, 4, 30), daily(APR_1, datetime(2024, 4, 30), 40))
+    sizer.failed(APR_1, datetime(2024, 4, 30))
+    sizer.save()
+
+    again = make_sizer()
+
+    assert again.budget == sizer.budget == 600
+    assert again.days == sizer.days
+    assert again.span_cap is None  # the span cap lives only for one run
@@ -0,0 +1,79 @@
+"""merkle_diff narrows a tampered voucher down to its month, day and GUID."""
+
+import pytest
+
+from merkle_reconcile import DAY, MONTH, SnapshotBucketSource, bucket_hashes, merkle_diff, tally_identities
+from snapshot_store import SnapshotStore
+
+COMPANY = 7
+FROM, TO = '2024-04-01', '2024-06-30'
+
+
+def tally_records():
+    dates = ['2024-04-03', '2024-04-17', '2024-05-09', '2024-05-09', '2024-06-21']
+    return [{'guid': f'g{i}', 'masterID': str(i), 'alterID': 10 + i, 'date': d, 'name': f'S/{i}'}
+            for i, d in enumerate(dates)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshot.db'))
+    yield store
+    store.close()
+
+
+def diff_against(store, remote_records):
+    store.upsert(COMPANY, 'Voucher', remote_records)
+    return merkle_diff(tally_records(), SnapshotBucketSource(store, COMPANY), FROM, TO)
+
+
+def test_bucket_hash_ignores_order_and_tracks_alter_id():
+    ids = tally_identities(tally_records())
+    assert bucket_hashes(ids, MONTH) == bucket_hashes(list(reversed(ids)), MONTH)
+    assert sorted(bucket_hashes(ids, DAY)) == ['2024-04-03', '2024-04-17', '2024-05-09', '2024-06-21']
+
+    bumped = [(g, a + 1 if g == 'g2' else a, d) for g, a, d in ids]
+    months, bumped_months = bucket_hashes(ids, MONTH), bucket_hashes(bumped, MONTH)
+    assert [m for m in months if months[m] != bumped_months[m]] == ['2024-05']
+
+
+def test_identical_sides_need_no_identity_requests(store):
+    diff = diff_against(store, tally_records())
+
+    assert diff['missing'] == diff['stale'] == diff['extra'] == []
+    assert diff['remoteCount'] == 5
+    assert diff['stats']['monthsMismatched'] == 0 and diff['stats']['identityRequests'] == 0
+
+
+def test_tampered_guid_is_found_through_its_month_and_day(store):
+    remote = tally_records()
+    remote[2] = dict(remote[2], guid='g-forged')       # same day, different GUID
+    remote[4] = dict(remote[4], alterID=3)              # older copy on the remote side
+
+    diff = diff_against(store, remote)
+
+    assert diff['stats']['monthsMismatched'] == 2
+    assert diff['stats']['daysMismatched'] == 2
+    assert [r['guid'] for r in diff['missing']] == ['g2']
+    assert diff['extra'] == [('g-forged', '2024-05-09')]
+    assert [(r['guid'], r['tallyAlterID'], r['dbAlterID']) for r in diff['stale']] == [('g4', 14, 3)]
+
+
+def test_remote_voucher_outside_tally_is_extra(store):
+    remote = tally_records() + [{'guid': 'g-gone', 'masterID': '99', 'alterID': 1, 'date': '2024-04-20'}]
+
+    diff = diff_against(store, remote)
+
+    assert diff['extra'] == [('g-gone', '2024-04-20')]
+    assert diff['missing'] == [] and diff['stale'] == []
+    assert diff['stats']['monthsMismatched'] == 1 and diff['stats']['daysMismatched'] == 1
+
+
+def test_source_without_bucket_routes_returns_none():
+    class Unsupported:
+        name, bytes = 'backend', 0
+
+        def buckets(self, level, from_date, to_date):
+            return None
+
+    assert merkle_diff(tally_records(), Unsupported(), FROM, TO) is None
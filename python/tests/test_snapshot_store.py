@@ -0,0 +1,40 @@
+"""get_snapshot_store degrades to "no snapshot" instead of failing the sync."""
+
+import pytest
+
+import snapshot_store
+
+
+@pytest.fixture
+def fresh_store(monkeypatch):
+    monkeypatch.setattr(snapshot_store, 'SNAPSHOT_ENABLED', True)
+    monkeypatch.setattr(snapshot_store, '_store', None)
+    monkeypatch.setattr(snapshot_store, '_store_failed', False)
+
+
+def test_unusable_path_disables_the_store_once(fresh_store, tmp_path, monkeypatch):
+    blocker = tmp_path / 'file'
+    blocker.write_text('not a directory')
+    monkeypatch.setattr(snapshot_store, 'SNAPSHOT_DB', str(blocker / 'sub' / 'snapshot.db'))
+    opened = []
+    real_init = snapshot_store.SnapshotStore.__init__
+
+    def counting_init(self, path=None):
+        opened.append(path)
+        real_init(self, path)
+
+    monkeypatch.setattr(snapshot_store.SnapshotStore, '__init__', counting_init)
+
+    assert snapshot_store.get_snapshot_store() is None
+    assert snapshot_store.get_snapshot_store() is None
+    assert len(opened) == 1
+
+
+def test_store_is_shared_across_calls(fresh_store, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, 'SNAPSHOT_DB', str(tmp_path / 'snapshot.db'))
+
+    store = snapshot_store.get_snapshot_store()
+    try:
+        assert store is not None and snapshot_store.get_snapshot_store() is store
+    finally:
+        store.close()
@@ -0,0 +1,209 @@
+"""StreamUploader's offset / acknowledge / reject / resume protocol against a fake backend."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import stream_uploader
+from stream_uploader import MAX_RESUMES, StreamUploader, stream_supported
+from sync_logger import install_request_retries
+
+
+class FakeStream:
+    """The backend's /vouchers/sync/stream route; `answer` decides each POST's reply.
+
+    `answer(n, offset, lines)` gets the request number (0-based), its X-Sync-Offset
+    and the body lines, and returns (status, committed, rejected_offsets), or
+    None to drop the connection after committing `committed_on_drop` lines.
+    """
+
+    def __init__(self, answer, committed_on_drop=0, probe=(200, {'acknowledged': 0})):
+        self.answer = answer
+        self.committed_on_drop = committed_on_drop
+        self.probe = probe
+        self.acked = 0
+        self.streams = set()
+        self.requests = []  # (offset, [guid, ...]) per POST
+        self.lines = {}     # offset → guid the backend holds
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path.rsplit('/', 1)[-1] in fake.streams:  # resume check
+                    self._reply(200, {'acknowledged': fake.acked})
+                else:
+                    self._reply(*fake.probe)
+
+            def do_POST(self):
+                data = b''
+                while True:
+                    size = int(self.rfile.readline().strip(), 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        break
+                    data += self.rfile.read(size + 2)[:-2]
+                fake.streams.add(self.headers['X-Sync-Stream'])
+                offset = int(self.headers['X-Sync-Offset'])
+                guids = [json.loads(line)['guid'] for line in data.splitlines() if line]
+                n = len(fake.requests)
+                fake.requests.append((offset, guids))
+                reply = fake.answer(n, offset, guids)
+                if reply is None:
+                    fake.commit(offset, guids[:fake.committed_on_drop])
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                status, committed, rejected = reply
+                fake.commit(offset, guids[:committed])
+                self._reply(status, {'acknowledged': fake.acked, 'savedCount': committed,
+                                     'rejected': [{'offset': o, 'error': 'bad record'} for o in rejected]})
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/vouchers/sync/stream"
+        threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+
+    def commit(self, offset, guids):
+        for i, guid in enumerate(guids):
+            self.lines[offset + i] = guid
+        while self.acked in self.lines:
+            self.acked += 1
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def global_retries():
+    # The uploader must not be slowed down by sync_logger's retry patch.
+    install_request_retries()
+
+
+@pytest.fixture
+def fake():
+    backends = []
+
+    def make(*args, **kwargs):
+        backend = FakeStream(*args, **kwargs)
+        backends.append(backend)
+        return backend
+
+    yield make
+    for backend in backends:
+        backend.close()
+
+
+def batches(count=3, size=2):
+    return [[{'guid': f'g{b * size + i}'} for i in range(size)] for b in range(count)]
+
+
+def all_guids(count=3, size=2):
+    return [f'g{i}' for i in range(count * size)]
+
+
+def accept_all(n, offset, guids):
+    return 200, len(guids), []
+
+
+def test_one_request_carries_every_batch(fake):
+    backend = fake(accept_all)
+
+    report = StreamUploader(backend.url, {}).upload(batches())
+
+    assert backend.requests == [(0, all_guids())]
+    assert report['allSucceeded'] and report['saved'] == 6 and report['requests'] == 1
+    assert [r['saved'] for r in report['results']] == [2, 2, 2]
+
+
+def test_partial_ack_resumes_from_the_acknowledged_offset(fake):
+    backend = fake(lambda n, offset, guids: (200, 3 if n == 0 else len(guids), []))
+    seen = []
+
+    report = StreamUploader(backend.url, {}).upload(batches(), on_result=lambda item, r: seen.append(r['success']))
+
+    assert backend.requests == [(0, all_guids()), (3, ['g3', 'g4', 'g5'])]
+    assert report['allSucceeded'] and report['resumes'] == 1
+    assert seen == [True, True, True]
+    assert [backend.lines[i] for i in range(6)] == all_guids()
+
+
+def test_rejected_offset_fails_only_its_batch(fake):
+    backend = fake(lambda n, offset, guids: (200, len(guids), [3]))
+
+    report = StreamUploader(backend.url, {}).upload(batches())
+
+    assert [r['success'] for r in report['results']] == [True, False, True]
+    assert report['results'][1]['saved'] == 1 and 'bad record' in report['results'][1]['error']
+    assert report['saved'] == 5 and not report['allSucceeded']
+
+
+def test_dropped_connection_resumes_where_the_backend_got_to(fake):
+    backend = fake(lambda n, offset, guids: None if n == 0 else (200, len(guids), []), committed_on_drop=4)
+
+    report = StreamUploader(backend.url, {}).upload(batches())
+
+    assert [offset for offset, _ in backend.requests] == [0, 4]
+    assert backend.requests[1][1] == ['g4', 'g5']
+    assert report['allSucceeded'] and report['saved'] == 6
+
+
+def test_no_progress_gives_up_without_hidden_retries(fake):
+    backend = fake(lambda n, offset, guids: (503, 0, []))
+    closed = []
+
+    def source():
+        try:
+            yield from batches(count=10)
+        finally:
+            closed.append(True)
+
+    report = StreamUploader(backend.url, {}, max_records=4).upload(source())
+
+    # One POST per attempt: sync_logger's 1/2/4 s retries are bypassed.
+    assert len(backend.requests) == MAX_RESUMES + 1
+    assert report['cancelled'] and not report['allSucceeded'] and report['saved'] == 0
+    assert report['batches'] == 2 and closed == [True]
+
+
+def test_fatal_status_stops_the_source(fake):
+    backend = fake(lambda n, offset, guids: (401, 0, []))
+    produced = []
+
+    def source():
+        for batch in batches(count=50):
+            produced.append(batch)
+            yield batch
+
+    report = StreamUploader(backend.url, {}, max_records=4, prefetch=2).upload(source())
+
+    assert len(backend.requests) == 1
+    assert report['cancelled'] and report['failed'] == report['batches'] == 2
+    assert len(produced) < 10
+
+
+def test_probe_fails_closed(fake, monkeypatch):
+    monkeypatch.setattr(stream_uploader, 'UPLOAD_MODE', 'auto')
+    monkeypatch.setattr(stream_uploader, '_support', {})
+
+    assert stream_supported(fake(accept_all).url, {})
+    assert not stream_supported(fake(accept_all, probe=(200, {'acknowledged': 'yes'})).url, {})
+    assert not stream_supported(fake(accept_all, probe=(404, {'error': 'no route'})).url, {})
+
+    busy = fake(accept_all, probe=(503, {}))
+    assert not stream_supported(busy.url, {})
+    assert busy.url not in stream_uploader._support  # probed again next sync
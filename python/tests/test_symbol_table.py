@@ -0,0 +1,80 @@
+"""SymbolTable interning and the encode_records / decode_records round trip."""
+
+import os
+
+import serializer
+from symbol_table import SymbolTable, decode_records, encode_records
+from sync_vouchers import VoucherSyncManager
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def parsed_vouchers():
+    with open(os.path.join(DATA, 'vouchers.xml'), encoding='utf-8') as f:
+        xml = f.read()
+    manager = VoucherSyncManager('http://localhost:8080', 'token', 'device')
+    return manager, manager.parse_voucher_xml(xml, fk={'cmpId': 1, 'userId': 2})
+
+
+def test_intern_returns_one_object_per_value():
+    table = SymbolTable()
+    first = table.intern(''.join(['Sa', 'les']))
+    second = table.intern(''.join(['Sal', 'es']))
+
+    assert first == second == 'Sales'
+    assert first is second
+    assert len(table) == 1
+    assert table.intern('') == '' and table.intern(None) is None
+    assert len(table) == 1
+
+
+def test_parser_shares_repeated_names():
+    _, vouchers = parsed_vouchers()
+    names = [le.ledgerName for v in vouchers for le in v.ledgerEntries]
+    by_value = {}
+    for name in names:
+        assert by_value.setdefault(name, name) is name
+    assert len(by_value) < len(names)
+
+
+def test_encode_replaces_listed_fields_at_every_depth():
+    records = [
+        {'guid': 'g1', 'ledgerName': 'Cash', 'amount': 10.0,
+         'rows': [{'ledgerName': 'Sales', 'note': 'Cash'}, {'ledgerName': 'Cash', 'note': None}]},
+        {'guid': 'g2', 'ledgerName': 'Sales', 'amount': -10.0, 'rows': []},
+    ]
+
+    payload = encode_records(records, ['ledgerName', 'guid'])
+
+    assert payload['symbols'] == ['g1', 'Cash', 'Sales', 'g2']
+    assert payload['symbolFields'] == ['guid', 'ledgerName']
+    first = payload['records'][0]
+    assert (first['guid'], first['ledgerName'], first['amount']) == (0, 1, 10.0)
+    # Only listed fields are encoded; other strings stay inline.
+    assert first['rows'] == [{'ledgerName': 2, 'note': 'Cash'}, {'ledgerName': 1, 'note': None}]
+    assert decode_records(payload) == records
+
+
+def test_voucher_records_round_trip_through_the_wire():
+    manager, vouchers = parsed_vouchers()
+    expected = [v.to_wire() for v in vouchers]
+    assert any(le['billAllocations'] for v in expected for le in v['ledgerEntries'])
+    assert any(ie['batchAllocations'] for v in expected for ie in v['inventoryEntries'])
+
+    payload = encode_records(vouchers, manager.SYMBOL_FIELDS)
+    body = serializer.dumps(payload)
+
+    assert len(payload['symbols']) == len(set(payload['symbols']))
+    assert len(body) < len(serializer.dumps(expected))
+    assert decode_records(serializer.loads(body)) == expected
+
+
+def test_each_batch_decodes_on_its_own():
+    manager, vouchers = parsed_vouchers()
+    half = len(vouchers) // 2
+    batches = [encode_records(vouchers[:half], manager.SYMBOL_FIELDS),
+               encode_records(vouchers[half:], manager.SYMBOL_FIELDS)]
+
+    decoded = [r for batch in reversed(batches) for r in decode_records(batch)]
+
+    assert decoded == [v.to_wire() for v in vouchers[half:] + vouchers[:half]]
@@ -0,0 +1,109 @@
+"""run_dag ordering, worker bound and failure handling; critical_path over measured durations."""
+
+import threading
+import time
+
+import pytest
+
+from sync_scheduler import critical_path, run_dag
+
+DEPS = {
+    'Ledger': ['Group', 'Currency'],
+    'StockItem': ['StockGroup', 'Unit'],
+    'Group': [],
+}
+ENTITIES = ['Group', 'Currency', 'Ledger', 'StockGroup', 'Unit', 'StockItem']
+
+
+class Recorder:
+    """run_one stand-in: records start/finish order and the peak number running at once."""
+
+    def __init__(self, seconds=0.02, fail=()):
+        self.seconds = seconds
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+        self.started, self.finished = [], []
+        self.running = self.peak = 0
+
+    def __call__(self, entity):
+        with self.lock:
+            self.started.append(entity)
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        try:
+            time.sleep(self.seconds)
+            if entity in self.fail:
+                raise RuntimeError(f"{entity} export failed")
+            return {'success': True, 'count': 1}
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.finished.append(entity)
+
+
+def test_dependencies_finish_before_their_dependants_start():
+    run_one = Recorder()
+
+    results, schedule = run_dag(ENTITIES, run_one, DEPS, max_workers=4)
+
+    assert list(results) == ENTITIES and all(r['success'] for r in results.values())
+    for entity, deps in DEPS.items():
+        for dep in deps:
+            assert run_one.finished.index(dep) < run_one.started.index(entity)
+            assert schedule['entities'][dep]['start'] < schedule['entities'][entity]['start']
+
+
+@pytest.mark.parametrize('workers', [1, 2, 3])
+def test_never_runs_more_than_max_workers(workers):
+    run_one = Recorder()
+
+    _, schedule = run_dag(ENTITIES, run_one, {}, max_workers=workers)
+
+    assert run_one.peak == workers == schedule['workers']
+
+
+def test_one_worker_keeps_the_given_order():
+    run_one = Recorder(seconds=0)
+
+    run_dag(['StockItem', 'Unit', 'StockGroup'], run_one, DEPS, max_workers=1)
+
+    assert run_one.started == ['Unit', 'StockGroup', 'StockItem']
+
+
+def test_cycle_is_rejected_before_anything_runs():
+    run_one = Recorder()
+
+    with pytest.raises(ValueError, match='Cyclic'):
+        run_dag(['A', 'B', 'C'], run_one, {'A': ['C'], 'B': ['A'], 'C': ['B']})
+    assert run_one.started == []
+
+
+def test_exception_becomes_a_failed_result_and_dependants_still_run():
+    run_one = Recorder(fail={'Group'})
+
+    results, _ = run_dag(ENTITIES, run_one, DEPS, max_workers=2)
+
+    assert results['Group'] == {'success': False, 'message': 'Group export failed', 'count': 0}
+    assert results['Ledger']['success'] and len(run_one.finished) == len(ENTITIES)
+
+
+def test_schedule_reports_the_critical_path():
+    seconds = {'Group': 0.05, 'Currency': 0.01, 'Ledger': 0.05, 'StockGroup': 0.01, 'Unit': 0.01,
+               'StockItem': 0.01}
+
+    def run_one(entity):
+        time.sleep(seconds[entity])
+        return {'success': True, 'count': 0}
+
+    _, schedule = run_dag(ENTITIES, run_one, DEPS, max_workers=6)
+
+    assert schedule['criticalPath'] == ['Group', 'Ledger']
+    assert schedule['criticalPathSeconds'] <= schedule['wallSeconds'] < schedule['sumSeconds']
+
+
+def test_critical_path_follows_the_slowest_dependency():
+    deps = {'Group': set(), 'Currency': set(), 'Ledger': {'Group', 'Currency'}, 'Unit': set()}
+    durations = {'Group': 1.0, 'Currency': 3.0, 'Ledger': 2.0, 'Unit': 4.5}
+
+    assert critical_path(durations, deps, list(deps)) == (['Currency', 'Ledger'], 5.0)
+    assert critical_path({}, {}, []) == ([], 0.0)
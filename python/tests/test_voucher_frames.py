@@ -0,0 +1,70 @@
+"""diff_voucher_frames classifies vouchers by GUID and AlterID in one merge."""
+
+import pandas as pd
+
+from reconciliation import diff_voucher_frames, voucher_frame_records
+
+
+def tally_frame(rows):
+    return pd.DataFrame(rows, columns=['guid', 'masterID', 'alterID', 'name', 'month'])
+
+
+def guids(frame):
+    return sorted(frame['guid'].tolist())
+
+
+def test_missing_extra_stale_and_matched():
+    tally = tally_frame([
+        ('g-same', 1, 10, 'S/1', '2024-04'),
+        ('g-newer', 2, 25, 'S/2', '2024-04'),
+        ('g-missing', 3, 30, 'S/3', '2024-05'),
+        ('g-older', 4, 5, 'S/4', '2024-05'),
+    ])
+    db = pd.DataFrame({
+        'guid': ['g-same', 'g-newer', 'g-extra', 'g-older'],
+        'alterId': [10, 20, 40, 9],
+        'voucherNumber': ['S/1', 'S/2', 'X/1', 'S/4'],
+    })
+
+    diff = diff_voucher_frames(tally, db)
+
+    assert guids(diff['missing']) == ['g-missing']
+    assert guids(diff['stale']) == ['g-newer']
+    assert guids(diff['extra']) == ['g-extra']
+    # A DB copy at or past Tally's AlterID is not re-sent.
+    assert guids(diff['matched']) == ['g-older', 'g-same']
+
+    stale = voucher_frame_records(diff['stale'], 'stale')
+    assert stale == [{'guid': 'g-newer', 'masterID': 2, 'name': 'S/2', 'month': '2024-04',
+                      'tallyAlterID': 25, 'dbAlterID': 20}]
+    assert voucher_frame_records(diff['extra'], 'extra') == [{'guid': 'g-extra', 'name': 'X/1'}]
+
+
+def test_backend_column_spellings_and_bad_alter_ids():
+    tally = tally_frame([('g1', 1, 3, 'A', '2024-04'), ('g2', 2, 1, 'B', '2024-04')])
+    db = pd.DataFrame({'GUID': ['g1', 'g2', ''], 'alter_id': ['oops', None, 7]})
+
+    diff = diff_voucher_frames(tally, db)
+
+    # Unparseable / missing DB AlterIDs count as 0; blank GUIDs are ignored.
+    assert guids(diff['stale']) == ['g1', 'g2']
+    assert diff['extra'].empty and diff['missing'].empty
+
+
+def test_duplicate_guids_keep_the_last_row():
+    tally = tally_frame([('g1', 1, 2, 'A', '2024-04'), ('g1', 1, 8, 'A', '2024-04')])
+    db = pd.DataFrame({'guid': ['g1'], 'alterID': [5]})
+
+    diff = diff_voucher_frames(tally, db)
+
+    assert guids(diff['stale']) == ['g1']
+    assert diff['stale']['alterID'].tolist() == [8]
+
+
+def test_db_without_guid_column_marks_everything_missing():
+    tally = tally_frame([('g1', 1, 2, 'A', '2024-04')])
+
+    diff = diff_voucher_frames(tally, pd.DataFrame({'id': [1]}))
+
+    assert guids(diff['missing']) == ['g1']
+    assert diff['extra'].empty and diff['stale'].empty and diff['matched'].empty
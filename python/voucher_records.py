@@ -0,0 +1,226 @@
+"""Slotted record types for parsed vouchers.
+
+VoucherSyncManager.parse_single_voucher used to build a plain dict for every
+voucher and every nested row — dozens of string keys each, with a per-object
+hash table — and a pipelined first-time sync holds a year of them at once.
+These classes store the same fields in `__slots__` instead:
+
+    Voucher
+    ├── LedgerEntry
+    │   ├── BillAllocation
+    │   └── CostCategoryAllocation
+    │       └── CostCentreAllocation
+    └── InventoryEntry
+        └── BatchAllocation
+
+Field names and order ARE the backend wire format (camelCase, FK columns
+last), so the records serialize straight to the /vouchers/sync JSON: orjson
+and msgspec encode dataclasses natively and serializer's stdlib fallback
+does the same. The FK columns are None until stamped — the parser stamps
+them when given {cmpId, userId} and the upload paths do before sending.
+
+Records also answer the dict protocol the rest of the sync layer uses on
+vouchers (`v['guid']`, `v.get('alterId', 0)`, `le['cmpId'] = ...`), so
+reconciliation, snapshot_store.identity_of and the stats helpers work on
+them unchanged. `to_wire()` returns the equivalent plain dict tree.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+class _Record:
+    """Dict-style access to a slotted record's fields."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return self.__slots__
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def to_wire(self) -> Dict[str, Any]:
+        """The record as a plain dict, nested rows included."""
+        wire = {}
+        for key in self.__slots__:
+            value = getattr(self, key)
+            if type(value) is list:
+                value = [row.to_wire() for row in value]
+            wire[key] = value
+        return wire
+
+
+@dataclass(slots=True)
+class BillAllocation(_Record):
+    billType: str
+    billName: str
+    billRef: str
+    billDate: Optional[str]
+    billDueDate: Optional[str]
+    billCreditPeriod: str
+    billAmount: float
+    tdsDeducteeIsSpecialRate: bool
+    voucherGuid: Optional[str] = None
+    cmpId: Optional[int] = None
+
+
+@dataclass(slots=True)
+class CostCentreAllocation(_Record):
+    costCentreName: str
+    amount: float
+    voucherGuid: Optional[str] = None
+    cmpId: Optional[int] = None
+
+
+@dataclass(slots=True)
+class CostCategoryAllocation(_Record):
+    categoryName: str
+    amount: float
+    isDeemedPositive: bool
+    costCentreAllocations: List[CostCentreAllocation]
+    voucherGuid: Optional[str] = None
+    cmpId: Optional[int] = None
+
+
+@dataclass(slots=True)
+class LedgerEntry(_Record):
+    ledgerName: str
+    ledgerGuid: str
+    amount: float
+    debitAmount: float
+    creditAmount: float
+    drCr: str
+    isDeemedPositive: bool
+    isPartyLedger: bool
+    ledgerFromItem: bool
+    gstClass: str
+    appropriateFor: str
+    billAllocations: List[BillAllocation]
+    costCategoryAllocations: List[CostCategoryAllocation]
+    voucherGuid: Optional[str] = None
+    cmpId: Optional[int] = None
+    userId: Optional[int] = None
+
+
+@dataclass(slots=True)
+class BatchAllocation(_Record):
+    batchName: str
+    godownName: str
+    destinationGodown: str
+    batchQty: float
+    batchRate: float
+    batchAmount: float
+    batchUom: str
+    mfgDate: Optional[str]
+    expiryDate: Optional[str]
+    isDeemedPositive: bool
+    isOutward: bool
+    voucherGuid: Optional[str] = None
+    cmpId: Optional[int] = None
+
+
+@dataclass(slots=True)
+class InventoryEntry(_Record):
+    stockItemName: str
+    stockItemGuid: str
+    billedQty: float
+    actualQty: float
+    rate: float
+    amount: float
+    discount: float
+    uom: str
+    alternateUom: str
+    rateUom: str
+    isDeemedPositive: bool
+    isOutward: bool
+    godownName: str
+    trackingNumber: str
+    batchAllocations: List[BatchAllocation]
+    voucherGuid: Optional[str] = None
+    cmpId: Optional[int] = None
+    userId: Optional[int] = None
+
+
+@dataclass(slots=True)
+class Voucher(_Record):
+    # Tally Identity
+    guid: str
+    masterId: int
+    alterId: int
+    voucherKey: int
+    voucherRetainKey: int
+    remoteId: str
+    remoteAltGuid: str
+
+    # Voucher Info
+    voucherNumber: str
+    voucherType: str
+    voucherDate: Optional[str]
+    effectiveDate: Optional[str]
+    voucherNumberSeries: str
+    persistedView: str
+
+    # Party Info
+    partyLedgerName: str
+    partyName: str
+    amount: float
+    totalDebit: float
+    totalCredit: float
+
+    # Reference
+    reference: str
+    narration: str
+
+    # GST
+    partyGstin: str
+    companyGstin: str
+    companyGstRegistrationType: str
+    companyGstState: str
+    gstRegistration: str
+    placeOfSupply: str
+    vchGstClass: str
+
+    # E-Invoice
+    irn: str
+    irnAckNo: str
+    irnAckDate: Optional[str]
+    irnQrCode: str
+
+    # Status Flags
+    isOptional: bool
+    isDeleted: bool
+    isCancelled: bool
+    isVoid: bool
+    isOnHold: bool
+    isInvoice: bool
+    isPostDated: bool
+    hasCashFlow: bool
+    hasDiscounts: bool
+    isDeemedPositive: bool
+    isReverseChargeApplicable: bool
+
+    # Nested Data
+    ledgerEntries: List[LedgerEntry]
+    inventoryEntries: List[InventoryEntry]
+
+    cmpId: Optional[int] = None
+    userId: Optional[int] = None
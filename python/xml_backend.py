@@ -0,0 +1,126 @@
+"""Pluggable XML parser for Tally responses.
+
+Every parser in the sync layer (vouchers, masters, company identity,
+reconciliation, bills, financial reports) goes through this module instead of
+calling xml.etree.ElementTree directly:
+
+    etree → lxml
+
+(override with SYNC_XML_BACKEND=lxml|etree). Both build trees with the same
+element API (`find`, `findtext`, `iter`, `get`, `.text`, child iteration), so
+callers do not care which one they got.
+
+lxml parses about twice as fast, but every element it hands to Python is a
+proxy object and its `find` goes through a Python-level path engine — the
+voucher, bills and report parsers call find() per field and come out slower
+on it overall (see bench_xml_backend.py), and a fresh worker process also
+pays for importing it. So ElementTree stays the default and lxml, when it is
+installed, is used where it pays off without the caller asking:
+
+* a document ElementTree rejects (a stray bad byte in a 200 MB export) is
+  parsed again by lxml with `recover=True` instead of failing the sync;
+* with SYNC_XML_BACKEND=lxml it parses everything, with `huge_tree=True` (no
+  libxml2 limits on text size or depth) and an `iterparse` that filters on
+  the element tag inside libxml2, so only the elements asked for reach Python.
+
+Comments and processing instructions are dropped by lxml so child iteration
+only sees elements, as with ElementTree.
+"""
+
+import logging
+import os
+import xml.etree.ElementTree as _ET
+
+try:
+    from lxml import etree as _lxml
+except ImportError:  # optional dependency
+    _lxml = None
+
+logger = logging.getLogger(__name__)
+
+# What a failed parse raises, for `except PARSE_ERRORS`.
+PARSE_ERRORS = (_ET.ParseError,) + ((_lxml.XMLSyntaxError,) if _lxml is not None else ())
+
+_LXML_OPTIONS = dict(recover=True, huge_tree=True, remove_comments=True, remove_pis=True)
+
+
+def _lxml_fromstring(data):
+    if isinstance(data, str):
+        # lxml refuses str input that carries an encoding declaration; the
+        # text is already decoded, so parse its UTF-8 bytes and ignore it.
+        parser = _lxml.XMLParser(encoding='utf-8', **_LXML_OPTIONS)
+        data = data.encode('utf-8')
+    else:
+        parser = _lxml.XMLParser(**_LXML_OPTIONS)
+    root = _lxml.fromstring(data, parser)
+    if root is None:  # recover=True on a document without any element
+        raise _ET.ParseError('no element found')
+    return root
+
+
+def _lxml_iterparse(chunks, tag: str):
+    parser = _lxml.XMLPullParser(events=('end',), tag=tag, **_LXML_OPTIONS)
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, elem in parser.read_events():
+            yield elem
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                parent.remove(elem)
+    parser.close()
+
+
+def _etree_fromstring(data):
+    try:
+        return _ET.fromstring(data)
+    except _ET.ParseError as e:
+        if _lxml is None:
+            raise
+        logger.warning(f"⚠️ Malformed XML from Tally ({e}) — parsing it in recovery mode")
+        return _lxml_fromstring(data)
+
+
+def _etree_iterparse(chunks, tag: str):
+    parser = _ET.XMLPullParser(events=('start', 'end'))
+    stack = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == 'start':
+                stack.append(elem)
+                continue
+            stack.pop()
+            if elem.tag != tag:
+                continue
+            yield elem
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+    parser.close()
+
+
+def _select_backend(preferred: str = None) -> str:
+    preferred = (preferred or os.getenv('SYNC_XML_BACKEND', '')).strip().lower()
+    available = ['etree'] + (['lxml'] if _lxml is not None else [])
+    if preferred in available:
+        return preferred
+    return available[0]
+
+
+def get_backend(backend: str = None):
+    """Return (name, fromstring, iterparse) for a backend; unknown/unavailable → etree.
+
+    fromstring(data) parses a whole document (str or bytes) and returns its
+    root element. iterparse(chunks, tag) parses an iterable of str or bytes
+    chunks and yields every <tag> element once it is complete; the element is
+    cleared and detached from its parent when the caller asks for the next
+    one, so memory stays bounded by the largest single element.
+    """
+    name = _select_backend(backend)
+    if name == 'lxml':
+        return name, _lxml_fromstring, _lxml_iterparse
+    return name, _etree_fromstring, _etree_iterparse
+
+
+BACKEND, fromstring, iterparse = get_backend()
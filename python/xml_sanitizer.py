@@ -0,0 +1,137 @@
+"""One shared cleanup of Tally XML before it reaches ElementTree.
+
+Tally's exports are not always well-formed XML:
+
+* UDF fields come out as namespaced tags without a namespace declaration
+  (`<UDF:FIELD>`), which expat rejects — they are renamed to `<UDF_FIELD>`;
+* character references to control characters (`&#4;` in group parents,
+  `&#x1F;`) and the raw control bytes themselves are not allowed in XML 1.0 —
+  they are dropped. Tab, LF and CR are kept.
+
+Every parser used to carry its own copy of this: a chain of full-payload
+`re.sub` calls on a decoded `str`, with a Python callback per match and a tag
+pattern that is tried at every '<' of the document. `sanitize` works on the
+response bytes instead — every rule is ASCII and UTF-8 never uses ASCII byte
+values inside a multi-byte character, so nothing needs decoding and expat gets
+the bytes as-is. Each rule is one C-level scan that only copies when it
+changes something: a regex with a literal `&#` prefix for the references,
+`translate` for control bytes, and for namespaces a `find(':')` walk that
+renames all tags of a prefix with one `replace` the first time it sees it
+(a response has one or two prefixes, usually just UDF).
+
+`XmlSanitizer` applies the same rules to a response read in chunks, so each
+chunk is cleaned while it is still in cache, and `response_xml` picks bytes
+or text for a `requests` response depending on its encoding.
+"""
+
+import codecs
+import re
+
+_ENTITY = r'&#(?:0*(?:[0-8]|1[124-9]|2[0-9]|3[01])|x0*(?:[0-8bBcCeEfF]|1[0-9a-fA-F]));'
+_CONTROL = ''.join(chr(c) for c in range(32) if c not in (9, 10, 13))
+_TAG_NAME = r'</?([A-Za-z_]+)\Z'  # what must sit between '<' and ':' in a namespaced tag
+
+
+class _Rules:
+    """The compiled rules for one data type (bytes or str)."""
+
+    def __init__(self, kind):
+        enc = (lambda s: s.encode('ascii')) if kind is bytes else (lambda s: s)
+        self.entity = re.compile(enc(_ENTITY))
+        self.tag_name = re.compile(enc(_TAG_NAME))
+        self.colon, self.lt, self.slash, self.under = enc(':'), enc('<'), enc('/'), enc('_')
+        self.empty = enc('')
+        if kind is bytes:
+            control = enc(_CONTROL)
+            self.strip_control = lambda data: data.translate(None, control)
+        else:
+            control = re.compile(f'[{re.escape(_CONTROL)}]')
+            self.strip_control = lambda data: control.sub('', data)
+
+    def rename_prefixes(self, data):
+        colon, lt, slash, under = self.colon, self.lt, self.slash, self.under
+        i = data.find(colon)
+        while i != -1:
+            start = data.rfind(lt, 0, i)
+            match = self.tag_name.match(data, start, i) if start != -1 else None
+            if match is not None:
+                name = match.group(1)
+                data = (data.replace(lt + name + colon, lt + name + under)
+                        .replace(lt + slash + name + colon, lt + slash + name + under))
+            i = data.find(colon, i + 1)
+        return data
+
+    def apply(self, data):
+        data = self.entity.sub(self.empty, data)
+        data = self.strip_control(data)
+        return self.rename_prefixes(data)
+
+
+_BYTES = _Rules(bytes)
+_TEXT = _Rules(str)
+
+# Encodings in which ASCII bytes only ever stand for ASCII characters.
+_BYTE_SAFE = {'utf-8', 'ascii'}
+
+
+def sanitize(data):
+    """Clean a whole document; bytes in → bytes out, str in → str out."""
+    if isinstance(data, (bytes, bytearray)):
+        return _BYTES.apply(bytes(data))
+    return _TEXT.apply(data)
+
+
+def byte_safe(encoding: str = None) -> bool:
+    """Whether a document in `encoding` can be sanitised and parsed as raw bytes."""
+    if not encoding:
+        return True
+    try:
+        return codecs.lookup(encoding).name in _BYTE_SAFE
+    except LookupError:
+        return False
+
+
+def response_xml(response):
+    """Sanitised body of a `requests` response, ready for ET.fromstring.
+
+    Raw bytes when the declared encoding is UTF-8/ASCII (expat decodes them
+    itself), else the decoded text — the same characters `response.text`
+    would have given.
+    """
+    if byte_safe(response.encoding):
+        return sanitize(response.content)
+    return sanitize(response.text)
+
+
+class XmlSanitizer:
+    """`sanitize` for a document that arrives in chunks.
+
+    `feed` returns the cleaned part of the input up to the last '>' seen and
+    holds back the rest: a tag name ends at '>' at the latest and a character
+    reference cannot contain one, so nothing that needs cleaning is ever split
+    between two outputs. `close` returns whatever is left. Output is bytes for
+    byte chunks in a byte-safe encoding (see `byte_safe`), else str.
+    """
+
+    def __init__(self, encoding: str = None):
+        self._decoder = None
+        if not byte_safe(encoding):
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._tail = None
+
+    def feed(self, chunk):
+        if self._decoder is not None and isinstance(chunk, (bytes, bytearray)):
+            chunk = self._decoder.decode(chunk)
+        data = self._tail + chunk if self._tail else chunk
+        cut = data.rfind(b'>' if isinstance(data, (bytes, bytearray)) else '>') + 1
+        if not cut:
+            self._tail = data
+            return data[:0]
+        self._tail = data[cut:]
+        return sanitize(data[:cut])
+
+    def close(self):
+        tail, self._tail = self._tail, None
+        if self._decoder is not None:
+            return sanitize((tail or '') + self._decoder.decode(b'', final=True))
+        return sanitize(tail) if tail else b''
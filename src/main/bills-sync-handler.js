@@ -9,6 +9,7 @@ const path = require('path');
 const fs = require('fs');
 const { findPython } = require('./python-finder');
 const security = require('./security');
+const workerJobs = require('./worker-jobs');
 
 function getWorkerExe() {
     const isDev = !app.isPackaged;
@@ -55,6 +56,26 @@ function syncBillsOutstanding(params, processRegistry) {
         } = params;
 
         const isDev = !app.isPackaged;
+
+        // The sync worker daemon runs the job in-process when it is up.
+        if (workerJobs.accepts('sync-bills-outstanding')) {
+            workerJobs.runJob('sync-bills-outstanding', {
+                companyId: companyId || 1, tallyHost, tallyPort: tallyPort || 9000,
+                backendUrl, authToken, deviceToken, companyName: companyName || null
+            }, { timeoutMs: 5 * 60 * 1000 }).then(({ result }) => {
+                resolve(result ? {
+                    success: result.success,
+                    message: result.message,
+                    receivable: result.receivable || {},
+                    payable: result.payable || {},
+                    exitCode: 0
+                } : { success: false, message: 'Failed to parse bills outstanding response', exitCode: 0 });
+            }).catch((error) => {
+                resolve({ success: false, message: error.message });
+            });
+            return;
+        }
+
         const { command, useExe, cwd } = getWorkerExe();
         let args;
 
@@ -4,6 +4,7 @@ const path = require('path');
 const fs = require('fs');
 const { findPython } = require('./python-finder');
 const { DEFAULT_BACKEND_URL } = require('./app-urls');
+const workerJobs = require('./worker-jobs');
 
 function logToFile(message) {
     try {
@@ -50,6 +51,54 @@ function registerFinancialReportsHandler(activeChildProcesses) {
                 financialYear = 'None'
             } = params;
 
+            const notifyDone = (success) => {
+                // Notify renderer that sync has finished to trigger auto-refresh in report pages
+                if (event.sender) {
+                    event.sender.send('sync-update', {
+                        type: 'sync_completed',
+                        entityType: 'FinancialReports',
+                        companyId: cmpId,
+                        success
+                    });
+                }
+            };
+
+            // The sync worker daemon runs the job in-process when it is up. Its
+            // params leave out the positional script's 'None' placeholders.
+            if (workerJobs.accepts('sync-financial-reports')) {
+                const given = (value) => (value && value !== 'None' ? value : null);
+                console.log(`📊 Starting Financial Reports sync for company: ${companyName} (worker daemon)`);
+                logToFile(`[START] Syncing financial reports for company: ${companyName} (ID: ${cmpId}, Year: ${financialYear})`);
+                workerJobs.runJob('sync-financial-reports', {
+                    companyName,
+                    companyId: cmpId || companyIdParam,
+                    userId: userId || 1,
+                    fromDate: given(fromDate),
+                    toDate: given(toDate),
+                    tallyHost,
+                    tallyPort,
+                    backendUrl: backendUrl || null,
+                    authToken: given(authToken),
+                    deviceToken: given(deviceToken),
+                    reportType: given(reportType),
+                    financialYear: given(financialYear)
+                }).then(({ result, success }) => {
+                    logToFile(`[END] Sync completed (worker daemon, success=${success})`);
+                    notifyDone(success);
+                    resolve({
+                        success,
+                        output: result ? JSON.stringify(result) : '',
+                        error: success ? '' : (result && result.message) || '',
+                        exitCode: success ? 0 : 1
+                    });
+                }).catch((err) => {
+                    logToFile(`[FATAL ERROR] ${err.message}`);
+                    notifyDone(false);
+                    resolve({ success: false, error: err.message, exitCode: -1 });
+                });
+                return;
+            }
+
             const isDev = !app.isPackaged;
             const { command, useExe, cwd } = getWorkerExe();
             let args;
@@ -125,15 +174,7 @@ function registerFinancialReportsHandler(activeChildProcesses) {
                     activeChildProcesses.delete(child);
                 }
 
-                // Notify renderer that sync has finished to trigger auto-refresh in report pages
-                if (event.sender) {
-                    event.sender.send('sync-update', {
-                        type: 'sync_completed',
-                        entityType: 'FinancialReports',
-                        companyId: cmpId,
-                        success: code === 0
-                    });
-                }
+                notifyDone(code === 0);
 
                 resolve({
                     success: code === 0,
@@ -7,6 +7,7 @@ const security = require("./security");
 const { findPython } = require("./python-finder");
 const { registerVoucherSyncHandler } = require("./voucher-sync-handler");
 const { registerBillsSyncHandler } = require("./bills-sync-handler");
+const workerJobs = require("./worker-jobs");
 const { DEFAULT_BACKEND_URL, ALLOWED_EXTERNAL_ORIGINS } = require("./app-urls");
 
 // Single Instance Lock
@@ -420,58 +421,54 @@ function startSyncWorker(config = {}) {
       return;
     }
 
+    // stdin stays open: after the settings line it carries job requests (worker-jobs.js).
     syncWorker.stdin.write(JSON.stringify(settings) + '\n');
-    syncWorker.stdin.end();
 
-    syncWorker.stdout.on("data", (data) => {
-      const output = data.toString().trim();
-      if (output) {
-        try {
-          const result = JSON.parse(output);
-          const type = result.type || 'unknown';
-          const timestamp = new Date().toLocaleTimeString();
-
-          if (isDev) {
-            if (type === 'worker_started') {
-              console.log(`\n${'='.repeat(60)}`);
-              console.log(`🚀 [${timestamp}] SYNC WORKER STARTED`);
-              console.log(`   Port: ${result.data?.tally_port || 9000}`);
-              console.log(`   Interval: ${result.data?.sync_interval || 30} minutes`);
-              console.log(`${'='.repeat(60)}\n`);
-            } else if (type === 'sync_started') {
-              console.log(`\n📤 [${timestamp}] SYNC STARTED`);
-              console.log(`   Port: ${result.data?.tally_port || 'N/A'}`);
-            } else if (type === 'sync_completed') {
-              if (isDev) {
-                console.log(`✅ [${timestamp}] SYNC COMPLETED`);
-                console.log(`   Last Sync: ${result.data?.last_sync_time || 'N/A'}`);
-                console.log(`   Next Sync: ${new Date(result.data?.next_sync_time * 1000).toLocaleTimeString() || 'N/A'}\n`);
-              }
-              if (tray && typeof tray.displayBalloon === 'function') {
-                try {
-                  tray.displayBalloon({
-                    title: 'Sync Completed',
-                    content: 'Data has been successfully synced with Tally.',
-                    icon: require('path').join(__dirname, '..', '..', 'assets', process.platform === 'win32' ? 'icon.ico' : 'icon.png'),
-                    iconType: 'custom'
-                  });
-                } catch (_) {}
-              }
-            } else if (type === 'sync_error') {
-              console.error(`\n❌ [${timestamp}] SYNC ERROR`);
-              console.error(`   Error: ${result.data?.error || 'Unknown error'}\n`);
-            } else if (type === 'worker_stopped') {
-              console.log(`\n⏹️  [${timestamp}] SYNC WORKER STOPPED`);
-              console.log(`   Last Sync: ${result.data?.last_sync_time || 'Never'}\n`);
+    workerJobs.attachWorker(syncWorker, (result, output) => {
+      if (result) {
+        const type = result.type || 'unknown';
+        const timestamp = new Date().toLocaleTimeString();
+
+        if (isDev) {
+          if (type === 'worker_started') {
+            console.log(`\n${'='.repeat(60)}`);
+            console.log(`🚀 [${timestamp}] SYNC WORKER STARTED`);
+            console.log(`   Port: ${result.data?.tally_port || 9000}`);
+            console.log(`   Interval: ${result.data?.sync_interval || 30} minutes`);
+            console.log(`${'='.repeat(60)}\n`);
+          } else if (type === 'sync_started') {
+            console.log(`\n📤 [${timestamp}] SYNC STARTED`);
+            console.log(`   Port: ${result.data?.tally_port || 'N/A'}`);
+          } else if (type === 'sync_completed') {
+            if (isDev) {
+              console.log(`✅ [${timestamp}] SYNC COMPLETED`);
+              console.log(`   Last Sync: ${result.data?.last_sync_time || 'N/A'}`);
+              console.log(`   Next Sync: ${new Date(result.data?.next_sync_time * 1000).toLocaleTimeString() || 'N/A'}\n`);
+            }
+            if (tray && typeof tray.displayBalloon === 'function') {
+              try {
+                tray.displayBalloon({
+                  title: 'Sync Completed',
+                  content: 'Data has been successfully synced with Tally.',
+                  icon: require('path').join(__dirname, '..', '..', 'assets', process.platform === 'win32' ? 'icon.ico' : 'icon.png'),
+                  iconType: 'custom'
+                });
+              } catch (_) {}
             }
+          } else if (type === 'sync_error') {
+            console.error(`\n❌ [${timestamp}] SYNC ERROR`);
+            console.error(`   Error: ${result.data?.error || 'Unknown error'}\n`);
+          } else if (type === 'worker_stopped') {
+            console.log(`\n⏹️  [${timestamp}] SYNC WORKER STOPPED`);
+            console.log(`   Last Sync: ${result.data?.last_sync_time || 'Never'}\n`);
           }
+        }
 
-          if (mainWindow) {
-            mainWindow.webContents.send("sync-update", result);
-          }
-        } catch (e) {
-          if (isDev) console.log(`Sync Worker: ${output}`);
+        if (mainWindow) {
+          mainWindow.webContents.send("sync-update", result);
         }
+      } else {
+        if (isDev) console.log(`Sync Worker: ${output}`);
       }
     });
 
@@ -504,6 +501,7 @@ function startSyncWorker(config = {}) {
 function stopSyncWorker() {
   if (syncWorker) {
     if (isDev) console.log("Stopping sync worker");
+    workerJobs.detachWorker(syncWorker);
     syncWorker.kill();
     syncWorker = null;
   }
@@ -714,6 +712,19 @@ async function runWorkerCommand(mode, params = {}) {
       deep: '--deep'
     };
 
+    // A running daemon takes short jobs over its job channel instead of a fresh process.
+    if (workerJobs.accepts(mode, params)) {
+      const jobParams = { authToken: params.authToken, deviceToken: params.deviceToken };
+      for (const key of Object.keys(argMapping)) jobParams[key] = params[key];
+      workerJobs.runJob(mode, jobParams)
+        .then(({ result }) => {
+          if (result === null) reject(new Error('Worker produced no output'));
+          else resolve(result);
+        })
+        .catch(reject);
+      return;
+    }
+
     for (const [key, flag] of Object.entries(argMapping)) {
       if (params[key] !== undefined && params[key] !== null) {
         // Boolean flags (store_true in argparse) don't take a value
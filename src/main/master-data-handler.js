@@ -9,6 +9,7 @@ const path = require('path');
 const fs = require('fs');
 const { findPython } = require('./python-finder');
 const security = require('./security');
+const workerJobs = require('./worker-jobs');
 
 function getWorkerExe() {
     const isDev = !app.isPackaged;
@@ -53,6 +54,23 @@ function registerMasterDataHandler() {
                 isFirstSync = false
             } = params;
 
+            // The sync worker daemon runs the job in-process when it is up.
+            if (workerJobs.accepts('fetch-master-data', { isFirstSync })) {
+                workerJobs.runJob('fetch-master-data', { companyName, tallyHost, tallyPort, isFirstSync })
+                    .then(({ result }) => {
+                        resolve(result ? {
+                            success: result.success,
+                            data: result.data || {},
+                            message: result.message,
+                            exitCode: 0
+                        } : { success: false, data: {}, message: 'Failed to parse response', exitCode: 0 });
+                    })
+                    .catch((error) => {
+                        resolve({ success: false, data: {}, message: error.message, exitCode: -1 });
+                    });
+                return;
+            }
+
             const isDev = !app.isPackaged;
             const { command, useExe, cwd } = getWorkerExe();
             let args;
@@ -0,0 +1,167 @@
+/**
+ * Job channel to the long-running sync worker daemon.
+ *
+ * startSyncWorker keeps the daemon's stdin open; one-shot operations (master
+ * data, bills, financial report and incremental syncs, ...) are sent to it as
+ * NDJSON job requests instead of spawning a fresh Python process each:
+ *
+ *   → {"type":"job","id":"j1","mode":"fetch-master-data","params":{...}}
+ *   ← job_queued / job_started / progress / result / job_done (or job_error), all with "id"
+ *
+ * Jobs run one at a time, in order, inside the daemon, so only short jobs go
+ * there: voucher syncs, first-time (initial) syncs and reconciliations keep
+ * their own process. Secrets travel in the params over the pipe, never on argv.
+ * Callers check accepts(mode, params) and fall back to spawning the worker
+ * themselves when it says no.
+ */
+
+const JOB_MESSAGES = new Set(['job_queued', 'job_started', 'progress', 'result', 'job_done', 'job_error']);
+// Long jobs would hold up everything queued behind them on the single job thread.
+const SPAWNED_MODES = new Set(['sync-vouchers', 'reconcile']);
+
+let worker = null;
+let nextJobId = 1;
+const pending = new Map();
+const queuedByKey = new Map(); // mode + params → promise of a job not started yet
+
+function failPending(message) {
+    for (const job of pending.values()) {
+        clearTimeout(job.timeoutHandle);
+        job.reject(new Error(message));
+    }
+    pending.clear();
+    queuedByKey.clear();
+}
+
+function jobKey(mode, params) {
+    const sorted = Object.keys(params).sort().map((key) => [key, params[key]]);
+    return JSON.stringify([mode, sorted]);
+}
+
+function startTimer(id, job) {
+    // Counted from job_started: time spent queued behind other jobs does not count.
+    job.timeoutHandle = setTimeout(() => {
+        pending.delete(id);
+        job.reject(new Error(`Job timed out after ${Math.round(job.timeoutMs / 60000)} minutes for ${job.mode}`));
+    }, job.timeoutMs);
+}
+
+function routeJobMessage(message) {
+    const job = pending.get(message.id);
+    if (!job) return;
+    if (message.type !== 'job_queued' && queuedByKey.get(job.key) === job.promise) {
+        queuedByKey.delete(job.key); // started (or rejected): a new request runs again
+    }
+
+    if (message.type === 'job_started') {
+        startTimer(message.id, job);
+    } else if (message.type === 'result') {
+        job.results.push(message.result);
+    } else if (message.type === 'progress') {
+        if (job.onProgress) job.onProgress(message);
+    } else if (message.type === 'job_error' || message.type === 'job_done') {
+        pending.delete(message.id);
+        clearTimeout(job.timeoutHandle);
+        if (message.type === 'job_error') {
+            job.reject(new Error(message.error || `Job ${message.id} rejected`));
+            return;
+        }
+        const results = job.results;
+        const result = results.length ? results[results.length - 1] : null;
+        if (result === null && message.error) {
+            job.reject(new Error(message.error));
+            return;
+        }
+        job.resolve({ result, results, success: message.success, elapsedMs: message.elapsedMs });
+    }
+}
+
+/**
+ * Take over a spawned daemon's stdout. Job messages are routed to the waiting
+ * runJob() call; every other parsed line goes to onMessage(obj), and lines that
+ * are not JSON to onMessage(null, line).
+ */
+function attachWorker(child, onMessage) {
+    worker = child;
+    let buffer = '';
+
+    child.stdout.on('data', (data) => {
+        buffer += data.toString();
+        let newline;
+        while ((newline = buffer.indexOf('\n')) !== -1) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (!line) continue;
+
+            let message;
+            try {
+                message = JSON.parse(line);
+            } catch (e) {
+                onMessage(null, line);
+                continue;
+            }
+            if (message && JOB_MESSAGES.has(message.type) && message.id != null) {
+                routeJobMessage(message);
+            } else {
+                onMessage(message, line);
+            }
+        }
+    });
+
+    child.on('close', () => {
+        if (worker === child) worker = null;
+        failPending('Sync worker exited before the job finished');
+    });
+}
+
+function detachWorker(child) {
+    if (worker === child) worker = null;
+    failPending('Sync worker stopped');
+}
+
+function isRunning() {
+    return Boolean(worker && worker.stdin && worker.stdin.writable);
+}
+
+/** Whether a job should go to the daemon (running, and not a long voucher/initial sync). */
+function accepts(mode, params = {}) {
+    return isRunning() && !SPAWNED_MODES.has(mode) && !params.isFirstSync;
+}
+
+/**
+ * Queue a job on the daemon. Resolves with { result, results, success, elapsedMs }
+ * where result is the last document the mode wrote (what the CLI would have
+ * printed); rejects on job_error, daemon exit or timeoutMs after the job started.
+ * Null/undefined params are left out. A job identical (mode and params) to one
+ * still waiting in the queue is not sent again: the caller shares its promise.
+ */
+function runJob(mode, params = {}, { timeoutMs = 10 * 60 * 1000, onProgress = null } = {}) {
+    const jobParams = {};
+    for (const [key, value] of Object.entries(params)) {
+        if (value !== undefined && value !== null) jobParams[key] = value;
+    }
+    const key = jobKey(mode, jobParams);
+    if (queuedByKey.has(key)) return queuedByKey.get(key);
+    if (!isRunning()) return Promise.reject(new Error('Sync worker is not running'));
+
+    // The daemon cannot abort a running job; on timeout the caller gets an
+    // error and whatever the job reports later is dropped.
+    const id = `job-${nextJobId++}`;
+    const job = { mode, key, onProgress, timeoutMs, timeoutHandle: null, results: [] };
+    job.promise = new Promise((resolve, reject) => {
+        job.resolve = resolve;
+        job.reject = reject;
+    });
+    pending.set(id, job);
+    queuedByKey.set(key, job.promise);
+    try {
+        worker.stdin.write(JSON.stringify({ type: 'job', id, mode, params: jobParams }) + '\n');
+    } catch (err) {
+        pending.delete(id);
+        queuedByKey.delete(key);
+        job.reject(err);
+    }
+    return job.promise;
+}
+
+module.exports = { attachWorker, detachWorker, isRunning, accepts, runJob };